@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import os
+import time
 import plotly.express as px
 from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
@@ -15,31 +16,23 @@ st.set_page_config(
 )
 
 from utils import (
-    load_animals, 
-    load_breeding_cycles, 
-    load_gestation, 
-    load_weight_records,
-    load_insemination,
-    load_pens,
-    load_pen_allocations,
-    load_maternity,
-    load_litters,
-    load_piglets,
-    load_weaning,
-    load_nursery,
-    load_nursery_batches,
-    load_nursery_movements,
-    load_gilts,
-    load_gilts_selection,
-    load_gilts_discard,
+    LazyTables,
+    record_page_render,
+    get_table_cache_stats,
     calculate_statistics,
+    get_weight_outlier_flags,
     authenticate_employee,
     register_employee,
     load_employees,
     check_developer_access,
-    check_permission
+    check_permission,
+    get_restricted_pages,
+    start_report_scheduler
 )
 
+# Geração noturna dos pacotes de relatórios (uma thread por processo, iniciada na primeira execução)
+start_report_scheduler()
+
 # Função para criar um usuário administrador padrão se necessário
 def setup_default_admin():
     employees_df = load_employees()
@@ -327,6 +320,13 @@ with st.sidebar:
         </div>
         """, unsafe_allow_html=True)
         
+        # Ocultar do menu as páginas que o cargo não pode acessar (lista pré-calculada no cache de permissões)
+        restricted_pages = get_restricted_pages(st.session_state.current_user['cargo'])
+        if restricted_pages:
+            page_slugs = [page[:-3].split('_', 2)[-1] for page in restricted_pages]
+            hidden_links = ",\n".join(f'[data-testid="stSidebarNav"] a[href$="/{slug}"]' for slug in page_slugs)
+            st.markdown(f"<style>{hidden_links} {{ display: none; }}</style>", unsafe_allow_html=True)
+        
         # Adiciona CSS personalizado para o botão de sair no modo escuro
         st.markdown("""
         <style>
@@ -482,24 +482,17 @@ Este sistema ajuda a gerenciar sua granja de suínos, monitorando:
 if not os.path.exists("data"):
     os.makedirs("data")
 
-# Load data
-animals_df = load_animals()
-breeding_df = load_breeding_cycles()
-gestation_df = load_gestation()
-weight_df = load_weight_records()
-insemination_df = load_insemination()
-pens_df = load_pens()
-pen_allocations_df = load_pen_allocations()
-maternity_df = load_maternity()
-litters_df = load_litters()
-piglets_df = load_piglets()
-weaning_df = load_weaning()
-nursery_df = load_nursery()
-nursery_batches_df = load_nursery_batches()
-nursery_movements_df = load_nursery_movements()
-gilts_df = load_gilts()
-gilts_selection_df = load_gilts_selection()
-gilts_discard_df = load_gilts_discard()
+# Load data (apenas as tabelas usadas pelo painel, sob demanda)
+render_start = time.perf_counter()
+disk_reads_before = get_table_cache_stats()['misses']
+tables = LazyTables()
+animals_df = tables['animals']
+breeding_df = tables['breeding']
+gestation_df = tables['gestation']
+weight_df = tables['weight']
+insemination_df = tables['insemination']
+pens_df = tables['pens']
+pen_allocations_df = tables['pen_allocations']
 
 # Dashboard metrics
 col1, col2, col3, col4, col5 = st.columns(5)
@@ -516,7 +509,10 @@ if not breeding_df.empty:
     in_heat_animals = len(breeding_df[(breeding_df['proxima_data'] >= today) & 
                                       (breeding_df['proxima_data'] <= today + timedelta(days=3))])
 
-avg_weight = weight_df['peso'].mean() if not weight_df.empty else 0
+# Pesagens sinalizadas como atípicas ficam fora da média e da distribuição
+weight_flags = get_weight_outlier_flags(weight_df, animals_df)
+valid_weight_df = weight_df[~weight_flags['outlier'].astype(bool)] if not weight_df.empty else weight_df
+avg_weight = valid_weight_df['peso'].mean() if not valid_weight_df.empty else 0
 
 # Pen metrics
 total_pens = len(pens_df) if not pens_df.empty else 0
@@ -551,7 +547,7 @@ st.subheader("Visão Geral")
 
 if not animals_df.empty and not weight_df.empty:
     # Merge data for visualization
-    merged_df = pd.merge(weight_df, animals_df, on='id_animal')
+    merged_df = pd.merge(valid_weight_df, animals_df, on='id_animal')
     
     col1, col2 = st.columns(2)
     
@@ -668,4 +664,7 @@ st.markdown("""
 
 # Footer
 st.markdown("---")
-st.markdown("© 2025 Sistema de Gestão Suinocultura")
\ No newline at end of file
+st.markdown("© 2025 Sistema de Gestão Suinocultura")
+
+# Registrar o tempo de renderização do painel (frio = alguma tabela foi lida do disco)
+record_page_render('app.py', time.perf_counter() - render_start, get_table_cache_stats()['misses'] > disk_reads_before)
\ No newline at end of file
@@ -0,0 +1,179 @@
+import os
+import sys
+import time
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+
+sys_path = os.path.dirname(os.path.abspath(__file__))
+if sys_path not in sys.path:
+    sys.path.append(sys_path)
+
+from utils import (
+    CHART_MAX_POINTS,
+    CHART_WEBGL_THRESHOLD,
+    CHART_DENSITY_THRESHOLD,
+    downsample_series,
+    density_grid,
+    record_chart_render,
+    cached_result
+)
+
+def _render_mode(n_points):
+    return 'webgl' if n_points > CHART_WEBGL_THRESHOLD else 'svg'
+
+def _chart_meta(fig):
+    return dict(fig.layout.meta) if isinstance(fig.layout.meta, dict) else {}
+
+def _mark_source_points(fig, n_points):
+    # Guardado no layout para que show_chart registre quantos pontos havia antes da redução
+    fig.update_layout(meta=dict(_chart_meta(fig), pontos_originais=int(n_points)))
+    return fig
+
+def line_chart(df, x, y, color=None, max_points=CHART_MAX_POINTS, method='lttb', **kwargs):
+    """
+    px.line para séries grandes: reduz cada série a max_points pontos (LTTB ou mínimo/máximo)
+    e usa WebGL quando ainda restam muitos pontos.
+
+    Args:
+        df: DataFrame com os dados
+        x, y: Colunas dos eixos
+        color: Coluna que separa as séries
+        max_points: Pontos por série após a redução
+        method: 'lttb' ou 'minmax'
+        **kwargs: Demais argumentos do px.line (labels, title, markers...)
+
+    Returns:
+        Figure: Gráfico Plotly
+    """
+    data = downsample_series(df, x, y, group=color, max_points=max_points, method=method)
+    fig = px.line(data, x=x, y=y, color=color, render_mode=_render_mode(len(data)), **kwargs)
+    return _mark_source_points(fig, len(df))
+
+def scatter_chart(df, x, y, color=None, trendline=False, density_threshold=CHART_DENSITY_THRESHOLD, **kwargs):
+    """
+    px.scatter para muitos pontos: WebGL acima de CHART_WEBGL_THRESHOLD e mapa de
+    densidade acima de density_threshold (hover, tamanho e cor por ponto são descartados).
+
+    Args:
+        df: DataFrame com os dados
+        x, y: Colunas dos eixos
+        color: Coluna de categoria
+        trendline: Adiciona uma reta de tendência (mínimos quadrados) por categoria
+        density_threshold: Número de pontos a partir do qual o gráfico vira mapa de densidade
+        **kwargs: Demais argumentos do px.scatter (labels, title, hover_data...)
+
+    Returns:
+        Figure: Gráfico Plotly
+    """
+    if len(df) > density_threshold:
+        # Contagens calculadas no servidor: só a grade é enviada, não os pontos
+        x_centers, y_centers, counts = density_grid(df, x, y)
+        labels = kwargs.get('labels') or {}
+        fig = go.Figure(go.Heatmap(
+            x=x_centers, y=y_centers, z=np.where(counts > 0, counts, np.nan),
+            colorscale='Blues', colorbar=dict(title='Pontos')
+        ))
+        fig.update_layout(
+            title=kwargs.get('title'),
+            xaxis_title=labels.get(x, x),
+            yaxis_title=labels.get(y, y)
+        )
+    else:
+        fig = px.scatter(df, x=x, y=y, color=color, render_mode=_render_mode(len(df)), **kwargs)
+
+    if trendline:
+        groups = df.groupby(color) if color else [(None, df)]
+        for name, group_df in groups:
+            points = group_df[[x, y]].dropna()
+            if len(points) < 2 or points[x].nunique() < 2:
+                continue
+            # Reta com dois pontos em vez de uma linha com todos os valores de x
+            slope, intercept = np.polyfit(points[x].astype(float), points[y].astype(float), 1)
+            x_range = np.array([points[x].min(), points[x].max()], dtype=float)
+            fig.add_trace(go.Scatter(
+                x=x_range,
+                y=slope * x_range + intercept,
+                mode='lines',
+                name=f"Tendência {name}" if name is not None else "Tendência",
+                line=dict(dash='dot')
+            ))
+    return _mark_source_points(fig, len(df))
+
+def box_chart(df, x, y, **kwargs):
+    """
+    px.box que, com muitos pontos, envia apenas os quartis calculados no servidor
+    (o px.box envia todos os valores e calcula as caixas no navegador).
+
+    Args:
+        df: DataFrame com os dados
+        x: Coluna de categoria
+        y: Coluna de valores
+        **kwargs: Demais argumentos do px.box (labels, title...)
+
+    Returns:
+        Figure: Gráfico Plotly
+    """
+    if len(df) <= CHART_WEBGL_THRESHOLD:
+        return _mark_source_points(px.box(df, x=x, y=y, **kwargs), len(df))
+
+    stats = df.groupby(x)[y].describe()
+    iqr = stats['75%'] - stats['25%']
+    fig = go.Figure(go.Box(
+        x=stats.index.astype(str),
+        q1=stats['25%'],
+        median=stats['50%'],
+        q3=stats['75%'],
+        lowerfence=np.maximum(stats['min'], stats['25%'] - 1.5 * iqr),
+        upperfence=np.minimum(stats['max'], stats['75%'] + 1.5 * iqr),
+        mean=stats['mean']
+    ))
+    labels = kwargs.get('labels') or {}
+    fig.update_layout(title=kwargs.get('title'), xaxis_title=labels.get(x, x), yaxis_title=labels.get(y, y))
+    return _mark_source_points(fig, len(df))
+
+def cached_figure(name, tables, params, build):
+    """
+    Figura memoizada pela versão das tabelas de entrada e pelos filtros (utils.cached_result).
+
+    A figura é montada e serializada uma vez por versão dos dados; as interações que
+    não mudam dados nem filtros reutilizam a mesma figura.
+
+    Args:
+        name: Nome da figura nas estatísticas de acerto
+        tables: Tabelas de que a figura depende (nomes de utils.TABLE_FILES)
+        params: Filtros que alteram a figura
+        build: Função sem argumentos que monta a figura
+
+    Returns:
+        Figure: Gráfico Plotly
+    """
+    def compute():
+        fig = build()
+        fig.update_layout(meta=dict(_chart_meta(fig), payload_bytes=len(fig.to_json())))
+        return fig
+    return cached_result(name, tables, params, compute, size=lambda fig: fig.layout.meta['payload_bytes'])
+
+def show_chart(fig, chart, **kwargs):
+    """
+    st.plotly_chart registrando pontos, tamanho do JSON e tempo de serialização/envio.
+
+    Args:
+        fig: Figura Plotly
+        chart: Nome do gráfico nas estatísticas do painel do desenvolvedor
+        **kwargs: Argumentos do st.plotly_chart
+    """
+    start = time.perf_counter()
+    meta = _chart_meta(fig)
+    payload_bytes = meta.get('payload_bytes') or len(fig.to_json())
+    kwargs.setdefault('use_container_width', True)
+    st.plotly_chart(fig, **kwargs)
+    points_sent = sum(len(trace.x) for trace in fig.data if getattr(trace, 'x', None) is not None)
+    record_chart_render(
+        chart,
+        meta.get('pontos_originais', points_sent),
+        points_sent,
+        payload_bytes,
+        time.perf_counter() - start
+    )
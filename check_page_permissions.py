@@ -3,6 +3,7 @@ import sys
 import json
 import streamlit as st
 import importlib.util
+import inspect
 
 def load_page_permissions():
     """
@@ -22,10 +23,13 @@ def load_page_permissions():
     else:
         return {}
 
-def check_page_permission():
+def check_page_permission(page_filename=None):
     """
     Verifica se o usuário autenticado tem permissão para acessar a página atual
     
+    Args:
+        page_filename: Nome do arquivo da página; por padrão, o arquivo de quem chamou a função
+    
     Returns:
         bool: True se o usuário tem permissão, False caso contrário
     """
@@ -39,30 +43,15 @@ def check_page_permission():
         sys.path.append(sys_path)
     
     try:
-        from utils import check_permission
+        from utils import has_page_permission
     except ImportError:
         # Se não conseguir importar a função, não pode verificar as permissões
         return False
     
-    # Obter o nome do arquivo da página atual
-    script_path = __file__
-    page_filename = os.path.basename(script_path)
-    
-    # Carregar as permissões das páginas
-    page_permissions = load_page_permissions()
-    
-    # Obter as permissões necessárias para esta página
-    required_permissions = page_permissions.get(page_filename, [])
-    
-    # Se não houver permissões necessárias, todos os usuários autenticados podem acessar
-    if not required_permissions:
-        return True
-    
-    # Verificar se o usuário tem pelo menos uma das permissões necessárias
-    user = st.session_state.current_user
-    for permission in required_permissions:
-        if check_permission(user, permission):
-            return True
+    # Obter o nome do arquivo da página atual (quem chamou esta função)
+    if page_filename is None:
+        page_filename = os.path.basename(inspect.currentframe().f_back.f_code.co_filename)
     
-    # Se chegou aqui, o usuário não tem nenhuma das permissões necessárias
-    return False
\ No newline at end of file
+    # Verificar pelo cache compilado de permissões (cargo × permissões exigidas pela página);
+    # páginas sem permissões configuradas ficam liberadas para todos os usuários autenticados
+    return has_page_permission(st.session_state.current_user, page_filename)
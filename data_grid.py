@@ -0,0 +1,90 @@
+import os
+import sys
+import pandas as pd
+import streamlit as st
+
+sys_path = os.path.dirname(os.path.abspath(__file__))
+if sys_path not in sys.path:
+    sys.path.append(sys_path)
+
+from utils import GRID_PAGE_SIZE, query_grid_page
+
+def paginated_dataframe(df, key, page_size=GRID_PAGE_SIZE, search_columns=None, filter_columns=None,
+                        sort_by=None, ascending=False, column_config=None):
+    """
+    Exibe uma tabela grande paginada no servidor: busca, filtros, ordenação e paginação
+    são resolvidos em utils.query_grid_page e apenas a página visível é enviada ao navegador.
+
+    Args:
+        df: DataFrame completo (não é copiado nem enviado inteiro)
+        key: Chave única do componente na página
+        page_size: Número de linhas por página
+        search_columns: Colunas usadas na busca por texto (padrão: colunas de texto)
+        filter_columns: Colunas oferecidas como filtro de seleção múltipla
+        sort_by: Coluna de ordenação inicial
+        ascending: Ordem inicial
+        column_config: Configuração de colunas repassada ao st.dataframe
+
+    Returns:
+        DataFrame: Linhas da página exibida
+    """
+    if search_columns is None:
+        search_columns = [
+            column for column in df.columns
+            if pd.api.types.is_string_dtype(df[column]) or pd.api.types.is_object_dtype(df[column])
+        ]
+    filter_columns = filter_columns or []
+
+    columns = st.columns([3, 2, 1])
+    with columns[0]:
+        search = st.text_input("Buscar", key=f"{key}_search", placeholder="Digite para filtrar...") if search_columns else None
+    with columns[1]:
+        sort_options = list(df.columns)
+        sort_index = sort_options.index(sort_by) if sort_by in sort_options else 0
+        sort_column = st.selectbox("Ordenar por", sort_options, index=sort_index, key=f"{key}_sort")
+    with columns[2]:
+        order = st.selectbox("Ordem", ["Decrescente", "Crescente"], index=1 if ascending else 0, key=f"{key}_order")
+
+    filters = {}
+    if filter_columns:
+        filter_cols = st.columns(len(filter_columns))
+        for col, column in zip(filter_cols, filter_columns):
+            with col:
+                options = sorted(df[column].dropna().unique().tolist(), key=str)
+                selected = st.multiselect(column, options, key=f"{key}_filter_{column}")
+                if selected:
+                    filters[column] = selected
+
+    # Volta para a primeira página quando a consulta muda
+    query_state = (search, sort_column, order, tuple((k, tuple(v)) for k, v in filters.items()))
+    if st.session_state.get(f"{key}_query") != query_state:
+        st.session_state[f"{key}_query"] = query_state
+        st.session_state[f"{key}_page"] = 1
+
+    page = st.session_state.get(f"{key}_page", 1)
+    page_df, total, n_pages, page = query_grid_page(
+        df,
+        search=search,
+        search_columns=search_columns,
+        filters=filters,
+        sort_by=sort_column,
+        ascending=(order == "Crescente"),
+        page=page,
+        page_size=page_size
+    )
+    st.session_state[f"{key}_page"] = page
+
+    st.dataframe(page_df, hide_index=True, use_container_width=True, column_config=column_config)
+
+    nav_cols = st.columns([3, 1])
+    with nav_cols[0]:
+        if total:
+            first = (page - 1) * page_size + 1
+            st.caption(f"Mostrando {first}–{first + len(page_df) - 1} de {total} registros")
+        else:
+            st.caption("Nenhum registro encontrado.")
+    with nav_cols[1]:
+        if n_pages > 1:
+            st.number_input(f"Página (de {n_pages})", min_value=1, max_value=n_pages, step=1, key=f"{key}_page")
+
+    return page_df
@@ -0,0 +1,33 @@
+import os
+import sys
+import streamlit as st
+
+sys_path = os.path.dirname(os.path.abspath(__file__))
+if sys_path not in sys.path:
+    sys.path.append(sys_path)
+
+from utils import export_to_file
+
+def export_download_button(source, format_type, file_name, label="Baixar arquivo", key=None):
+    """
+    Exporta em blocos para um arquivo temporário (utils.export_to_file) e o oferece
+    com st.download_button a partir do arquivo aberto, sem montar o conteúdo em memória
+    nem embuti-lo em base64 na página.
+
+    Args:
+        source: DataFrame ou nome de uma tabela de utils.TABLE_FILES
+        format_type: 'csv', 'excel', 'parquet' ou 'json'
+        file_name: Nome do arquivo baixado, sem extensão
+        label: Texto do botão
+        key: Chave única do botão na página
+
+    Returns:
+        str: Extensão do arquivo gerado
+    """
+    path, extension, mime = export_to_file(source, format_type)
+    try:
+        with open(path, 'rb') as f:
+            st.download_button(label, data=f, file_name=f"{file_name}.{extension}", mime=mime, key=key)
+    finally:
+        os.remove(path)
+    return extension
@@ -32,6 +32,7 @@ from utils import (
     VACCINATION_RECORDS_FILE,
     MORTALITY_FILE
 )
+from downloads import export_download_button
 
 st.set_page_config(
     page_title="Administração",
@@ -416,12 +417,11 @@ with tab4:
             df = load_mortality_records()
         
         if not df.empty:
-            csv = df.to_csv(index=False)
-            st.download_button(
-                "📥 Baixar CSV",
-                data=csv,
-                file_name=f"{data_key}_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
+            export_download_button(
+                df,
+                'csv',
+                f"{data_key}_{datetime.now().strftime('%Y%m%d')}",
+                label="📥 Baixar CSV"
             )
         else:
             st.warning("Não há dados para exportar.")
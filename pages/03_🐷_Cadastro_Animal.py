@@ -10,6 +10,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from utils import load_animals, save_animals, date_to_pig_calendar, pig_calendar_to_date, check_permission
 from check_page_permissions import check_page_permission
+from data_grid import paginated_dataframe
 
 st.set_page_config(
     page_title="Cadastro de Animais",
@@ -173,12 +174,16 @@ with tab2:
     
     # Display data
     if not filtered_df.empty:
-        st.dataframe(
+        # Busca e filtro acima já aplicados; a grade pagina e ordena no servidor
+        paginated_dataframe(
             filtered_df[[
                 'identificacao', 'nome', 'categoria', 'data_nascimento', 
                 'sexo', 'raca', 'origem', 'data_cadastro'
             ]],
-            use_container_width=True
+            key="animal_list",
+            search_columns=[],
+            sort_by='identificacao',
+            ascending=True
         )
         
         # Animal details
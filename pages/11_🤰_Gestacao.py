@@ -12,6 +12,7 @@ import plotly.graph_objects as go
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from utils import load_animals, load_gestation, save_gestation, calculate_gestation_details, check_permission
+from charts import cached_figure, show_chart
 
 st.set_page_config(
     page_title="Gestação",
@@ -339,33 +340,37 @@ with tab2:
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    # Average litter size by animal
-                    avg_by_animal = display_completed_df.groupby('identificacao')['quantidade_leitoes'].mean().reset_index()
-                    avg_by_animal.columns = ['Animal', 'Média de Leitões']
+                    # Average litter size by animal (em cache até a próxima gravação)
+                    def build_avg_by_animal():
+                        avg_by_animal = display_completed_df.groupby('identificacao')['quantidade_leitoes'].mean().reset_index()
+                        avg_by_animal.columns = ['Animal', 'Média de Leitões']
+                        return px.bar(
+                            avg_by_animal,
+                            x='Animal',
+                            y='Média de Leitões',
+                            title='Média de Leitões por Matriz'
+                        )
                     
-                    fig = px.bar(
-                        avg_by_animal,
-                        x='Animal',
-                        y='Média de Leitões',
-                        title='Média de Leitões por Matriz'
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
+                    fig = cached_figure("Média de Leitões por Matriz", ['gestation', 'animals'], None, build_avg_by_animal)
+                    show_chart(fig, "Média de Leitões por Matriz")
                 
                 with col2:
                     # Total litter count over time
-                    display_completed_df['data_parto'] = pd.to_datetime(display_completed_df['data_parto'])
-                    display_completed_df['month'] = display_completed_df['data_parto'].dt.to_period('M')
-                    monthly_count = display_completed_df.groupby('month')['quantidade_leitoes'].sum().reset_index()
-                    monthly_count['month'] = monthly_count['month'].astype(str)
+                    def build_monthly_count():
+                        months = pd.to_datetime(display_completed_df['data_parto']).dt.to_period('M')
+                        monthly_count = display_completed_df.groupby(months)['quantidade_leitoes'].sum().reset_index()
+                        monthly_count.columns = ['month', 'quantidade_leitoes']
+                        monthly_count['month'] = monthly_count['month'].astype(str)
+                        return px.line(
+                            monthly_count,
+                            x='month',
+                            y='quantidade_leitoes',
+                            title='Total de Leitões por Mês',
+                            labels={'month': 'Mês', 'quantidade_leitoes': 'Quantidade de Leitões'}
+                        )
                     
-                    fig = px.line(
-                        monthly_count,
-                        x='month',
-                        y='quantidade_leitoes',
-                        title='Total de Leitões por Mês',
-                        labels={'month': 'Mês', 'quantidade_leitoes': 'Quantidade de Leitões'}
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
+                    fig = cached_figure("Total de Leitões por Mês", ['gestation'], None, build_monthly_count)
+                    show_chart(fig, "Total de Leitões por Mês")
         else:
             st.info("Não há histórico de partos registrados.")
     else:
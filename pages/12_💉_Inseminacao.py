@@ -18,7 +18,16 @@ from utils import (
     load_insemination,
     save_insemination
 ,
-    check_permission
+    check_permission,
+    load_litters,
+    load_piglets,
+    load_gilts,
+    load_gestation,
+    build_pedigree,
+    calculate_relationship,
+    recommend_matings,
+    MATING_MAX_OFFSPRING_INBREEDING,
+    MATING_HEAT_WINDOW_DAYS
 )
 
 st.set_page_config(
@@ -58,6 +67,19 @@ female_animals = animals_df[
     (animals_df['categoria'].isin(['Matriz', 'Leitoa']))
 ].copy() if not animals_df.empty else pd.DataFrame()
 
+# Recomendações de acasalamento calculadas em lote para as fêmeas em cio ou com cio próximo
+litters_df = load_litters()
+pedigree = build_pedigree(animals_df, litters_df, load_piglets(), insemination_df, load_gilts())
+mating_recommendations = recommend_matings(
+    pedigree,
+    female_animals['id_animal'].tolist() if not female_animals.empty else [],
+    litters_df,
+    insemination_df,
+    top_k=3,
+    breeding_df=breeding_df,
+    gestation_df=load_gestation()
+)
+
 # Create tabs for different sections
 tab1, tab2 = st.tabs(["Registrar Inseminação", "Histórico de Inseminações"])
 
@@ -108,6 +130,14 @@ with tab1:
                     help="Linhagem genética do sêmen utilizado"
                 )
             
+            # Endogamia prevista para o sêmen informado
+            if num_identificacao_semen:
+                endogamia_prevista = calculate_relationship(
+                    pedigree, selected_animal_id, f"semen:{num_identificacao_semen}"
+                ) / 2
+                if endogamia_prevista > MATING_MAX_OFFSPRING_INBREEDING:
+                    st.warning(f"Endogamia prevista da leitegada: {endogamia_prevista * 100:.1f}%. Considere outro sêmen.")
+            
             # Idade do sêmen (opcional)
             idade_semen = st.number_input("Idade do Sêmen (dias)", min_value=0, value=0)
             
@@ -136,6 +166,35 @@ with tab1:
             # Observações
             observacoes = st.text_area("Observações")
             
+        # Sêmens recomendados para a fêmea selecionada
+        sow_recommendations = mating_recommendations[mating_recommendations['id_animal'] == selected_animal_id]
+        if not sow_recommendations.empty:
+            st.subheader("Sêmens Recomendados")
+            recommendations_display = sow_recommendations[[
+                'ranking', 'num_semen', 'linhagem_semen', 'endogamia_prevista',
+                'nascidos_vivos_medio', 'n_leitegadas', 'recomendado'
+            ]].copy()
+            recommendations_display['endogamia_prevista'] = (recommendations_display['endogamia_prevista'] * 100).round(2)
+            recommendations_display['nascidos_vivos_medio'] = recommendations_display['nascidos_vivos_medio'].round(1)
+            st.dataframe(
+                recommendations_display.rename(columns={
+                    'ranking': 'Posição',
+                    'num_semen': 'Nº do Sêmen',
+                    'linhagem_semen': 'Linhagem',
+                    'endogamia_prevista': 'Endogamia Prevista (%)',
+                    'nascidos_vivos_medio': 'Nascidos Vivos (média)',
+                    'n_leitegadas': 'Leitegadas',
+                    'recomendado': 'Recomendado'
+                }),
+                hide_index=True,
+                use_container_width=True
+            )
+        else:
+            st.caption(
+                "Sem recomendação de sêmen: só fêmeas não gestantes em cio ou com cio previsto "
+                f"em até {MATING_HEAT_WINDOW_DAYS} dias recebem recomendações."
+            )
+        
         # Submeter formulário
         if st.button("Registrar Inseminação"):
             if not num_identificacao_semen:
@@ -16,7 +16,10 @@ from utils import (
     load_breeding_cycles,
     save_breeding_cycles
 ,
-    check_permission
+    check_permission,
+    assign_heat_groups,
+    summarize_heat_groups,
+    HEAT_GROUP_WINDOW_DAYS
 )
 
 st.set_page_config(
@@ -142,53 +145,47 @@ with tab2:
     st.header("Grupos de Irmãs de Cio")
     
     if not breeding_df.empty and not female_animals.empty:
-        # Agrupar ciclos com irmãs de cio
-        cycles_with_sisters = breeding_df[breeding_df['irmas_cio'].notna() & (breeding_df['irmas_cio'] != '')]
+        # Janela de sincronização configurável
+        janela_dias = st.slider(
+            "Janela de sincronização (dias)",
+            min_value=0,
+            max_value=7,
+            value=HEAT_GROUP_WINDOW_DAYS,
+            help="Cios que ocorrem até esta quantidade de dias após o primeiro cio do grupo são considerados sincronizados"
+        )
         
-        if not cycles_with_sisters.empty:
-            # Agrupar por data para identificar grupos
-            cycles_with_sisters['data_cio'] = pd.to_datetime(cycles_with_sisters['data_cio'])
-            
-            # Mostrar grupos por data
-            unique_dates = cycles_with_sisters['data_cio'].dt.strftime('%Y-%m-%d').unique()
+        # Grupos pré-calculados pelo motor de sincronização
+        grouped_cycles = assign_heat_groups(breeding_df, janela_dias)
+        groups_summary = summarize_heat_groups(grouped_cycles)
+        
+        if not groups_summary.empty:
+            group_dates = dict(zip(groups_summary['grupo_cio'], groups_summary['data_grupo_cio']))
+            group_sizes = dict(zip(groups_summary['grupo_cio'], groups_summary['tamanho_grupo_cio']))
             
-            selected_date = st.selectbox(
-                "Selecione a data do grupo", 
-                options=unique_dates,
-                format_func=lambda x: f"{pd.to_datetime(x).strftime('%d/%m/%Y')}"
+            selected_group = st.selectbox(
+                "Selecione o grupo", 
+                options=groups_summary['grupo_cio'].tolist(),
+                format_func=lambda x: f"{pd.to_datetime(group_dates[x]).strftime('%d/%m/%Y')} ({group_sizes[x]} fêmeas)"
             )
             
-            if selected_date:
-                # Filtrar ciclos desta data
-                date_group = cycles_with_sisters[cycles_with_sisters['data_cio'].dt.strftime('%Y-%m-%d') == selected_date]
+            if selected_group is not None:
+                # Ciclos deste grupo
+                date_group = grouped_cycles[grouped_cycles['grupo_cio'] == selected_group]
+                selected_date = group_dates[selected_group]
                 
                 # Adicionar informações dos animais
-                display_df = pd.merge(
-                    date_group,
+                group_df = pd.merge(
+                    date_group[['id_ciclo', 'id_animal', 'status', 'observacao']],
                     animals_df[['id_animal', 'identificacao', 'nome', 'categoria', 'brinco']],
                     on='id_animal',
                     how='left'
                 )
+                group_df['brinco'] = group_df['brinco'].fillna('N/A')
+                group_df['observacao'] = group_df['observacao'].fillna('')
                 
                 st.subheader(f"Grupo de cio de {pd.to_datetime(selected_date).strftime('%d/%m/%Y')}")
                 
-                # Buscar informações dos animais no grupo
-                animals_in_group = []
-                for _, row in display_df.iterrows():
-                    animal_info = {
-                        'id_ciclo': row['id_ciclo'],
-                        'id_animal': row['id_animal'],
-                        'identificacao': row['identificacao'],
-                        'nome': row['nome'] if pd.notna(row['nome']) else '',
-                        'categoria': row['categoria'],
-                        'brinco': row['brinco'] if pd.notna(row['brinco']) else 'N/A',
-                        'status': row['status'],
-                        'observacao': row['observacao'] if pd.notna(row['observacao']) else ''
-                    }
-                    animals_in_group.append(animal_info)
-                
                 # Mostrar animais do grupo
-                group_df = pd.DataFrame(animals_in_group)
                 st.dataframe(
                     group_df[[
                         'identificacao', 'nome', 'categoria', 'brinco', 'status'
@@ -327,19 +324,18 @@ with tab2:
         st.info("Não há dados suficientes para exibir grupos de irmãs de cio.")
         
 # Estatísticas e visualizações
-if not breeding_df.empty and 'irmas_cio' in breeding_df.columns:
+if not breeding_df.empty and 'data_cio' in breeding_df.columns:
     st.header("Estatísticas de Irmãs de Cio")
     
-    # Filtrar ciclos com irmãs de cio
-    cycles_with_sisters = breeding_df[breeding_df['irmas_cio'].notna() & (breeding_df['irmas_cio'] != '')]
+    # Resumo dos grupos com pelo menos duas fêmeas
+    stats_groups = summarize_heat_groups(assign_heat_groups(breeding_df))
     
-    if not cycles_with_sisters.empty:
+    if not stats_groups.empty:
         col1, col2 = st.columns(2)
         
         with col1:
-            # Quantidade de animais por grupo
-            cycles_with_sisters['quantidade_total'] = cycles_with_sisters['quantidade_irmas_cio'] + 1
-            quantity_df = cycles_with_sisters.groupby('quantidade_total').size().reset_index()
+            # Quantidade de grupos por tamanho
+            quantity_df = stats_groups.groupby('tamanho_grupo_cio').size().reset_index()
             quantity_df.columns = ['Tamanho do Grupo', 'Quantidade de Grupos']
             
             fig = px.bar(
@@ -352,12 +348,13 @@ if not breeding_df.empty and 'irmas_cio' in breeding_df.columns:
         
         with col2:
             # Grupos por mês
-            cycles_with_sisters['mes'] = pd.to_datetime(cycles_with_sisters['data_cio']).dt.strftime('%Y-%m')
-            months_df = cycles_with_sisters.groupby('mes').size().reset_index()
+            months_df = stats_groups.assign(
+                mes=pd.to_datetime(stats_groups['data_grupo_cio']).dt.to_period('M').dt.to_timestamp()
+            ).groupby('mes').size().reset_index()
             months_df.columns = ['Mês', 'Quantidade de Grupos']
             
             # Converter para formato legível
-            months_df['Mês'] = pd.to_datetime(months_df['Mês'], format='%Y-%m').dt.strftime('%b/%Y')
+            months_df['Mês'] = months_df['Mês'].dt.strftime('%b/%Y')
             
             fig = px.line(
                 months_df,
@@ -368,4 +365,4 @@ if not breeding_df.empty and 'irmas_cio' in breeding_df.columns:
             )
             st.plotly_chart(fig, use_container_width=True)
     else:
-        st.info("Não há dados suficientes para gerar estatísticas de irmãs de cio.")
\ No newline at end of file
+        st.info("Não há dados suficientes para gerar estatísticas de irmãs de cio.")
@@ -18,10 +18,22 @@ from utils import (
     calculate_age,
     load_caliber_scores,
     save_caliber_scores,
-    calculate_body_condition
+    calculate_body_condition,
+    prepare_weighings,
+    build_growth_reference,
+    growth_reference_curves,
+    calculate_weight_percentiles,
+    detect_caliber_outliers,
+    get_weight_outlier_state,
+    get_caliber_outlier_state,
+    get_weight_outlier_flags,
+    record_appended_measure,
+    check_new_measure
 ,
     check_permission
 )
+from charts import line_chart, box_chart, show_chart, CHART_WEBGL_THRESHOLD
+from data_grid import paginated_dataframe
 
 st.set_page_config(
     page_title="Peso e Idade",
@@ -114,11 +126,31 @@ with tab1:
             
             peso = st.number_input("Peso (kg)", min_value=0.0, value=0.0, step=0.1)
             observacao = st.text_area("Observações")
+            
+            # Plausibility check against the animal's last weighing and its age band
+            peso_plausivel = True
+            confirmar_atipico = False
+            if peso > 0 and not weight_df.empty:
+                animal_row = animals_df[animals_df['id_animal'] == selected_animal].iloc[0]
+                idade_registro = (pd.to_datetime(data_registro) - pd.to_datetime(animal_row['data_nascimento'], errors='coerce')).days
+                peso_plausivel, motivos = check_new_measure(
+                    get_weight_outlier_state(weight_df, animals_df),
+                    selected_animal,
+                    animal_row['categoria'],
+                    None if pd.isna(idade_registro) else idade_registro,
+                    data_registro,
+                    peso
+                )
+                if not peso_plausivel:
+                    st.warning(f"Peso atípico: {', '.join(motivos)}")
+                    confirmar_atipico = st.checkbox("Confirmo que o peso informado está correto")
         
         # Submit button
         if st.button("Registrar Peso"):
             if peso <= 0:
                 st.error("O peso deve ser maior que zero.")
+            elif not peso_plausivel and not confirmar_atipico:
+                st.error("Confirme o peso atípico antes de registrar.")
             else:
                 # Create new weight record
                 new_weight = {
@@ -137,6 +169,7 @@ with tab1:
                 
                 # Save updated DataFrame
                 save_weight_records(weight_df)
+                record_appended_measure('peso', selected_animal, data_registro, peso)
                 
                 st.success(f"Peso registrado com sucesso!")
                 st.rerun()
@@ -165,8 +198,18 @@ with tab2:
                 default=[]
             )
         
+        include_outliers = st.checkbox(
+            "Incluir pesagens sinalizadas como atípicas",
+            value=False,
+            help="Pesagens duplicadas, fora da faixa etária ou com variação diária impossível ficam fora das análises por padrão"
+        )
+        
         # Prepare data
-        merged_df = pd.merge(weight_df, animals_df, on='id_animal')
+        weight_flags = get_weight_outlier_flags(weight_df, animals_df)
+        analysis_weight_df = weight_df if include_outliers else weight_df[~weight_flags['outlier'].astype(bool)]
+        if not include_outliers and weight_flags['outlier'].any():
+            st.caption(f"{int(weight_flags['outlier'].sum())} pesagens atípicas excluídas das análises.")
+        merged_df = pd.merge(analysis_weight_df, animals_df, on='id_animal')
         
         # Apply filters
         filtered_df = merged_df.copy()
@@ -186,7 +229,7 @@ with tab2:
             
             # Individual animal weight curve
             if filter_animal and len(filter_animal) <= 5:  # Limit to 5 animals for clarity
-                fig = px.line(
+                fig = line_chart(
                     filtered_df,
                     x='data_registro',
                     y='peso',
@@ -199,41 +242,83 @@ with tab2:
                     },
                     title='Evolução de Peso por Animal'
                 )
-                st.plotly_chart(fig, use_container_width=True)
-            
-            # Average weight by category and age
-            st.subheader("Peso Médio por Categoria e Idade")
+                show_chart(fig, "Evolução de Peso por Animal")
             
-            # Add age information
-            filtered_df['data_nascimento'] = pd.to_datetime(filtered_df['data_nascimento'])
-            filtered_df['idade_dias'] = filtered_df.apply(
-                lambda row: (row['data_registro'] - row['data_nascimento']).days, 
-                axis=1
-            )
+            # Reference weight-for-age curves
+            st.subheader("Curvas de Referência de Peso por Idade")
             
-            # Group by category and age bracket (monthly)
-            filtered_df['idade_meses'] = (filtered_df['idade_dias'] / 30).astype(int)
+            # Age information (vectorized)
+            filtered_df['data_nascimento'] = pd.to_datetime(filtered_df['data_nascimento'], errors='coerce')
+            filtered_df['idade_dias'] = (filtered_df['data_registro'] - filtered_df['data_nascimento']).dt.days
             
             # Filter out potentially erroneous age data
-            age_filtered_df = filtered_df[filtered_df['idade_dias'] >= 0]
+            age_filtered_df = filtered_df[filtered_df['idade_dias'] >= 0].copy()
             
             if not age_filtered_df.empty:
-                avg_by_category_age = age_filtered_df.groupby(['categoria', 'idade_meses'])['peso'].mean().reset_index()
+                # Reference built from the whole weighing history, so filters don't shift the curves
+                growth_reference = build_growth_reference(prepare_weighings(analysis_weight_df, animals_df))
+                percentiles_df = calculate_weight_percentiles(growth_reference, age_filtered_df)
+                age_filtered_df['percentil'] = percentiles_df['percentil']
+                age_filtered_df['z_score'] = percentiles_df['z_score']
                 
-                fig = px.line(
-                    avg_by_category_age,
-                    x='idade_meses',
-                    y='peso',
-                    color='categoria',
-                    markers=True,
-                    labels={
-                        'idade_meses': 'Idade (meses)',
-                        'peso': 'Peso Médio (kg)',
-                        'categoria': 'Categoria'
-                    },
-                    title='Peso Médio por Categoria e Idade'
+                reference_category = st.selectbox(
+                    "Categoria da curva de referência",
+                    options=sorted(age_filtered_df['categoria'].dropna().unique().tolist())
                 )
-                st.plotly_chart(fig, use_container_width=True)
+                category_points = age_filtered_df[age_filtered_df['categoria'] == reference_category]
+                max_age = int(category_points['idade_dias'].max()) + 30
+                curves_df = growth_reference_curves(growth_reference, groups=[reference_category])
+                curves_df = curves_df[curves_df['idade_dias'] <= max_age]
+                
+                if not curves_df.empty:
+                    fig = px.line(
+                        curves_df,
+                        x='idade_dias',
+                        y='peso',
+                        color='percentil',
+                        labels={
+                            'idade_dias': 'Idade (dias)',
+                            'peso': 'Peso (kg)',
+                            'percentil': 'Percentil'
+                        },
+                        title=f'Curvas de Referência - {reference_category}'
+                    )
+                    # WebGL para categorias com muitas pesagens
+                    points_trace = go.Scattergl if len(category_points) > CHART_WEBGL_THRESHOLD else go.Scatter
+                    fig.add_trace(points_trace(
+                        x=category_points['idade_dias'],
+                        y=category_points['peso'],
+                        mode='markers',
+                        name='Pesagens',
+                        marker=dict(size=6, color='black', opacity=0.6)
+                    ))
+                    show_chart(fig, "Curvas de Referência de Peso")
+                    
+                    # Most recent weighing per animal against the reference
+                    latest_df = category_points.sort_values('data_registro').drop_duplicates('id_animal', keep='last')
+                    latest_df = latest_df.dropna(subset=['percentil']).sort_values('percentil')
+                    
+                    if not latest_df.empty:
+                        paginated_dataframe(
+                            latest_df[['identificacao', 'idade_dias', 'peso', 'percentil', 'z_score']].rename(columns={
+                                'identificacao': 'Identificação',
+                                'idade_dias': 'Idade (dias)',
+                                'peso': 'Peso (kg)',
+                                'percentil': 'Percentil',
+                                'z_score': 'Escore Z'
+                            }),
+                            key="weight_percentiles",
+                            search_columns=['Identificação'],
+                            sort_by='Percentil',
+                            ascending=True,
+                            column_config={
+                                'Peso (kg)': st.column_config.NumberColumn(format="%.1f"),
+                                'Percentil': st.column_config.NumberColumn(format="%.0f"),
+                                'Escore Z': st.column_config.NumberColumn(format="%.2f")
+                            }
+                        )
+                else:
+                    st.info("Não há pesagens suficientes desta categoria para construir a curva de referência.")
                 
                 # Weight gain analysis
                 st.subheader("Análise de Ganho de Peso")
@@ -314,7 +399,7 @@ with tab2:
             # Weight distribution
             st.subheader("Distribuição de Peso por Categoria")
             
-            fig = px.box(
+            fig = box_chart(
                 filtered_df,
                 x='categoria',
                 y='peso',
@@ -324,7 +409,7 @@ with tab2:
                 },
                 title='Distribuição de Peso por Categoria'
             )
-            st.plotly_chart(fig, use_container_width=True)
+            show_chart(fig, "Distribuição de Peso por Categoria")
         else:
             st.info("Nenhum dado encontrado com os filtros selecionados.")
     else:
@@ -485,13 +570,34 @@ with tab3:
                     help="Anotações adicionais sobre a medição"
                 )
 
+                confirmar_p2_atipico = st.checkbox(
+                    "Confirmo a medida P2 mesmo se sinalizada como atípica",
+                    value=False
+                )
+
                 submitted = st.form_submit_button("✅ Registrar Medição")
 
                 if submitted:
                     valid, message = validate_caliber_measures(p1, p2, p3)
 
+                    # Plausibility check of P2 against the animal's history and age band
+                    p2_plausivel, motivos_p2 = True, []
+                    if valid and not caliber_df.empty:
+                        animal_row = animals_df[animals_df['id_animal'] == selected_animal].iloc[0]
+                        idade_medicao = (pd.to_datetime(data_medicao) - pd.to_datetime(animal_row['data_nascimento'], errors='coerce')).days
+                        p2_plausivel, motivos_p2 = check_new_measure(
+                            get_caliber_outlier_state(caliber_df, animals_df),
+                            selected_animal,
+                            animal_row['categoria'],
+                            None if pd.isna(idade_medicao) else idade_medicao,
+                            data_medicao,
+                            p2
+                        )
+
                     if not valid:
                         st.error(message)
+                    elif not p2_plausivel and not confirmar_p2_atipico:
+                        st.error(f"Medida P2 atípica: {', '.join(motivos_p2)}. Confirme a medida para registrar.")
                     elif not tecnico:
                         st.error("Por favor, informe o técnico responsável.")
                     else:
@@ -517,6 +623,7 @@ with tab3:
 
                         # Salvar dados
                         save_caliber_scores(caliber_df)
+                        record_appended_measure('p2', selected_animal, data_medicao, p2)
 
                         st.success(f"✅ Score registrado com sucesso!\nScore: {score} - {condition}")
                         st.rerun()
@@ -549,9 +656,19 @@ with tab3:
                 default=[]
             )
 
+        include_caliber_outliers = st.checkbox(
+            "Incluir medições de P2 sinalizadas como atípicas",
+            value=False
+        )
+
         # Aplicar filtros
         filtered_df = merged_df.copy()
 
+        if not include_caliber_outliers:
+            caliber_flags = detect_caliber_outliers(caliber_df, animals_df)
+            valid_scores = caliber_df.loc[~caliber_flags['outlier'].astype(bool), 'id_score']
+            filtered_df = filtered_df[filtered_df['id_score'].isin(valid_scores)]
+
         if filter_category:
             filtered_df = filtered_df[filtered_df['categoria'].isin(filter_category)]
 
@@ -565,7 +682,7 @@ with tab3:
                 'p1', 'p2', 'p3', 'score', 'condition'
             ]].copy()
 
-            display_df['data_medicao'] = pd.to_datetime(display_df['data_medicao']).dt.strftime('%d/%m/%Y')
+            display_df['data_medicao'] = pd.to_datetime(display_df['data_medicao'], errors='coerce')
 
             display_df.columns = [
                 'Identificação', 'Categoria', 'Data',
@@ -573,10 +690,13 @@ with tab3:
                 'Score', 'Condição'
             ]
 
-            st.dataframe(
-                display_df.sort_values('Data', ascending=False),
-                hide_index=True,
-                use_container_width=True
+            paginated_dataframe(
+                display_df,
+                key="caliber_history",
+                search_columns=['Identificação'],
+                filter_columns=['Categoria', 'Condição'],
+                sort_by='Data',
+                column_config={'Data': st.column_config.DateColumn(format="DD/MM/YYYY")}
             )
 
             # Gráficos
@@ -614,7 +734,7 @@ with tab3:
 
                 filtered_df['data_medicao'] = pd.to_datetime(filtered_df['data_medicao'])
 
-                fig = px.line(
+                fig = line_chart(
                     filtered_df,
                     x='data_medicao',
                     y='score',
@@ -633,7 +753,7 @@ with tab3:
                 fig.add_hline(y=4, line_dash="dash", line_color="orange", annotation_text="Gorda")
                 fig.add_hline(y=5, line_dash="dash", line_color="red", annotation_text="Muito Gorda")
 
-                st.plotly_chart(fig, use_container_width=True)
+                show_chart(fig, "Evolução do Score Corporal")
 
             # Exportar dados
             st.markdown("---")
@@ -11,7 +11,15 @@ from utils import (
     save_pen_allocations,
     get_pen_occupancy,
     get_available_pens,
-    get_animal_details
+    get_animal_details,
+    load_gestation,
+    load_litters,
+    load_weaning,
+    load_nursery_batches,
+    load_mortality_records,
+    forecast_pen_demand,
+    summarize_pen_shortfalls,
+    optimize_pen_assignment
 ,
     check_permission
 )
@@ -50,7 +58,7 @@ st.title("Gestão de Baias 🏠")
 st.markdown("Cadastre e gerencie as baias da sua granja, alocando animais nos espaços disponíveis.")
 
 # Abas para diferentes funcionalidades
-tab1, tab2, tab3, tab4 = st.tabs(["Cadastrar Baia", "Alocar Animal", "Realocar/Remover", "Visualizar Ocupação"])
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["Cadastrar Baia", "Alocar Animal", "Realocar/Remover", "Visualizar Ocupação", "Planejamento de Capacidade"])
 
 with tab1:
     st.header("Cadastrar Nova Baia")
@@ -231,6 +239,80 @@ with tab2:
                     
                     st.success(f"Animal alocado com sucesso!")
                     st.rerun()
+        
+        # Alocação em lote dos animais sem baia
+        st.markdown("---")
+        st.subheader("Alocação Automática")
+        st.write("Propõe baias para todos os animais sem alocação ativa, respeitando a capacidade e o setor de cada categoria. "
+                 "Animais da mesma categoria nascidos no mesmo dia são mantidos juntos sempre que possível.")
+        
+        allocated_ids = allocations_df.loc[allocations_df['data_saida'].isna(), 'id_animal'] if not allocations_df.empty else pd.Series(dtype=object)
+        unallocated = animals_df[~animals_df['id_animal'].isin(allocated_ids)]
+        if 'status' in unallocated.columns:
+            unallocated = unallocated[unallocated['status'].fillna('Ativo') == 'Ativo']
+        
+        if unallocated.empty:
+            st.info("Todos os animais ativos já estão alocados.")
+        else:
+            unallocated = unallocated.assign(
+                id_grupo=unallocated['categoria'].fillna('').astype(str) + '|' + unallocated['data_nascimento'].fillna('').astype(str)
+            )
+            groups_df = unallocated.groupby('id_grupo', as_index=False).agg(
+                quantidade=('id_animal', 'size'),
+                categoria=('categoria', 'first')
+            )
+            assignments_df, unassigned_df = optimize_pen_assignment(pens_df, allocations_df, groups_df)
+            
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Animais sem Baia", len(unallocated))
+            col2.metric("Baias Utilizadas", assignments_df['id_baia'].nunique())
+            col3.metric("Sem Vaga", int(unassigned_df['quantidade_nao_alocada'].sum()))
+            
+            if not assignments_df.empty:
+                proposal = assignments_df.merge(pens_df[['id_baia', 'identificacao', 'setor']], on='id_baia', how='left')
+                proposal[['categoria', 'data_nascimento']] = proposal['id_grupo'].str.split('|', n=1, expand=True)
+                st.dataframe(
+                    proposal[['categoria', 'data_nascimento', 'identificacao', 'setor', 'quantidade']].rename(columns={
+                        'categoria': 'Categoria',
+                        'data_nascimento': 'Nascimento',
+                        'identificacao': 'Baia',
+                        'setor': 'Setor',
+                        'quantidade': 'Animais'
+                    }),
+                    use_container_width=True,
+                    hide_index=True
+                )
+            
+            if not unassigned_df.empty:
+                st.warning("Alguns animais não couberam nas baias disponíveis do seu setor.")
+            
+            data_entrada_lote = st.date_input("Data de Entrada (alocação automática)", value=datetime.now().date())
+            
+            if st.button("Aplicar Alocação Automática", disabled=assignments_df.empty):
+                # Distribuir os animais de cada grupo pelas baias propostas, na ordem da proposta
+                pen_slots = assignments_df.loc[assignments_df.index.repeat(assignments_df['quantidade'])]
+                pen_slots = pen_slots.assign(ordem=pen_slots.groupby('id_grupo').cumcount())
+                animals_order = unallocated[['id_animal', 'id_grupo']].assign(
+                    ordem=unallocated.groupby('id_grupo').cumcount()
+                )
+                placed = animals_order.merge(pen_slots[['id_grupo', 'ordem', 'id_baia']], on=['id_grupo', 'ordem'])
+                
+                novas_alocacoes = pd.DataFrame({
+                    'id_alocacao': [str(uuid.uuid4()) for _ in range(len(placed))],
+                    'id_baia': placed['id_baia'].values,
+                    'id_animal': placed['id_animal'].values,
+                    'data_entrada': data_entrada_lote.strftime('%Y-%m-%d'),
+                    'data_saida': None,
+                    'motivo_saida': None,
+                    'status': 'Ativo',
+                    'observacao': 'Alocação automática'
+                })
+                
+                allocations_df = pd.concat([allocations_df, novas_alocacoes], ignore_index=True)
+                save_pen_allocations(allocations_df)
+                
+                st.success(f"{len(novas_alocacoes)} animais alocados com sucesso!")
+                st.rerun()
 
 with tab3:
     st.header("Realocar ou Remover Animal")
@@ -478,4 +560,63 @@ with tab4:
             else:
                 st.info("Esta baia está vazia no momento.")
         else:
-            st.info("Não há animais alocados em nenhuma baia.")
\ No newline at end of file
+            st.info("Não há animais alocados em nenhuma baia.")
+
+with tab5:
+    st.header("Planejamento de Capacidade")
+    st.write("Demanda prevista por setor a partir das gestações, leitegadas e lotes de creche em andamento.")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        horizonte_semanas = st.slider("Horizonte (semanas)", min_value=4, max_value=26, value=12)
+    with col2:
+        granularidade = st.radio("Granularidade", options=["Semanal", "Diária"], horizontal=True)
+    
+    demand_df = forecast_pen_demand(
+        pens_df,
+        animals_df,
+        load_gestation(),
+        load_litters(),
+        load_weaning(),
+        load_nursery_batches(),
+        load_mortality_records(),
+        horizon_days=horizonte_semanas * 7
+    )
+    periods_df, alerts_df = summarize_pen_shortfalls(demand_df, freq='W' if granularidade == "Semanal" else 'D')
+    
+    # Alertas de déficit
+    if alerts_df.empty:
+        st.success("Nenhum déficit de vagas previsto no horizonte selecionado.")
+    else:
+        for _, alert in alerts_df.iterrows():
+            st.warning(
+                f"**{alert['setor']}:** faltam até {int(alert['deficit_maximo'])} vagas a partir de "
+                f"{alert['data_inicio_deficit'].strftime('%d/%m/%Y')} (em {alert['semanas_ate_deficit']} semanas)."
+            )
+    
+    fig = px.line(
+        periods_df,
+        x='periodo',
+        y=['demanda', 'capacidade'],
+        facet_col='setor',
+        labels={
+            'periodo': 'Data',
+            'value': 'Animais',
+            'variable': 'Série',
+            'setor': 'Setor'
+        },
+        title="Demanda Prevista x Capacidade por Setor"
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    
+    st.dataframe(
+        periods_df.assign(periodo=periods_df['periodo'].dt.strftime('%d/%m/%Y')).rename(columns={
+            'periodo': 'Período',
+            'setor': 'Setor',
+            'demanda': 'Demanda (pico)',
+            'capacidade': 'Capacidade',
+            'deficit': 'Déficit'
+        }),
+        hide_index=True,
+        use_container_width=True
+    )
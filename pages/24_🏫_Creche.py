@@ -19,7 +19,13 @@ from utils import (
     get_active_nursery_batches,
     calculate_nursery_metrics,
     get_batch_details,
-    get_available_pens
+    get_available_pens,
+    optimize_pen_assignment,
+    get_pending_weanings,
+    form_weaning_batches,
+    create_weaning_batches,
+    WEANING_BATCH_TARGET_SIZE,
+    WEANING_BATCH_MAX_AGE_SPREAD
 ,
     check_permission
 )
@@ -214,22 +220,14 @@ with tab2:
     st.header("Registrar Novo Lote na Creche")
     
     # Opções de origem do lote
-    origem_options = ["Desmame Interno", "Transferência", "Compra Externa"]
+    origem_options = ["Desmame Interno", "Formação Automática de Lotes", "Transferência", "Compra Externa"]
     origem_lote = st.selectbox("Origem do Lote", origem_options)
     
     if origem_lote == "Desmame Interno":
         # Lista de desmames recentes sem lote de creche associado
         if not weaning_df.empty:
-            # Verificar quais desmames já têm lotes associados
-            desmames_com_lote = []
-            if not nursery_batches_df.empty and 'id_desmame' in nursery_batches_df.columns:
-                desmames_com_lote = nursery_batches_df['id_desmame'].dropna().unique().tolist()
-            
             # Filtrar desmames disponíveis (destino = Creche e sem lote associado)
-            desmames_disponiveis = weaning_df[
-                (weaning_df['destino_leitoes'] == 'Creche') & 
-                (~weaning_df['id_desmame'].isin(desmames_com_lote))
-            ].sort_values('data_desmame', ascending=False)
+            desmames_disponiveis = get_pending_weanings(weaning_df, nursery_batches_df).sort_values('data_desmame', ascending=False)
             
             if desmames_disponiveis.empty:
                 st.warning("Não há desmames disponíveis para criação de lotes. Registre um novo desmame ou escolha outra origem.")
@@ -254,6 +252,37 @@ with tab2:
                         'idade_desmame': desmame['idade_desmame']
                     })
                 
+                # Proposta de baias para todos os desmames pendentes (cada desmame mantido junto)
+                pen_proposal = pd.DataFrame(columns=['id_grupo', 'id_baia', 'quantidade'])
+                if not pens_df.empty:
+                    pending_groups = pd.DataFrame({
+                        'id_grupo': desmames_disponiveis['id_desmame'].values,
+                        'quantidade': desmames_disponiveis['total_desmamados'].fillna(0).astype(int).values,
+                        'setor': 'Creche'
+                    })
+                    pen_proposal, pending_unassigned = optimize_pen_assignment(
+                        pens_df[pens_df['setor'] == 'Creche'], pen_allocations_df, pending_groups
+                    )
+                    
+                    with st.expander("Sugestão de Baias para os Desmames Pendentes"):
+                        if pen_proposal.empty:
+                            st.info("Não há vagas em baias de creche para os desmames pendentes.")
+                        else:
+                            labels = {d['id_desmame']: d['label'] for d in desmame_options}
+                            suggestion = pen_proposal.merge(pens_df[['id_baia', 'identificacao']], on='id_baia', how='left')
+                            suggestion['desmame'] = suggestion['id_grupo'].map(labels)
+                            st.dataframe(
+                                suggestion[['desmame', 'identificacao', 'quantidade']].rename(columns={
+                                    'desmame': 'Desmame',
+                                    'identificacao': 'Baia',
+                                    'quantidade': 'Leitões'
+                                }),
+                                use_container_width=True,
+                                hide_index=True
+                            )
+                        if not pending_unassigned.empty:
+                            st.warning(f"{int(pending_unassigned['quantidade_nao_alocada'].sum())} leitões não couberam nas baias de creche disponíveis.")
+                
                 selected_desmame = st.selectbox(
                     "Selecione o Desmame",
                     options=[d['id_desmame'] for d in desmame_options],
@@ -324,9 +353,14 @@ with tab2:
                                     st.error("Não há baias de creche disponíveis no momento.")
                                     id_baia = None
                                 else:
+                                    # Pré-selecionar a baia sugerida para o desmame escolhido
+                                    pen_options = available_pens['id_baia'].tolist()
+                                    suggested = pen_proposal.loc[pen_proposal['id_grupo'] == selected_desmame, 'id_baia']
+                                    suggested_index = pen_options.index(suggested.iloc[0]) if not suggested.empty and suggested.iloc[0] in pen_options else 0
                                     id_baia = st.selectbox(
                                         "Baia de Destino",
-                                        options=available_pens['id_baia'].tolist(),
+                                        options=pen_options,
+                                        index=suggested_index,
                                         format_func=lambda x: f"{available_pens[available_pens['id_baia'] == x]['identificacao'].iloc[0]} ({available_pens[available_pens['id_baia'] == x]['ocupacao_atual'].iloc[0]}/{available_pens[available_pens['id_baia'] == x]['capacidade'].iloc[0]} ocupada)"
                                     )
                         else:
@@ -432,6 +466,72 @@ with tab2:
         else:
             st.warning("Não há registros de desmame disponíveis. Registre um desmame primeiro.")
     
+    elif origem_lote == "Formação Automática de Lotes":
+        st.write("Agrupa todos os leitões desmamados no período em lotes de creche do tamanho desejado, "
+                 "com a menor variação possível de peso e idade dentro de cada lote, e distribui os lotes nas baias livres.")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            periodo_inicio = st.date_input("Desmames a partir de", value=datetime.now().date() - timedelta(days=7))
+            tamanho_lote = st.number_input("Tamanho Alvo do Lote", min_value=5, max_value=500, value=WEANING_BATCH_TARGET_SIZE)
+        with col2:
+            periodo_fim = st.date_input("Desmames até", value=datetime.now().date())
+            amplitude_idade = st.number_input("Variação Máxima de Idade (dias)", min_value=1, max_value=30, value=WEANING_BATCH_MAX_AGE_SPREAD)
+        
+        pendentes = get_pending_weanings(weaning_df, nursery_batches_df, periodo_inicio, periodo_fim)
+        
+        if pendentes.empty:
+            st.warning("Não há desmames para a creche sem lote no período selecionado.")
+        else:
+            lots_df, composition_df = form_weaning_batches(pendentes, int(tamanho_lote), int(amplitude_idade))
+            
+            creche_pens = pens_df[pens_df['setor'] == 'Creche'] if not pens_df.empty else pens_df
+            lot_groups = pd.DataFrame({'id_grupo': lots_df['lote'], 'quantidade': lots_df['quantidade'], 'setor': 'Creche'})
+            pen_assignments_df, unplaced_df = optimize_pen_assignment(creche_pens, pen_allocations_df, lot_groups)
+            
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Desmames", len(pendentes))
+            col2.metric("Leitões", int(lots_df['quantidade'].sum()))
+            col3.metric("Lotes Propostos", len(lots_df))
+            col4.metric("Baias Utilizadas", pen_assignments_df['id_baia'].nunique())
+            
+            pens_per_lot = pen_assignments_df.merge(
+                pens_df[['id_baia', 'identificacao']], on='id_baia', how='left'
+            ).groupby('id_grupo')['identificacao'].agg(lambda names: ', '.join(map(str, names))) if not pen_assignments_df.empty else pd.Series(dtype=object)
+            proposal = lots_df.assign(baias=lots_df['lote'].map(pens_per_lot).fillna('Sem vaga'))
+            st.dataframe(
+                proposal[['lote', 'quantidade', 'peso_medio', 'peso_min', 'peso_max', 'idade_media', 'idade_min', 'idade_max', 'baias']].rename(columns={
+                    'lote': 'Lote',
+                    'quantidade': 'Leitões',
+                    'peso_medio': 'Peso Médio (kg)',
+                    'peso_min': 'Peso Mín. (kg)',
+                    'peso_max': 'Peso Máx. (kg)',
+                    'idade_media': 'Idade Média (dias)',
+                    'idade_min': 'Idade Mín.',
+                    'idade_max': 'Idade Máx.',
+                    'baias': 'Baias'
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+            
+            if not unplaced_df.empty:
+                st.error("Não há vagas suficientes nas baias de creche para todos os lotes propostos.")
+            
+            prefixo = st.text_input("Prefixo da Identificação dos Lotes", value=f"Lote-{datetime.now().strftime('%Y%m%d')}")
+            
+            if st.button("Criar Lotes", disabled=not unplaced_df.empty):
+                success, message = create_weaning_batches(
+                    lots_df, composition_df, pen_assignments_df,
+                    identification_prefix=prefixo,
+                    responsavel=st.session_state.current_user['nome']
+                )
+                if success:
+                    st.success(message)
+                    st.rerun()
+                else:
+                    st.error(message)
+    
     elif origem_lote == "Transferência" or origem_lote == "Compra Externa":
         # Formulário para entrada manual de lote
         with st.form("novo_lote_manual_form"):
@@ -17,7 +17,17 @@ from utils import (
     get_discarded_gilts,
     calculate_gilts_statistics
 ,
-    check_permission
+    check_permission,
+    load_litters,
+    load_piglets,
+    load_insemination,
+    build_pedigree,
+    calculate_gilts_inbreeding,
+    calculate_ages,
+    load_weight_records,
+    load_caliber_scores,
+    calculate_gilt_selection_index,
+    suggest_gilt_replacement
 )
 
 # Configuração da página
@@ -50,6 +60,11 @@ gilts_df = load_gilts()
 gilts_selection_df = load_gilts_selection()
 gilts_discard_df = load_gilts_discard()
 
+# Genealogia: coeficiente de endogamia de cada leitoa
+litters_df = load_litters()
+pedigree = build_pedigree(animals_df, litters_df, load_piglets(), load_insemination(), gilts_df)
+gilts_inbreeding_df = calculate_gilts_inbreeding(gilts_df, pedigree)
+
 # Título da página
 st.title("Seleção de Leitoas 🐖")
 st.markdown("""
@@ -145,9 +160,11 @@ with tab1:
             
             # Adicionar idade em dias
             if 'data_nascimento' in available_gilts.columns:
-                display_df['idade_dias'] = available_gilts['data_nascimento'].apply(
-                    lambda x: calculate_age(x) if pd.notna(x) else None
-                )
+                display_df['idade_dias'] = calculate_ages(available_gilts['data_nascimento'])
+            
+            # Adicionar coeficiente de endogamia (%)
+            endogamia = available_gilts[['id_leitoa']].merge(gilts_inbreeding_df, on='id_leitoa', how='left')
+            display_df['endogamia'] = (endogamia['coef_endogamia'].fillna(0) * 100).round(2).values
             
             # Renomear colunas
             display_df = display_df.rename(columns={
@@ -158,7 +175,8 @@ with tab1:
                 'peso_selecao': 'Peso (kg)',
                 'status': 'Status',
                 'data_selecao': 'Data de Seleção',
-                'idade_dias': 'Idade (dias)'
+                'idade_dias': 'Idade (dias)',
+                'endogamia': 'Endogamia (%)'
             })
             
             st.dataframe(
@@ -168,6 +186,72 @@ with tab1:
             )
         else:
             st.info("Não há leitoas ativas cadastradas.")
+        
+        # Ranking pelo índice de seleção (todas as leitoas disponíveis de uma vez)
+        st.subheader("Ranking de Seleção e Reposição")
+        
+        selection_index = calculate_gilt_selection_index(
+            gilts_df, gilts_selection_df, load_weight_records(), litters_df, animals_df, load_caliber_scores()
+        )
+        
+        if not selection_index.empty:
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                matrizes_ativas = int((animals_df['categoria'] == 'Matriz').sum()) if not animals_df.empty else 0
+                matrizes_ativas = st.number_input(
+                    "Matrizes Ativas no Plantel",
+                    min_value=0,
+                    value=matrizes_ativas,
+                    step=1
+                )
+            
+            with col2:
+                horizonte_dias = st.slider(
+                    "Horizonte de Reposição (dias)",
+                    min_value=30,
+                    max_value=365,
+                    value=90,
+                    step=15
+                )
+            
+            ranking_df, cota_reposicao = suggest_gilt_replacement(selection_index, matrizes_ativas, horizonte_dias)
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Cota de Reposição Sugerida", cota_reposicao)
+            with col2:
+                st.metric("Leitoas Aptas", int(ranking_df['apta'].sum()))
+            with col3:
+                st.metric("Leitoas Sugeridas", int(ranking_df['sugerida_reposicao'].sum()))
+            
+            display_ranking = ranking_df[[
+                'ranking', 'identificacao', 'indice_selecao', 'gpd', 'condicao_corporal',
+                'tetos_funcionais', 'idade_avaliacao', 'nascidos_vivos_mae', 'escore_geral',
+                'apta', 'motivo_inaptidao', 'sugerida_reposicao'
+            ]].copy()
+            display_ranking['indice_selecao'] = display_ranking['indice_selecao'].round(1)
+            display_ranking['gpd'] = display_ranking['gpd'].round(0)
+            display_ranking['nascidos_vivos_mae'] = display_ranking['nascidos_vivos_mae'].round(1)
+            
+            st.dataframe(
+                display_ranking.rename(columns={
+                    'ranking': 'Posição',
+                    'identificacao': 'Identificação',
+                    'indice_selecao': 'Índice',
+                    'gpd': 'GPD (g/dia)',
+                    'condicao_corporal': 'Condição Corporal (1-5)',
+                    'tetos_funcionais': 'Tetos Funcionais',
+                    'idade_avaliacao': 'Idade na Avaliação (dias)',
+                    'nascidos_vivos_mae': 'Nascidos Vivos da Mãe',
+                    'escore_geral': 'Escore (1-5)',
+                    'apta': 'Apta',
+                    'motivo_inaptidao': 'Motivo',
+                    'sugerida_reposicao': 'Sugerida para Reposição'
+                }),
+                hide_index=True,
+                use_container_width=True
+            )
     else:
         st.info("Não há leitoas cadastradas. Utilize a aba 'Cadastro de Leitoas' para cadastrar novas leitoas.")
 
@@ -453,6 +537,19 @@ with tab3:
                     else:
                         st.metric("Idade (dias)", "N/A")
                 
+                # Endogamia calculada a partir da genealogia (mãe/pai e leitegadas)
+                gilt_inbreeding = gilts_inbreeding_df[gilts_inbreeding_df['id_leitoa'] == selected_gilt['id_leitoa']]
+                if not gilt_inbreeding.empty:
+                    coef = gilt_inbreeding['coef_endogamia'].iloc[0]
+                    geracoes = int(gilt_inbreeding['geracoes_conhecidas'].iloc[0])
+                    st.metric(
+                        "Coeficiente de Endogamia (F)",
+                        f"{coef * 100:.2f}%",
+                        help=f"Coeficiente de Wright calculado com {geracoes} geração(ões) conhecida(s) na genealogia"
+                    )
+                    if coef >= 0.0625:
+                        st.warning("Endogamia elevada (≥ 6,25%, equivalente a acasalamento entre primos). Avalie com cuidado antes de selecionar.")
+                
                 # Formulário de avaliação
                 with st.form("form_avaliacao"):
                     st.subheader("Critérios de Avaliação")
@@ -1,4 +1,5 @@
 import streamlit as st
+from utils import prefetch_tables, MODULE_TABLES
 
 st.set_page_config(page_title="SAÚDE", page_icon="🔹", layout="wide")
 
@@ -7,6 +8,9 @@ if "authenticated" not in st.session_state or not st.session_state.authenticated
     st.warning("Você precisa estar autenticado para acessar esta página.")
     st.stop()
 
+# Pré-carregar em segundo plano as tabelas das páginas deste módulo
+prefetch_tables(MODULE_TABLES['SAUDE'])
+
 # Elementos de estilo personalizado para a barra lateral
 # Isso é injetado para criar um efeito de "seção" colorida no sidebar
 st.markdown("""
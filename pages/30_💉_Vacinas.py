@@ -13,10 +13,20 @@ from utils import (
     load_animals,
     load_vaccination_records,
     save_vaccination_records,
-    calculate_age
+    calculate_age,
+    load_vaccines,
+    load_vaccination_protocols,
+    load_pens,
+    load_pen_allocations,
+    plan_vaccination_campaign,
+    summarize_vaccination_worklist,
+    apply_vaccination_campaign,
+    VACCINATION_CAMPAIGN_INTERVAL_DAYS
 ,
     check_permission
 )
+from data_grid import paginated_dataframe
+from charts import cached_figure, show_chart
 
 st.set_page_config(
     page_title="Controle de Vacinação",
@@ -47,9 +57,13 @@ st.write("Registre e acompanhe a vacinação dos animais.")
 # Carregar dados
 animals_df = load_animals()
 vaccination_df = load_vaccination_records()
+vaccines_df = load_vaccines()
+protocols_df = load_vaccination_protocols()
+pens_df = load_pens()
+allocations_df = load_pen_allocations()
 
 # Tabs para organização
-tab1, tab2, tab3 = st.tabs(["Registrar Vacina", "Histórico de Vacinação", "Próximas Vacinas"])
+tab1, tab2, tab3, tab4 = st.tabs(["Registrar Vacina", "Histórico de Vacinação", "Próximas Vacinas", "Campanhas"])
 
 with tab1:
     st.header("Registrar Nova Vacinação")
@@ -203,17 +217,21 @@ with tab2:
                 'nome_vacina', 'dose', 'lote', 'responsavel'
             ]].copy()
             
-            display_df['data_aplicacao'] = pd.to_datetime(display_df['data_aplicacao']).dt.strftime('%d/%m/%Y')
+            display_df['data_aplicacao'] = pd.to_datetime(display_df['data_aplicacao'])
             
             display_df.columns = [
                 'Identificação', 'Categoria', 'Data',
                 'Vacina', 'Dose', 'Lote', 'Responsável'
             ]
             
-            st.dataframe(
-                display_df.sort_values('Data', ascending=False),
-                hide_index=True,
-                use_container_width=True
+            # Paginação no servidor: ordena pela data real e envia só a página visível
+            paginated_dataframe(
+                display_df,
+                key="vaccination_history",
+                search_columns=['Identificação', 'Vacina', 'Lote', 'Responsável'],
+                filter_columns=['Vacina'],
+                sort_by='Data',
+                column_config={'Data': st.column_config.DateColumn(format="DD/MM/YYYY")}
             )
             
             # Gráficos
@@ -221,53 +239,66 @@ with tab2:
             
             col1, col2 = st.columns(2)
             
+            # Gráficos em cache pela versão das tabelas e pelos filtros
+            chart_tables = ['vaccination_records', 'animals']
+            chart_filters = (filter_category, filter_animal)
+            
             with col1:
                 # Vacinas por categoria
-                vaccines_by_category = filtered_df.groupby(['categoria', 'nome_vacina']).size().reset_index(name='count')
-                fig = px.bar(
-                    vaccines_by_category,
-                    x='categoria',
-                    y='count',
-                    color='nome_vacina',
-                    title='Vacinas Aplicadas por Categoria',
-                    labels={
-                        'categoria': 'Categoria',
-                        'count': 'Quantidade',
-                        'nome_vacina': 'Vacina'
-                    }
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                def build_vaccines_by_category():
+                    vaccines_by_category = filtered_df.groupby(['categoria', 'nome_vacina']).size().reset_index(name='count')
+                    return px.bar(
+                        vaccines_by_category,
+                        x='categoria',
+                        y='count',
+                        color='nome_vacina',
+                        title='Vacinas Aplicadas por Categoria',
+                        labels={
+                            'categoria': 'Categoria',
+                            'count': 'Quantidade',
+                            'nome_vacina': 'Vacina'
+                        }
+                    )
+                
+                fig = cached_figure("Vacinas por Categoria", chart_tables, chart_filters, build_vaccines_by_category)
+                show_chart(fig, "Vacinas por Categoria")
             
             with col2:
                 # Distribuição de doses
-                doses_dist = filtered_df['dose'].value_counts()
-                fig = px.pie(
-                    values=doses_dist.values,
-                    names=doses_dist.index,
-                    title='Distribuição de Doses'
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                def build_doses_pie():
+                    doses_dist = filtered_df['dose'].value_counts()
+                    return px.pie(
+                        values=doses_dist.values,
+                        names=doses_dist.index,
+                        title='Distribuição de Doses'
+                    )
+                
+                fig = cached_figure("Distribuição de Doses", chart_tables, chart_filters, build_doses_pie)
+                show_chart(fig, "Distribuição de Doses")
             
             # Evolução temporal
             st.subheader("Evolução da Vacinação")
             
             filtered_df['data_aplicacao'] = pd.to_datetime(filtered_df['data_aplicacao'])
-            vaccines_over_time = filtered_df.groupby(['data_aplicacao', 'nome_vacina']).size().reset_index(name='count')
             
-            fig = px.line(
-                vaccines_over_time,
-                x='data_aplicacao',
-                y='count',
-                color='nome_vacina',
-                markers=True,
-                title='Evolução da Vacinação ao Longo do Tempo',
-                labels={
-                    'data_aplicacao': 'Data',
-                    'count': 'Quantidade',
-                    'nome_vacina': 'Vacina'
-                }
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            def build_vaccines_over_time():
+                vaccines_over_time = filtered_df.groupby(['data_aplicacao', 'nome_vacina']).size().reset_index(name='count')
+                return px.line(
+                    vaccines_over_time,
+                    x='data_aplicacao',
+                    y='count',
+                    color='nome_vacina',
+                    markers=True,
+                    title='Evolução da Vacinação ao Longo do Tempo',
+                    labels={
+                        'data_aplicacao': 'Data',
+                        'count': 'Quantidade',
+                        'nome_vacina': 'Vacina'
+                    }
+                )
+            
+            fig = cached_figure("Vacinas ao Longo do Tempo", chart_tables, chart_filters, build_vaccines_over_time)
+            show_chart(fig, "Vacinas ao Longo do Tempo")
             
             # Exportar dados
             if st.button("Exportar Dados"):
@@ -356,3 +387,87 @@ with tab3:
             st.info("Não há vacinas programadas para o futuro.")
     else:
         st.info("Não há registros de vacinação no sistema.")
+
+with tab4:
+    st.header("Planejamento de Campanhas")
+    st.write("Agrupa as doses pendentes dos protocolos por baia, com uma visita por baia em cada campanha, "
+             "respeitando o intervalo mínimo entre doses de cada vacina.")
+    
+    if protocols_df.empty:
+        st.info("Não há protocolos de vacinação cadastrados.")
+    elif animals_df.empty:
+        st.warning("Não há animais cadastrados. Cadastre animais primeiro.")
+    else:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            inicio_campanha = st.date_input("Início do Planejamento", value=datetime.now().date())
+        with col2:
+            horizonte = st.number_input("Horizonte (dias)", min_value=7, max_value=180, value=28, step=7)
+        with col3:
+            intervalo_campanha = st.number_input(
+                "Intervalo entre Campanhas (dias)", min_value=1, max_value=60, value=VACCINATION_CAMPAIGN_INTERVAL_DAYS
+            )
+        
+        plan_df = plan_vaccination_campaign(
+            animals_df, protocols_df, vaccines_df, vaccination_df, allocations_df,
+            start_date=inicio_campanha, horizon_days=int(horizonte), campaign_interval=int(intervalo_campanha)
+        )
+        
+        if plan_df.empty:
+            st.success("Não há doses pendentes no período.")
+        else:
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Doses Planejadas", len(plan_df))
+            col2.metric("Animais", plan_df['id_animal'].nunique())
+            col3.metric("Visitas a Baias", len(plan_df[['data_campanha', 'id_baia']].drop_duplicates()))
+            col4.metric("Doses em Atraso", int((plan_df['atraso_dias'] > 0).sum()))
+            
+            doses_por_dia = plan_df.groupby('data_campanha').size().reset_index(name='doses')
+            fig = px.bar(
+                doses_por_dia,
+                x='data_campanha',
+                y='doses',
+                title='Doses por Dia de Campanha',
+                labels={'data_campanha': 'Data', 'doses': 'Doses'}
+            )
+            st.plotly_chart(fig, use_container_width=True)
+            
+            # Roteiro do dia
+            st.subheader("Roteiro Diário")
+            campaign_days = sorted(plan_df['data_campanha'].unique())
+            selected_day = st.selectbox(
+                "Dia da Campanha",
+                options=campaign_days,
+                format_func=lambda x: pd.Timestamp(x).strftime('%d/%m/%Y')
+            )
+            day_plan = plan_df[plan_df['data_campanha'] == selected_day]
+            worklist = summarize_vaccination_worklist(day_plan, animals_df, vaccines_df, pens_df)
+            st.dataframe(
+                worklist[['baia', 'animais', 'doses', 'vacinas']].rename(columns={
+                    'baia': 'Baia',
+                    'animais': 'Animais',
+                    'doses': 'Doses',
+                    'vacinas': 'Vacinas'
+                }),
+                hide_index=True,
+                use_container_width=True
+            )
+            
+            with st.form("campaign_apply_form"):
+                st.write(f"Registrar as {len(day_plan)} doses do dia como aplicadas.")
+                responsavel_campanha = st.text_input("Responsável pela Aplicação")
+                lote_campanha = st.text_input("Lote da Vacina")
+                submitted_campaign = st.form_submit_button("Registrar Campanha do Dia")
+                
+                if submitted_campaign:
+                    if not responsavel_campanha:
+                        st.error("Por favor, informe o responsável pela aplicação.")
+                    else:
+                        success, message = apply_vaccination_campaign(
+                            day_plan, responsavel_campanha, vaccines_df, lote_campanha or None
+                        )
+                        if success:
+                            st.success(message)
+                            st.rerun()
+                        else:
+                            st.error(message)
@@ -15,10 +15,19 @@ from utils import (
     save_mortality_records,
     calculate_mortality_statistics,
     generate_mortality_report,
-    calculate_age
+    calculate_age,
+    load_piglets,
+    load_nursery_batches,
+    load_nursery_movements,
+    load_recria,
+    build_survival_data,
+    kaplan_meier,
+    calculate_survival_hazard
 ,
     check_permission
 )
+from data_grid import paginated_dataframe
+from charts import cached_figure, show_chart
 
 st.set_page_config(
     page_title="Registro de Mortalidade",
@@ -51,7 +60,7 @@ animals_df = load_animals()
 mortality_df = load_mortality_records()
 
 # Tabs para organização
-tab1, tab2, tab3 = st.tabs(["Registrar Morte", "Análise de Mortalidade", "Relatórios"])
+tab1, tab2, tab3, tab4 = st.tabs(["Registrar Morte", "Análise de Mortalidade", "Relatórios", "Sobrevivência"])
 
 with tab1:
     st.header("Registrar Nova Morte")
@@ -246,42 +255,45 @@ with tab2:
                 avg_weight = filtered_df['peso_morte'].mean()
                 st.metric("Peso Médio (kg)", f"{avg_weight:.1f}")
             
-            # Gráficos
+            # Gráficos (em cache pela versão dos registros e pelos filtros)
+            chart_filters = (start_date, end_date, filter_category)
             col1, col2 = st.columns(2)
             
             with col1:
                 # Mortes por causa
-                fig = px.pie(
+                fig = cached_figure("Mortalidade por Causa", ['mortality'], chart_filters, lambda: px.pie(
                     filtered_df,
                     names='causa_morte',
                     title='Distribuição por Causa da Morte'
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                ))
+                show_chart(fig, "Mortalidade por Causa")
             
             with col2:
                 # Mortes por local
-                fig = px.pie(
+                fig = cached_figure("Mortalidade por Local", ['mortality'], chart_filters, lambda: px.pie(
                     filtered_df,
                     names='local_morte',
                     title='Distribuição por Local da Morte'
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                ))
+                show_chart(fig, "Mortalidade por Local")
             
             # Evolução temporal
             st.subheader("Evolução da Mortalidade")
             
-            deaths_by_date = filtered_df.groupby(
-                filtered_df['data_morte'].dt.date
-            ).size().reset_index(name='count')
+            def build_deaths_by_date():
+                deaths_by_date = filtered_df.groupby(
+                    filtered_df['data_morte'].dt.date
+                ).size().reset_index(name='count')
+                return px.line(
+                    deaths_by_date,
+                    x='data_morte',
+                    y='count',
+                    title='Mortes por Data',
+                    labels={'data_morte': 'Data', 'count': 'Número de Mortes'}
+                )
             
-            fig = px.line(
-                deaths_by_date,
-                x='data_morte',
-                y='count',
-                title='Mortes por Data',
-                labels={'data_morte': 'Data', 'count': 'Número de Mortes'}
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            fig = cached_figure("Mortes por Data", ['mortality'], chart_filters, build_deaths_by_date)
+            show_chart(fig, "Mortes por Data")
             
             # Tabela detalhada
             st.subheader("Registros Detalhados")
@@ -291,17 +303,19 @@ with tab2:
                 'local_morte', 'idade_dias', 'peso_morte'
             ]].copy()
             
-            display_df['data_morte'] = display_df['data_morte'].dt.strftime('%d/%m/%Y')
-            
             display_df.columns = [
                 'Data', 'Categoria', 'Causa',
                 'Local', 'Idade (dias)', 'Peso (kg)'
             ]
             
-            st.dataframe(
-                display_df.sort_values('Data', ascending=False),
-                hide_index=True,
-                use_container_width=True
+            # Paginação no servidor: ordena pela data real e envia só a página visível
+            paginated_dataframe(
+                display_df,
+                key="mortality_history",
+                search_columns=['Categoria', 'Causa', 'Local'],
+                filter_columns=['Categoria', 'Causa'],
+                sort_by='Data',
+                column_config={'Data': st.column_config.DateColumn(format="DD/MM/YYYY")}
             )
         else:
             st.info("Nenhum dado encontrado para o período e filtros selecionados.")
@@ -420,3 +434,114 @@ with tab3:
             st.info("Nenhum dado encontrado para o período selecionado.")
     else:
         st.info("Não há dados de mortalidade registrados no sistema.")
+
+with tab4:
+    st.header("Análise de Sobrevivência")
+    st.write("Curvas de Kaplan–Meier por idade, considerando leitões na maternidade, lotes de creche e animais em recria.")
+    
+    survival_df = build_survival_data(
+        load_piglets(),
+        load_nursery_batches(),
+        load_nursery_movements(),
+        load_recria(),
+        animals_df,
+        mortality_df
+    )
+    
+    if survival_df.empty:
+        st.info("Não há dados de nascimentos, creche ou recria para a análise de sobrevivência.")
+    else:
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            fase_sobrevivencia = st.selectbox(
+                "Fase",
+                options=["Todas"] + sorted(survival_df['fase'].unique().tolist())
+            )
+        
+        with col2:
+            agrupamento = st.selectbox(
+                "Agrupar por",
+                options=['lote', 'coorte', 'fase'],
+                format_func=lambda x: {'lote': 'Lote / Leitegada', 'coorte': 'Coorte (semana)', 'fase': 'Fase'}[x]
+            )
+        
+        with col3:
+            causas = sorted(survival_df['causa'].dropna().unique().tolist())
+            causa_sobrevivencia = st.selectbox("Causa", options=["Todas"] + causas)
+        
+        fase_df = survival_df if fase_sobrevivencia == "Todas" else survival_df[survival_df['fase'] == fase_sobrevivencia]
+        causa_filtro = None if causa_sobrevivencia == "Todas" else causa_sobrevivencia
+        
+        # Limitar o gráfico aos grupos mais recentes para manter a leitura
+        grupos_recentes = fase_df.groupby(agrupamento)['data_entrada'].min().sort_values(ascending=False)
+        grupos_selecionados = st.multiselect(
+            "Grupos",
+            options=grupos_recentes.index.tolist(),
+            default=grupos_recentes.index[:8].tolist()
+        )
+        
+        if grupos_selecionados:
+            curves_df = kaplan_meier(
+                fase_df[fase_df[agrupamento].isin(grupos_selecionados)],
+                group_col=agrupamento,
+                cause=causa_filtro
+            )
+            
+            if curves_df.empty:
+                st.info("Nenhum óbito registrado para os grupos selecionados.")
+            else:
+                fig = px.line(
+                    curves_df,
+                    x='idade_dias',
+                    y='sobrevivencia',
+                    color='grupo',
+                    line_shape='hv',
+                    labels={
+                        'idade_dias': 'Idade (dias)',
+                        'sobrevivencia': 'Sobrevivência',
+                        'grupo': 'Grupo'
+                    },
+                    title='Curvas de Sobrevivência (Kaplan–Meier)'
+                )
+                fig.update_yaxes(tickformat='.0%')
+                st.plotly_chart(fig, use_container_width=True)
+                
+                final_df = curves_df.groupby('grupo').agg(
+                    obitos=('obitos', 'sum'),
+                    sobrevivencia_final=('sobrevivencia', 'last'),
+                    idade_ultimo_obito=('idade_dias', 'max')
+                ).reset_index()
+                final_df['sobrevivencia_final'] = final_df['sobrevivencia_final'] * 100
+                
+                st.dataframe(
+                    final_df.rename(columns={
+                        'grupo': 'Grupo',
+                        'obitos': 'Óbitos',
+                        'sobrevivencia_final': 'Sobrevivência Final (%)',
+                        'idade_ultimo_obito': 'Idade do Último Óbito (dias)'
+                    }).round(2),
+                    hide_index=True,
+                    use_container_width=True
+                )
+        
+        # Taxa de mortalidade por faixa de idade em cada fase
+        st.subheader("Taxa de Mortalidade por Idade")
+        
+        hazard_df = calculate_survival_hazard(fase_df, group_col='fase', cause=causa_filtro)
+        
+        if not hazard_df.empty:
+            fig = px.bar(
+                hazard_df,
+                x='faixa_inicio',
+                y='taxa_1000_dias',
+                color='grupo',
+                barmode='group',
+                labels={
+                    'faixa_inicio': 'Idade (dias, início da semana)',
+                    'taxa_1000_dias': 'Óbitos por 1000 animais-dia',
+                    'grupo': 'Fase'
+                },
+                title='Risco de Morte por Semana de Idade'
+            )
+            st.plotly_chart(fig, use_container_width=True)
@@ -0,0 +1,174 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import os
+import sys
+import plotly.express as px
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import (
+    get_cohort_summary,
+    update_cohort_summary,
+    COHORT_WEIGHT_AGES,
+    check_permission
+)
+
+st.set_page_config(
+    page_title="Coortes de Nascimento",
+    page_icon="🐷",
+    layout="wide"
+)
+
+# Initialize session state for authentication
+if 'authenticated' not in st.session_state:
+    st.session_state.authenticated = False
+if 'current_user' not in st.session_state:
+    st.session_state.current_user = None
+
+# Verificar se o usuário está autenticado
+if 'authenticated' not in st.session_state or not st.session_state.authenticated:
+    st.error("Você precisa estar autenticado para acessar esta página.")
+    st.stop()
+
+# Verificar se o usuário tem permissão para acessar esta página
+if not check_permission(st.session_state.current_user, 'view_reports'):
+    st.error("Você não tem permissão para acessar esta página.")
+    st.stop()
+
+
+st.title("Coortes de Nascimento 👶")
+st.write("Acompanhe cada semana de nascimento da maternidade à recria.")
+
+# O resumo por coorte é mantido em data/coortes.csv e refeito automaticamente quando
+# alguma tabela de origem muda; a atualização só recalcula as fontes alteradas
+if st.button("🔄 Atualizar Coortes"):
+    cohort_df = update_cohort_summary()
+    st.success("Resumo de coortes atualizado.")
+else:
+    cohort_df = get_cohort_summary()
+
+if cohort_df.empty:
+    st.info("Não há nascimentos registrados para formar coortes.")
+    st.stop()
+
+# Filtro de período (semanas ISO ordenáveis como texto)
+cohorts = cohort_df['coorte'].dropna().sort_values().tolist()
+col1, col2 = st.columns(2)
+with col1:
+    first_cohort = st.selectbox("Coorte Inicial", options=cohorts, index=max(len(cohorts) - 26, 0))
+with col2:
+    last_cohort = st.selectbox("Coorte Final", options=cohorts, index=len(cohorts) - 1)
+
+filtered_df = cohort_df[(cohort_df['coorte'] >= first_cohort) & (cohort_df['coorte'] <= last_cohort)]
+
+if filtered_df.empty:
+    st.info("Nenhuma coorte no intervalo selecionado.")
+    st.stop()
+
+def column_or_nan(df, column):
+    return df[column] if column in df.columns else pd.Series(np.nan, index=df.index)
+
+# Métricas principais
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    st.metric("Coortes", len(filtered_df))
+with col2:
+    st.metric("Nascidos Vivos", int(column_or_nan(filtered_df, 'nascidos_vivos').sum()))
+with col3:
+    survival = column_or_nan(filtered_df, 'sobrevivencia_maternidade').mean()
+    st.metric("Sobrevivência na Maternidade", f"{survival * 100:.1f}%" if pd.notna(survival) else "-")
+with col4:
+    survival = column_or_nan(filtered_df, 'sobrevivencia_acumulada').mean()
+    st.metric("Sobrevivência Acumulada", f"{survival * 100:.1f}%" if pd.notna(survival) else "-")
+
+tab1, tab2, tab3, tab4 = st.tabs(["Sobrevivência", "Pesos", "Dias por Fase", "Custos"])
+
+with tab1:
+    survival_cols = [c for c in ['sobrevivencia_maternidade', 'sobrevivencia_creche', 'sobrevivencia_recria', 'sobrevivencia_acumulada']
+                     if c in filtered_df.columns]
+    survival_df = filtered_df.melt(id_vars='coorte', value_vars=survival_cols, var_name='fase', value_name='sobrevivencia').dropna()
+    
+    if survival_df.empty:
+        st.info("Sem dados de sobrevivência para as coortes selecionadas.")
+    else:
+        survival_df['fase'] = survival_df['fase'].str.replace('sobrevivencia_', '').str.capitalize()
+        fig = px.line(
+            survival_df,
+            x='coorte',
+            y='sobrevivencia',
+            color='fase',
+            markers=True,
+            labels={'coorte': 'Coorte (semana de nascimento)', 'sobrevivencia': 'Sobrevivência', 'fase': 'Fase'},
+            title='Sobrevivência por Fase e Coorte'
+        )
+        fig.update_yaxes(tickformat='.0%')
+        st.plotly_chart(fig, use_container_width=True)
+
+with tab2:
+    weight_cols = [c for c in ['peso_nascimento', 'peso_desmame'] + [f'peso_{age}d' for age in COHORT_WEIGHT_AGES]
+                   if c in filtered_df.columns]
+    weights_df = filtered_df.melt(id_vars='coorte', value_vars=weight_cols, var_name='idade', value_name='peso').dropna()
+    
+    if weights_df.empty:
+        st.info("Sem pesagens para as coortes selecionadas.")
+    else:
+        weights_df['idade'] = weights_df['idade'].str.replace('peso_', '')
+        fig = px.line(
+            weights_df,
+            x='coorte',
+            y='peso',
+            color='idade',
+            markers=True,
+            labels={'coorte': 'Coorte', 'peso': 'Peso Médio (kg)', 'idade': 'Idade'},
+            title='Peso Médio em Idades Fixas'
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+with tab3:
+    days_cols = [c for c in ['dias_maternidade', 'dias_creche', 'dias_recria'] if c in filtered_df.columns]
+    days_df = filtered_df.melt(id_vars='coorte', value_vars=days_cols, var_name='fase', value_name='dias').dropna()
+    
+    if days_df.empty:
+        st.info("Sem dados de permanência para as coortes selecionadas.")
+    else:
+        days_df['fase'] = days_df['fase'].str.replace('dias_', '').str.capitalize()
+        fig = px.bar(
+            days_df,
+            x='coorte',
+            y='dias',
+            color='fase',
+            labels={'coorte': 'Coorte', 'dias': 'Dias Médios', 'fase': 'Fase'},
+            title='Dias Médios em Cada Fase'
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+with tab4:
+    cost_cols = [c for c in ['coorte', 'entradas_recria', 'custo_racao', 'custo_racao_animal', 'medicacoes'] if c in filtered_df.columns]
+    
+    if len(cost_cols) <= 1:
+        st.info("Sem registros de alimentação ou medicação da recria para as coortes selecionadas.")
+    else:
+        st.dataframe(
+            filtered_df[cost_cols].rename(columns={
+                'coorte': 'Coorte',
+                'entradas_recria': 'Animais na Recria',
+                'custo_racao': 'Custo de Ração (R$)',
+                'custo_racao_animal': 'Custo de Ração por Animal (R$)',
+                'medicacoes': 'Medicações'
+            }).round(2),
+            hide_index=True,
+            use_container_width=True
+        )
+
+# Tabela completa
+st.subheader("Resumo por Coorte")
+st.dataframe(filtered_df.round(3), hide_index=True, use_container_width=True)
+
+st.download_button(
+    "📥 Baixar CSV",
+    data=filtered_df.to_csv(index=False),
+    file_name=f"coortes_{first_cohort}_{last_cohort}.csv",
+    mime="text/csv"
+)
@@ -0,0 +1,167 @@
+import streamlit as st
+import pandas as pd
+import os
+import sys
+import plotly.graph_objects as go
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import (
+    load_animals,
+    load_litters,
+    load_gestation,
+    load_weaning,
+    load_insemination,
+    load_nursery_batches,
+    load_recria,
+    load_mortality_records,
+    load_pens,
+    estimate_herd_flow_parameters,
+    build_herd_state,
+    simulate_herd_flow,
+    benchmark_herd_flow
+,
+    check_permission
+)
+
+st.set_page_config(
+    page_title="Simulação do Rebanho",
+    page_icon="🐷",
+    layout="wide"
+)
+
+# Initialize session state for authentication
+if 'authenticated' not in st.session_state:
+    st.session_state.authenticated = False
+if 'current_user' not in st.session_state:
+    st.session_state.current_user = None
+
+# Verificar se o usuário está autenticado
+if 'authenticated' not in st.session_state or not st.session_state.authenticated:
+    st.error("Você precisa estar autenticado para acessar esta página.")
+    st.stop()
+
+# Verificar se o usuário tem permissão para acessar esta página
+if not check_permission(st.session_state.current_user, 'view_reports'):
+    st.error("Você não tem permissão para acessar esta página.")
+    st.stop()
+
+
+st.title("Simulação do Fluxo do Rebanho 🎲")
+st.write("Projeção semanal de partos, desmames, vendas e demanda de baias a partir do estado atual do rebanho e do histórico da granja.")
+
+# Carregar dados
+animals_df = load_animals()
+litters_df = load_litters()
+weaning_df = load_weaning()
+nursery_batches_df = load_nursery_batches()
+recria_df = load_recria()
+mortality_df = load_mortality_records()
+pens_df = load_pens()
+
+params = estimate_herd_flow_parameters(
+    litters_df, weaning_df, load_insemination(), nursery_batches_df, recria_df, mortality_df, pens_df
+)
+state = build_herd_state(
+    animals_df, litters_df, load_gestation(), weaning_df, nursery_batches_df, recria_df, mortality_df, params
+)
+
+if len(state['estagio']) == 0:
+    st.warning("Não há matrizes ativas cadastradas para simular.")
+    st.stop()
+
+# Estado atual
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    st.metric("Matrizes Gestantes", int((state['estagio'] == 0).sum()))
+with col2:
+    st.metric("Matrizes Lactantes", int((state['estagio'] == 1).sum()))
+with col3:
+    st.metric("Matrizes Vazias", int((state['estagio'] == 2).sum()))
+with col4:
+    st.metric("Taxa de Parto Histórica", f"{params['taxa_parto'] * 100:.1f}%")
+
+# Parâmetros da simulação
+col1, col2, col3 = st.columns(3)
+with col1:
+    semanas = st.slider("Horizonte (semanas)", min_value=26, max_value=52, value=26, step=1)
+with col2:
+    replicas = st.number_input("Réplicas", min_value=100, max_value=20000, value=2000, step=100)
+with col3:
+    processos = st.selectbox(
+        "Processos",
+        options=[None] + list(range(1, (os.cpu_count() or 1) + 1)),
+        format_func=lambda x: "Automático" if x is None else str(x),
+        help="Automático roda em série, a menos que haja réplicas suficientes para o pool de processos compensar"
+    )
+
+if st.button("▶️ Executar Simulação"):
+    with st.spinner("Simulando..."):
+        st.session_state.herd_flow_result = simulate_herd_flow(
+            state, params, weeks=semanas, replicates=int(replicas), n_jobs=processos
+        )
+
+result_df = st.session_state.get('herd_flow_result')
+
+if result_df is not None:
+    indicadores = {
+        'partos': 'Partos',
+        'nascidos_vivos': 'Nascidos Vivos',
+        'desmamados': 'Desmamados',
+        'vendas': 'Saídas da Recria (Vendas)',
+        'leitoes_creche': 'Leitões na Creche',
+        'animais_recria': 'Animais na Recria',
+        'matrizes_lactantes': 'Matrizes Lactantes'
+    }
+    indicador = st.selectbox("Indicador", options=list(indicadores.keys()), format_func=lambda x: indicadores[x])
+    series = result_df[result_df['indicador'] == indicador]
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=series['data_inicio'], y=series['p90'], line=dict(width=0), showlegend=False))
+    fig.add_trace(go.Scatter(
+        x=series['data_inicio'], y=series['p10'], fill='tonexty', line=dict(width=0),
+        fillcolor='rgba(31, 119, 180, 0.2)', name='P10–P90'
+    ))
+    fig.add_trace(go.Scatter(x=series['data_inicio'], y=series['p50'], line=dict(color='rgb(31, 119, 180)'), name='Mediana'))
+    fig.update_layout(title=f"{indicadores[indicador]} por Semana", xaxis_title="Semana", yaxis_title=indicadores[indicador])
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Demanda de baias comparada às baias cadastradas
+    st.subheader("Demanda de Baias por Setor")
+    setores = {
+        'baias_maternidade': 'Maternidade',
+        'baias_gestacao': 'Gestação',
+        'baias_creche': 'Creche',
+        'baias_crescimento': 'Crescimento'
+    }
+    baias_por_setor = pens_df['setor'].value_counts() if not pens_df.empty else pd.Series(dtype=int)
+    demanda = result_df[result_df['indicador'].isin(setores.keys())].groupby('indicador')[['p50', 'p90']].max()
+    demanda_df = pd.DataFrame({
+        'Setor': [setores[i] for i in demanda.index],
+        'Pico Mediano': demanda['p50'].to_numpy(),
+        'Pico P90': demanda['p90'].to_numpy(),
+        'Baias Cadastradas': [int(baias_por_setor.get(setores[i], 0)) for i in demanda.index]
+    })
+    demanda_df['Déficit (P90)'] = (demanda_df['Pico P90'] - demanda_df['Baias Cadastradas']).clip(lower=0)
+    st.dataframe(demanda_df.round(0), hide_index=True, use_container_width=True)
+
+    if (demanda_df['Déficit (P90)'] > 0).any():
+        st.warning("Há setores com risco de falta de baias no horizonte simulado (cenário P90).")
+
+with st.expander("⏱️ Benchmark do Simulador"):
+    st.write("Mede réplicas por segundo em série e com o pool de processos.")
+    if st.button("Executar Benchmark"):
+        with st.spinner("Medindo..."):
+            benchmark_df = benchmark_herd_flow(state, params, weeks=26, replicates=int(replicas))
+        st.dataframe(
+            benchmark_df.rename(columns={
+                'processos': 'Processos',
+                'replicas': 'Réplicas',
+                'segundos': 'Tempo (s)',
+                'replicas_por_segundo': 'Réplicas/s',
+                'replicas_por_segundo_por_nucleo': 'Réplicas/s por Núcleo'
+            }).round(2),
+            hide_index=True,
+            use_container_width=True
+        )
@@ -16,10 +16,14 @@ from utils import (
     registrar_alimentacao_recria, registrar_medicacao_recria,
     finalizar_recria, finalizar_lote_recria,
     obter_lotes_recria_ativos, obter_animais_recria_ativos,
-    calcular_estatisticas_recria, load_animals, load_pens
+    calcular_estatisticas_recria, load_animals, load_pens,
+    prepare_weighings, fit_growth_curves, project_days_to_target,
+    build_lot_growth_series
 ,
     check_permission
 )
+from charts import line_chart, show_chart
+from data_grid import paginated_dataframe
 
 st.set_page_config(page_title="Sistema de Recria", page_icon="🐷", layout="wide")
 
@@ -230,6 +234,44 @@ with tabs[1]:
                 
                 st.dataframe(lotes_display, use_container_width=True)
                 
+                # Projeção de peso alvo por lote (curvas ajustadas em lote)
+                st.subheader("Projeção de Peso Alvo")
+                col1, col2 = st.columns(2)
+                with col1:
+                    peso_alvo = st.number_input("Peso Alvo (kg)", min_value=1.0, value=25.0, step=0.5)
+                with col2:
+                    modelo_curva = st.selectbox(
+                        "Modelo de Curva",
+                        options=['gompertz', 'logistic'],
+                        format_func=lambda x: 'Gompertz' if x == 'gompertz' else 'Logística'
+                    )
+                
+                pesagens_projecao_df = load_recria_pesagens()
+                series_lotes = build_lot_growth_series(lotes_ativos, pesagens_projecao_df)
+                projecao_lotes = project_days_to_target(
+                    fit_growth_curves(series_lotes, key_col='id_lote', model=modelo_curva),
+                    peso_alvo
+                )
+                
+                if projecao_lotes.empty:
+                    st.info("São necessárias ao menos 3 pesagens por lote para projetar o peso alvo.")
+                else:
+                    projecao_display = projecao_lotes.merge(lotes_ativos[['id_lote', 'codigo']], on='id_lote')
+                    projecao_display['peso_ultimo'] = projecao_display['peso_ultimo'].apply(formatar_numero)
+                    projecao_display['dias_para_alvo'] = projecao_display['dias_para_alvo'].apply(lambda x: formatar_numero(x, 0))
+                    projecao_display['data_prevista'] = projecao_display['data_prevista'].apply(formatar_data)
+                    
+                    st.dataframe(
+                        projecao_display[['codigo', 'pontos', 'peso_ultimo', 'dias_para_alvo', 'data_prevista']].rename(columns={
+                            'codigo': 'Código',
+                            'pontos': 'Pesagens',
+                            'peso_ultimo': 'Último Peso Médio (kg)',
+                            'dias_para_alvo': 'Dias até o Alvo',
+                            'data_prevista': 'Data Prevista'
+                        }),
+                        use_container_width=True
+                    )
+                
                 # Detalhes do lote selecionado
                 st.subheader("Detalhes do Lote")
                 lote_id_selecionado = st.selectbox(
@@ -284,6 +326,37 @@ with tabs[1]:
                         })
                         
                         st.dataframe(animais_display, use_container_width=True)
+                        
+                        # Projeção individual pelas curvas ajustadas de cada animal
+                        pesagens_animais = prepare_weighings(
+                            pd.DataFrame(columns=['id_animal', 'data_registro', 'peso']),
+                            load_animals(),
+                            pesagens_projecao_df[pesagens_projecao_df['id_animal'].isin(animais_lote['id_animal'])]
+                        )
+                        projecao_animais = project_days_to_target(
+                            fit_growth_curves(pesagens_animais, model=modelo_curva),
+                            peso_alvo
+                        )
+                        
+                        if not projecao_animais.empty:
+                            st.write(f"**Projeção Individual para {formatar_numero(peso_alvo, 1)} kg**")
+                            projecao_animais = projecao_animais.merge(
+                                animais_lote[['id_animal', 'identificacao']], on='id_animal'
+                            ).sort_values('dias_para_alvo')
+                            projecao_animais['data_prevista'] = projecao_animais['data_prevista'].apply(formatar_data)
+                            
+                            st.dataframe(
+                                projecao_animais[['identificacao', 'peso_ultimo', 'dias_para_alvo', 'data_prevista']].rename(columns={
+                                    'identificacao': 'Identificação',
+                                    'peso_ultimo': 'Último Peso (kg)',
+                                    'dias_para_alvo': 'Dias até o Alvo',
+                                    'data_prevista': 'Data Prevista'
+                                }).style.format({
+                                    'Último Peso (kg)': '{:.1f}',
+                                    'Dias até o Alvo': '{:.0f}'
+                                }),
+                                use_container_width=True
+                            )
     
     # Criar Novo Lote
     with lote_tabs[1]:
@@ -520,14 +593,14 @@ with tabs[2]:
                         # Gráfico de evolução do peso
                         pesagens_grafico = pesagens_animal.sort_values('data_pesagem')
                         if not pesagens_grafico.empty:
-                            fig = px.line(
+                            fig = line_chart(
                                 pesagens_grafico, 
                                 x='data_pesagem', 
                                 y='peso', 
                                 title='Evolução do Peso',
                                 labels={'data_pesagem': 'Data', 'peso': 'Peso (kg)'}
                             )
-                            st.plotly_chart(fig, use_container_width=True)
+                            show_chart(fig, "Evolução do Peso (Animal)")
                 else:
                     st.info("Não há pesagens registradas para este animal.")
     
@@ -739,17 +812,12 @@ with tabs[3]:
                 # Exibir pesagens em uma tabela
                 pesagens_display = pesagens_df[['id_pesagem', 'identificacao', 'data_pesagem', 
                                              'peso', 'ganho_desde_ultima', 'gpd_periodo', 
-                                             'fase_recria', 'codigo_lote', 'tipo_pesagem']]
+                                             'fase_recria', 'codigo_lote', 'tipo_pesagem']].copy()
                 
-                # Formatar datas e números
-                pesagens_display['data_pesagem'] = pesagens_display['data_pesagem'].apply(formatar_data)
-                pesagens_display['peso'] = pesagens_display['peso'].apply(formatar_numero)
-                pesagens_display['ganho_desde_ultima'] = pesagens_display['ganho_desde_ultima'].apply(
-                    lambda x: formatar_numero(x) if x is not None and not pd.isna(x) else "-"
-                )
-                pesagens_display['gpd_periodo'] = pesagens_display['gpd_periodo'].apply(
-                    lambda x: formatar_numero(x) if x is not None and not pd.isna(x) else "-"
-                )
+                # Datas e números mantidos como valores para a ordenação da grade; o formato fica no column_config
+                pesagens_display['data_pesagem'] = pd.to_datetime(pesagens_display['data_pesagem'], errors='coerce')
+                for column in ['peso', 'ganho_desde_ultima', 'gpd_periodo']:
+                    pesagens_display[column] = pd.to_numeric(pesagens_display[column], errors='coerce')
                 
                 # Renomear colunas para exibição
                 pesagens_display = pesagens_display.rename(columns={
@@ -764,7 +832,19 @@ with tabs[3]:
                     'tipo_pesagem': 'Tipo'
                 })
                 
-                st.dataframe(pesagens_display, use_container_width=True)
+                paginated_dataframe(
+                    pesagens_display,
+                    key="recria_pesagens_history",
+                    search_columns=['Animal', 'Lote'],
+                    filter_columns=['Fase', 'Tipo'],
+                    sort_by='Data',
+                    column_config={
+                        'Data': st.column_config.DateColumn(format="DD/MM/YYYY"),
+                        'Peso (kg)': st.column_config.NumberColumn(format="%.2f"),
+                        'Ganho (kg)': st.column_config.NumberColumn(format="%.2f"),
+                        'GPD (g/dia)': st.column_config.NumberColumn(format="%.2f")
+                    }
+                )
                 
                 # Estatísticas das pesagens
                 st.subheader("Estatísticas de Pesagens")
@@ -788,14 +868,14 @@ with tabs[3]:
                 pesagens_por_data = pesagens_por_data.sort_values('data_pesagem')
                 
                 if not pesagens_por_data.empty:
-                    fig = px.line(
+                    fig = line_chart(
                         pesagens_por_data, 
                         x='data_pesagem', 
                         y='peso', 
                         title='Evolução do Peso Médio',
                         labels={'data_pesagem': 'Data', 'peso': 'Peso Médio (kg)'}
                     )
-                    st.plotly_chart(fig, use_container_width=True)
+                    show_chart(fig, "Evolução do Peso Médio")
     
     # Registrar Pesagem
     with pesagem_tabs[1]:
@@ -1030,11 +1110,11 @@ with tabs[4]:
                 # Exibir transferências em uma tabela
                 transferencias_display = transferencias_df[['id_transferencia', 'identificacao', 'data_transferencia',
                                                          'lote_origem', 'lote_destino', 'peso_transferencia',
-                                                         'fase_origem', 'fase_destino', 'motivo']]
+                                                         'fase_origem', 'fase_destino', 'motivo']].copy()
                 
-                # Formatar datas e números
-                transferencias_display['data_transferencia'] = transferencias_display['data_transferencia'].apply(formatar_data)
-                transferencias_display['peso_transferencia'] = transferencias_display['peso_transferencia'].apply(formatar_numero)
+                # Datas e números mantidos como valores para a ordenação da grade; o formato fica no column_config
+                transferencias_display['data_transferencia'] = pd.to_datetime(transferencias_display['data_transferencia'], errors='coerce')
+                transferencias_display['peso_transferencia'] = pd.to_numeric(transferencias_display['peso_transferencia'], errors='coerce')
                 
                 # Renomear colunas para exibição
                 transferencias_display = transferencias_display.rename(columns={
@@ -1049,7 +1129,17 @@ with tabs[4]:
                     'motivo': 'Motivo'
                 })
                 
-                st.dataframe(transferencias_display, use_container_width=True)
+                paginated_dataframe(
+                    transferencias_display,
+                    key="recria_transferencias_history",
+                    search_columns=['Animal', 'Motivo'],
+                    filter_columns=['Lote Origem', 'Lote Destino'],
+                    sort_by='Data',
+                    column_config={
+                        'Data': st.column_config.DateColumn(format="DD/MM/YYYY"),
+                        'Peso (kg)': st.column_config.NumberColumn(format="%.2f")
+                    }
+                )
     
     # Registrar Transferência
     with transferencia_tabs[1]:
@@ -1225,17 +1315,13 @@ with tabs[5]:
                 # Exibir registros de alimentação em uma tabela
                 alimentacao_display = alimentacao_df[['id_alimentacao', 'codigo_lote', 'data_inicio', 'data_fim',
                                                    'tipo_racao', 'quantidade_kg', 'custo_kg', 'custo_total',
-                                                   'consumo_animal_dia', 'fase_recria']]
+                                                   'consumo_animal_dia', 'fase_recria']].copy()
                 
-                # Formatar datas e números
-                alimentacao_display['data_inicio'] = alimentacao_display['data_inicio'].apply(formatar_data)
-                alimentacao_display['data_fim'] = alimentacao_display['data_fim'].apply(formatar_data)
-                alimentacao_display['quantidade_kg'] = alimentacao_display['quantidade_kg'].apply(formatar_numero)
-                alimentacao_display['custo_kg'] = alimentacao_display['custo_kg'].apply(formatar_numero)
-                alimentacao_display['custo_total'] = alimentacao_display['custo_total'].apply(formatar_numero)
-                alimentacao_display['consumo_animal_dia'] = alimentacao_display['consumo_animal_dia'].apply(
-                    lambda x: formatar_numero(x) if x is not None and not pd.isna(x) else "-"
-                )
+                # Datas e números mantidos como valores para a ordenação da grade; o formato fica no column_config
+                for column in ['data_inicio', 'data_fim']:
+                    alimentacao_display[column] = pd.to_datetime(alimentacao_display[column], errors='coerce')
+                for column in ['quantidade_kg', 'custo_kg', 'custo_total', 'consumo_animal_dia']:
+                    alimentacao_display[column] = pd.to_numeric(alimentacao_display[column], errors='coerce')
                 
                 # Renomear colunas para exibição
                 alimentacao_display = alimentacao_display.rename(columns={
@@ -1251,7 +1337,21 @@ with tabs[5]:
                     'fase_recria': 'Fase'
                 })
                 
-                st.dataframe(alimentacao_display, use_container_width=True)
+                paginated_dataframe(
+                    alimentacao_display,
+                    key="recria_alimentacao_history",
+                    search_columns=['Lote', 'Tipo de Ração'],
+                    filter_columns=['Fase'],
+                    sort_by='Data Início',
+                    column_config={
+                        'Data Início': st.column_config.DateColumn(format="DD/MM/YYYY"),
+                        'Data Fim': st.column_config.DateColumn(format="DD/MM/YYYY"),
+                        'Quantidade (kg)': st.column_config.NumberColumn(format="%.2f"),
+                        'Custo/kg (R$)': st.column_config.NumberColumn(format="%.2f"),
+                        'Custo Total (R$)': st.column_config.NumberColumn(format="%.2f"),
+                        'Consumo/Animal/Dia (kg)': st.column_config.NumberColumn(format="%.2f")
+                    }
+                )
                 
                 # Estatísticas de alimentação
                 st.subheader("Estatísticas de Alimentação")
@@ -1448,13 +1548,11 @@ with tabs[6]:
                 # Exibir medicações em uma tabela
                 medicacao_display = medicacao_df[['id_medicacao', 'data_aplicacao', 'medicamento', 
                                                'tipo_aplicacao', 'identificacao', 'codigo_lote',
-                                               'via_aplicacao', 'dose', 'unidade_dose', 'motivo']]
+                                               'via_aplicacao', 'dose', 'unidade_dose', 'motivo']].copy()
                 
-                # Formatar datas e números
-                medicacao_display['data_aplicacao'] = medicacao_display['data_aplicacao'].apply(formatar_data)
-                medicacao_display['dose'] = medicacao_display['dose'].apply(
-                    lambda x: formatar_numero(x) if x is not None and not pd.isna(x) else "-"
-                )
+                # Datas e números mantidos como valores para a ordenação da grade; o formato fica no column_config
+                medicacao_display['data_aplicacao'] = pd.to_datetime(medicacao_display['data_aplicacao'], errors='coerce')
+                medicacao_display['dose'] = pd.to_numeric(medicacao_display['dose'], errors='coerce')
                 
                 # Renomear colunas para exibição
                 medicacao_display = medicacao_display.rename(columns={
@@ -1470,7 +1568,17 @@ with tabs[6]:
                     'motivo': 'Motivo'
                 })
                 
-                st.dataframe(medicacao_display, use_container_width=True)
+                paginated_dataframe(
+                    medicacao_display,
+                    key="recria_medicacao_history",
+                    search_columns=['Medicamento', 'Animal', 'Lote', 'Motivo'],
+                    filter_columns=['Tipo', 'Via'],
+                    sort_by='Data',
+                    column_config={
+                        'Data': st.column_config.DateColumn(format="DD/MM/YYYY"),
+                        'Dose': st.column_config.NumberColumn(format="%.2f")
+                    }
+                )
                 
                 # Estatísticas de medicações
                 st.subheader("Estatísticas de Medicações")
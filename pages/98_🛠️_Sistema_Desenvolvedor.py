@@ -16,6 +16,9 @@ import shutil
 # Adicionar diretório raiz ao path para importar utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils import check_developer_access, check_permission, load_employees, save_employees, load_permissions_map, save_permissions_map
+from utils import benchmark_table_loading, get_page_render_timings, get_table_cache_stats, APP_EAGER_TABLES, DASHBOARD_TABLES
+from utils import benchmark_login_burst, benchmark_session_memory, get_store_stats, benchmark_grid, get_chart_render_stats, get_result_cache_stats
+from utils import get_report_job_stats, get_report_scheduler_status, run_report_pipeline, benchmark_export
 
 # Configuração da página
 st.set_page_config(
@@ -254,6 +257,220 @@ with tab1:
         hide_index=True,
         use_container_width=True
     )
+    
+    st.markdown("---")
+    
+    # Desempenho de carregamento das páginas
+    st.markdown("### Desempenho de Carregamento")
+    
+    cache_stats = get_table_cache_stats()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Leituras do Cache", cache_stats['hits'])
+    col2.metric("Leituras do Disco", cache_stats['misses'])
+    col3.metric("Tabelas em Cache", cache_stats['tabelas_em_cache'])
+    
+    if st.button("Medir Carregamento das Tabelas"):
+        benchmark_df = benchmark_table_loading()
+        eager = benchmark_df[benchmark_df['tabela'].isin(APP_EAGER_TABLES)]
+        lazy = benchmark_df[benchmark_df['tabela'].isin(DASHBOARD_TABLES)]
+        
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Antes: todas as tabelas do painel (frio)", f"{eager['frio_ms'].sum():.1f} ms")
+        col2.metric("Depois: tabelas sob demanda (frio)", f"{lazy['frio_ms'].sum():.1f} ms")
+        col3.metric("Depois: com pré-carregamento", f"{lazy['quente_ms'].sum():.1f} ms")
+        
+        st.dataframe(
+            benchmark_df.rename(columns={
+                'tabela': 'Tabela',
+                'linhas': 'Linhas',
+                'frio_ms': 'Disco (ms)',
+                'quente_ms': 'Cache (ms)'
+            }),
+            hide_index=True,
+            use_container_width=True
+        )
+    
+    if st.button("Simular 100 Logins Simultâneos"):
+        login_df = benchmark_login_burst(100)
+        if login_df.empty:
+            st.warning("Não há colaboradores ativos para simular logins.")
+        else:
+            st.dataframe(
+                login_df.rename(columns={
+                    'modo': 'Modo',
+                    'logins': 'Logins',
+                    'p50_ms': 'Mediana (ms)',
+                    'p95_ms': 'P95 (ms)',
+                    'max_ms': 'Máximo (ms)',
+                    'total_ms': 'Total (ms)'
+                }),
+                hide_index=True,
+                use_container_width=True
+            )
+    
+    # Memória do armazenamento compartilhado de tabelas
+    store_stats = get_store_stats()
+    st.write(f"Armazenamento compartilhado: {store_stats['tabelas']} tabelas, {store_stats['bytes'] / 2**20:.1f} MB (uma versão por tabela para todas as sessões)")
+    
+    if st.button("Simular 30 Sessões Simultâneas"):
+        memory_df = benchmark_session_memory(30)
+        st.line_chart(memory_df, x='sessoes', y='rss_mb', color='modo')
+        st.dataframe(
+            memory_df.groupby('modo', as_index=False).agg(
+                rss_final_mb=('rss_mb', 'last'),
+                privado_por_sessao_mb=('privado_mb', 'mean')
+            ).rename(columns={
+                'modo': 'Modo',
+                'rss_final_mb': 'Memória com 30 Sessões (MB)',
+                'privado_por_sessao_mb': 'Memória Privada por Sessão (MB)'
+            }),
+            hide_index=True,
+            use_container_width=True
+        )
+    
+    if st.button("Testar Grade Paginada (500 mil linhas)"):
+        grid_df = benchmark_grid(500000)
+        st.dataframe(
+            grid_df.rename(columns={
+                'modo': 'Modo',
+                'linhas_enviadas': 'Linhas Enviadas',
+                'payload_kb': 'Payload (KB)',
+                'tempo_ms': 'Tempo (ms)'
+            }),
+            hide_index=True,
+            use_container_width=True
+        )
+    
+    if st.button("Testar Exportação (1 milhão de linhas)"):
+        with st.spinner("Medindo o pico de memória de cada formato..."):
+            export_df = benchmark_export(1000000)
+        st.dataframe(
+            export_df.rename(columns={
+                'formato': 'Formato',
+                'modo': 'Modo',
+                'tempo_s': 'Tempo (s)',
+                'tamanho_mb': 'Tamanho (MB)',
+                'pico_mb': 'Pico de Memória (MB)'
+            }),
+            hide_index=True,
+            use_container_width=True
+        )
+    
+    # Cache de agregações e figuras
+    result_stats, result_summary = get_result_cache_stats()
+    total_lookups = result_stats['acertos'].sum() + result_stats['faltas'].sum()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Taxa de Acerto (Gráficos)", f"{result_stats['acertos'].sum() / total_lookups:.0%}" if total_lookups else "-")
+    with col2:
+        st.metric("Resultados em Cache", result_summary['entradas'])
+    with col3:
+        st.metric("Memória do Cache", f"{result_summary['bytes'] / 2**20:.1f} MB")
+    with col4:
+        st.metric("Invalidações / Despejos", f"{result_summary['invalidations']} / {result_summary['evictions']}")
+    if not result_stats.empty:
+        st.dataframe(
+            result_stats.assign(taxa_acerto=result_stats['taxa_acerto'] * 100).rename(columns={
+                'nome': 'Resultado',
+                'acertos': 'Acertos',
+                'faltas': 'Faltas',
+                'taxa_acerto': 'Taxa de Acerto'
+            }),
+            column_config={'Taxa de Acerto': st.column_config.ProgressColumn(format="%.0f%%", min_value=0, max_value=100)},
+            hide_index=True,
+            use_container_width=True
+        )
+    
+    # Jobs de relatório em segundo plano
+    report_jobs_df, report_job_counts = get_report_job_stats()
+    st.write(
+        f"Jobs de relatório: {report_job_counts['submitted']} enviados, "
+        f"{report_job_counts['deduplicated']} pedidos reaproveitados, "
+        f"{report_job_counts['completed']} concluídos, {report_job_counts['failed']} com erro"
+    )
+    if not report_jobs_df.empty:
+        st.dataframe(
+            report_jobs_df.rename(columns={
+                'secao': 'Seção',
+                'status': 'Status',
+                'espera_ms': 'Espera na Fila (ms)',
+                'calculo_ms': 'Cálculo (ms)'
+            }),
+            hide_index=True,
+            use_container_width=True
+        )
+    
+    # Pacotes de relatórios gerados à noite
+    scheduler_status = get_report_scheduler_status()
+    last_run = scheduler_status['ultima_execucao']
+    st.write(
+        f"Pacotes de relatórios: agendador {'ativo' if scheduler_status['ativo'] else 'parado'}, "
+        f"última execução {last_run.strftime('%d/%m/%Y %H:%M') if last_run else 'nenhuma'}, "
+        f"próxima {scheduler_status['proxima_execucao'].strftime('%d/%m/%Y %H:%M')}"
+    )
+    pack_cols = st.columns([1, 3])
+    with pack_cols[0]:
+        force_packs = st.checkbox("Regerar todos", key="force_report_packs")
+    with pack_cols[1]:
+        run_packs = st.button("Gerar Pacotes Agora")
+    pipeline_result = scheduler_status['resultado']
+    if run_packs:
+        with st.spinner("Gerando pacotes de relatórios..."):
+            pipeline_result = run_report_pipeline(force=force_packs)
+    if pipeline_result is not None and not pipeline_result.empty:
+        st.dataframe(
+            pipeline_result.rename(columns={
+                'setor': 'Setor',
+                'versao': 'Versão',
+                'status': 'Status',
+                'tempo_s': 'Tempo (s)'
+            }),
+            hide_index=True,
+            use_container_width=True
+        )
+    
+    chart_stats = get_chart_render_stats()
+    if not chart_stats.empty:
+        st.write("Gráficos renderizados (pontos originais, pontos enviados e tamanho do JSON):")
+        st.dataframe(
+            chart_stats.groupby('grafico', as_index=False).agg(
+                renderizacoes=('tempo_ms', 'size'),
+                pontos=('pontos', 'last'),
+                pontos_enviados=('pontos_enviados', 'last'),
+                payload_kb=('payload_kb', 'last'),
+                tempo_medio_ms=('tempo_ms', 'mean')
+            ).rename(columns={
+                'grafico': 'Gráfico',
+                'renderizacoes': 'Renderizações',
+                'pontos': 'Pontos',
+                'pontos_enviados': 'Pontos Enviados',
+                'payload_kb': 'Payload (KB)',
+                'tempo_medio_ms': 'Tempo Médio (ms)'
+            }),
+            hide_index=True,
+            use_container_width=True
+        )
+    
+    render_timings = get_page_render_timings()
+    if not render_timings.empty:
+        st.write("Tempos de renderização registrados:")
+        render_summary = render_timings.groupby(['pagina', 'frio'], as_index=False).agg(
+            renderizacoes=('tempo_ms', 'size'),
+            tempo_medio_ms=('tempo_ms', 'mean'),
+            tempo_max_ms=('tempo_ms', 'max')
+        )
+        render_summary['frio'] = render_summary['frio'].map({True: 'Frio', False: 'Cache'})
+        st.dataframe(
+            render_summary.rename(columns={
+                'pagina': 'Página',
+                'frio': 'Tipo',
+                'renderizacoes': 'Renderizações',
+                'tempo_medio_ms': 'Tempo Médio (ms)',
+                'tempo_max_ms': 'Tempo Máximo (ms)'
+            }).round(1),
+            hide_index=True,
+            use_container_width=True
+        )
 
 with tab2:
     st.markdown('<div class="dev-section"><h2>Gerenciamento de Usuários</h2></div>', unsafe_allow_html=True)
@@ -380,16 +597,15 @@ with tab3:
                     # Sucesso!
                     st.success(f"Backup criado com sucesso em {backup_file}")
                     
-                    # Opção para download
+                    # Opção para download (servido do arquivo, sem embutir o ZIP em base64 na página)
                     with open(backup_file, "rb") as f:
-                        data = f.read()
-                    
-                    b64 = base64.b64encode(data).decode()
-                    href = f'<a href="data:application/zip;base64,{b64}" download="{os.path.basename(backup_file)}" style="text-decoration:none;">'\
-                          f'<div style="background-color:#4CAF50; color:white; padding:10px; border-radius:5px; '\
-                          f'cursor:pointer; text-align:center; margin:10px 0px;">Baixar Arquivo de Backup</div></a>'
-                    
-                    st.markdown(href, unsafe_allow_html=True)
+                        st.download_button(
+                            "Baixar Arquivo de Backup",
+                            data=f,
+                            file_name=os.path.basename(backup_file),
+                            mime="application/zip",
+                            type="primary"
+                        )
                     
                 except Exception as e:
                     st.error(f"Erro ao criar backup: {str(e)}")
@@ -1315,21 +1531,21 @@ with tab5:
     # Executar a função
     module.create_download_package()
     
-    # Função para gerar o link de download
-    def get_download_link(file_path, link_text):
+    # Botão de download servido do arquivo (sem embutir o ZIP em base64 na página)
+    def show_download_button(file_path, label):
         if not os.path.exists(file_path):
             st.error(f"Arquivo {file_path} não encontrado!")
-            return ""
+            return
         
         with open(file_path, "rb") as f:
-            data = f.read()
-        
-        b64 = base64.b64encode(data).decode()
-        href = f'<a href="data:application/zip;base64,{b64}" download="{os.path.basename(file_path)}" style="text-decoration:none;">'\
-               f'<div style="background-color:#4CAF50; color:white; padding:12px 20px; border-radius:8px; '\
-               f'cursor:pointer; text-align:center; font-weight:bold; margin:20px 0px;">{link_text}</div></a>'
-        
-        return href
+            st.download_button(
+                label,
+                data=f,
+                file_name=os.path.basename(file_path),
+                mime="application/zip",
+                type="primary",
+                use_container_width=True
+            )
     
     col1, col2 = st.columns([2, 1])
     
@@ -1345,7 +1561,7 @@ with tab5:
         
         # Mostrar o botão de download
         if os.path.exists(zip_path):
-            st.markdown(get_download_link(zip_path, "📥 DOWNLOAD DO SISTEMA COMPLETO"), unsafe_allow_html=True)
+            show_download_button(zip_path, "📥 DOWNLOAD DO SISTEMA COMPLETO")
             
             file_size = round(os.path.getsize(zip_path) / (1024), 2)
             st.caption(f"Tamanho do arquivo: {file_size} KB | Última atualização: {datetime.datetime.fromtimestamp(os.path.getmtime(zip_path)).strftime('%d/%m/%Y %H:%M')}")
@@ -0,0 +1,41 @@
+import os
+import sys
+import streamlit as st
+
+sys_path = os.path.dirname(os.path.abspath(__file__))
+if sys_path not in sys.path:
+    sys.path.append(sys_path)
+
+from utils import get_report_job
+
+REPORT_JOB_POLL_SECONDS = 1.0
+
+def render_when_ready(handle, render, message="Calculando relatório...", poll_seconds=REPORT_JOB_POLL_SECONDS):
+    """
+    Renderiza uma seção calculada em segundo plano (utils.submit_report_job).
+
+    Se o job já terminou, a seção é desenhada na hora. Caso contrário, um fragmento
+    consulta o job a cada poll_seconds sem bloquear o restante da página e, quando
+    ele termina, pede um novo rerun para desenhar a seção pronta.
+
+    Args:
+        handle: Identificador retornado por submit_report_job
+        render: Função que recebe o resultado do job e desenha a seção
+        message: Texto exibido enquanto o job não termina
+        poll_seconds: Intervalo entre as consultas
+    """
+    job = get_report_job(handle)
+    if job['status'] == 'concluido':
+        render(job['result'])
+        return
+    if job['status'] == 'erro':
+        st.error(f"Erro ao calcular o relatório: {job['error']}")
+        return
+
+    @st.fragment(run_every=poll_seconds)
+    def wait_for_job():
+        if get_report_job(handle)['status'] not in ('pendente', 'executando'):
+            st.rerun()
+        st.info(f"⏳ {message}")
+
+    wait_for_job()
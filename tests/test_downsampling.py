@@ -0,0 +1,41 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import utils
+
+N_ROWS = 20000
+SPIKE_AT = 12345
+
+
+@pytest.fixture
+def csv_weights(tmp_path):
+    """Pesagens com datas em texto, lidas de volta de um CSV como nas páginas"""
+    rng = np.random.default_rng(0)
+    dates = pd.Timestamp('2020-01-01') + pd.to_timedelta(np.arange(N_ROWS), unit='h')
+    weights = rng.random(N_ROWS)
+    weights[SPIKE_AT] = 9.57
+    path = tmp_path / "pesagens.csv"
+    pd.DataFrame({'data_pesagem': dates.strftime('%Y-%m-%d %H:%M:%S'), 'peso': weights}).to_csv(path, index=False)
+    return pd.read_csv(path)
+
+
+def test_text_dates_become_numeric_axis(csv_weights):
+    assert not pd.api.types.is_numeric_dtype(csv_weights['data_pesagem'])
+    axis = utils._numeric_axis(csv_weights['data_pesagem'])
+    assert not np.isnan(axis).any()
+    assert (np.diff(axis) > 0).all()
+
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+def test_downsampling_text_dates_keeps_spike(csv_weights, method):
+    reduced = utils.downsample_series(csv_weights, 'data_pesagem', 'peso', max_points=500, method=method)
+    assert len(reduced) <= 500
+    assert reduced['peso'].max() == pytest.approx(9.57)
+    # Não é só o primeiro ponto de cada balde
+    assert SPIKE_AT in reduced.index
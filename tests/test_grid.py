@@ -0,0 +1,25 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import utils
+
+
+def test_search_skips_missing_text():
+    df = pd.DataFrame({
+        'identificacao': ['A001', None, 'B002', 'A003'],
+        'observacao': [None, 'Reavaliação', '', 'Pesagem de rotina'],
+        'peso': [80.5, np.nan, 92.0, 75.0]
+    })
+    assert pd.api.types.is_string_dtype(df['identificacao'])
+
+    page_df, total, _, _ = utils.query_grid_page(df, search='a0', search_columns=['identificacao', 'observacao'])
+    assert total == 2
+    assert page_df['identificacao'].tolist() == ['A001', 'A003']
+
+    _, total, _, _ = utils.query_grid_page(df, search='reavalia', search_columns=['identificacao', 'observacao'])
+    assert total == 1
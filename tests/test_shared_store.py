@@ -0,0 +1,78 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import utils
+
+N_ANIMALS = 200000
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Diretório de trabalho temporário com uma tabela de animais grande em data/"""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    rng = np.random.default_rng(0)
+    pd.DataFrame({
+        'id_animal': np.arange(N_ANIMALS),
+        'identificacao': [f"A{i:06d}" for i in range(N_ANIMALS)],
+        'categoria': rng.choice(['Leitão', 'Matriz', 'Reprodutor', 'Leitoa'], N_ANIMALS),
+        'peso': rng.normal(80, 30, N_ANIMALS).round(2)
+    }).to_csv(utils.ANIMALS_FILE, index=False)
+    utils._table_cache.clear()
+    yield tmp_path
+    utils._table_cache.clear()
+
+
+def test_load_views_share_buffers_with_store(data_dir):
+    first = utils.load_animals()
+    second = utils.load_animals()
+    _, shared = utils._table_cache[utils.ANIMALS_FILE]
+
+    assert first is not second
+    for column in ('id_animal', 'peso'):
+        assert np.shares_memory(first[column].to_numpy(), shared[column].to_numpy())
+        assert np.shares_memory(first[column].to_numpy(), second[column].to_numpy())
+
+
+def test_edit_does_not_change_shared_version(data_dir):
+    session = utils.load_animals()
+    original_weight = session.loc[0, 'peso']
+
+    session.loc[0, 'peso'] = -1.0
+    session['categoria'] = 'Editada'
+    session['_derivada'] = session['peso'] * 2
+
+    _, shared = utils._table_cache[utils.ANIMALS_FILE]
+    assert shared.loc[0, 'peso'] == original_weight
+    assert '_derivada' not in shared.columns
+    assert (shared['categoria'] != 'Editada').all()
+
+    other = utils.load_animals()
+    assert other.loc[0, 'peso'] == original_weight
+    assert '_derivada' not in other.columns
+    # Colunas não editadas continuam compartilhadas com a versão do armazenamento
+    assert np.shares_memory(session['id_animal'].to_numpy(), shared['id_animal'].to_numpy())
+
+
+def test_session_memory_growth_is_bounded(data_dir):
+    n_sessions = 20
+    result = utils.benchmark_session_memory(n_sessions=n_sessions, names=['animals'])
+    shared = result[result['modo'] == 'Armazenamento compartilhado'].reset_index(drop=True)
+    copied = result[result['modo'] == 'Cópia por sessão (anterior)'].reset_index(drop=True)
+    assert len(shared) == len(copied) == n_sessions
+
+    # Memória privada de cada sessão: só a coluna derivada, igual em todas as sessões
+    assert shared['privado_mb'].max() - shared['privado_mb'].min() < 0.01
+    assert shared['privado_mb'].iloc[-1] < copied['privado_mb'].iloc[-1] / 10
+
+    if shared['rss_mb'].notna().all() and copied['rss_mb'].notna().all():
+        # RSS fica estável enquanto as sessões se somam; com cópias cresce uma tabela por sessão
+        table_mb = utils.get_store_stats()['bytes'] / 2**20
+        assert shared['rss_mb'].iloc[-1] - shared['rss_mb'].iloc[0] < 2 * table_mb
+        assert shared['rss_mb'].iloc[-1] < copied['rss_mb'].iloc[-1]
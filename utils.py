@@ -3,6 +3,20 @@ import numpy as np
 import os
 from datetime import datetime, timedelta
 import uuid
+import heapq
+import bisect
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import atexit
+import hashlib
+import io
+import multiprocessing
+import json
+import shutil
+import tempfile
+import zipfile
+from collections import OrderedDict
 
 # File paths for different data
 ANIMALS_FILE = "data/animals.csv"
@@ -40,7 +54,50 @@ RECRIA_TRANSFERENCIAS_FILE = "data/recria_transferencias.csv"
 RECRIA_ALIMENTACAO_FILE = "data/recria_alimentacao.csv"
 RECRIA_MEDICACAO_FILE = "data/recria_medicacao.csv"
 
+# Armazenamento compartilhado de tabelas: uma versão imutável por arquivo para todo o processo
+_table_cache = {}
+_table_locks = {}
+_table_locks_guard = threading.Lock()
+_table_cache_stats = {'hits': 0, 'misses': 0, 'writes': 0}
+
+def _read_table(path):
+    """
+    Lê um CSV de dados a partir da versão compartilhada enquanto o arquivo não mudar.
+
+    Todas as sessões recebem visões (cópias rasas) da mesma versão; com copy-on-write,
+    uma página que altera ou acrescenta colunas duplica apenas essas colunas, sem
+    afetar a versão compartilhada. A leitura de cada arquivo é serializada, então uma
+    página que pede uma tabela em pré-carregamento espera a leitura em andamento.
+    """
+    with _table_locks_guard:
+        lock = _table_locks.setdefault(path, threading.Lock())
+    with lock:
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        cached = _table_cache.get(path)
+        if cached is not None and cached[0] == stamp:
+            _table_cache_stats['hits'] += 1
+            return cached[1].copy(deep=False)
+        df = pd.read_csv(path)
+        _table_cache[path] = (stamp, df)
+        _table_cache_stats['misses'] += 1
+        return df.copy(deep=False)
+
+def _write_table(df, path):
+    """Grava uma tabela e descarta a versão compartilhada anterior (a próxima leitura carrega a nova)"""
+    with _table_locks_guard:
+        lock = _table_locks.setdefault(path, threading.Lock())
+    with lock:
+        df.to_csv(path, index=False)
+        _table_cache.pop(path, None)
+        _table_cache_stats['writes'] += 1
+    invalidate_result_cache(path)
+
 # Calendário suíno de 1000 dias
+# Dia 1 do calendário suíno é 1º de janeiro de 2020 (definido como referência)
+PIG_CALENDAR_REFERENCE_DATE = datetime(2020, 1, 1).date()
+PIG_CALENDAR_DAYS = 1000
+
 def date_to_pig_calendar(date):
     """
     Converte uma data para o número do calendário suíno de 1000 dias
@@ -49,15 +106,18 @@ def date_to_pig_calendar(date):
     if isinstance(date, str):
         date = pd.to_datetime(date).date()
     
-    # Dia 1 do calendário suíno é 1º de janeiro de 2020 (definido como referência)
-    reference_date = datetime(2020, 1, 1).date()
-    days_diff = (date - reference_date).days
+    days_diff = (date - PIG_CALENDAR_REFERENCE_DATE).days
     
     # Calcula o dia do calendário (de 1 a 1000) com referência cíclica
-    pig_day = (days_diff % 1000) + 1
+    pig_day = (days_diff % PIG_CALENDAR_DAYS) + 1
     
     return pig_day
 
+def dates_to_pig_calendar(dates):
+    """Versão vetorizada de date_to_pig_calendar para uma Series de datas (datas vazias ficam <NA>)"""
+    days_diff = (pd.to_datetime(dates) - pd.Timestamp(PIG_CALENDAR_REFERENCE_DATE)).dt.days
+    return (days_diff % PIG_CALENDAR_DAYS + 1).astype('Int64')
+
 def pig_calendar_to_date(pig_day, reference_year=None):
     """
     Converte um número do calendário suíno (1-1000) para uma data
@@ -82,7 +142,7 @@ def pig_calendar_to_date(pig_day, reference_year=None):
 def load_animals():
     """Load animals data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(ANIMALS_FILE):
-        return pd.read_csv(ANIMALS_FILE)
+        return _read_table(ANIMALS_FILE)
     else:
         return pd.DataFrame({
             'id_animal': [],
@@ -100,12 +160,12 @@ def load_animals():
 
 def save_animals(df):
     """Save animals data to CSV"""
-    df.to_csv(ANIMALS_FILE, index=False)
+    _write_table(df, ANIMALS_FILE)
 
 def load_breeding_cycles():
     """Load breeding cycles data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(BREEDING_FILE):
-        return pd.read_csv(BREEDING_FILE)
+        return _read_table(BREEDING_FILE)
     else:
         return pd.DataFrame({
             'id_ciclo': [],
@@ -120,13 +180,13 @@ def load_breeding_cycles():
         })
 
 def save_breeding_cycles(df):
-    """Save breeding cycles data to CSV"""
-    df.to_csv(BREEDING_FILE, index=False)
+    """Save breeding cycles data to CSV (with heat group ids and sizes)"""
+    _write_table(assign_heat_groups(df), BREEDING_FILE)
 
 def load_gestation():
     """Load gestation data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(GESTATION_FILE):
-        return pd.read_csv(GESTATION_FILE)
+        return _read_table(GESTATION_FILE)
     else:
         return pd.DataFrame({
             'id_gestacao': [],
@@ -141,12 +201,12 @@ def load_gestation():
 
 def save_gestation(df):
     """Save gestation data to CSV"""
-    df.to_csv(GESTATION_FILE, index=False)
+    _write_table(df, GESTATION_FILE)
 
 def load_weight_records():
     """Load weight records data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(WEIGHT_FILE):
-        return pd.read_csv(WEIGHT_FILE)
+        return _read_table(WEIGHT_FILE)
     else:
         return pd.DataFrame({
             'id_registro': [],
@@ -158,7 +218,7 @@ def load_weight_records():
 
 def save_weight_records(df):
     """Save weight records data to CSV"""
-    df.to_csv(WEIGHT_FILE, index=False)
+    _write_table(df, WEIGHT_FILE)
 
 def calculate_statistics(animals_df, breeding_df, gestation_df, weight_df):
     """Calculate various statistics for dashboard"""
@@ -191,11 +251,14 @@ def calculate_statistics(animals_df, breeding_df, gestation_df, weight_df):
     else:
         stats['animals_in_heat'] = 0
         
-    # Weight statistics
+    # Weight statistics (pesagens sinalizadas como atípicas ficam de fora)
     if not weight_df.empty:
-        stats['avg_weight'] = weight_df['peso'].mean()
-        stats['min_weight'] = weight_df['peso'].min()
-        stats['max_weight'] = weight_df['peso'].max()
+        valid_weights = weight_df['peso']
+        if not animals_df.empty:
+            valid_weights = valid_weights[~get_weight_outlier_flags(weight_df, animals_df)['outlier'].astype(bool)]
+        stats['avg_weight'] = valid_weights.mean()
+        stats['min_weight'] = valid_weights.min()
+        stats['max_weight'] = valid_weights.max()
     else:
         stats['avg_weight'] = 0
         stats['min_weight'] = 0
@@ -209,6 +272,11 @@ def calculate_age(birth_date):
     today = datetime.now().date()
     return (today - birth_date).days
 
+def calculate_ages(birth_dates, reference_date=None):
+    """Vectorized age in days for a Series of birth dates (NaN when unknown)"""
+    reference = pd.Timestamp(reference_date if reference_date is not None else datetime.now().date())
+    return (reference - pd.to_datetime(birth_dates, errors='coerce')).dt.days
+
 def get_animal_details(animal_id, animals_df):
     """Get details for a specific animal"""
     if animal_id in animals_df['id_animal'].values:
@@ -222,33 +290,17 @@ def predict_heat_date(last_heat_date):
 
 def calculate_gestation_details(gestation_date):
     """Calculate expected delivery date and current gestation stage"""
-    gestation_date = pd.to_datetime(gestation_date).date()
-    today = datetime.now().date()
-    
-    # Typical gestation period for pigs is 114 days
-    expected_delivery = gestation_date + timedelta(days=114)
-    
-    # Calculate current day of gestation
-    current_day = (today - gestation_date).days
-    
-    # Calculate percentage complete
-    if current_day <= 0:
-        percentage = 0
-    elif current_day >= 114:
-        percentage = 100
-    else:
-        percentage = (current_day / 114) * 100
-        
+    progress = calculate_gestation_progress(pd.Series([gestation_date])).iloc[0]
     return {
-        'expected_delivery': expected_delivery,
-        'current_day': current_day,
-        'percentage': percentage
+        'expected_delivery': progress['data_prevista_parto'].date(),
+        'current_day': int(progress['dia_gestacao']),
+        'percentage': float(progress['percentual'])
     }
 
 def load_insemination():
     """Load insemination data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(INSEMINATION_FILE):
-        return pd.read_csv(INSEMINATION_FILE)
+        return _read_table(INSEMINATION_FILE)
     else:
         return pd.DataFrame({
             'id_inseminacao': [],
@@ -271,7 +323,7 @@ def load_insemination():
 
 def save_insemination(df):
     """Save insemination data to CSV"""
-    df.to_csv(INSEMINATION_FILE, index=False)
+    _write_table(df, INSEMINATION_FILE)
 
 def export_data(dataframe, format_type):
     """Export dataframe to various formats"""
@@ -288,7 +340,7 @@ def export_data(dataframe, format_type):
 def load_pens():
     """Load pens data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(PENS_FILE):
-        return pd.read_csv(PENS_FILE)
+        return _read_table(PENS_FILE)
     else:
         return pd.DataFrame({
             'id_baia': [],
@@ -305,12 +357,12 @@ def load_pens():
 
 def save_pens(df):
     """Save pens data to CSV"""
-    df.to_csv(PENS_FILE, index=False)
+    _write_table(df, PENS_FILE)
 
 def load_pen_allocations():
     """Load pen allocation data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(PENS_ALLOCATION_FILE):
-        return pd.read_csv(PENS_ALLOCATION_FILE)
+        return _read_table(PENS_ALLOCATION_FILE)
     else:
         return pd.DataFrame({
             'id_alocacao': [],
@@ -325,7 +377,7 @@ def load_pen_allocations():
 
 def save_pen_allocations(df):
     """Save pen allocation data to CSV"""
-    df.to_csv(PENS_ALLOCATION_FILE, index=False)
+    _write_table(df, PENS_ALLOCATION_FILE)
 
 def get_pen_occupancy(pen_id, allocations_df):
     """Get current occupancy for a specific pen"""
@@ -338,32 +390,37 @@ def get_pen_occupancy(pen_id, allocations_df):
     
     return len(current_occupants)
 
+# Map animal categories to appropriate sectors
+CATEGORY_SECTOR_MAP = {
+    'Leitão': 'Creche',
+    'Matriz': 'Gestação',
+    'Reprodutor': 'Reprodução',
+    'Matriz Lactante': 'Maternidade'
+    # Add more mappings as needed
+}
+
+def calculate_pens_occupancy(pens_df, allocations_df):
+    """Current occupancy and free places for every pen in one pass"""
+    pens_with_occupancy = pens_df.copy()
+    if allocations_df.empty:
+        occupancy = pd.Series(dtype=int)
+    else:
+        occupancy = allocations_df.loc[allocations_df['data_saida'].isna(), 'id_baia'].value_counts()
+    pens_with_occupancy['ocupacao_atual'] = pens_with_occupancy['id_baia'].map(occupancy).fillna(0).astype(int)
+    pens_with_occupancy['vagas_disponiveis'] = pens_with_occupancy['capacidade'] - pens_with_occupancy['ocupacao_atual']
+    return pens_with_occupancy
+
 def get_available_pens(pens_df, allocations_df, animal_category=None):
     """Get list of available pens with capacity information"""
     if pens_df.empty:
         return pd.DataFrame()
     
-    pens_with_occupancy = pens_df.copy()
-    pens_with_occupancy['ocupacao_atual'] = pens_with_occupancy['id_baia'].apply(
-        lambda x: get_pen_occupancy(x, allocations_df)
-    )
-    
-    pens_with_occupancy['vagas_disponiveis'] = pens_with_occupancy['capacidade'] - pens_with_occupancy['ocupacao_atual']
+    pens_with_occupancy = calculate_pens_occupancy(pens_df, allocations_df)
     
     # Filter by sector if animal category is provided
-    if animal_category:
-        # Map animal categories to appropriate sectors
-        category_sector_map = {
-            'Leitão': 'Creche',
-            'Matriz': 'Gestação',
-            'Reprodutor': 'Reprodução',
-            'Matriz Lactante': 'Maternidade'
-            # Add more mappings as needed
-        }
-        
-        if animal_category in category_sector_map:
-            recommended_sector = category_sector_map[animal_category]
-            pens_with_occupancy = pens_with_occupancy[pens_with_occupancy['setor'] == recommended_sector]
+    if animal_category in CATEGORY_SECTOR_MAP:
+        recommended_sector = CATEGORY_SECTOR_MAP[animal_category]
+        pens_with_occupancy = pens_with_occupancy[pens_with_occupancy['setor'] == recommended_sector]
     
     # Return only pens with available space
     return pens_with_occupancy[pens_with_occupancy['vagas_disponiveis'] > 0]
@@ -372,7 +429,7 @@ def get_available_pens(pens_df, allocations_df, animal_category=None):
 def load_maternity():
     """Load maternity data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(MATERNITY_FILE):
-        return pd.read_csv(MATERNITY_FILE)
+        return _read_table(MATERNITY_FILE)
     else:
         return pd.DataFrame({
             'id_maternidade': [],
@@ -387,12 +444,12 @@ def load_maternity():
 
 def save_maternity(df):
     """Save maternity data to CSV"""
-    df.to_csv(MATERNITY_FILE, index=False)
+    _write_table(df, MATERNITY_FILE)
 
 def load_litters():
     """Load litters data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(LITTERS_FILE):
-        return pd.read_csv(LITTERS_FILE)
+        return _read_table(LITTERS_FILE)
     else:
         return pd.DataFrame({
             'id_leitegada': [],
@@ -411,12 +468,12 @@ def load_litters():
 
 def save_litters(df):
     """Save litters data to CSV"""
-    df.to_csv(LITTERS_FILE, index=False)
+    _write_table(df, LITTERS_FILE)
 
 def load_piglets():
     """Load piglets data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(PIGLETS_FILE):
-        return pd.read_csv(PIGLETS_FILE)
+        return _read_table(PIGLETS_FILE)
     else:
         return pd.DataFrame({
             'id_leitao': [],
@@ -435,12 +492,12 @@ def load_piglets():
 
 def save_piglets(df):
     """Save piglets data to CSV"""
-    df.to_csv(PIGLETS_FILE, index=False)
+    _write_table(df, PIGLETS_FILE)
 
 def load_weaning():
     """Load weaning data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(WEANING_FILE):
-        return pd.read_csv(WEANING_FILE)
+        return _read_table(WEANING_FILE)
     else:
         return pd.DataFrame({
             'id_desmame': [],
@@ -460,7 +517,7 @@ def load_weaning():
 
 def save_weaning(df):
     """Save weaning data to CSV"""
-    df.to_csv(WEANING_FILE, index=False)
+    _write_table(df, WEANING_FILE)
 
 def calculate_weaning_metrics(litter_id, piglets_df):
     """Calculate metrics for weaning based on piglet data"""
@@ -543,7 +600,7 @@ def check_litter_exists(litters_df, maternity_id):
 def load_nursery():
     """Load nursery data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(NURSERY_FILE):
-        return pd.read_csv(NURSERY_FILE)
+        return _read_table(NURSERY_FILE)
     else:
         return pd.DataFrame({
             'id_creche': [],
@@ -557,12 +614,12 @@ def load_nursery():
 
 def save_nursery(df):
     """Save nursery data to CSV"""
-    df.to_csv(NURSERY_FILE, index=False)
+    _write_table(df, NURSERY_FILE)
 
 def load_nursery_batches():
     """Load nursery batches data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(NURSERY_BATCHES_FILE):
-        return pd.read_csv(NURSERY_BATCHES_FILE)
+        return _read_table(NURSERY_BATCHES_FILE)
     else:
         return pd.DataFrame({
             'id_lote': [],
@@ -585,12 +642,12 @@ def load_nursery_batches():
 
 def save_nursery_batches(df):
     """Save nursery batches data to CSV"""
-    df.to_csv(NURSERY_BATCHES_FILE, index=False)
+    _write_table(df, NURSERY_BATCHES_FILE)
 
 def load_nursery_movements():
     """Load nursery movements data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(NURSERY_MOVEMENTS_FILE):
-        return pd.read_csv(NURSERY_MOVEMENTS_FILE)
+        return _read_table(NURSERY_MOVEMENTS_FILE)
     else:
         return pd.DataFrame({
             'id_movimentacao': [],
@@ -612,7 +669,7 @@ def load_nursery_movements():
 
 def save_nursery_movements(df):
     """Save nursery movements data to CSV"""
-    df.to_csv(NURSERY_MOVEMENTS_FILE, index=False)
+    _write_table(df, NURSERY_MOVEMENTS_FILE)
 
 def get_active_nursery_batches(nursery_batches_df):
     """Get list of active nursery batches"""
@@ -692,7 +749,7 @@ def get_batch_details(batch_id, nursery_batches_df, movements_df):
 def load_gilts():
     """Load gilts data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(GILTS_FILE):
-        return pd.read_csv(GILTS_FILE)
+        return _read_table(GILTS_FILE)
     else:
         return pd.DataFrame({
             'id_leitoa': [],
@@ -716,12 +773,12 @@ def load_gilts():
 
 def save_gilts(df):
     """Save gilts data to CSV"""
-    df.to_csv(GILTS_FILE, index=False)
+    _write_table(df, GILTS_FILE)
 
 def load_gilts_selection():
     """Load gilts selection data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(GILTS_SELECTION_FILE):
-        return pd.read_csv(GILTS_SELECTION_FILE)
+        return _read_table(GILTS_SELECTION_FILE)
     else:
         return pd.DataFrame({
             'id_selecao': [],
@@ -749,12 +806,12 @@ def load_gilts_selection():
 
 def save_gilts_selection(df):
     """Save gilts selection data to CSV"""
-    df.to_csv(GILTS_SELECTION_FILE, index=False)
+    _write_table(df, GILTS_SELECTION_FILE)
 
 def load_gilts_discard():
     """Load gilts discard data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(GILTS_DISCARD_FILE):
-        return pd.read_csv(GILTS_DISCARD_FILE)
+        return _read_table(GILTS_DISCARD_FILE)
     else:
         return pd.DataFrame({
             'id_descarte': [],
@@ -772,7 +829,7 @@ def load_gilts_discard():
 
 def save_gilts_discard(df):
     """Save gilts discard data to CSV"""
-    df.to_csv(GILTS_DISCARD_FILE, index=False)
+    _write_table(df, GILTS_DISCARD_FILE)
 
 def get_available_gilts(gilts_df):
     """Get list of available gilts (not discarded)"""
@@ -792,7 +849,7 @@ def load_caliber_scores():
     """Load caliber scores data from CSV or create empty DataFrame if file doesn't exist"""
     file_path = "data/caliber_scores.csv"
     if os.path.exists(file_path):
-        return pd.read_csv(file_path)
+        return _read_table(file_path)
     else:
         return pd.DataFrame({
             'id_score': [],
@@ -809,20 +866,34 @@ def load_caliber_scores():
 
 def save_caliber_scores(df):
     """Save caliber scores data to CSV"""
-    df.to_csv("data/caliber_scores.csv", index=False)
+    _write_table(df, "data/caliber_scores.csv")
+
+# Faixas de condição corporal pelo P2 (mm): limite superior, se o limite entra na faixa, rótulo e escore
+BODY_CONDITION_THRESHOLDS = [
+    (10, False, "Muito Magra (1)", 1),
+    (14, False, "Magra (2)", 2),
+    (19, True, "Ideal (3)", 3),
+    (25, True, "Gorda (4)", 4)
+]
+BODY_CONDITION_ABOVE = ("Muito Gorda (5)", 5)
 
 def calculate_body_condition(p2_value):
     """Calculate body condition score based on P2 measurement (mm)"""
-    if p2_value < 10:
-        return "Muito Magra (1)", 1
-    elif p2_value < 14:
-        return "Magra (2)", 2
-    elif p2_value >= 14 and p2_value <= 19:
-        return "Ideal (3)", 3
-    elif p2_value > 19 and p2_value <= 25:
-        return "Gorda (4)", 4
-    else:
-        return "Muito Gorda (5)", 5
+    for limit, inclusive, label, score in BODY_CONDITION_THRESHOLDS:
+        if p2_value < limit or (inclusive and p2_value == limit):
+            return label, score
+    return BODY_CONDITION_ABOVE
+
+def calculate_body_condition_scores(p2_values):
+    """Vectorized version of calculate_body_condition returning the 1-5 score (NaN when unknown)"""
+    p2 = pd.to_numeric(pd.Series(p2_values), errors='coerce').to_numpy(dtype=float)
+    conditions = [(p2 <= limit) if inclusive else (p2 < limit) for limit, inclusive, _, _ in BODY_CONDITION_THRESHOLDS]
+    scores = np.select(
+        conditions + [p2 > BODY_CONDITION_THRESHOLDS[-1][0]],
+        [score for _, _, _, score in BODY_CONDITION_THRESHOLDS] + [BODY_CONDITION_ABOVE[1]],
+        default=np.nan
+    )
+    return scores
 
 def calculate_gilts_statistics(gilts_df, selection_df, discard_df):
     """Calculate statistics for gilts management"""
@@ -871,7 +942,7 @@ MORTALITY_FILE = "data/mortality.csv"
 def load_mortality_records():
     """Load mortality records from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(MORTALITY_FILE):
-        return pd.read_csv(MORTALITY_FILE)
+        return _read_table(MORTALITY_FILE)
     else:
         return pd.DataFrame({
             'id_morte': [],
@@ -891,7 +962,7 @@ def load_mortality_records():
 
 def save_mortality_records(df):
     """Save mortality records to CSV"""
-    df.to_csv(MORTALITY_FILE, index=False)
+    _write_table(df, MORTALITY_FILE)
 
 def calculate_mortality_statistics(mortality_df, start_date=None, end_date=None, category=None):
     """Calculate mortality statistics for the given period and category"""
@@ -955,7 +1026,7 @@ def generate_mortality_report(mortality_df, animals_df, start_date=None, end_dat
 def load_vaccines():
     """Load vaccines data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(VACCINES_FILE):
-        return pd.read_csv(VACCINES_FILE)
+        return _read_table(VACCINES_FILE)
     else:
         return pd.DataFrame({
             'id_vacina': [],
@@ -972,12 +1043,12 @@ def load_vaccines():
 
 def save_vaccines(df):
     """Save vaccines data to CSV"""
-    df.to_csv(VACCINES_FILE, index=False)
+    _write_table(df, VACCINES_FILE)
 
 def load_vaccination_protocols():
     """Load vaccination protocols data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(VACCINATION_PROTOCOLS_FILE):
-        return pd.read_csv(VACCINATION_PROTOCOLS_FILE)
+        return _read_table(VACCINATION_PROTOCOLS_FILE)
     else:
         return pd.DataFrame({
             'id_protocolo': [],
@@ -994,12 +1065,12 @@ def load_vaccination_protocols():
 
 def save_vaccination_protocols(df):
     """Save vaccination protocols data to CSV"""
-    df.to_csv(VACCINATION_PROTOCOLS_FILE, index=False)
+    _write_table(df, VACCINATION_PROTOCOLS_FILE)
 
 def load_vaccination_records():
     """Load vaccination records data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(VACCINATION_RECORDS_FILE):
-        return pd.read_csv(VACCINATION_RECORDS_FILE)
+        return _read_table(VACCINATION_RECORDS_FILE)
     else:
         return pd.DataFrame({
             'id_registro': [],
@@ -1019,7 +1090,7 @@ def load_vaccination_records():
 
 def save_vaccination_records(df):
     """Save vaccination records data to CSV"""
-    df.to_csv(VACCINATION_RECORDS_FILE, index=False)
+    _write_table(df, VACCINATION_RECORDS_FILE)
 
 def calculate_next_vaccinations(animal_id, animals_df, protocols_df, records_df):
     """Calculate next vaccinations needed for an animal based on protocols and history"""
@@ -1121,7 +1192,7 @@ def generate_vaccination_report(start_date, end_date, records_df, animals_df, va
 def load_heat_detection():
     """Load heat detection data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(HEAT_DETECTION_FILE):
-        return pd.read_csv(HEAT_DETECTION_FILE)
+        return _read_table(HEAT_DETECTION_FILE)
     else:
         return pd.DataFrame({
             'id_rufia': [],
@@ -1135,12 +1206,12 @@ def load_heat_detection():
 
 def save_heat_detection(df):
     """Save heat detection data to CSV"""
-    df.to_csv(HEAT_DETECTION_FILE, index=False)
+    _write_table(df, HEAT_DETECTION_FILE)
 
 def load_heat_records():
     """Load heat records data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(HEAT_RECORDS_FILE):
-        return pd.read_csv(HEAT_RECORDS_FILE)
+        return _read_table(HEAT_RECORDS_FILE)
     else:
         return pd.DataFrame({
             'id_registro': [],
@@ -1159,7 +1230,7 @@ def load_heat_records():
 
 def save_heat_records(df):
     """Save heat records data to CSV"""
-    df.to_csv(HEAT_RECORDS_FILE, index=False)
+    _write_table(df, HEAT_RECORDS_FILE)
 
 def calculate_heat_interval(matriz_id, heat_records_df):
     """Calculate interval between heat detections for a specific sow"""
@@ -1281,52 +1352,149 @@ def load_employees():
 
 def save_employees(df):
     """Save employees data to CSV"""
-    df.to_csv(EMPLOYEES_FILE, index=False)
-
-def authenticate_employee(matricula):
-    """Authenticate employee by registration number"""
-    employees_df = load_employees()
-
-    if employees_df.empty:
-        return None
-        
-    # Converte a matrícula para string para garantir a comparação correta
-    matricula_str = str(matricula)
-    # Garante que as matrículas no DataFrame também são strings
-    employees_df['matricula'] = employees_df['matricula'].astype(str)
-
-    employee = employees_df[
-        (employees_df['matricula'] == matricula_str) & 
-        (employees_df['status'] == 'Ativo')
-    ]
-
-    if not employee.empty:
-        # Update last access
-        # Primeiro, certifique-se de que a coluna ultimo_acesso tem o tipo de dados correto (string/object)
+    with _employees_write_lock:
+        _write_csv_transaction({EMPLOYEES_FILE: df})
+
+# Índice em memória de colaboradores por matrícula e gravação de último acesso em segundo plano
+LAST_ACCESS_FLUSH_SECONDS = 5
+
+_employee_index = {'stamp': None, 'index': {}}
+_employee_index_lock = threading.Lock()
+# Reentrante: register_employee/update_employee_status leem e gravam sob o lock e chamam save_employees
+_employees_write_lock = threading.RLock()
+_last_access_pending = {}
+_last_access_lock = threading.Lock()
+_last_access_wakeup = threading.Event()
+_last_access_writer = {'thread': None}
+
+def _get_employee_index():
+    """Índice matrícula → colaborador, reconstruído apenas quando o arquivo muda"""
+    stamp = _file_stamp(EMPLOYEES_FILE)
+    with _employee_index_lock:
+        if _employee_index['stamp'] != stamp or stamp is None:
+            employees_df = load_employees()
+            employees_df['matricula'] = employees_df['matricula'].astype(str)
+            records = employees_df.to_dict('records')
+            _employee_index['index'] = {record['matricula']: record for record in records}
+            _employee_index['stamp'] = stamp
+        return _employee_index['index']
+
+def flush_last_access():
+    """Grava de uma vez os últimos acessos pendentes no arquivo de colaboradores"""
+    with _last_access_lock:
+        pending = dict(_last_access_pending)
+        _last_access_pending.clear()
+    if not pending:
+        return 0
+    with _employees_write_lock:
+        employees_df = load_employees()
+        if employees_df.empty:
+            return 0
+        employees_df['matricula'] = employees_df['matricula'].astype(str)
         if 'ultimo_acesso' not in employees_df.columns:
             employees_df['ultimo_acesso'] = None
-        
-        # Garante que a coluna seja do tipo object (string) antes de atribuir um valor string
-        if not pd.api.types.is_object_dtype(employees_df['ultimo_acesso']):
-            employees_df['ultimo_acesso'] = employees_df['ultimo_acesso'].astype(str)
-        
-        # Atualiza o último acesso
-        employees_df.loc[
-            employees_df['matricula'] == matricula_str, 
-            'ultimo_acesso'
-        ] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-        save_employees(employees_df)
-        return employee.iloc[0].to_dict()
+        new_access = employees_df['matricula'].map(pending)
+        employees_df['ultimo_acesso'] = new_access.where(new_access.notna(), employees_df['ultimo_acesso'].astype(object))
+        _write_csv_transaction({EMPLOYEES_FILE: employees_df})
+        # A gravação só mudou ultimo_acesso: atualiza o índice em vez de reconstruí-lo
+        with _employee_index_lock:
+            for matricula, access in pending.items():
+                if matricula in _employee_index['index']:
+                    _employee_index['index'][matricula]['ultimo_acesso'] = access
+            _employee_index['stamp'] = _file_stamp(EMPLOYEES_FILE)
+    return len(pending)
+
+def _last_access_writer_loop():
+    """Thread de gravação: agrupa os acessos e grava a cada LAST_ACCESS_FLUSH_SECONDS"""
+    while True:
+        _last_access_wakeup.wait(LAST_ACCESS_FLUSH_SECONDS)
+        _last_access_wakeup.clear()
+        try:
+            flush_last_access()
+        except (OSError, ValueError) as e:
+            print(f"Erro ao gravar último acesso: {str(e)}")
+
+def _record_last_access(matricula):
+    """Enfileira o último acesso; vários logins da mesma matrícula viram uma única gravação"""
+    with _last_access_lock:
+        _last_access_pending[matricula] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        thread = _last_access_writer['thread']
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(target=_last_access_writer_loop, name='last-access-writer', daemon=True)
+            _last_access_writer['thread'] = thread
+            thread.start()
+
+atexit.register(flush_last_access)
+
+def authenticate_employee(matricula, record_access=True):
+    """Authenticate employee by registration number (record_access=False não registra o último acesso)"""
+    # Consulta o índice em memória; o último acesso é gravado em segundo plano
+    employee = _get_employee_index().get(str(matricula))
+
+    if employee is not None and employee.get('status') == 'Ativo':
+        if record_access:
+            _record_last_access(employee['matricula'])
+        return dict(employee)
 
     return None
 
+def benchmark_login_burst(n_logins=100):
+    """
+    Simula n_logins simultâneos e compara a latência do login pelo índice em memória
+    com a do login antigo (ler, alterar e regravar o CSV a cada acesso, em série).
+
+    O login antigo é simulado sobre uma cópia temporária do arquivo de colaboradores e o
+    login pelo índice não registra acessos, então o arquivo real não é alterado.
+
+    Returns:
+        DataFrame: modo, logins, p50_ms, p95_ms, max_ms, total_ms
+    """
+    index = _get_employee_index()
+    active = [matricula for matricula, employee in index.items() if employee.get('status') == 'Ativo']
+    if not active:
+        return pd.DataFrame(columns=['modo', 'logins', 'p50_ms', 'p95_ms', 'max_ms', 'total_ms'])
+    burst = [active[i % len(active)] for i in range(n_logins)]
+
+    copy_path = f"{EMPLOYEES_FILE}.{uuid.uuid4().hex}.bench"
+    load_employees().to_csv(copy_path, index=False)
+    copy_lock = threading.Lock()
+
+    def legacy_login(matricula):
+        # O arquivo é um recurso único: as regravações ficam em série
+        with copy_lock:
+            employees_df = pd.read_csv(copy_path)
+            employees_df['matricula'] = employees_df['matricula'].astype(str)
+            employees_df['ultimo_acesso'] = employees_df['ultimo_acesso'].astype(object)
+            employees_df.loc[employees_df['matricula'] == matricula, 'ultimo_acesso'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            employees_df.to_csv(copy_path, index=False)
+
+    def timed(login, matricula):
+        start = time.perf_counter()
+        login(matricula)
+        return time.perf_counter() - start
+
+    rows = []
+    try:
+        for mode, login in (('Síncrono (anterior)', legacy_login), ('Índice em memória', lambda m: authenticate_employee(m, record_access=False))):
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=n_logins) as executor:
+                latencies = np.array(list(executor.map(lambda m: timed(login, m), burst))) * 1000
+            total = (time.perf_counter() - start) * 1000
+            rows.append((mode, n_logins, round(float(np.percentile(latencies, 50)), 2),
+                         round(float(np.percentile(latencies, 95)), 2), round(float(latencies.max()), 2), round(total, 2)))
+    finally:
+        os.remove(copy_path)
+    return pd.DataFrame(rows, columns=['modo', 'logins', 'p50_ms', 'p95_ms', 'max_ms', 'total_ms'])
+
 def check_developer_access(user):
     """Verifica se o usuário tem acesso de desenvolvedor"""
     if user and 'cargo' in user:
         return user['cargo'] == 'Desenvolvedor'
     return False
 
+PERMISSIONS_FILE = "data/permissions.json"
+PAGE_PERMISSIONS_FILE = ".streamlit/page_config/page_permissions.json"
+
 def load_permissions_map():
     """
     Carrega o mapeamento de permissões por cargo de um arquivo JSON ou retorna o mapeamento padrão.
@@ -1335,7 +1503,7 @@ def load_permissions_map():
         dict: Mapeamento de permissões por cargo
     """
     # Caminho para o arquivo de configuração de permissões
-    permission_file = "data/permissions.json"
+    permission_file = PERMISSIONS_FILE
     
     # Mapeamento padrão de permissões por cargo
     default_permissions_map = {
@@ -1431,7 +1599,7 @@ def save_permissions_map(permissions_map):
         bool: True se salvo com sucesso, False caso contrário
     """
     # Caminho para o arquivo de configuração de permissões
-    permission_file = "data/permissions.json"
+    permission_file = PERMISSIONS_FILE
     
     try:
         # Garantir que o diretório data existe
@@ -1441,6 +1609,7 @@ def save_permissions_map(permissions_map):
         import json
         with open(permission_file, 'w') as f:
             json.dump(permissions_map, f, indent=4)
+        invalidate_permission_cache()
         return True
     except Exception as e:
         print(f"Erro ao salvar permissões: {str(e)}")
@@ -1457,84 +1626,163 @@ def check_permission(user, permission_type):
     Returns:
         bool: True se o usuário tem a permissão, False caso contrário
     """
+    return has_permission(user, permission_type)
+
+# Cache compilado de permissões: cada cargo vira uma máscara de bits sobre as permissões conhecidas
+_permission_cache = {'stamp': None, 'compiled': None}
+
+def _file_stamp(path):
+    """(mtime_ns, tamanho) do arquivo, ou None se não existir"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _process_pool(max_workers):
+    """
+    Pool de processos iniciados por spawn, usado por todos os cálculos em paralelo.
+
+    O app roda com várias threads (sessões do Streamlit, agendador de relatórios); um
+    fork copiaria locks que podem estar ocupados (como os de _table_locks) e o filho travaria.
+    """
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+def invalidate_permission_cache():
+    """Descarta o cache compilado de permissões (recompilado no próximo acesso)"""
+    _permission_cache['stamp'] = None
+
+def _compiled_permissions():
+    """
+    Compila os mapas de permissões por cargo e por página em máscaras de bits.
+
+    A compilação é refeita apenas quando um dos arquivos de configuração muda
+    (data de modificação ou tamanho) ou após invalidate_permission_cache().
+    """
+    stamp = (_file_stamp(PERMISSIONS_FILE), _file_stamp(PAGE_PERMISSIONS_FILE))
+    if _permission_cache['stamp'] == stamp and _permission_cache['compiled'] is not None:
+        return _permission_cache['compiled']
+
+    import json
+    roles_map = load_permissions_map()
+    try:
+        with open(PAGE_PERMISSIONS_FILE, 'r') as f:
+            pages_map = json.load(f)
+    except (OSError, ValueError):
+        pages_map = {}
+
+    bits = {}
+    for permissions in list(roles_map.values()) + list(pages_map.values()):
+        for permission in permissions:
+            bits.setdefault(permission, 1 << len(bits))
+    role_masks = {role: sum({bits[p] for p in permissions}) for role, permissions in roles_map.items()}
+    # Página sem permissões exigidas (máscara 0) fica liberada para qualquer usuário autenticado
+    page_masks = {page: sum({bits[p] for p in permissions}) for page, permissions in pages_map.items()}
+    role_pages = {
+        role: sorted(page for page, page_mask in page_masks.items() if page_mask == 0 or page_mask & role_mask)
+        for role, role_mask in role_masks.items()
+    }
+    compiled = {'bits': bits, 'roles': role_masks, 'pages': page_masks, 'role_pages': role_pages}
+    _permission_cache.update(stamp=stamp, compiled=compiled)
+    return compiled
+
+def has_permission(user, permission_type):
+    """Verifica em tempo constante se o cargo do usuário tem a permissão (cache compilado)"""
     if not user or 'cargo' not in user:
         return False
-        
-    # Carregar o mapeamento de permissões
-    permissions_map = load_permissions_map()
-    
-    # Obtém as permissões do cargo do usuário, ou uma lista vazia se o cargo não estiver mapeado
-    user_permissions = permissions_map.get(user['cargo'], [])
-    
-    # Verifica se a permissão solicitada está na lista de permissões do usuário
-    return permission_type in user_permissions
+    compiled = _compiled_permissions()
+    bit = compiled['bits'].get(permission_type)
+    return bit is not None and bool(compiled['roles'].get(user['cargo'], 0) & bit)
+
+def has_page_permission(user, page_filename):
+    """Verifica se o usuário tem ao menos uma das permissões exigidas pela página"""
+    if not user or 'cargo' not in user:
+        return False
+    compiled = _compiled_permissions()
+    page_mask = compiled['pages'].get(page_filename, 0)
+    return page_mask == 0 or bool(compiled['roles'].get(user['cargo'], 0) & page_mask)
+
+def get_allowed_pages(cargo):
+    """Páginas (nomes de arquivo) liberadas para o cargo, pré-calculadas no cache de permissões"""
+    compiled = _compiled_permissions()
+    if cargo in compiled['role_pages']:
+        return compiled['role_pages'][cargo]
+    return sorted(page for page, page_mask in compiled['pages'].items() if page_mask == 0)
+
+def get_restricted_pages(cargo):
+    """Páginas configuradas que o cargo não pode acessar (para ocultar no menu lateral)"""
+    return sorted(set(_compiled_permissions()['pages']) - set(get_allowed_pages(cargo)))
     
 def register_employee(nome, matricula, cargo, setor, observacao=""):
     """Register a new employee"""
-    employees_df = load_employees()
-    
-    # Converte a matrícula para string
-    matricula_str = str(matricula)
-    
-    # Garante que as matrículas no DataFrame também são strings
-    if not employees_df.empty:
-        employees_df['matricula'] = employees_df['matricula'].astype(str)
-
-    # Check if registration number already exists
-    if not employees_df.empty and matricula_str in employees_df['matricula'].values:
-        return False, "Matrícula já cadastrada"
-
-    # Create new employee record
-    new_employee = {
-        'id_colaborador': str(uuid.uuid4()),
-        'nome': nome,
-        'matricula': matricula_str,
-        'cargo': cargo,
-        'setor': setor,
-        'data_admissao': datetime.now().strftime('%Y-%m-%d'),
-        'status': 'Ativo',
-        'ultimo_acesso': None,
-        'observacao': observacao
-    }
+    # Leitura e gravação sob o mesmo lock da gravação de últimos acessos (sem atualizações perdidas)
+    with _employees_write_lock:
+        employees_df = load_employees()
+    
+        # Converte a matrícula para string
+        matricula_str = str(matricula)
+    
+        # Garante que as matrículas no DataFrame também são strings
+        if not employees_df.empty:
+            employees_df['matricula'] = employees_df['matricula'].astype(str)
+
+        # Check if registration number already exists
+        if not employees_df.empty and matricula_str in employees_df['matricula'].values:
+            return False, "Matrícula já cadastrada"
+
+        # Create new employee record
+        new_employee = {
+            'id_colaborador': str(uuid.uuid4()),
+            'nome': nome,
+            'matricula': matricula_str,
+            'cargo': cargo,
+            'setor': setor,
+            'data_admissao': datetime.now().strftime('%Y-%m-%d'),
+            'status': 'Ativo',
+            'ultimo_acesso': None,
+            'observacao': observacao
+        }
 
-    # Add to DataFrame
-    if employees_df.empty:
-        employees_df = pd.DataFrame([new_employee])
-    else:
-        employees_df = pd.concat([employees_df, pd.DataFrame([new_employee])], ignore_index=True)
+        # Add to DataFrame
+        if employees_df.empty:
+            employees_df = pd.DataFrame([new_employee])
+        else:
+            employees_df = pd.concat([employees_df, pd.DataFrame([new_employee])], ignore_index=True)
 
-    # Save updated DataFrame
-    save_employees(employees_df)
-    return True, "Colaborador cadastrado com sucesso"
+        # Save updated DataFrame
+        save_employees(employees_df)
+        return True, "Colaborador cadastrado com sucesso"
 
 def update_employee_status(matricula, new_status):
     """Update employee status (Active/Inactive)"""
-    employees_df = load_employees()
+    # Leitura e gravação sob o mesmo lock da gravação de últimos acessos (sem atualizações perdidas)
+    with _employees_write_lock:
+        employees_df = load_employees()
     
-    # Converte a matrícula para string
-    matricula_str = str(matricula)
+        # Converte a matrícula para string
+        matricula_str = str(matricula)
     
-    # Garante que as matrículas no DataFrame também são strings
-    if not employees_df.empty:
-        employees_df['matricula'] = employees_df['matricula'].astype(str)
+        # Garante que as matrículas no DataFrame também são strings
+        if not employees_df.empty:
+            employees_df['matricula'] = employees_df['matricula'].astype(str)
 
-    if employees_df.empty or matricula_str not in employees_df['matricula'].values:
-        return False, "Colaborador não encontrado"
+        if employees_df.empty or matricula_str not in employees_df['matricula'].values:
+            return False, "Colaborador não encontrado"
 
-    employees_df.loc[
-        employees_df['matricula'] == matricula_str, 
-        'status'
-    ] = new_status
+        employees_df.loc[
+            employees_df['matricula'] == matricula_str, 
+            'status'
+        ] = new_status
 
-    save_employees(employees_df)
-    return True, f"Status atualizado para {new_status}"
+        save_employees(employees_df)
+        return True, f"Status atualizado para {new_status}"
     
 # Funções para o sistema de recria
 
 def load_recria():
     """Load recria data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(RECRIA_FILE):
-        return pd.read_csv(RECRIA_FILE)
+        return _read_table(RECRIA_FILE)
     else:
         return pd.DataFrame({
             'id_recria': [],
@@ -1554,12 +1802,12 @@ def load_recria():
 
 def save_recria(df):
     """Save recria data to CSV"""
-    df.to_csv(RECRIA_FILE, index=False)
+    _write_table(df, RECRIA_FILE)
 
 def load_recria_lotes():
     """Load recria batches data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(RECRIA_LOTES_FILE):
-        return pd.read_csv(RECRIA_LOTES_FILE)
+        return _read_table(RECRIA_LOTES_FILE)
     else:
         return pd.DataFrame({
             'id_lote': [],
@@ -1582,12 +1830,12 @@ def load_recria_lotes():
 
 def save_recria_lotes(df):
     """Save recria batches data to CSV"""
-    df.to_csv(RECRIA_LOTES_FILE, index=False)
+    _write_table(df, RECRIA_LOTES_FILE)
 
 def load_recria_pesagens():
     """Load recria weighing data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(RECRIA_PESAGENS_FILE):
-        return pd.read_csv(RECRIA_PESAGENS_FILE)
+        return _read_table(RECRIA_PESAGENS_FILE)
     else:
         return pd.DataFrame({
             'id_pesagem': [],
@@ -1606,12 +1854,12 @@ def load_recria_pesagens():
 
 def save_recria_pesagens(df):
     """Save recria weighing data to CSV"""
-    df.to_csv(RECRIA_PESAGENS_FILE, index=False)
+    _write_table(df, RECRIA_PESAGENS_FILE)
 
 def load_recria_transferencias():
     """Load recria transfers data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(RECRIA_TRANSFERENCIAS_FILE):
-        return pd.read_csv(RECRIA_TRANSFERENCIAS_FILE)
+        return _read_table(RECRIA_TRANSFERENCIAS_FILE)
     else:
         return pd.DataFrame({
             'id_transferencia': [],
@@ -1631,12 +1879,12 @@ def load_recria_transferencias():
 
 def save_recria_transferencias(df):
     """Save recria transfers data to CSV"""
-    df.to_csv(RECRIA_TRANSFERENCIAS_FILE, index=False)
+    _write_table(df, RECRIA_TRANSFERENCIAS_FILE)
 
 def load_recria_alimentacao():
     """Load recria feeding data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(RECRIA_ALIMENTACAO_FILE):
-        return pd.read_csv(RECRIA_ALIMENTACAO_FILE)
+        return _read_table(RECRIA_ALIMENTACAO_FILE)
     else:
         return pd.DataFrame({
             'id_alimentacao': [],
@@ -1655,12 +1903,12 @@ def load_recria_alimentacao():
 
 def save_recria_alimentacao(df):
     """Save recria feeding data to CSV"""
-    df.to_csv(RECRIA_ALIMENTACAO_FILE, index=False)
+    _write_table(df, RECRIA_ALIMENTACAO_FILE)
 
 def load_recria_medicacao():
     """Load recria medication data from CSV or create empty DataFrame if file doesn't exist"""
     if os.path.exists(RECRIA_MEDICACAO_FILE):
-        return pd.read_csv(RECRIA_MEDICACAO_FILE)
+        return _read_table(RECRIA_MEDICACAO_FILE)
     else:
         return pd.DataFrame({
             'id_medicacao': [],
@@ -1681,7 +1929,7 @@ def load_recria_medicacao():
 
 def save_recria_medicacao(df):
     """Save recria medication data to CSV"""
-    df.to_csv(RECRIA_MEDICACAO_FILE, index=False)
+    _write_table(df, RECRIA_MEDICACAO_FILE)
 
 def criar_lote_recria(codigo, data_formacao, quantidade_inicial, idade_media, 
                       peso_medio_inicial, id_baia, responsavel, observacao=""):
@@ -2172,4 +2420,4328 @@ def calcular_estatisticas_recria(id_lote=None, fase=None, periodo_inicio=None, p
         # Medicações por motivo
         stats['medicacoes_por_motivo'] = medicacao_df.groupby('motivo').size().to_dict()
     
-    return stats
\ No newline at end of file
+    return stats
+
+# Funções para o sistema de genealogia (pedigree)
+
+# Janela (dias) entre inseminação e parto usada para atribuir o reprodutor à leitegada
+PEDIGREE_GESTATION_MIN_DAYS = 105
+PEDIGREE_GESTATION_MAX_DAYS = 125
+
+# Estado do último pedigree calculado (reaproveitado enquanto as tabelas não mudam)
+_pedigree_cache = {'version': None, 'pedigree': None}
+
+def _dataframe_version(df):
+    """Return a cheap fingerprint of a DataFrame contents (rows + content hash)"""
+    if df is None or df.empty:
+        return (0, 0)
+    return (len(df), int(pd.util.hash_pandas_object(df, index=False).sum()))
+
+def infer_litter_sires(litters_df, insemination_df):
+    """Assign each litter the semen used in the last insemination before farrowing"""
+    columns = ['id_leitegada', 'id_animal', 'data_parto', 'num_semen', 'linhagem_semen']
+    if litters_df.empty or insemination_df.empty:
+        return pd.DataFrame(columns=columns)
+
+    litters = litters_df[['id_leitegada', 'id_animal', 'data_parto']].copy()
+    litters['data_parto'] = pd.to_datetime(litters['data_parto'], errors='coerce')
+
+    insem_cols = ['id_animal', 'data_inseminacao', 'num_semen']
+    if 'linhagem_semen' in insemination_df.columns:
+        insem_cols.append('linhagem_semen')
+    inseminations = insemination_df[insem_cols].dropna(subset=['num_semen']).copy()
+    inseminations['data_inseminacao'] = pd.to_datetime(inseminations['data_inseminacao'], errors='coerce')
+    inseminations['num_semen'] = inseminations['num_semen'].astype(str)
+
+    # Cruzar leitegadas e inseminações da mesma matriz e manter as compatíveis com a gestação
+    merged = litters.merge(inseminations, on='id_animal', how='inner')
+    dias = (merged['data_parto'] - merged['data_inseminacao']).dt.days
+    merged = merged[(dias >= PEDIGREE_GESTATION_MIN_DAYS) & (dias <= PEDIGREE_GESTATION_MAX_DAYS)]
+
+    # Em caso de várias doses, vale a última inseminação antes do parto
+    merged = merged.sort_values('data_inseminacao').drop_duplicates('id_leitegada', keep='last')
+    if 'linhagem_semen' not in merged.columns:
+        merged['linhagem_semen'] = None
+
+    return merged[columns].reset_index(drop=True)
+
+def _animal_key_lookup(animals_df):
+    """Map brinco/identificação (text) to id_animal"""
+    lookup = {}
+    if not animals_df.empty:
+        for column in ['brinco', 'identificacao']:
+            if column in animals_df.columns:
+                valid = animals_df[animals_df[column].notna()]
+                lookup.update(dict(zip(valid[column].astype(str).str.strip(), valid['id_animal'])))
+    return lookup
+
+def _resolve_parent_keys(values, lookup, prefix):
+    """Map free-text parent identifications to pedigree keys"""
+    values = values.astype('string').str.strip()
+    keys = values.map(lookup)
+    unresolved = keys.isna() & values.notna() & (values != '')
+    keys = keys.astype(object)
+    keys[unresolved] = prefix + values[unresolved].astype(str)
+    return keys.where(keys.notna(), None)
+
+def _collect_pedigree_edges(animals_df, litters_df, piglets_df, insemination_df, gilts_df):
+    """Collect (key, sire, dam) rows from litters, piglets and gilts"""
+    edges = []
+
+    # Leitões: mãe biológica + reprodutor inferido pela inseminação da leitegada
+    if not piglets_df.empty:
+        sires = infer_litter_sires(litters_df, insemination_df)
+        piglets = piglets_df[['id_leitao', 'id_leitegada', 'id_animal_mae']].merge(
+            sires[['id_leitegada', 'num_semen']], on='id_leitegada', how='left'
+        )
+        edges.append(pd.DataFrame({
+            'key': piglets['id_leitao'].astype(str).values,
+            'sire': np.where(piglets['num_semen'].notna(), 'semen:' + piglets['num_semen'].astype(str), None),
+            'dam': piglets['id_animal_mae'].where(piglets['id_animal_mae'].notna(), None).values
+        }))
+
+    # Leitoas: mãe e pai informados no cadastro (identificação, brinco ou número do sêmen)
+    if not gilts_df.empty:
+        lookup = _animal_key_lookup(animals_df)
+        sire_lookup = dict(lookup)
+        if not insemination_df.empty:
+            semen = insemination_df['num_semen'].dropna().astype(str).unique()
+            sire_lookup.update({value: 'semen:' + value for value in semen})
+
+        gilt_keys = gilts_df['id_animal'].astype(object) if 'id_animal' in gilts_df.columns else pd.Series(None, index=gilts_df.index, dtype=object)
+        gilt_keys = gilt_keys.where(gilt_keys.notna(), 'leitoa:' + gilts_df['id_leitoa'].astype(str))
+        edges.append(pd.DataFrame({
+            'key': gilt_keys.astype(str).values,
+            'sire': _resolve_parent_keys(gilts_df['pai'], sire_lookup, 'pai:').values,
+            'dam': _resolve_parent_keys(gilts_df['mae'], lookup, 'mae:').values
+        }))
+
+    if not edges:
+        return pd.DataFrame(columns=['key', 'sire', 'dam'])
+
+    edges = pd.concat(edges, ignore_index=True)
+    return edges.drop_duplicates('key', keep='last').reset_index(drop=True)
+
+def _pedigree_generations(sire, dam):
+    """Compute generation depth for every node (0 = founder), breaking loops"""
+    n = len(sire)
+    generation = np.zeros(n, dtype=np.int32)
+    if n == 0:
+        return generation, sire, dam
+
+    for _ in range(64):
+        from_sire = np.where(sire >= 0, generation[np.maximum(sire, 0)] + 1, 0)
+        from_dam = np.where(dam >= 0, generation[np.maximum(dam, 0)] + 1, 0)
+        new_generation = np.maximum(from_sire, from_dam)
+        if np.array_equal(new_generation, generation):
+            return generation, sire, dam
+        generation = new_generation
+
+    # Genealogia com laços (erro de cadastro): remove os pais dos nós que não convergiram
+    looping = generation >= 63
+    sire = np.where(looping, -1, sire)
+    dam = np.where(looping, -1, dam)
+    return _pedigree_generations(sire, dam)
+
+def _ancestor_contributions(i, sire, dam):
+    """Row i of Henderson's L factor as {ancestor_index: contribution}"""
+    contributions = {i: 1.0}
+    heap = [-i]
+    # Percorre os ancestrais em ordem decrescente (topológica) de índice
+    while heap:
+        j = -heapq.heappop(heap)
+        half = 0.5 * contributions[j]
+        for parent in (sire[j], dam[j]):
+            if parent >= 0:
+                if parent in contributions:
+                    contributions[parent] += half
+                else:
+                    contributions[parent] = half
+                    heapq.heappush(heap, -parent)
+    return contributions
+
+def _compute_inbreeding(pedigree, start):
+    """Fill inbreeding (F) and Mendelian variance (D) from node `start` onwards"""
+    sire = pedigree['sire'].tolist()
+    dam = pedigree['dam'].tolist()
+    inbreeding = pedigree['inbreeding']
+    variance = pedigree['D']
+    pair_cache = pedigree['pair_cache']
+
+    for i in range(start, len(sire)):
+        s, d = sire[i], dam[i]
+        f_sire = inbreeding[s] if s >= 0 else -1.0
+        f_dam = inbreeding[d] if d >= 0 else -1.0
+        variance[i] = 0.5 - 0.25 * (f_sire + f_dam)
+
+        if s < 0 or d < 0:
+            inbreeding[i] = 0.0
+            continue
+
+        # Irmãos completos têm o mesmo F: calcula uma única vez por casal
+        pair = (s, d) if s < d else (d, s)
+        if pair not in pair_cache:
+            pair_cache[pair] = 0.5 * _relationship_from_index(pedigree, s, d, sire, dam)
+        inbreeding[i] = pair_cache[pair]
+
+def _relationship_from_index(pedigree, a, b, sire=None, dam=None):
+    """Additive relationship a_ab between two node indexes"""
+    if sire is None:
+        sire = pedigree['sire'].tolist()
+        dam = pedigree['dam'].tolist()
+    if a == b:
+        return 1.0 + pedigree['inbreeding'][a]
+
+    contrib_a = _ancestor_contributions(a, sire, dam)
+    contrib_b = _ancestor_contributions(b, sire, dam)
+    if len(contrib_a) > len(contrib_b):
+        contrib_a, contrib_b = contrib_b, contrib_a
+
+    variance = pedigree['D']
+    return float(sum(value * contrib_b[k] * variance[k] for k, value in contrib_a.items() if k in contrib_b))
+
+def build_pedigree(animals_df, litters_df, piglets_df, insemination_df, gilts_df):
+    """
+    Monta o grafo genealógico e calcula o coeficiente de endogamia de Wright para todos os nós.
+
+    Os nós recebem ids inteiros compactos em ordem topológica (pais antes dos filhos).
+    O resultado é reaproveitado enquanto as tabelas não mudam; quando só há novos
+    registros (novas leitegadas), apenas os nós novos são calculados.
+
+    Returns:
+        dict: keys, index, sire, dam, generation, inbreeding, D e pair_cache
+    """
+    version = tuple(_dataframe_version(df) for df in (animals_df, litters_df, piglets_df, insemination_df, gilts_df))
+    cached = _pedigree_cache['pedigree']
+    if cached is not None and _pedigree_cache['version'] == version:
+        return cached
+
+    edges = _collect_pedigree_edges(animals_df, litters_df, piglets_df, insemination_df, gilts_df)
+
+    # Fundadores: pais que não aparecem como filhos
+    child_keys = set(edges['key'])
+    parents = pd.unique(pd.concat([edges['sire'], edges['dam']]).dropna())
+    founders = [key for key in parents if key not in child_keys]
+    all_keys = founders + edges['key'].tolist()
+    parent_map = dict(zip(edges['key'], zip(edges['sire'], edges['dam'])))
+
+    # Atualização incremental: nós antigos mantêm a posição se os pais não mudaram
+    old_keys = []
+    if cached is not None:
+        old_order, old_sire, old_dam = cached['keys'], cached['sire'], cached['dam']
+        all_set = child_keys.union(founders)
+        unchanged = all(
+            key in all_set and parent_map.get(key, (None, None)) == (
+                old_order[old_sire[i]] if old_sire[i] >= 0 else None,
+                old_order[old_dam[i]] if old_dam[i] >= 0 else None
+            )
+            for i, key in enumerate(old_order)
+        )
+        if unchanged:
+            old_keys = old_order
+
+    old_set = set(old_keys)
+    keys = list(old_keys) + [key for key in all_keys if key not in old_set]
+    index = {key: i for i, key in enumerate(keys)}
+
+    no_parents = (None, None)
+    sire = np.array([index.get(parent_map.get(key, no_parents)[0], -1) for key in keys], dtype=np.int64)
+    dam = np.array([index.get(parent_map.get(key, no_parents)[1], -1) for key in keys], dtype=np.int64)
+    generation, checked_sire, checked_dam = _pedigree_generations(sire, dam)
+    if not (np.array_equal(checked_sire, sire) and np.array_equal(checked_dam, dam)):
+        # Laços removidos alteraram nós antigos: recalcula tudo
+        old_keys = []
+    sire, dam = checked_sire, checked_dam
+
+    # Ordena os nós novos por geração para manter a ordem topológica
+    n_old = len(old_keys)
+    order = np.concatenate([np.arange(n_old), n_old + np.argsort(generation[n_old:], kind='stable')]).astype(np.int64)
+    if not np.array_equal(order, np.arange(len(keys))):
+        keys = [keys[i] for i in order]
+        remap = np.empty(len(order), dtype=np.int64)
+        remap[order] = np.arange(len(order))
+        sire = np.where(sire[order] >= 0, remap[np.maximum(sire[order], 0)], -1)
+        dam = np.where(dam[order] >= 0, remap[np.maximum(dam[order], 0)], -1)
+        generation = generation[order]
+        index = {key: i for i, key in enumerate(keys)}
+
+    n = len(keys)
+    start = len(old_keys)
+    pedigree = {
+        'keys': keys,
+        'index': index,
+        'sire': sire,
+        'dam': dam,
+        'generation': generation,
+        'inbreeding': np.zeros(n),
+        'D': np.ones(n),
+        'pair_cache': {}
+    }
+    if start:
+        pedigree['inbreeding'][:start] = cached['inbreeding'][:start]
+        pedigree['D'][:start] = cached['D'][:start]
+        pedigree['pair_cache'] = cached['pair_cache']
+
+    _compute_inbreeding(pedigree, start)
+
+    _pedigree_cache['version'] = version
+    _pedigree_cache['pedigree'] = pedigree
+    return pedigree
+
+def calculate_relationship(pedigree, key_a, key_b):
+    """Additive genetic relationship between two pedigree keys (0 if unknown)"""
+    index = pedigree['index']
+    if key_a not in index or key_b not in index:
+        return 0.0
+    return _relationship_from_index(pedigree, index[key_a], index[key_b])
+
+def calculate_relationship_matrix(pedigree, keys_a, keys_b, block_size=512):
+    """
+    Calcula a matriz de parentesco aditivo entre dois conjuntos de animais.
+
+    Cada linha do fator L (contribuição dos ancestrais) é montada uma vez e o bloco
+    A_ab = L_a · diag(D) · L_b' é obtido com produto matricial, em blocos de linhas.
+    Chaves ausentes do pedigree resultam em parentesco zero.
+    """
+    result = np.zeros((len(keys_a), len(keys_b)))
+    if len(keys_a) == 0 or len(keys_b) == 0:
+        return result
+
+    index = pedigree['index']
+    sire = pedigree['sire'].tolist()
+    dam = pedigree['dam'].tolist()
+    variance = pedigree['D']
+
+    rows_b = [(j, _ancestor_contributions(index[key], sire, dam)) for j, key in enumerate(keys_b) if key in index]
+    if not rows_b:
+        return result
+
+    # Colunas = ancestrais dos animais de B (só eles contribuem para o produto)
+    columns = {}
+    for _, contributions in rows_b:
+        for ancestor in contributions:
+            columns.setdefault(ancestor, len(columns))
+    ancestor_ids = np.fromiter(columns.keys(), dtype=np.int64, count=len(columns))
+
+    l_b = np.zeros((len(rows_b), len(columns)))
+    for row, (_, contributions) in enumerate(rows_b):
+        l_b[row, [columns[k] for k in contributions]] = list(contributions.values())
+    l_b_scaled = (l_b * variance[ancestor_ids]).T
+    positions_b = np.array([j for j, _ in rows_b])
+
+    rows_a = [(i, index[key]) for i, key in enumerate(keys_a) if key in index]
+    for start in range(0, len(rows_a), block_size):
+        block = rows_a[start:start + block_size]
+        l_a = np.zeros((len(block), len(columns)))
+        for row, (_, node) in enumerate(block):
+            for ancestor, value in _ancestor_contributions(node, sire, dam).items():
+                column = columns.get(ancestor)
+                if column is not None:
+                    l_a[row, column] = value
+        positions_a = np.array([i for i, _ in block])
+        result[np.ix_(positions_a, positions_b)] = l_a @ l_b_scaled
+
+    return result
+
+def calculate_gilts_inbreeding(gilts_df, pedigree):
+    """Return inbreeding coefficient (F) and parents relationship for each gilt"""
+    if gilts_df.empty:
+        return pd.DataFrame(columns=['id_leitoa', 'coef_endogamia', 'geracoes_conhecidas'])
+
+    gilt_keys = gilts_df['id_animal'].astype(object) if 'id_animal' in gilts_df.columns else pd.Series(None, index=gilts_df.index, dtype=object)
+    gilt_keys = gilt_keys.where(gilt_keys.notna(), 'leitoa:' + gilts_df['id_leitoa'].astype(str)).astype(str)
+
+    positions = gilt_keys.map(pedigree['index']).fillna(-1).astype(np.int64).values
+    known = positions >= 0
+    safe = np.maximum(positions, 0)
+
+    return pd.DataFrame({
+        'id_leitoa': gilts_df['id_leitoa'].values,
+        'coef_endogamia': np.where(known, pedigree['inbreeding'][safe], 0.0) if len(pedigree['keys']) else 0.0,
+        'geracoes_conhecidas': np.where(known, pedigree['generation'][safe], 0) if len(pedigree['keys']) else 0
+    })
+
+# Funções para recomendação de acasalamentos
+
+# Endogamia prevista da progênie acima da qual o acasalamento não é recomendado (primos)
+MATING_MAX_OFFSPRING_INBREEDING = 0.0625
+
+# Duração do ciclo estral e janela (dias) em torno do cio previsto para entrar nas recomendações
+MATING_HEAT_CYCLE_DAYS = 21
+MATING_HEAT_WINDOW_DAYS = 3
+
+def select_mating_candidates(sow_ids, breeding_df, gestation_df, reference_date=None,
+                             window_days=MATING_HEAT_WINDOW_DAYS):
+    """
+    Filtra as fêmeas aptas a receber recomendação de sêmen.
+
+    Ficam de fora as gestantes (gestação sem data de parto) e as fêmeas sem cio
+    registrado. Entram as que estão em cio (último cio há até `window_days` dias)
+    ou com o próximo cio previsto (último cio + 21 dias) a até `window_days` dias
+    da data de referência.
+    """
+    reference_date = pd.Timestamp(reference_date or datetime.now().date())
+    sows = pd.Series(pd.unique(pd.Series(sow_ids, dtype=object).dropna()), dtype=object)
+    if sows.empty or breeding_df.empty:
+        return []
+
+    if not gestation_df.empty:
+        pregnant = gestation_df.loc[gestation_df['data_parto'].isna(), 'id_animal']
+        sows = sows[~sows.isin(pregnant)]
+
+    last_heat = pd.to_datetime(breeding_df['data_cio'], errors='coerce').groupby(breeding_df['id_animal']).max()
+    since_heat = (reference_date - last_heat.reindex(sows.to_numpy())).dt.days.to_numpy()
+    to_next_heat = MATING_HEAT_CYCLE_DAYS - since_heat
+    eligible = ((since_heat >= 0) & (since_heat <= window_days)) | (np.abs(to_next_heat) <= window_days)
+    return sows[eligible].tolist()
+
+def calculate_sire_performance(litters_df, insemination_df, shrinkage=5):
+    """
+    Resume o desempenho das leitegadas por sêmen (reprodutor).
+
+    A média de nascidos vivos é encolhida em direção à média do rebanho conforme
+    o número de leitegadas (`shrinkage` leitegadas equivalentes), evitando que um
+    sêmen com uma única leitegada boa fique no topo do ranking.
+    """
+    columns = ['num_semen', 'linhagem_semen', 'n_leitegadas', 'nascidos_vivos_medio', 'indice_desempenho']
+    sires = infer_litter_sires(litters_df, insemination_df)
+    if sires.empty or 'nascidos_vivos' not in litters_df.columns:
+        return pd.DataFrame(columns=columns)
+
+    outcomes = sires.merge(litters_df[['id_leitegada', 'nascidos_vivos']], on='id_leitegada', how='left')
+    outcomes['nascidos_vivos'] = pd.to_numeric(outcomes['nascidos_vivos'], errors='coerce')
+    outcomes = outcomes.dropna(subset=['nascidos_vivos'])
+    if outcomes.empty:
+        return pd.DataFrame(columns=columns)
+
+    herd_mean = outcomes['nascidos_vivos'].mean()
+    herd_std = outcomes['nascidos_vivos'].std(ddof=0) or 1.0
+
+    performance = outcomes.groupby('num_semen').agg(
+        linhagem_semen=('linhagem_semen', 'last'),
+        n_leitegadas=('nascidos_vivos', 'size'),
+        nascidos_vivos_medio=('nascidos_vivos', 'mean')
+    ).reset_index()
+    shrunk = (performance['n_leitegadas'] * performance['nascidos_vivos_medio'] + shrinkage * herd_mean) / \
+             (performance['n_leitegadas'] + shrinkage)
+    performance['indice_desempenho'] = (shrunk - herd_mean) / herd_std
+
+    return performance[columns]
+
+def recommend_matings(pedigree, sow_ids, litters_df, insemination_df, top_k=3,
+                      inbreeding_weight=20.0, max_inbreeding=MATING_MAX_OFFSPRING_INBREEDING,
+                      breeding_df=None, gestation_df=None, reference_date=None):
+    """
+    Ranqueia todos os sêmens candidatos para todas as fêmeas de uma vez.
+
+    Com `breeding_df` e `gestation_df`, só as fêmeas aptas segundo
+    select_mating_candidates (não gestantes, em cio ou com cio próximo) são pontuadas.
+
+    A pontuação combina o índice de desempenho das leitegadas do sêmen com a
+    endogamia prevista da progênie (metade do parentesco fêmea × reprodutor,
+    calculado em blocos). Acasalamentos acima de `max_inbreeding` vão para o fim
+    da lista. Retorna as `top_k` melhores opções por fêmea.
+    """
+    columns = ['id_animal', 'ranking', 'num_semen', 'linhagem_semen', 'endogamia_prevista',
+               'nascidos_vivos_medio', 'n_leitegadas', 'pontuacao', 'recomendado']
+    sow_ids = list(pd.unique(pd.Series(sow_ids, dtype=object).dropna()))
+    if breeding_df is not None and gestation_df is not None:
+        sow_ids = select_mating_candidates(sow_ids, breeding_df, gestation_df, reference_date)
+    if not sow_ids or insemination_df.empty:
+        return pd.DataFrame(columns=columns)
+
+    # Candidatos: todos os sêmens já usados na granja
+    semen_cols = ['num_semen', 'linhagem_semen'] if 'linhagem_semen' in insemination_df.columns else ['num_semen']
+    candidates = insemination_df[semen_cols].dropna(subset=['num_semen']).copy()
+    if 'linhagem_semen' not in candidates.columns:
+        candidates['linhagem_semen'] = None
+    candidates['num_semen'] = candidates['num_semen'].astype(str)
+    candidates = candidates.drop_duplicates('num_semen', keep='last').reset_index(drop=True)
+    candidates = candidates.merge(
+        calculate_sire_performance(litters_df, insemination_df).drop(columns='linhagem_semen'),
+        on='num_semen', how='left'
+    )
+    candidates['n_leitegadas'] = candidates['n_leitegadas'].fillna(0).astype(int)
+    candidates['indice_desempenho'] = candidates['indice_desempenho'].fillna(0.0)
+    if candidates.empty:
+        return pd.DataFrame(columns=columns)
+
+    # Endogamia prevista da progênie: F = a(fêmea, reprodutor) / 2
+    kinship = calculate_relationship_matrix(
+        pedigree, sow_ids, ('semen:' + candidates['num_semen']).tolist()
+    )
+    offspring_inbreeding = kinship / 2
+    score = candidates['indice_desempenho'].to_numpy()[np.newaxis, :] - inbreeding_weight * offspring_inbreeding
+    acceptable = offspring_inbreeding <= max_inbreeding
+    score = np.where(acceptable, score, score - 1e6)
+
+    # Top-k por linha sem ordenar a matriz inteira
+    k = min(top_k, score.shape[1])
+    if k < score.shape[1]:
+        top = np.argpartition(-score, k - 1, axis=1)[:, :k]
+    else:
+        top = np.tile(np.arange(k), (score.shape[0], 1))
+    top_scores = np.take_along_axis(score, top, axis=1)
+    top = np.take_along_axis(top, np.argsort(-top_scores, axis=1), axis=1)
+
+    rows = np.repeat(np.arange(len(sow_ids)), k)
+    cols = top.ravel()
+    chosen = candidates.iloc[cols].reset_index(drop=True)
+    return pd.DataFrame({
+        'id_animal': np.asarray(sow_ids, dtype=object)[rows],
+        'ranking': np.tile(np.arange(1, k + 1), len(sow_ids)),
+        'num_semen': chosen['num_semen'].values,
+        'linhagem_semen': chosen['linhagem_semen'].values,
+        'endogamia_prevista': offspring_inbreeding[rows, cols],
+        'nascidos_vivos_medio': chosen['nascidos_vivos_medio'].values,
+        'n_leitegadas': chosen['n_leitegadas'].values,
+        'pontuacao': np.where(acceptable[rows, cols], score[rows, cols], score[rows, cols] + 1e6),
+        'recomendado': acceptable[rows, cols]
+    })
+
+# Funções para detecção de irmãs de cio (grupos de cio sincronizado)
+
+# Janela padrão (dias) para considerar cios como sincronizados
+HEAT_GROUP_WINDOW_DAYS = 3
+
+_heat_groups_cache = {}
+
+def assign_heat_groups(breeding_df, window_days=HEAT_GROUP_WINDOW_DAYS):
+    """
+    Agrupa os ciclos em grupos de cio sincronizado (irmãs de cio).
+
+    Os ciclos são ordenados por `data_cio` e varridos uma única vez: cada grupo
+    começa no primeiro cio ainda não agrupado e inclui todos os cios até
+    `window_days` dias depois. Retorna uma cópia com `grupo_cio`,
+    `data_grupo_cio` e `tamanho_grupo_cio` (o resultado fica em cache por versão
+    da tabela e janela).
+    """
+    if breeding_df.empty or 'data_cio' not in breeding_df.columns:
+        result = breeding_df.copy()
+        for column in ['grupo_cio', 'data_grupo_cio', 'tamanho_grupo_cio']:
+            result[column] = pd.Series(dtype=object)
+        return result
+
+    source = breeding_df.drop(columns=['grupo_cio', 'data_grupo_cio', 'tamanho_grupo_cio'], errors='ignore')
+    cache_key = (_dataframe_version(source), int(window_days))
+    if cache_key in _heat_groups_cache:
+        return _heat_groups_cache[cache_key].copy()
+
+    result = source.copy()
+    dates = pd.to_datetime(result['data_cio'], errors='coerce')
+    valid = dates.notna().to_numpy()
+    days = dates[valid].to_numpy().astype('datetime64[D]').astype(np.int64)
+
+    group_ids = np.full(len(result), -1, dtype=np.int64)
+    group_start = np.zeros(len(result), dtype=np.int64)
+
+    if len(days):
+        order = np.argsort(days, kind='stable')
+        sorted_days = days[order]
+        sorted_groups = np.empty(len(sorted_days), dtype=np.int64)
+        sorted_starts = np.empty(len(sorted_days), dtype=np.int64)
+
+        # Varredura: cada iteração fecha um grupo inteiro via busca binária
+        position, group = 0, 0
+        while position < len(sorted_days):
+            end = np.searchsorted(sorted_days, sorted_days[position] + window_days, side='right')
+            sorted_groups[position:end] = group
+            sorted_starts[position:end] = sorted_days[position]
+            position, group = end, group + 1
+
+        valid_positions = np.flatnonzero(valid)
+        group_ids[valid_positions[order]] = sorted_groups
+        group_start[valid_positions[order]] = sorted_starts
+
+    has_group = pd.Series(group_ids >= 0, index=result.index)
+    sizes = np.bincount(group_ids[group_ids >= 0], minlength=1)
+    result['grupo_cio'] = pd.Series(group_ids, index=result.index).where(has_group).astype('Int64')
+    result['data_grupo_cio'] = pd.Series(
+        pd.to_datetime(np.maximum(group_start, 0).astype('datetime64[D]')).strftime('%Y-%m-%d'),
+        index=result.index
+    ).where(has_group, None)
+    result['tamanho_grupo_cio'] = pd.Series(sizes[np.maximum(group_ids, 0)], index=result.index).where(has_group).astype('Int64')
+
+    if len(_heat_groups_cache) > 8:
+        _heat_groups_cache.clear()
+    _heat_groups_cache[cache_key] = result
+    return result.copy()
+
+def summarize_heat_groups(grouped_df, min_size=2):
+    """One row per heat group (date, size, animals) with at least `min_size` cycles"""
+    columns = ['grupo_cio', 'data_grupo_cio', 'tamanho_grupo_cio', 'animais', 'intensidades']
+    if grouped_df.empty or 'grupo_cio' not in grouped_df.columns:
+        return pd.DataFrame(columns=columns)
+
+    members = grouped_df[grouped_df['tamanho_grupo_cio'].fillna(0) >= min_size]
+    if members.empty:
+        return pd.DataFrame(columns=columns)
+
+    intensity = members['intensidade_cio'].fillna('').astype(str) if 'intensidade_cio' in members.columns else pd.Series('', index=members.index)
+    summary = members.assign(intensidade_cio=intensity).groupby('grupo_cio').agg(
+        data_grupo_cio=('data_grupo_cio', 'first'),
+        tamanho_grupo_cio=('tamanho_grupo_cio', 'first'),
+        animais=('id_animal', list),
+        intensidades=('intensidade_cio', ', '.join)
+    ).reset_index()
+
+    return summary.sort_values('data_grupo_cio', ascending=False).reset_index(drop=True)
+
+# Funções para o índice de seleção de leitoas
+
+# Pesos de cada componente (em desvios-padrão) no índice de seleção
+GILT_SELECTION_WEIGHTS = {
+    'gpd': 0.30,
+    'condicao_corporal': 0.15,
+    'tetos': 0.20,
+    'idade': 0.10,
+    'desempenho_mae': 0.15,
+    'escore_geral': 0.10
+}
+
+# Critérios eliminatórios
+GILT_MIN_FUNCTIONAL_TEATS = 12
+GILT_ACCEPTABLE_BODY_CONDITION = (2, 4)
+
+# Taxa anual de reposição de matrizes usada na sugestão de cotas
+ANNUAL_REPLACEMENT_RATE = 0.45
+
+_gilt_index_cache = {}
+
+def _standardize(values, higher_is_better=True):
+    """Z-score across the pool; missing values are scored as the pool mean (0)"""
+    values = pd.to_numeric(values, errors='coerce').astype(float)
+    std = values.std(ddof=0)
+    if values.notna().sum() < 2 or not std or np.isnan(std):
+        return pd.Series(0.0, index=values.index)
+    z = (values - values.mean()) / std
+    return (z if higher_is_better else -z).fillna(0.0)
+
+def calculate_gilt_selection_index(gilts_df, selection_df, weight_df, litters_df, animals_df,
+                                   caliber_df=None, weights=None):
+    """
+    Calcula o índice de seleção para todas as leitoas disponíveis de uma vez.
+
+    Componentes (padronizados dentro do grupo): GPD a partir das pesagens, condição
+    corporal pelo P2 (paquímetro ou espessura de toucinho), tetos funcionais, idade
+    na avaliação, desempenho das leitegadas da mãe e escore geral do avaliador.
+    O resultado fica em cache enquanto as tabelas de entrada não mudam.
+
+    Returns:
+        DataFrame: uma linha por leitoa, ordenada pelo índice (maior = melhor)
+    """
+    weights = weights or GILT_SELECTION_WEIGHTS
+    caliber_df = caliber_df if caliber_df is not None else pd.DataFrame()
+    cache_key = tuple(_dataframe_version(df) for df in (gilts_df, selection_df, weight_df, litters_df, animals_df, caliber_df)) + \
+        (tuple(sorted(weights.items())), datetime.now().date())
+    if cache_key in _gilt_index_cache:
+        return _gilt_index_cache[cache_key].copy()
+
+    gilts = get_available_gilts(gilts_df)
+    if gilts.empty:
+        return pd.DataFrame()
+    gilts = gilts.reset_index(drop=True)
+    result = gilts[['id_leitoa', 'identificacao']].copy()
+    animal_ids = gilts['id_animal'] if 'id_animal' in gilts.columns else pd.Series(None, index=gilts.index, dtype=object)
+
+    # Última avaliação de cada leitoa
+    evaluation = pd.DataFrame({'id_leitoa': gilts['id_leitoa']})
+    if not selection_df.empty:
+        latest = selection_df.assign(_data=pd.to_datetime(selection_df['data_selecao'], errors='coerce')) \
+            .sort_values('_data').drop_duplicates('id_leitoa', keep='last')
+        evaluation = evaluation.merge(latest, on='id_leitoa', how='left')
+    for column in ['peso', 'idade', 'espessura_toucinho', 'numero_tetos', 'escore_geral', 'data_selecao']:
+        if column not in evaluation.columns:
+            evaluation[column] = np.nan
+
+    # GPD (g/dia): primeira e última pesagem; sem pesagens, peso de seleção / idade
+    gpd = pd.Series(np.nan, index=gilts.index)
+    if not weight_df.empty:
+        weights_sorted = weight_df[weight_df['id_animal'].isin(animal_ids.dropna())].assign(
+            _data=pd.to_datetime(weight_df['data_registro'], errors='coerce')
+        ).dropna(subset=['_data', 'peso']).sort_values('_data')
+        by_animal = weights_sorted.groupby('id_animal').agg(
+            primeiro_peso=('peso', 'first'), ultimo_peso=('peso', 'last'),
+            primeira_data=('_data', 'first'), ultima_data=('_data', 'last')
+        )
+        dias = (by_animal['ultima_data'] - by_animal['primeira_data']).dt.days
+        by_animal['gpd'] = ((by_animal['ultimo_peso'] - by_animal['primeiro_peso']) * 1000 / dias).where(dias > 0)
+        gpd = animal_ids.map(by_animal['gpd'])
+    peso_selecao = pd.to_numeric(gilts.get('peso_selecao'), errors='coerce') if 'peso_selecao' in gilts.columns else pd.Series(np.nan, index=gilts.index)
+    idade_selecao = pd.to_numeric(gilts.get('idade_selecao'), errors='coerce') if 'idade_selecao' in gilts.columns else pd.Series(np.nan, index=gilts.index)
+    lifetime_gpd = ((peso_selecao.fillna(evaluation['peso']) - 1.4) * 1000 / idade_selecao.fillna(evaluation['idade'])).where(
+        idade_selecao.fillna(evaluation['idade']) > 0
+    )
+    result['gpd'] = pd.to_numeric(gpd, errors='coerce').fillna(lifetime_gpd).values
+
+    # Condição corporal pelo P2: medida do paquímetro mais recente, senão espessura de toucinho
+    p2 = pd.to_numeric(evaluation['espessura_toucinho'], errors='coerce')
+    p2_column = _caliber_p2_column(caliber_df)
+    if not caliber_df.empty and p2_column in caliber_df.columns:
+        latest_p2 = caliber_df.assign(_data=pd.to_datetime(caliber_df['data_medicao'], errors='coerce')) \
+            .sort_values('_data').drop_duplicates('id_animal', keep='last').set_index('id_animal')[p2_column]
+        p2 = pd.to_numeric(animal_ids.map(latest_p2), errors='coerce').fillna(p2)
+    result['p2'] = p2.values
+    result['condicao_corporal'] = calculate_body_condition_scores(p2)
+
+    # Tetos funcionais (numero_tetos já é registrado sem os tetos invertidos)
+    result['tetos_funcionais'] = pd.to_numeric(evaluation['numero_tetos'], errors='coerce').values
+
+    # Idade na avaliação
+    birth = pd.to_datetime(gilts['data_nascimento'], errors='coerce')
+    evaluation_date = pd.to_datetime(evaluation['data_selecao'], errors='coerce').fillna(pd.Timestamp(datetime.now().date()))
+    result['idade_avaliacao'] = (evaluation_date - birth).dt.days.values
+
+    # Desempenho da mãe: média de nascidos vivos das leitegadas dela
+    result['nascidos_vivos_mae'] = np.nan
+    if not litters_df.empty and 'mae' in gilts.columns and 'nascidos_vivos' in litters_df.columns:
+        dam_ids = gilts['mae'].astype('string').str.strip().map(_animal_key_lookup(animals_df))
+        dam_performance = litters_df.assign(
+            nascidos_vivos=pd.to_numeric(litters_df['nascidos_vivos'], errors='coerce')
+        ).groupby('id_animal')['nascidos_vivos'].mean()
+        result['nascidos_vivos_mae'] = pd.to_numeric(dam_ids.map(dam_performance), errors='coerce').values
+
+    result['escore_geral'] = pd.to_numeric(evaluation['escore_geral'], errors='coerce').values
+
+    # Índice: soma ponderada dos componentes padronizados
+    components = {
+        'gpd': _standardize(result['gpd']),
+        'condicao_corporal': _standardize(-(result['condicao_corporal'] - 3).abs()),
+        'tetos': _standardize(result['tetos_funcionais']),
+        'idade': _standardize(result['idade_avaliacao'], higher_is_better=False),
+        'desempenho_mae': _standardize(result['nascidos_vivos_mae']),
+        'escore_geral': _standardize(result['escore_geral'])
+    }
+    result['indice_selecao'] = sum(weights.get(name, 0) * values for name, values in components.items()) * 10 + 100
+
+    # Critérios eliminatórios (somente quando a medida existe)
+    low, high = GILT_ACCEPTABLE_BODY_CONDITION
+    teats_fail = result['tetos_funcionais'] < GILT_MIN_FUNCTIONAL_TEATS
+    condition_fail = (result['condicao_corporal'] < low) | (result['condicao_corporal'] > high)
+    result['apta'] = ~(teats_fail | condition_fail)
+    result['motivo_inaptidao'] = np.select(
+        [teats_fail, condition_fail], ['Poucos tetos funcionais', 'Condição corporal fora do ideal'], default=''
+    )
+
+    result = result.sort_values(['apta', 'indice_selecao'], ascending=[False, False]).reset_index(drop=True)
+    result['ranking'] = np.arange(1, len(result) + 1)
+
+    if len(_gilt_index_cache) > 8:
+        _gilt_index_cache.clear()
+    _gilt_index_cache[cache_key] = result
+    return result.copy()
+
+def suggest_gilt_replacement(ranked_gilts, active_sows, horizon_days=90,
+                             replacement_rate=ANNUAL_REPLACEMENT_RATE):
+    """
+    Sugere a cota de reposição do período e marca as leitoas indicadas.
+
+    A cota é o número de matrizes ativas × taxa anual de reposição proporcional
+    ao horizonte; as leitoas aptas de maior índice preenchem a cota.
+    """
+    quota = int(np.ceil(active_sows * replacement_rate * horizon_days / 365)) if active_sows else 0
+    suggestion = ranked_gilts.copy()
+    if suggestion.empty:
+        return suggestion, quota
+
+    eligible_rank = suggestion['apta'].cumsum().where(suggestion['apta'])
+    suggestion['sugerida_reposicao'] = (eligible_rank <= quota).fillna(False).astype(bool)
+    return suggestion, quota
+
+# Funções para curvas de referência de peso por idade
+
+# Percentis exibidos nas curvas de referência
+GROWTH_REFERENCE_PERCENTILES = [3, 10, 25, 50, 75, 90, 97]
+
+# Idade máxima (dias) coberta pelas tabelas de referência
+GROWTH_REFERENCE_MAX_AGE = 1500
+
+# Suavização (desvio-padrão do núcleo gaussiano, em dias) e pesagens mínimas por idade
+GROWTH_REFERENCE_BANDWIDTH = 7
+GROWTH_REFERENCE_MIN_COUNT = 5
+
+_growth_reference_cache = {'rows': 0, 'version': None, 'by_breed': None, 'reference': None}
+
+def _normal_cdf(z):
+    """Vectorized standard normal CDF (Abramowitz & Stegun 7.1.26)"""
+    z = np.asarray(z, dtype=float)
+    x = np.abs(z) / np.sqrt(2)
+    t = 1 / (1 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1 - poly * np.exp(-x * x)
+    return 0.5 * (1 + np.sign(z) * erf)
+
+def _normal_ppf(p):
+    """Standard normal quantile for the fixed reference percentiles"""
+    # Bisseção vetorizada sobre a CDF (usada só para poucos percentis)
+    p = np.asarray(p, dtype=float)
+    low, high = np.full(p.shape, -8.0), np.full(p.shape, 8.0)
+    for _ in range(60):
+        mid = (low + high) / 2
+        below = _normal_cdf(mid) < p
+        low = np.where(below, mid, low)
+        high = np.where(below, high, mid)
+    return (low + high) / 2
+
+def prepare_weighings(weight_df, animals_df, pesagens_df=None):
+    """
+    Une as pesagens (registro de peso e, opcionalmente, pesagens da recria) com
+    categoria, raça e idade em dias calculada de forma vetorizada.
+    """
+    columns = ['id_animal', 'data_registro', 'peso', 'idade_dias', 'categoria', 'raca']
+    frames = []
+    if not weight_df.empty:
+        frames.append(weight_df[['id_animal', 'data_registro', 'peso']])
+    if pesagens_df is not None and not pesagens_df.empty:
+        individual = pesagens_df[pesagens_df['id_animal'].notna()]
+        frames.append(individual[['id_animal', 'data_pesagem', 'peso']].rename(columns={'data_pesagem': 'data_registro'}))
+    if not frames or animals_df.empty:
+        return pd.DataFrame(columns=columns)
+
+    weighings = pd.concat(frames, ignore_index=True)
+    animal_columns = [c for c in ['id_animal', 'categoria', 'raca', 'data_nascimento'] if c in animals_df.columns]
+    weighings = weighings.merge(animals_df[animal_columns].drop_duplicates('id_animal'), on='id_animal', how='left')
+    if 'raca' not in weighings.columns:
+        weighings['raca'] = None
+
+    weighings['data_registro'] = pd.to_datetime(weighings['data_registro'], errors='coerce')
+    weighings['peso'] = pd.to_numeric(weighings['peso'], errors='coerce')
+    weighings['idade_dias'] = (weighings['data_registro'] - pd.to_datetime(weighings['data_nascimento'], errors='coerce')).dt.days
+    return weighings[columns]
+
+def _growth_group_keys(weighings, by_breed):
+    """Reference group label for each weighing (category, optionally + breed)"""
+    keys = weighings['categoria'].fillna('Sem categoria').astype(str)
+    if by_breed:
+        keys = keys + ' | ' + weighings['raca'].fillna('Sem raça').astype(str)
+    return keys
+
+def _accumulate_growth_statistics(reference, weighings):
+    """Add weighings to the per-group, per-age sufficient statistics (n, Σlog w, Σlog² w)"""
+    valid = weighings[
+        weighings['peso'].notna() & (weighings['peso'] > 0) &
+        weighings['idade_dias'].between(0, GROWTH_REFERENCE_MAX_AGE)
+    ]
+    if valid.empty:
+        return
+
+    keys = _growth_group_keys(valid, reference['by_breed'])
+    for key in pd.unique(keys):
+        if key not in reference['groups']:
+            reference['groups'][key] = len(reference['groups'])
+            empty = np.zeros((1, GROWTH_REFERENCE_MAX_AGE + 1))
+            for name in ('n', 's1', 's2'):
+                reference[name] = np.vstack([reference[name], empty])
+
+    group_index = keys.map(reference['groups']).to_numpy(dtype=np.int64)
+    ages = valid['idade_dias'].to_numpy(dtype=np.int64)
+    log_weight = np.log(valid['peso'].to_numpy(dtype=float))
+    np.add.at(reference['n'], (group_index, ages), 1)
+    np.add.at(reference['s1'], (group_index, ages), log_weight)
+    np.add.at(reference['s2'], (group_index, ages), log_weight ** 2)
+
+def _smooth_growth_reference(reference):
+    """Kernel-smooth the statistics and derive μ/σ (log scale) and percentile tables by day of age"""
+    radius = 4 * GROWTH_REFERENCE_BANDWIDTH
+    kernel = np.exp(-0.5 * (np.arange(-radius, radius + 1) / GROWTH_REFERENCE_BANDWIDTH) ** 2)
+    ages = np.arange(GROWTH_REFERENCE_MAX_AGE + 1)
+
+    n_groups = len(reference['groups'])
+    mu = np.full((n_groups, len(ages)), np.nan)
+    sigma = np.full((n_groups, len(ages)), np.nan)
+    for g in range(n_groups):
+        n = np.convolve(reference['n'][g], kernel, mode='same')
+        s1 = np.convolve(reference['s1'][g], kernel, mode='same')
+        s2 = np.convolve(reference['s2'][g], kernel, mode='same')
+        enough = n >= GROWTH_REFERENCE_MIN_COUNT
+        if not enough.any():
+            continue
+        mean = s1[enough] / n[enough]
+        sd = np.sqrt(np.maximum(s2[enough] / n[enough] - mean ** 2, 1e-4))
+        # Idades sem pesagens suficientes: interpolação entre as idades vizinhas
+        mu[g] = np.interp(ages, ages[enough], mean)
+        sigma[g] = np.interp(ages, ages[enough], sd)
+
+    z_values = _normal_ppf(np.array(GROWTH_REFERENCE_PERCENTILES) / 100)
+    reference['mu'] = mu
+    reference['sigma'] = sigma
+    reference['percentiles'] = np.exp(mu[:, np.newaxis, :] + z_values[np.newaxis, :, np.newaxis] * sigma[:, np.newaxis, :])
+
+def build_growth_reference(weighings, by_breed=False):
+    """
+    Constrói (ou atualiza) as curvas de referência de peso por idade.
+
+    As pesagens entram como estatísticas suficientes por grupo e dia de idade; as
+    curvas suavizadas ficam em tabelas por idade (0 a GROWTH_REFERENCE_MAX_AGE
+    dias). Quando a tabela só recebeu novas linhas no fim desde a última chamada,
+    apenas as novas pesagens são acumuladas.
+
+    Returns:
+        dict: groups (rótulo -> índice), mu, sigma e percentiles (grupo × percentil × idade)
+    """
+    cache = _growth_reference_cache
+    rows = len(weighings)
+    reference = cache['reference']
+    incremental = (
+        reference is not None and cache['by_breed'] == by_breed and rows >= cache['rows'] and
+        _dataframe_version(weighings.iloc[:cache['rows']]) == cache['version']
+    )
+
+    if incremental and rows == cache['rows']:
+        return reference
+
+    if not incremental:
+        reference = {
+            'by_breed': by_breed,
+            'groups': {},
+            'n': np.zeros((0, GROWTH_REFERENCE_MAX_AGE + 1)),
+            's1': np.zeros((0, GROWTH_REFERENCE_MAX_AGE + 1)),
+            's2': np.zeros((0, GROWTH_REFERENCE_MAX_AGE + 1))
+        }
+        _accumulate_growth_statistics(reference, weighings)
+    else:
+        _accumulate_growth_statistics(reference, weighings.iloc[cache['rows']:])
+
+    _smooth_growth_reference(reference)
+    cache.update({'rows': rows, 'version': _dataframe_version(weighings), 'by_breed': by_breed, 'reference': reference})
+    return reference
+
+def growth_reference_curves(reference, groups=None, step_days=1):
+    """Long-format percentile bands (grupo, idade_dias, percentil, peso) for plotting"""
+    frames = []
+    ages = np.arange(0, GROWTH_REFERENCE_MAX_AGE + 1, step_days)
+    for key, g in reference['groups'].items():
+        if groups is not None and key not in groups:
+            continue
+        table = reference['percentiles'][g][:, ages]
+        if np.isnan(table).all():
+            continue
+        frames.append(pd.DataFrame({
+            'grupo': key,
+            'idade_dias': np.tile(ages, len(GROWTH_REFERENCE_PERCENTILES)),
+            'percentil': np.repeat([f"P{p}" for p in GROWTH_REFERENCE_PERCENTILES], len(ages)),
+            'peso': table.ravel()
+        }))
+    if not frames:
+        return pd.DataFrame(columns=['grupo', 'idade_dias', 'percentil', 'peso'])
+    return pd.concat(frames, ignore_index=True).dropna(subset=['peso'])
+
+def calculate_weight_percentiles(reference, weighings):
+    """Vectorized z-score and percentile of each weighing against its reference curve"""
+    result = pd.DataFrame(index=weighings.index, data={'z_score': np.nan, 'percentil': np.nan})
+    if weighings.empty or not reference['groups']:
+        return result
+
+    group_index = _growth_group_keys(weighings, reference['by_breed']).map(reference['groups'])
+    ages = pd.to_numeric(weighings['idade_dias'], errors='coerce')
+    weights = pd.to_numeric(weighings['peso'], errors='coerce')
+    valid = (group_index.notna() & ages.between(0, GROWTH_REFERENCE_MAX_AGE) & (weights > 0)).to_numpy()
+    if not valid.any():
+        return result
+
+    g = group_index[valid].to_numpy(dtype=np.int64)
+    a = ages[valid].to_numpy(dtype=np.int64)
+    z = (np.log(weights[valid].to_numpy(dtype=float)) - reference['mu'][g, a]) / reference['sigma'][g, a]
+    result.loc[valid, 'z_score'] = z
+    result.loc[valid, 'percentil'] = _normal_cdf(z) * 100
+    return result
+
+# Funções para ajuste de curvas de crescimento (Gompertz / logística)
+
+# Valores a priori (peso adulto em kg, parâmetro b, taxa k por dia) e desvios na escala log.
+# O prior torna o ajuste estável mesmo com poucas pesagens, todas no início da curva.
+GROWTH_CURVE_PRIORS = {
+    'gompertz': {'theta': (250.0, 5.2, 0.012), 'sd': (0.3, 0.5, 0.5)},
+    'logistic': {'theta': (250.0, 180.0, 0.02), 'sd': (0.3, 1.0, 0.5)}
+}
+
+# Erro residual esperado (escala log) usado para ponderar o prior
+GROWTH_CURVE_RESIDUAL_SD = 0.05
+
+def _growth_curve_model(theta, ages, model):
+    """Log-weight prediction and Jacobian (n × points × 3) for log-parameters [log A, log b, log k]"""
+    A, b, k = np.exp(theta[:, 0:1]), np.exp(theta[:, 1:2]), np.exp(theta[:, 2:3])
+    u = b * np.exp(-k * ages)
+    jacobian = np.empty(ages.shape + (3,))
+    jacobian[..., 0] = 1.0
+    if model == 'gompertz':
+        log_weight = np.log(A) - u
+        jacobian[..., 1] = -u
+        jacobian[..., 2] = u * k * ages
+    else:
+        log_weight = np.log(A) - np.log1p(u)
+        jacobian[..., 1] = -u / (1 + u)
+        jacobian[..., 2] = u * k * ages / (1 + u)
+    return log_weight, jacobian
+
+def _fit_growth_batch(ages, log_weights, mask, model, max_iter=100, tol=1e-8):
+    """
+    Levenberg–Marquardt solved for every curve at once over padded arrays.
+
+    Returns:
+        tuple: (theta em log, rmse em log, convergiu) por curva
+    """
+    n = ages.shape[0]
+    prior = GROWTH_CURVE_PRIORS[model]
+    theta0 = np.log(np.asarray(prior['theta']))
+    prior_weight = (GROWTH_CURVE_RESIDUAL_SD / np.asarray(prior['sd'])) ** 2
+
+    ages = np.where(mask, ages, 0.0)
+    log_weights = np.where(mask, log_weights, 0.0)
+    theta = np.tile(theta0, (n, 1))
+    damping = np.full(n, 1e-2)
+    converged = np.zeros(n, dtype=bool)
+
+    def objective(params):
+        predicted, jacobian = _growth_curve_model(params, ages, model)
+        residuals = np.where(mask, log_weights - predicted, 0.0)
+        cost = (residuals ** 2).sum(axis=1) + (prior_weight * (params - theta0) ** 2).sum(axis=1)
+        return residuals, jacobian * mask[..., np.newaxis], cost
+
+    residuals, jacobian, cost = objective(theta)
+    for _ in range(max_iter):
+        active = ~converged
+        if not active.any():
+            break
+        JtJ = np.einsum('npi,npj->nij', jacobian, jacobian) + np.diag(prior_weight)
+        Jtr = np.einsum('npi,np->ni', jacobian, residuals) + prior_weight * (theta0 - theta)
+        diagonal = np.einsum('nii->ni', JtJ)
+        system = JtJ + damping[:, np.newaxis, np.newaxis] * np.eye(3) * diagonal[:, np.newaxis, :]
+        step = np.linalg.solve(system, Jtr[..., np.newaxis])[..., 0]
+        step = np.clip(step, -1.0, 1.0)
+
+        candidate = theta + np.where(active[:, np.newaxis], step, 0.0)
+        new_residuals, new_jacobian, new_cost = objective(candidate)
+        improved = active & (new_cost < cost)
+
+        theta = np.where(improved[:, np.newaxis], candidate, theta)
+        residuals = np.where(improved[:, np.newaxis], new_residuals, residuals)
+        jacobian = np.where(improved[:, np.newaxis, np.newaxis], new_jacobian, jacobian)
+        converged |= improved & (cost - new_cost <= tol * (1 + cost))
+        converged |= active & ~improved & (damping > 1e8)
+        cost = np.where(improved, new_cost, cost)
+        damping = np.where(improved, damping / 3, damping * 4)
+
+    points = np.maximum(mask.sum(axis=1), 1)
+    rmse = np.sqrt((residuals ** 2).sum(axis=1) / points)
+    return theta, rmse, converged
+
+def _pad_growth_observations(observations, key_col):
+    """Stack observations into padded (curves × max points) arrays of age and log-weight"""
+    ordered = observations.sort_values([key_col, 'idade_dias'])
+    codes, keys = pd.factorize(ordered[key_col], sort=True)
+    position = ordered.groupby(codes).cumcount().to_numpy()
+    width = int(position.max()) + 1
+
+    ages = np.zeros((len(keys), width))
+    log_weights = np.zeros((len(keys), width))
+    mask = np.zeros((len(keys), width), dtype=bool)
+    ages[codes, position] = ordered['idade_dias'].to_numpy(dtype=float)
+    log_weights[codes, position] = np.log(ordered['peso'].to_numpy(dtype=float))
+    mask[codes, position] = True
+    return keys, ages, log_weights, mask, ordered.groupby(codes).tail(1)
+
+def fit_growth_curves(observations, key_col='id_animal', model='gompertz', min_points=3,
+                      n_jobs=1, batch_size=5000):
+    """
+    Ajusta uma curva de crescimento (Gompertz ou logística) para cada animal ou lote.
+
+    As pesagens de todas as curvas são empilhadas em matrizes com preenchimento e
+    resolvidas juntas. Com n_jobs > 1 os lotes de curvas são distribuídos em um
+    pool de processos; se o pool não puder ser criado, o ajuste segue em série.
+
+    Args:
+        observations: DataFrame com key_col, data_registro, idade_dias e peso
+        key_col: coluna que identifica a curva (id_animal ou id_lote)
+        model: 'gompertz' ou 'logistic'
+        min_points: número mínimo de pesagens por curva
+
+    Returns:
+        DataFrame: key_col, modelo, peso_adulto, parametro_b, taxa_k, pontos, rmse_log,
+                   convergiu, idade_ultima, peso_ultimo, data_ultima
+    """
+    columns = [key_col, 'modelo', 'peso_adulto', 'parametro_b', 'taxa_k', 'pontos', 'rmse_log',
+               'convergiu', 'idade_ultima', 'peso_ultimo', 'data_ultima']
+    if model not in GROWTH_CURVE_PRIORS:
+        raise ValueError(f"Modelo de crescimento desconhecido: {model}")
+
+    valid = observations[
+        observations['peso'].notna() & (observations['peso'] > 0) &
+        observations['idade_dias'].notna() & (observations['idade_dias'] >= 0)
+    ]
+    counts = valid.groupby(key_col)['peso'].transform('size')
+    valid = valid[counts >= min_points]
+    if valid.empty:
+        return pd.DataFrame(columns=columns)
+
+    keys, ages, log_weights, mask, last = _pad_growth_observations(valid, key_col)
+    batches = [slice(start, start + batch_size) for start in range(0, len(keys), batch_size)]
+    results = None
+    if n_jobs > 1 and len(batches) > 1:
+        try:
+            with _process_pool(n_jobs) as executor:
+                futures = [executor.submit(_fit_growth_batch, ages[s], log_weights[s], mask[s], model) for s in batches]
+                results = [future.result() for future in futures]
+        except (OSError, RuntimeError):
+            results = None
+    if results is None:
+        results = [_fit_growth_batch(ages[s], log_weights[s], mask[s], model) for s in batches]
+
+    theta = np.vstack([r[0] for r in results])
+    params = np.exp(theta)
+    return pd.DataFrame({
+        key_col: keys,
+        'modelo': model,
+        'peso_adulto': params[:, 0],
+        'parametro_b': params[:, 1],
+        'taxa_k': params[:, 2],
+        'pontos': mask.sum(axis=1),
+        'rmse_log': np.concatenate([r[1] for r in results]),
+        'convergiu': np.concatenate([r[2] for r in results]),
+        'idade_ultima': last['idade_dias'].to_numpy(),
+        'peso_ultimo': last['peso'].to_numpy(),
+        'data_ultima': pd.to_datetime(last['data_registro']).to_numpy()
+    })
+
+def predict_growth_curve(fits, ages):
+    """Predicted weight (kg) of each fitted curve at the given ages (curves × ages)"""
+    ages = np.asarray(ages, dtype=float)[np.newaxis, :]
+    A = fits['peso_adulto'].to_numpy()[:, np.newaxis]
+    u = fits['parametro_b'].to_numpy()[:, np.newaxis] * np.exp(-fits['taxa_k'].to_numpy()[:, np.newaxis] * ages)
+    gompertz = (fits['modelo'] == 'gompertz').to_numpy()[:, np.newaxis]
+    return np.where(gompertz, A * np.exp(-u), A / (1 + u))
+
+def project_days_to_target(fits, target_weight, reference_date=None):
+    """
+    Projeta, pela curva ajustada, quando cada animal/lote atinge o peso alvo.
+
+    Returns:
+        DataFrame: fits com idade_alvo, dias_para_alvo e data_prevista
+                   (NaN quando o alvo não é atingível pela curva)
+    """
+    reference_date = pd.Timestamp(reference_date or datetime.now().date())
+    result = fits.copy()
+    A = result['peso_adulto'].to_numpy(dtype=float)
+    b = result['parametro_b'].to_numpy(dtype=float)
+    k = result['taxa_k'].to_numpy(dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(
+            (result['modelo'] == 'gompertz').to_numpy(),
+            np.log(A / target_weight) / b,
+            (A / target_weight - 1) / b
+        )
+        target_age = np.where((target_weight < A) & (ratio > 0), -np.log(ratio) / k, np.nan)
+
+    current_age = result['idade_ultima'].to_numpy(dtype=float) + (reference_date - pd.to_datetime(result['data_ultima'])).dt.days.to_numpy()
+    result['idade_alvo'] = target_age
+    result['dias_para_alvo'] = np.maximum(target_age - current_age, 0)
+    result['data_prevista'] = reference_date + pd.to_timedelta(np.round(result['dias_para_alvo']), unit='D')
+    return result
+
+def build_lot_growth_series(lotes_df, pesagens_df):
+    """
+    Série de peso médio por lote e data (pesagens individuais e de lote), com a
+    idade estimada a partir da idade média na formação do lote.
+    """
+    columns = ['id_lote', 'data_registro', 'idade_dias', 'peso']
+    if lotes_df.empty or pesagens_df.empty:
+        return pd.DataFrame(columns=columns)
+
+    series = pesagens_df[pesagens_df['id_lote'].notna()].groupby(['id_lote', 'data_pesagem'])['peso'].mean().reset_index()
+    series = series.merge(lotes_df[['id_lote', 'data_formacao', 'idade_media']], on='id_lote', how='inner')
+    series['data_registro'] = pd.to_datetime(series['data_pesagem'], errors='coerce')
+    series['idade_dias'] = (
+        pd.to_numeric(series['idade_media'], errors='coerce') +
+        (series['data_registro'] - pd.to_datetime(series['data_formacao'], errors='coerce')).dt.days
+    )
+    return series[columns]
+
+# Funções para detecção de valores atípicos (peso e calibre P2)
+
+# Limiar do escore z robusto (mediana/MAD) dentro de cada faixa etária
+OUTLIER_ROBUST_Z_THRESHOLD = 3.5
+OUTLIER_AGE_BAND_DAYS = 30
+OUTLIER_MIN_BAND_SIZE = 5
+
+# Variações diárias máximas plausíveis entre medições consecutivas do mesmo animal
+OUTLIER_MAX_DAILY_GAIN = 1.5     # kg/dia
+OUTLIER_MAX_DAILY_LOSS = 1.0     # kg/dia
+OUTLIER_MAX_P2_DAILY_CHANGE = 0.5  # mm/dia
+
+_outlier_state_cache = {}
+
+def _prepare_measures(df, value_col, date_col, animals_df):
+    """Common frame (id_animal, data, valor, idade_dias, categoria) for the outlier detectors"""
+    measures = df[['id_animal', date_col, value_col]].rename(columns={date_col: 'data', value_col: 'valor'})
+    measures = measures.merge(
+        animals_df[['id_animal', 'categoria', 'data_nascimento']].drop_duplicates('id_animal'),
+        on='id_animal', how='left'
+    )
+    measures.index = df.index
+    measures['data'] = pd.to_datetime(measures['data'], errors='coerce')
+    measures['valor'] = pd.to_numeric(measures['valor'], errors='coerce')
+    measures['idade_dias'] = (measures['data'] - pd.to_datetime(measures['data_nascimento'], errors='coerce')).dt.days
+    measures['categoria'] = measures['categoria'].fillna('Sem categoria')
+    measures['faixa_etaria'] = (measures['idade_dias'] // OUTLIER_AGE_BAND_DAYS).fillna(-1).astype(int)
+    return measures
+
+def _flag_measure_outliers(measures, max_rise, max_drop):
+    """
+    Sinaliza medições atípicas com poucas passagens de groupby.
+
+    Critérios: duplicata exata (animal, data, valor), escore z robusto por
+    categoria e faixa etária e variação diária impossível em relação às
+    medições vizinhas do mesmo animal.
+    """
+    duplicated = measures.duplicated(['id_animal', 'data', 'valor'], keep='first')
+
+    # Escore z robusto por categoria e faixa etária
+    band = measures.groupby(['categoria', 'faixa_etaria'])['valor']
+    median = band.transform('median')
+    deviation = (measures['valor'] - median).abs()
+    mad = deviation.groupby([measures['categoria'], measures['faixa_etaria']]).transform('median')
+    size = band.transform('size')
+    usable = (mad > 0) & (size >= OUTLIER_MIN_BAND_SIZE) & (measures['faixa_etaria'] >= 0)
+    z_score = (0.6745 * (measures['valor'] - median) / mad).where(usable)
+    out_of_band = z_score.abs() > OUTLIER_ROBUST_Z_THRESHOLD
+
+    # Variação diária entre medições consecutivas (sem duplicatas)
+    ordered = measures[~duplicated & measures['data'].notna()].sort_values(['id_animal', 'data'])
+    by_animal = ordered.groupby('id_animal')
+    days = (ordered['data'] - by_animal['data'].shift()).dt.days
+    rate = ((ordered['valor'] - by_animal['valor'].shift()) / days).where(days > 0)
+    next_rate = rate.groupby(ordered['id_animal']).shift(-1)
+    extreme_in = (rate > max_rise) | (rate < -max_drop)
+    extreme_out = (next_rate > max_rise) | (next_rate < -max_drop)
+    # Um erro de digitação gera um salto de ida e outro de volta; sinaliza só o ponto do pico
+    spike = extreme_in & (next_rate.isna() | (extreme_out & (np.sign(next_rate) != np.sign(rate))))
+    # A primeira medição só é culpada se a série segue normal depois do salto; com apenas
+    # duas medições não há como saber, e só a mais recente (o pico acima) é sinalizada
+    after_next_rate = rate.groupby(ordered['id_animal']).shift(-2)
+    after_next_normal = after_next_rate.notna() & (after_next_rate <= max_rise) & (after_next_rate >= -max_drop)
+    first_jump = extreme_out & (by_animal.cumcount() == 0) & after_next_normal
+    impossible_change = (spike | first_jump).reindex(measures.index, fill_value=False)
+
+    reason = pd.Series('', index=measures.index)
+    for mask, label in [(duplicated, 'duplicado'), (out_of_band, 'fora da faixa etária'),
+                        (impossible_change, 'variação diária impossível')]:
+        reason = reason.where(~mask, reason + label + '; ')
+
+    return pd.DataFrame({
+        'z_robusto': z_score,
+        'variacao_diaria': rate.reindex(measures.index),
+        'outlier': duplicated | out_of_band | impossible_change,
+        'motivo_outlier': reason.str.rstrip('; ')
+    }, index=measures.index)
+
+def detect_weight_outliers(weight_df, animals_df):
+    """
+    Varre todo o histórico de pesagens e sinaliza pesos atípicos.
+
+    Returns:
+        DataFrame: (mesmo índice de weight_df) z_robusto, variacao_diaria (kg/dia),
+                   outlier e motivo_outlier
+    """
+    if weight_df.empty:
+        return pd.DataFrame(columns=['z_robusto', 'variacao_diaria', 'outlier', 'motivo_outlier'])
+    measures = _prepare_measures(weight_df, 'peso', 'data_registro', animals_df)
+    return _flag_measure_outliers(measures, OUTLIER_MAX_DAILY_GAIN, OUTLIER_MAX_DAILY_LOSS)
+
+def _caliber_p2_column(caliber_df):
+    """Caliber P2 column name (the page writes 'p2', the empty schema uses 'medida_p2')"""
+    return 'p2' if 'p2' in caliber_df.columns else 'medida_p2'
+
+def detect_caliber_outliers(caliber_df, animals_df):
+    """
+    Varre o histórico de medições de calibre e sinaliza valores de P2 atípicos.
+
+    Returns:
+        DataFrame: (mesmo índice de caliber_df) z_robusto, variacao_diaria (mm/dia),
+                   outlier e motivo_outlier
+    """
+    if caliber_df.empty:
+        return pd.DataFrame(columns=['z_robusto', 'variacao_diaria', 'outlier', 'motivo_outlier'])
+    measures = _prepare_measures(caliber_df, _caliber_p2_column(caliber_df), 'data_medicao', animals_df)
+    return _flag_measure_outliers(measures, OUTLIER_MAX_P2_DAILY_CHANGE, OUTLIER_MAX_P2_DAILY_CHANGE)
+
+def _build_outlier_state(measures, flags, max_rise, max_drop):
+    """Per-animal last valid value and per-band median/MAD for O(1) checks at insert time"""
+    clean = measures[~flags['outlier'] & measures['data'].notna() & measures['valor'].notna()]
+    last = clean.sort_values('data').groupby('id_animal').tail(1)
+    bands = clean.groupby(['categoria', 'faixa_etaria'])['valor'].agg(['median', 'size'])
+    mad = (clean['valor'] - clean.groupby(['categoria', 'faixa_etaria'])['valor'].transform('median')).abs()
+    bands['mad'] = mad.groupby([clean['categoria'], clean['faixa_etaria']]).median()
+    return {
+        'last': dict(zip(last['id_animal'], zip(last['data'], last['valor']))),
+        'bands': {key: (row['median'], row['mad'], row['size']) for key, row in bands.iterrows()},
+        'max_rise': max_rise,
+        'max_drop': max_drop
+    }
+
+def _outlier_key(path, df):
+    """Versão das tabelas de origem pelo carimbo dos arquivos (O(1), sem varrer o histórico)"""
+    return (_file_stamp(path), _file_stamp(ANIMALS_FILE), len(df))
+
+def _outlier_cache_entry(kind, path, df):
+    key = _outlier_key(path, df)
+    cached = _outlier_state_cache.get(kind)
+    if cached is None or cached['key'] != key:
+        cached = {'key': key, 'path': path, 'measures': None, 'flags': None, 'state': None}
+        _outlier_state_cache[kind] = cached
+    return cached
+
+def _get_outlier_flags(kind, path, df, value_col, date_col, animals_df, max_rise, max_drop):
+    """
+    Sinalização de todo o histórico, em cache pelo carimbo do arquivo de origem.
+
+    df deve ser a tabela carregada de path; o número de linhas também entra na chave.
+    """
+    cached = _outlier_cache_entry(kind, path, df)
+    if cached['flags'] is None:
+        cached['measures'] = _prepare_measures(df, value_col, date_col, animals_df)
+        cached['flags'] = _flag_measure_outliers(cached['measures'], max_rise, max_drop)
+    return cached
+
+def _get_outlier_state(kind, path, df, value_col, date_col, animals_df, max_rise, max_drop):
+    """Cached insert-time state (rebuilt only when the source file changed)"""
+    cached = _outlier_cache_entry(kind, path, df)
+    if cached['state'] is None:
+        _get_outlier_flags(kind, path, df, value_col, date_col, animals_df, max_rise, max_drop)
+        cached['state'] = _build_outlier_state(cached['measures'], cached['flags'], max_rise, max_drop)
+    return cached['state']
+
+def get_weight_outlier_flags(weight_df, animals_df):
+    """detect_weight_outliers em cache enquanto o arquivo de pesagens e o de animais não mudam"""
+    if weight_df.empty:
+        return detect_weight_outliers(weight_df, animals_df)
+    return _get_outlier_flags('peso', WEIGHT_FILE, weight_df, 'peso', 'data_registro', animals_df,
+                              OUTLIER_MAX_DAILY_GAIN, OUTLIER_MAX_DAILY_LOSS)['flags']
+
+def get_weight_outlier_state(weight_df, animals_df):
+    """Insert-time outlier state for weighings"""
+    return _get_outlier_state('peso', WEIGHT_FILE, weight_df, 'peso', 'data_registro', animals_df,
+                              OUTLIER_MAX_DAILY_GAIN, OUTLIER_MAX_DAILY_LOSS)
+
+def get_caliber_outlier_state(caliber_df, animals_df):
+    """Insert-time outlier state for caliber P2 measures"""
+    return _get_outlier_state('p2', TABLE_FILES['caliber_scores'], caliber_df, _caliber_p2_column(caliber_df), 'data_medicao',
+                              animals_df, OUTLIER_MAX_P2_DAILY_CHANGE, OUTLIER_MAX_P2_DAILY_CHANGE)
+
+def record_appended_measure(kind, id_animal, data, valor):
+    """
+    Depois de gravar uma medição acrescentada ao fim da tabela ('peso' ou 'p2'), atualiza
+    o estado em O(1) e o associa à nova versão do arquivo, sem varrer o histórico de novo.
+    """
+    cached = _outlier_state_cache.get(kind)
+    if cached is None or cached['state'] is None:
+        return
+    update_outlier_state(cached['state'], id_animal, data, valor)
+    # A sinalização do histórico ficou com a versão anterior; é refeita só quando for pedida
+    cached['key'] = (_file_stamp(cached['path']), _file_stamp(ANIMALS_FILE), cached['key'][2] + 1)
+    cached['measures'] = cached['flags'] = None
+
+def check_new_measure(state, id_animal, categoria, idade_dias, data, valor):
+    """
+    Verifica em O(1) se uma nova medição (peso ou P2) é atípica.
+
+    Returns:
+        tuple: (True se plausível, lista de motivos)
+    """
+    reasons = []
+    data = pd.to_datetime(data)
+
+    previous = state['last'].get(id_animal)
+    if previous is not None:
+        previous_date, previous_value = previous
+        days = (data - previous_date).days
+        if days == 0 and previous_value == valor:
+            reasons.append('duplicado')
+        elif days > 0:
+            rate = (valor - previous_value) / days
+            if rate > state['max_rise'] or rate < -state['max_drop']:
+                reasons.append(f'variação diária impossível ({rate:+.2f}/dia)')
+
+    if idade_dias is not None and idade_dias >= 0:
+        band = state['bands'].get((categoria or 'Sem categoria', int(idade_dias // OUTLIER_AGE_BAND_DAYS)))
+        if band is not None:
+            median, mad, size = band
+            if mad > 0 and size >= OUTLIER_MIN_BAND_SIZE and abs(0.6745 * (valor - median) / mad) > OUTLIER_ROBUST_Z_THRESHOLD:
+                reasons.append(f'fora da faixa etária (mediana {median:.1f})')
+
+    return len(reasons) == 0, reasons
+
+def update_outlier_state(state, id_animal, data, valor):
+    """Record an accepted measure as the animal's last value"""
+    data = pd.to_datetime(data)
+    previous = state['last'].get(id_animal)
+    if previous is None or data >= previous[0]:
+        state['last'][id_animal] = (data, valor)
+
+# Funções para análise de sobrevivência (Kaplan–Meier)
+
+SURVIVAL_COLUMNS = ['fase', 'lote', 'coorte', 'data_entrada', 'idade_entrada', 'idade_saida', 'evento', 'peso', 'causa']
+
+_survival_cache = {}
+
+def _week_label(dates):
+    """ISO year-week label (e.g. '2026-W07') for a datetime Series"""
+    iso = dates.dt.isocalendar()
+    return (iso['year'].astype('Int64').astype(str) + '-W' + iso['week'].astype('Int64').astype(str).str.zfill(2)).where(dates.notna())
+
+def _piglet_survival_data(piglets_df, reference_date):
+    """Piglets at risk from birth (age 0) until death, weaning/transfer or today"""
+    if piglets_df.empty:
+        return pd.DataFrame(columns=SURVIVAL_COLUMNS)
+    birth = pd.to_datetime(piglets_df['data_nascimento'], errors='coerce')
+    status_date = pd.to_datetime(piglets_df['data_status'], errors='coerce')
+    closed = piglets_df['status_atual'].isin(['Morto', 'Desmamado', 'Transferido']) & status_date.notna()
+    exit_date = status_date.where(closed, reference_date)
+    return pd.DataFrame({
+        'fase': 'Maternidade',
+        'lote': piglets_df['id_leitegada'],
+        'coorte': _week_label(birth),
+        'data_entrada': birth,
+        'idade_entrada': 0,
+        'idade_saida': (exit_date - birth).dt.days,
+        'evento': ((piglets_df['status_atual'] == 'Morto') & closed).astype(int),
+        'peso': 1,
+        'causa': piglets_df['causa_morte'].where(piglets_df['status_atual'] == 'Morto')
+    })
+
+def _nursery_survival_data(batches_df, movements_df, reference_date):
+    """
+    Nursery lots as weighted records: each death or transfer movement removes its
+    quantity at that age; the remainder is censored at the lot exit (or today).
+    """
+    if batches_df.empty:
+        return pd.DataFrame(columns=SURVIVAL_COLUMNS)
+    lots = batches_df[['id_lote', 'identificacao', 'quantidade_inicial', 'idade_media_entrada', 'data_entrada', 'data_saida']].copy()
+    lots['data_entrada'] = pd.to_datetime(lots['data_entrada'], errors='coerce')
+    lots['idade_media_entrada'] = pd.to_numeric(lots['idade_media_entrada'], errors='coerce').fillna(0)
+    lots['quantidade_inicial'] = pd.to_numeric(lots['quantidade_inicial'], errors='coerce').fillna(0)
+    lots['coorte'] = _week_label(lots['data_entrada'] - pd.to_timedelta(lots['idade_media_entrada'], unit='D'))
+
+    exits = pd.DataFrame(columns=['id_lote', 'data', 'quantidade', 'evento', 'causa'])
+    if not movements_df.empty:
+        moves = movements_df[movements_df['tipo'].isin(['Mortalidade', 'Transferência'])]
+        exits = pd.DataFrame({
+            'id_lote': moves['id_lote'],
+            'data': pd.to_datetime(moves['data'], errors='coerce'),
+            'quantidade': pd.to_numeric(moves['quantidade'], errors='coerce').fillna(0),
+            'evento': (moves['tipo'] == 'Mortalidade').astype(int),
+            'causa': moves['causa'].where(moves['tipo'] == 'Mortalidade')
+        })
+    exits = exits.merge(lots, on='id_lote', how='inner')
+
+    remaining = lots.set_index('id_lote')['quantidade_inicial'].sub(
+        exits.groupby('id_lote')['quantidade'].sum(), fill_value=0
+    ).clip(lower=0)
+    censored = lots.assign(
+        data=pd.to_datetime(lots['data_saida'], errors='coerce').fillna(reference_date),
+        quantidade=lots['id_lote'].map(remaining).to_numpy(),
+        evento=0,
+        causa=None
+    )
+
+    records = pd.concat([exits, censored], ignore_index=True)
+    records = records[records['quantidade'] > 0]
+    return pd.DataFrame({
+        'fase': 'Creche',
+        'lote': records['identificacao'].fillna(records['id_lote']),
+        'coorte': records['coorte'],
+        'data_entrada': records['data_entrada'],
+        'idade_entrada': records['idade_media_entrada'],
+        'idade_saida': records['idade_media_entrada'] + (records['data'] - records['data_entrada']).dt.days,
+        'evento': records['evento'].astype(int),
+        'peso': records['quantidade'],
+        'causa': records['causa']
+    })
+
+def _recria_survival_data(recria_df, animals_df, mortality_df, reference_date):
+    """Recria animals at risk from entry until exit; deaths come from the mortality records"""
+    if recria_df.empty:
+        return pd.DataFrame(columns=SURVIVAL_COLUMNS)
+    records = recria_df[['id_animal', 'id_lote', 'data_entrada', 'data_saida']].merge(
+        animals_df[['id_animal', 'data_nascimento']].drop_duplicates('id_animal'), on='id_animal', how='left'
+    )
+    if not mortality_df.empty:
+        deaths = mortality_df[['id_animal', 'data_morte', 'causa_morte']].drop_duplicates('id_animal')
+        records = records.merge(deaths, on='id_animal', how='left')
+    else:
+        records['data_morte'] = None
+        records['causa_morte'] = None
+
+    entry = pd.to_datetime(records['data_entrada'], errors='coerce')
+    birth = pd.to_datetime(records['data_nascimento'], errors='coerce').fillna(entry)
+    death = pd.to_datetime(records['data_morte'], errors='coerce')
+    exit_date = pd.to_datetime(records['data_saida'], errors='coerce').fillna(reference_date)
+    died = death.notna() & (death >= entry) & (death <= exit_date)
+    exit_date = exit_date.where(~died, death)
+    return pd.DataFrame({
+        'fase': 'Recria',
+        'lote': records['id_lote'],
+        'coorte': _week_label(birth),
+        'data_entrada': entry,
+        'idade_entrada': (entry - birth).dt.days,
+        'idade_saida': (exit_date - birth).dt.days,
+        'evento': died.astype(int),
+        'peso': 1,
+        'causa': records['causa_morte'].where(died)
+    })
+
+def build_survival_data(piglets_df, nursery_batches_df, nursery_movements_df, recria_df,
+                        animals_df, mortality_df, reference_date=None):
+    """
+    Monta a base de tempo até o evento (idade em dias) para todas as fases.
+
+    Cada linha é um indivíduo (ou grupo ponderado de um lote de creche) em risco
+    de idade_entrada até idade_saida; evento = 1 indica morte em idade_saida.
+
+    Returns:
+        DataFrame: fase, lote, coorte, data_entrada, idade_entrada, idade_saida, evento, peso, causa
+    """
+    reference_date = pd.Timestamp(reference_date or datetime.now().date())
+    key = (reference_date,) + tuple(
+        _dataframe_version(df) for df in
+        (piglets_df, nursery_batches_df, nursery_movements_df, recria_df, animals_df, mortality_df)
+    )
+    if key not in _survival_cache:
+        if len(_survival_cache) > 8:
+            _survival_cache.clear()
+        frames = [
+            _piglet_survival_data(piglets_df, reference_date),
+            _nursery_survival_data(nursery_batches_df, nursery_movements_df, reference_date),
+            _recria_survival_data(recria_df, animals_df, mortality_df, reference_date)
+        ]
+        data = pd.concat([f for f in frames if not f.empty], ignore_index=True) if any(not f.empty for f in frames) \
+            else pd.DataFrame(columns=SURVIVAL_COLUMNS)
+        data['idade_entrada'] = pd.to_numeric(data['idade_entrada'], errors='coerce')
+        data['idade_saida'] = pd.to_numeric(data['idade_saida'], errors='coerce')
+        data = data[data['idade_entrada'].notna() & (data['idade_saida'] >= data['idade_entrada'])]
+        _survival_cache[key] = data.reset_index(drop=True)
+    return _survival_cache[key]
+
+def kaplan_meier(survival_df, group_col=None, cause=None):
+    """
+    Curvas de Kaplan–Meier com entrada tardia para qualquer agrupamento.
+
+    O número em risco em cada idade de evento é obtido por busca binária sobre as
+    idades de entrada e saída ordenadas (com pesos acumulados), de forma vetorizada
+    para todos os grupos ao mesmo tempo. Com cause informada, mortes por outras
+    causas são tratadas como censura (sobrevivência causa-específica).
+
+    Returns:
+        DataFrame: grupo, idade_dias, em_risco, obitos, sobrevivencia, ic_inferior, ic_superior
+    """
+    columns = ['grupo', 'idade_dias', 'em_risco', 'obitos', 'sobrevivencia', 'ic_inferior', 'ic_superior']
+    if survival_df.empty:
+        return pd.DataFrame(columns=columns)
+
+    groups = survival_df[group_col] if group_col else pd.Series('Todos', index=survival_df.index)
+    codes, labels = pd.factorize(groups.fillna('Sem grupo'))
+    entry = survival_df['idade_entrada'].to_numpy(dtype=float) - 0.5  # entrada e morte no mesmo dia contam em risco
+    exit_age = survival_df['idade_saida'].to_numpy(dtype=float)
+    weight = survival_df['peso'].to_numpy(dtype=float)
+    event = survival_df['evento'].to_numpy(dtype=int) == 1
+    if cause is not None:
+        event &= (survival_df['causa'] == cause).to_numpy()
+
+    # Chave composta grupo/idade para buscar todos os grupos num único vetor ordenado;
+    # grupos anteriores já saíram por completo e se anulam na diferença entradas - saídas
+    span = max(exit_age.max(), entry.max()) + 2
+    entry_key = codes * span + entry
+    exit_key = codes * span + exit_age
+    entry_order = np.argsort(entry_key)
+    exit_order = np.argsort(exit_key)
+    entry_sorted, entry_cum = entry_key[entry_order], np.concatenate([[0], np.cumsum(weight[entry_order])])
+    exit_sorted, exit_cum = exit_key[exit_order], np.concatenate([[0], np.cumsum(weight[exit_order])])
+
+    deaths = pd.DataFrame({'g': codes[event], 't': exit_age[event], 'w': weight[event]}).groupby(['g', 't'])['w'].sum().reset_index()
+    if deaths.empty:
+        return pd.DataFrame(columns=columns)
+    death_key = deaths['g'].to_numpy() * span + deaths['t'].to_numpy()
+    at_risk = (
+        entry_cum[np.searchsorted(entry_sorted, death_key, side='left')] -
+        exit_cum[np.searchsorted(exit_sorted, death_key, side='left')]
+    )
+
+    d = deaths['w'].to_numpy()
+    at_risk = np.maximum(at_risk, d)
+    step = 1 - d / at_risk
+    result = pd.DataFrame({'grupo': labels[deaths['g'].to_numpy()], 'idade_dias': deaths['t'], 'em_risco': at_risk, 'obitos': d})
+    result['sobrevivencia'] = pd.Series(step).groupby(deaths['g']).cumprod().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        greenwood = pd.Series(np.where(at_risk > d, d / (at_risk * (at_risk - d)), 0.0)).groupby(deaths['g']).cumsum().to_numpy()
+    se = result['sobrevivencia'].to_numpy() * np.sqrt(greenwood)
+    result['ic_inferior'] = np.clip(result['sobrevivencia'] - 1.96 * se, 0, 1)
+    result['ic_superior'] = np.clip(result['sobrevivencia'] + 1.96 * se, 0, 1)
+
+    # Ponto inicial (sobrevivência 1) em cada grupo para o gráfico em degraus
+    first_entry = pd.Series(survival_df['idade_entrada'].to_numpy(dtype=float)).groupby(codes).min()
+    start = pd.DataFrame({
+        'grupo': labels[first_entry.index.to_numpy()], 'idade_dias': first_entry.to_numpy(),
+        'em_risco': np.nan, 'obitos': 0.0, 'sobrevivencia': 1.0, 'ic_inferior': 1.0, 'ic_superior': 1.0
+    })
+    return pd.concat([start, result], ignore_index=True).sort_values(['grupo', 'idade_dias'], kind='stable').reset_index(drop=True)
+
+def calculate_survival_hazard(survival_df, group_col='fase', band_days=7, cause=None):
+    """
+    Taxa de mortalidade (óbitos por 1000 animais-dia) por faixa de idade.
+
+    Returns:
+        DataFrame: grupo, faixa_inicio, animais_dia, obitos, taxa_1000_dias
+    """
+    columns = ['grupo', 'faixa_inicio', 'animais_dia', 'obitos', 'taxa_1000_dias']
+    if survival_df.empty:
+        return pd.DataFrame(columns=columns)
+
+    groups = survival_df[group_col].fillna('Sem grupo') if group_col else pd.Series('Todos', index=survival_df.index)
+    codes, labels = pd.factorize(groups)
+    entry = survival_df['idade_entrada'].to_numpy(dtype=float)
+    exit_age = survival_df['idade_saida'].to_numpy(dtype=float)
+    weight = survival_df['peso'].to_numpy(dtype=float)
+    event = survival_df['evento'].to_numpy(dtype=int) == 1
+    if cause is not None:
+        event &= (survival_df['causa'] == cause).to_numpy()
+
+    edges = np.arange(0, exit_age.max() + band_days + 1, band_days)
+    n_bands = len(edges) - 1
+    exposure = np.zeros((len(labels), n_bands))
+    # Exposição por faixa (processada em blocos para limitar a memória)
+    for start in range(0, len(entry), 20000):
+        block = slice(start, start + 20000)
+        overlap = np.clip(
+            np.minimum(exit_age[block, np.newaxis], edges[np.newaxis, 1:]) -
+            np.maximum(entry[block, np.newaxis], edges[np.newaxis, :-1]), 0, None
+        ) * weight[block, np.newaxis]
+        np.add.at(exposure, codes[block], overlap)
+
+    deaths = np.zeros((len(labels), n_bands))
+    band = np.minimum((exit_age[event] // band_days).astype(int), n_bands - 1)
+    np.add.at(deaths, (codes[event], band), weight[event])
+
+    result = pd.DataFrame({
+        'grupo': np.repeat(labels, n_bands),
+        'faixa_inicio': np.tile(edges[:-1], len(labels)),
+        'animais_dia': exposure.ravel(),
+        'obitos': deaths.ravel()
+    })
+    result = result[result['animais_dia'] > 0]
+    result['taxa_1000_dias'] = result['obitos'] / result['animais_dia'] * 1000
+    return result.reset_index(drop=True)
+
+# Funções para análise de coortes por semana de nascimento
+
+COHORTS_FILE = "data/coortes.csv"
+COHORTS_SOURCES_FILE = "data/coortes_fontes.json"
+
+# Tabelas de origem do resumo: se alguma mudar depois da última atualização, o resumo é refeito
+COHORT_SOURCE_FILES = [
+    PIGLETS_FILE, LITTERS_FILE, WEANING_FILE, NURSERY_BATCHES_FILE, NURSERY_MOVEMENTS_FILE,
+    ANIMALS_FILE, MORTALITY_FILE, RECRIA_FILE, RECRIA_ALIMENTACAO_FILE, RECRIA_MEDICACAO_FILE,
+    WEIGHT_FILE, RECRIA_PESAGENS_FILE
+]
+
+# Idades (dias) em que o peso de cada coorte é acompanhado e tolerância da pesagem
+COHORT_WEIGHT_AGES = (21, 63, 100, 150)
+COHORT_WEIGHT_TOLERANCE_DAYS = 7
+
+_cohort_partials = {}
+
+def _cohort_maternity_partial(piglets_df):
+    """Born alive, pre-weaning deaths, weaned piglets, birth weight and days in maternity per cohort"""
+    if piglets_df.empty:
+        return pd.DataFrame()
+    birth = pd.to_datetime(piglets_df['data_nascimento'], errors='coerce')
+    status_date = pd.to_datetime(piglets_df['data_status'], errors='coerce')
+    weaned = piglets_df['status_atual'] == 'Desmamado'
+    frame = pd.DataFrame({
+        'coorte': _week_label(birth),
+        'nascidos_vivos': 1,
+        'mortos_maternidade': (piglets_df['status_atual'] == 'Morto').astype(int),
+        'desmamados': weaned.astype(int),
+        'peso_nascimento': pd.to_numeric(piglets_df['peso_nascimento'], errors='coerce'),
+        'dias_maternidade': (status_date - birth).dt.days.where(weaned)
+    })
+    return frame.groupby('coorte').agg(
+        nascidos_vivos=('nascidos_vivos', 'sum'),
+        mortos_maternidade=('mortos_maternidade', 'sum'),
+        desmamados=('desmamados', 'sum'),
+        peso_nascimento=('peso_nascimento', 'mean'),
+        dias_maternidade=('dias_maternidade', 'mean')
+    )
+
+def _cohort_weaning_partial(weaning_df, litters_df):
+    """Weaning weight and age per cohort, weighted by piglets weaned in each litter"""
+    if weaning_df.empty or litters_df.empty:
+        return pd.DataFrame()
+    weaning = weaning_df[['id_leitegada', 'total_desmamados', 'peso_medio_desmame', 'idade_desmame']].merge(
+        litters_df[['id_leitegada', 'data_parto']], on='id_leitegada', how='inner'
+    )
+    weaning['coorte'] = _week_label(pd.to_datetime(weaning['data_parto'], errors='coerce'))
+    n = pd.to_numeric(weaning['total_desmamados'], errors='coerce').fillna(0)
+    weaning['_peso'] = pd.to_numeric(weaning['peso_medio_desmame'], errors='coerce') * n
+    weaning['_idade'] = pd.to_numeric(weaning['idade_desmame'], errors='coerce') * n
+    weaning['_n'] = n
+    totals = weaning.groupby('coorte')[['_peso', '_idade', '_n']].sum()
+    return pd.DataFrame({
+        'peso_desmame': totals['_peso'] / totals['_n'].replace(0, np.nan),
+        'idade_desmame': totals['_idade'] / totals['_n'].replace(0, np.nan)
+    })
+
+def _cohort_nursery_partial(batches_df, movements_df, reference_date):
+    """Nursery entries, deaths and days in nursery per cohort (lot birth week from entry age)"""
+    if batches_df.empty:
+        return pd.DataFrame()
+    lots = batches_df[['id_lote', 'quantidade_inicial', 'idade_media_entrada', 'data_entrada', 'data_saida']].copy()
+    entry = pd.to_datetime(lots['data_entrada'], errors='coerce')
+    entry_age = pd.to_numeric(lots['idade_media_entrada'], errors='coerce').fillna(0)
+    lots['coorte'] = _week_label(entry - pd.to_timedelta(entry_age, unit='D'))
+    lots['entradas_creche'] = pd.to_numeric(lots['quantidade_inicial'], errors='coerce').fillna(0)
+    lots['_dias'] = (pd.to_datetime(lots['data_saida'], errors='coerce').fillna(reference_date) - entry).dt.days * lots['entradas_creche']
+
+    deaths = pd.Series(dtype=float)
+    if not movements_df.empty:
+        moves = movements_df[movements_df['tipo'] == 'Mortalidade']
+        deaths = pd.to_numeric(moves['quantidade'], errors='coerce').groupby(moves['id_lote']).sum()
+    lots['mortes_creche'] = lots['id_lote'].map(deaths).fillna(0)
+
+    totals = lots.groupby('coorte')[['entradas_creche', 'mortes_creche', '_dias']].sum()
+    totals['dias_creche'] = totals.pop('_dias') / totals['entradas_creche'].replace(0, np.nan)
+    return totals
+
+def _cohort_recria_partial(recria_df, animals_df, mortality_df, feed_df, medication_df, reference_date):
+    """Recria entries, deaths, days, feed cost (split across lot animals) and medications per cohort"""
+    if recria_df.empty or animals_df.empty:
+        return pd.DataFrame()
+    recria = recria_df[['id_animal', 'id_lote', 'data_entrada', 'data_saida']].merge(
+        animals_df[['id_animal', 'data_nascimento']].drop_duplicates('id_animal'), on='id_animal', how='left'
+    )
+    recria['coorte'] = _week_label(pd.to_datetime(recria['data_nascimento'], errors='coerce'))
+    entry = pd.to_datetime(recria['data_entrada'], errors='coerce')
+    recria['dias_recria'] = (pd.to_datetime(recria['data_saida'], errors='coerce').fillna(reference_date) - entry).dt.days
+    dead_ids = set(mortality_df['id_animal']) if not mortality_df.empty else set()
+    recria['mortes_recria'] = recria['id_animal'].isin(dead_ids).astype(int)
+    animals_per_lot = recria.groupby('id_lote')['id_animal'].transform('size')
+
+    recria['custo_racao'] = 0.0
+    if not feed_df.empty:
+        lot_cost = pd.to_numeric(feed_df['custo_total'], errors='coerce').groupby(feed_df['id_lote']).sum()
+        recria['custo_racao'] = recria['id_lote'].map(lot_cost).fillna(0) / animals_per_lot
+
+    recria['medicacoes'] = 0.0
+    if not medication_df.empty:
+        individual = medication_df['id_animal'].notna()
+        per_animal = medication_df[individual].groupby('id_animal').size()
+        per_lot = medication_df[~individual].groupby('id_lote').size()
+        recria['medicacoes'] = recria['id_animal'].map(per_animal).fillna(0) + recria['id_lote'].map(per_lot).fillna(0)
+
+    return recria.groupby('coorte').agg(
+        entradas_recria=('id_animal', 'size'),
+        mortes_recria=('mortes_recria', 'sum'),
+        dias_recria=('dias_recria', 'mean'),
+        custo_racao=('custo_racao', 'sum'),
+        medicacoes=('medicacoes', 'sum')
+    )
+
+def _cohort_weight_partial(weight_df, pesagens_df, animals_df):
+    """Mean weight per cohort at each of COHORT_WEIGHT_AGES (closest weighing within tolerance)"""
+    weighings = prepare_weighings(weight_df, animals_df, pesagens_df).dropna(subset=['peso', 'idade_dias'])
+    if weighings.empty:
+        return pd.DataFrame()
+    weighings['coorte'] = _week_label(weighings['data_registro'] - pd.to_timedelta(weighings['idade_dias'], unit='D'))
+    columns = {}
+    for age in COHORT_WEIGHT_AGES:
+        distance = (weighings['idade_dias'] - age).abs()
+        near = weighings[distance <= COHORT_WEIGHT_TOLERANCE_DAYS].assign(_distancia=distance)
+        closest = near.sort_values('_distancia').drop_duplicates('id_animal')
+        columns[f'peso_{age}d'] = closest.groupby('coorte')['peso'].mean()
+    return pd.DataFrame(columns)
+
+def _cached_cohort_partial(name, frames, builder):
+    """Rebuild one source's partial aggregates only when one of its tables changed"""
+    key = tuple(_dataframe_version(df) for df in frames)
+    cached = _cohort_partials.get(name)
+    if cached is None or cached[0] != key:
+        _cohort_partials[name] = (key, builder())
+    return _cohort_partials[name][1]
+
+def update_cohort_summary(reference_date=None):
+    """
+    Atualiza o resumo por coorte (semana de nascimento) e o salva em COHORTS_FILE.
+
+    Os agregados parciais de cada fonte (maternidade, desmame, creche, recria e
+    pesagens) ficam em cache pela versão das tabelas de origem; quando chega um
+    novo evento, apenas a fonte alterada é recalculada e o resumo é recombinado.
+
+    Returns:
+        DataFrame: uma linha por coorte com sobrevivência por fase, pesos em idades
+                   fixas, dias em cada fase, custo de ração e medicações
+    """
+    reference_date = pd.Timestamp(reference_date or datetime.now().date())
+    # Carimbos lidos antes das tabelas: um evento gravado durante o cálculo deixa o resumo desatualizado
+    source_stamps = _cohort_source_stamps()
+    piglets_df, litters_df, weaning_df = load_piglets(), load_litters(), load_weaning()
+    batches_df, movements_df = load_nursery_batches(), load_nursery_movements()
+    animals_df, mortality_df = load_animals(), load_mortality_records()
+    recria_df, feed_df, medication_df = load_recria(), load_recria_alimentacao(), load_recria_medicacao()
+    weight_df, pesagens_df = load_weight_records(), load_recria_pesagens()
+
+    partials = [
+        _cached_cohort_partial('maternidade', [piglets_df], lambda: _cohort_maternity_partial(piglets_df)),
+        _cached_cohort_partial('desmame', [weaning_df, litters_df], lambda: _cohort_weaning_partial(weaning_df, litters_df)),
+        _cached_cohort_partial(('creche', reference_date), [batches_df, movements_df],
+                               lambda: _cohort_nursery_partial(batches_df, movements_df, reference_date)),
+        _cached_cohort_partial(('recria', reference_date), [recria_df, animals_df, mortality_df, feed_df, medication_df],
+                               lambda: _cohort_recria_partial(recria_df, animals_df, mortality_df, feed_df, medication_df, reference_date)),
+        _cached_cohort_partial('pesos', [weight_df, pesagens_df, animals_df],
+                               lambda: _cohort_weight_partial(weight_df, pesagens_df, animals_df))
+    ]
+    partials = [p for p in partials if not p.empty]
+    if not partials:
+        summary = pd.DataFrame(columns=['coorte'])
+    else:
+        summary = pd.concat(partials, axis=1).sort_index()
+        summary.index.name = 'coorte'
+        summary = summary.reset_index()
+
+        def rate(deaths, entries):
+            if deaths not in summary.columns:
+                return pd.Series(np.nan, index=summary.index)
+            return 1 - summary[deaths].fillna(0) / summary[entries].replace(0, np.nan)
+
+        summary['sobrevivencia_maternidade'] = rate('mortos_maternidade', 'nascidos_vivos')
+        summary['sobrevivencia_creche'] = rate('mortes_creche', 'entradas_creche')
+        summary['sobrevivencia_recria'] = rate('mortes_recria', 'entradas_recria')
+        summary['sobrevivencia_acumulada'] = summary[
+            ['sobrevivencia_maternidade', 'sobrevivencia_creche', 'sobrevivencia_recria']
+        ].prod(axis=1, min_count=1)
+        if 'custo_racao' in summary.columns:
+            summary['custo_racao_animal'] = summary['custo_racao'] / summary['entradas_recria'].replace(0, np.nan)
+
+    save_cohort_summary(summary)
+    with open(COHORTS_SOURCES_FILE, 'w') as f:
+        json.dump({'fontes': source_stamps, 'data_referencia': reference_date.strftime('%Y-%m-%d')}, f)
+    return summary
+
+def _cohort_source_stamps():
+    return {path: list(stamp) if stamp else None for path, stamp in ((path, _file_stamp(path)) for path in COHORT_SOURCE_FILES)}
+
+def cohort_summary_is_stale():
+    """True se alguma tabela de origem mudou (ou o dia virou) desde a última atualização do resumo"""
+    if not os.path.exists(COHORTS_FILE):
+        return True
+    try:
+        with open(COHORTS_SOURCES_FILE) as f:
+            sources = json.load(f)
+    except (OSError, ValueError):
+        return True
+    return sources.get('fontes') != _cohort_source_stamps() or \
+        sources.get('data_referencia') != datetime.now().strftime('%Y-%m-%d')
+
+def get_cohort_summary():
+    """Resumo por coorte, atualizado antes da leitura quando as tabelas de origem mudaram"""
+    if cohort_summary_is_stale():
+        return update_cohort_summary()
+    return load_cohort_summary()
+
+def load_cohort_summary():
+    """Load the per-cohort summary written by update_cohort_summary"""
+    if os.path.exists(COHORTS_FILE):
+        return _read_table(COHORTS_FILE)
+    else:
+        return pd.DataFrame({'coorte': []})
+
+def save_cohort_summary(df):
+    """Save the per-cohort summary to CSV"""
+    _write_table(df, COHORTS_FILE)
+
+# Funções para simulação Monte Carlo do fluxo do rebanho
+
+HERD_FLOW_GESTATION_DAYS = 114
+
+# Número mínimo de registros históricos para usar a distribuição empírica
+HERD_FLOW_MIN_HISTORY = 10
+
+# Valores usados quando a granja ainda não tem histórico suficiente
+HERD_FLOW_DEFAULTS = {
+    'tamanho_leitegada': 12.5,
+    'mortalidade_maternidade': 0.10,
+    'dias_lactacao': 24,
+    'intervalo_desmame_cio': 5,
+    'taxa_parto': 0.85,
+    'dias_creche': 42,
+    'mortalidade_creche': 0.03,
+    'dias_recria': 60,
+    'mortalidade_recria': 0.015
+}
+
+# Capacidade padrão (animais por baia) quando o setor não tem baias cadastradas
+HERD_FLOW_DEFAULT_PEN_CAPACITY = {'Maternidade': 1, 'Gestação': 1, 'Creche': 30, 'Crescimento': 20}
+
+# Dias até a primeira cobertura de uma leitoa de reposição
+HERD_FLOW_GILT_ENTRY_DAYS = 21
+
+def _empirical_or_default(values, default, integer=False):
+    """Historical sample when there is enough data, otherwise the farm default"""
+    values = pd.to_numeric(pd.Series(values), errors='coerce').dropna().to_numpy()
+    if len(values) >= HERD_FLOW_MIN_HISTORY:
+        return values
+    if integer:
+        return np.random.default_rng(0).poisson(default, 500)
+    return np.array([float(default)])
+
+def estimate_herd_flow_parameters(litters_df, weaning_df, insemination_df, nursery_batches_df,
+                                  recria_df, mortality_df, pens_df):
+    """
+    Estima, a partir do histórico da granja, as distribuições usadas na simulação.
+
+    Returns:
+        dict: amostras empíricas (tamanho de leitegada por ordem de parto, mortalidade,
+              dias de lactação, intervalo desmame-cio, dias de creche/recria), taxa de
+              parto, taxa de reposição e capacidade média das baias por setor
+    """
+    params = {}
+
+    # Leitegadas e ordem de parto
+    litter_sizes = {1: [], 2: [], 3: []}
+    if not litters_df.empty:
+        litters = litters_df.assign(data_parto=pd.to_datetime(litters_df['data_parto'], errors='coerce')).sort_values('data_parto')
+        parity = litters.groupby('id_animal').cumcount().add(1).clip(upper=3)
+        for bucket in litter_sizes:
+            litter_sizes[bucket] = litters.loc[parity == bucket, 'nascidos_vivos']
+    all_sizes = litters_df['nascidos_vivos'] if not litters_df.empty else []
+    overall = _empirical_or_default(all_sizes, HERD_FLOW_DEFAULTS['tamanho_leitegada'], integer=True)
+    params['tamanho_leitegada'] = {
+        bucket: (_empirical_or_default(sizes, 0) if len(pd.Series(sizes).dropna()) >= HERD_FLOW_MIN_HISTORY else overall).astype(int)
+        for bucket, sizes in litter_sizes.items()
+    }
+
+    # Desmame: mortalidade na maternidade e dias de lactação
+    prewean, lactation, wei = [], [], []
+    if not weaning_df.empty and not litters_df.empty:
+        weaning = weaning_df.merge(litters_df[['id_leitegada', 'nascidos_vivos']], on='id_leitegada', how='inner')
+        born = pd.to_numeric(weaning['nascidos_vivos'], errors='coerce')
+        weaned = pd.to_numeric(weaning['total_desmamados'], errors='coerce')
+        prewean = (1 - weaned / born.where(born > 0)).clip(0, 1)
+        lactation = weaning['idade_desmame']
+
+    # Intervalo desmame-cio: primeira inseminação da matriz após cada desmame
+    if not weaning_df.empty and not insemination_df.empty:
+        weanings = pd.DataFrame({
+            'id_animal': weaning_df['id_animal_mae'],
+            'data_desmame': pd.to_datetime(weaning_df['data_desmame'], errors='coerce')
+        }).dropna().sort_values('data_desmame')
+        services = pd.DataFrame({
+            'id_animal': insemination_df['id_animal'],
+            'data_inseminacao': pd.to_datetime(insemination_df['data_inseminacao'], errors='coerce')
+        }).dropna().sort_values('data_inseminacao')
+        matched = pd.merge_asof(
+            weanings, services, left_on='data_desmame', right_on='data_inseminacao',
+            by='id_animal', direction='forward', tolerance=pd.Timedelta(days=60)
+        )
+        wei = (matched['data_inseminacao'] - matched['data_desmame']).dt.days
+        wei = wei[wei.between(2, 60)]
+
+    params['mortalidade_maternidade'] = _empirical_or_default(prewean, HERD_FLOW_DEFAULTS['mortalidade_maternidade'])
+    params['dias_lactacao'] = _empirical_or_default(lactation, HERD_FLOW_DEFAULTS['dias_lactacao'])
+    params['intervalo_desmame_cio'] = _empirical_or_default(wei, HERD_FLOW_DEFAULTS['intervalo_desmame_cio'])
+
+    # Taxa de parto: coberturas (uma por matriz e semana) seguidas de parto na janela de gestação
+    farrowing_rate = HERD_FLOW_DEFAULTS['taxa_parto']
+    if not insemination_df.empty and not litters_df.empty:
+        services = pd.DataFrame({
+            'id_animal': insemination_df['id_animal'],
+            'data_inseminacao': pd.to_datetime(insemination_df['data_inseminacao'], errors='coerce')
+        }).dropna()
+        services = services[services['data_inseminacao'] <= pd.Timestamp(datetime.now().date()) - pd.Timedelta(days=PEDIGREE_GESTATION_MAX_DAYS)]
+        services = services.assign(semana=services['data_inseminacao'].dt.to_period('W')).drop_duplicates(['id_animal', 'semana'])
+        farrowings = pd.DataFrame({
+            'id_animal': litters_df['id_animal'],
+            'data_parto': pd.to_datetime(litters_df['data_parto'], errors='coerce')
+        }).dropna().sort_values('data_parto')
+        if len(services) >= HERD_FLOW_MIN_HISTORY:
+            matched = pd.merge_asof(
+                services.assign(data_minima=services['data_inseminacao'] + pd.Timedelta(days=PEDIGREE_GESTATION_MIN_DAYS)).sort_values('data_minima'),
+                farrowings, left_on='data_minima', right_on='data_parto', by='id_animal', direction='forward',
+                tolerance=pd.Timedelta(days=PEDIGREE_GESTATION_MAX_DAYS - PEDIGREE_GESTATION_MIN_DAYS)
+            )
+            farrowing_rate = matched['data_parto'].notna().mean()
+    params['taxa_parto'] = float(farrowing_rate)
+
+    # Creche e recria
+    nursery_days, nursery_mortality = [], []
+    if not nursery_batches_df.empty:
+        finished = nursery_batches_df[nursery_batches_df['data_saida'].notna()]
+        nursery_days = (pd.to_datetime(finished['data_saida'], errors='coerce') - pd.to_datetime(finished['data_entrada'], errors='coerce')).dt.days
+        nursery_mortality = pd.to_numeric(finished['mortalidade'], errors='coerce') / 100
+    params['dias_creche'] = _empirical_or_default(nursery_days, HERD_FLOW_DEFAULTS['dias_creche'])
+    params['mortalidade_creche'] = _empirical_or_default(nursery_mortality, HERD_FLOW_DEFAULTS['mortalidade_creche'])
+
+    recria_days, recria_mortality = [], HERD_FLOW_DEFAULTS['mortalidade_recria']
+    if not recria_df.empty:
+        finished = recria_df[recria_df['data_saida'].notna()]
+        recria_days = (pd.to_datetime(finished['data_saida'], errors='coerce') - pd.to_datetime(finished['data_entrada'], errors='coerce')).dt.days
+        if len(recria_df) >= HERD_FLOW_MIN_HISTORY and not mortality_df.empty:
+            recria_mortality = recria_df['id_animal'].isin(mortality_df['id_animal']).mean()
+    params['dias_recria'] = _empirical_or_default(recria_days, HERD_FLOW_DEFAULTS['dias_recria'])
+    params['mortalidade_recria'] = float(recria_mortality)
+
+    params['taxa_reposicao'] = ANNUAL_REPLACEMENT_RATE
+    capacity = dict(HERD_FLOW_DEFAULT_PEN_CAPACITY)
+    if not pens_df.empty:
+        capacity.update(pd.to_numeric(pens_df['capacidade'], errors='coerce').groupby(pens_df['setor']).mean().dropna().to_dict())
+    params['capacidade_baia'] = capacity
+    return params
+
+def build_herd_state(animals_df, litters_df, gestation_df, weaning_df, nursery_batches_df,
+                     recria_df, mortality_df, params, reference_date=None):
+    """
+    Estado atual do rebanho para a simulação.
+
+    Returns:
+        dict: por matriz a ordem de parto, o estágio (0 gestante, 1 lactante, 2 vazia) e
+              os dias até o fim do estágio; lotes de creche e animais em recria como
+              quantidades com dias até a saída
+    """
+    reference_date = pd.Timestamp(reference_date or datetime.now().date())
+    dead = set(mortality_df['id_animal']) if not mortality_df.empty else set()
+    sows = animals_df[(animals_df['categoria'] == 'Matriz') & ~animals_df['id_animal'].isin(dead)][['id_animal']].copy()
+
+    parity = litters_df.groupby('id_animal').size() if not litters_df.empty else pd.Series(dtype=int)
+    sows['paridade'] = sows['id_animal'].map(parity).fillna(0).astype(int)
+    sows['estagio'] = 2
+    sows['dias_evento'] = np.nan
+
+    # Gestações em andamento
+    if not gestation_df.empty:
+        active = gestation_df[gestation_df['data_parto'].isna()].drop_duplicates('id_animal', keep='last')
+        due = (pd.to_datetime(active['data_prevista_parto'], errors='coerce') - reference_date).dt.days
+        due = pd.Series(due.clip(lower=0).to_numpy(), index=active['id_animal'])
+        pregnant = sows['id_animal'].isin(due.index)
+        sows.loc[pregnant, 'estagio'] = 0
+        sows.loc[pregnant, 'dias_evento'] = sows.loc[pregnant, 'id_animal'].map(due)
+
+    # Lactantes: último parto sem desmame posterior e ainda dentro da lactação
+    if not litters_df.empty:
+        last_litter = litters_df.assign(data_parto=pd.to_datetime(litters_df['data_parto'], errors='coerce')) \
+            .sort_values('data_parto').drop_duplicates('id_animal', keep='last')
+        weaned = set(weaning_df['id_leitegada']) if not weaning_df.empty else set()
+        lactation_days = float(np.median(params['dias_lactacao']))
+        days_left = lactation_days - (reference_date - last_litter['data_parto']).dt.days
+        lactating = last_litter[~last_litter['id_leitegada'].isin(weaned) & (days_left > -7)]
+        days_left = pd.Series(days_left[lactating.index].clip(lower=0).to_numpy(), index=lactating['id_animal'])
+        mask = sows['id_animal'].isin(days_left.index) & (sows['estagio'] == 2)
+        sows.loc[mask, 'estagio'] = 1
+        sows.loc[mask, 'dias_evento'] = sows.loc[mask, 'id_animal'].map(days_left)
+
+    creche_counts, creche_days = np.array([]), np.array([])
+    if not nursery_batches_df.empty:
+        active = nursery_batches_df[nursery_batches_df['status'] == 'Ativo']
+        creche_counts = pd.to_numeric(active['quantidade_atual'], errors='coerce').fillna(0).to_numpy()
+        expected_exit = pd.to_datetime(active['data_entrada'], errors='coerce') + pd.Timedelta(days=float(np.median(params['dias_creche'])))
+        creche_days = (expected_exit - reference_date).dt.days.clip(lower=0).fillna(0).to_numpy()
+
+    recria_days = np.array([])
+    if not recria_df.empty:
+        active = recria_df[recria_df['status'] == 'Ativo']
+        expected_exit = pd.to_datetime(active['data_entrada'], errors='coerce') + pd.Timedelta(days=float(np.median(params['dias_recria'])))
+        recria_days = (expected_exit - reference_date).dt.days.clip(lower=0).fillna(0).to_numpy()
+
+    return {
+        'data_referencia': reference_date,
+        'paridade': sows['paridade'].to_numpy(),
+        'estagio': sows['estagio'].to_numpy(),
+        'dias_evento': sows['dias_evento'].to_numpy(dtype=float),
+        'creche_quantidade': creche_counts,
+        'creche_dias_saida': creche_days,
+        'recria_dias_saida': recria_days
+    }
+
+def _simulate_herd_flow_shard(state, params, weeks, replicates, seed):
+    """
+    Simula `replicates` trajetórias do rebanho de uma vez (matrizes × réplicas).
+
+    Returns:
+        dict: indicador -> matriz (réplicas × semanas)
+    """
+    rng = np.random.default_rng(seed)
+    R, S = replicates, len(state['estagio'])
+    stage = np.tile(state['estagio'], (R, 1))
+    parity = np.tile(state['paridade'], (R, 1))
+    event_day = np.tile(state['dias_evento'], (R, 1))
+    # Matrizes vazias entram em cio em um ponto aleatório do ciclo
+    open_start = np.isnan(event_day)
+    event_day[open_start] = rng.integers(0, 21, open_start.sum())
+    litter = np.zeros((R, S), dtype=np.int64)
+    lactating_start = stage == 1
+    litter[lactating_start] = rng.choice(params['tamanho_leitegada'][3], lactating_start.sum())
+
+    pad = weeks + int(max(params['dias_creche'].max(), params['dias_recria'].max()) // 7) + 2
+    creche_exit = np.zeros((R, pad))
+    recria_exit = np.zeros((R, pad))
+    rows = np.arange(R)
+    for count, days in zip(state['creche_quantidade'], state['creche_dias_saida']):
+        survivors = rng.binomial(int(count), 1 - rng.choice(params['mortalidade_creche'], R))
+        creche_exit[:, int(days // 7)] += survivors
+    if len(state['recria_dias_saida']):
+        exit_weeks = np.bincount((state['recria_dias_saida'] // 7).astype(int), minlength=pad)[:pad]
+        recria_exit += rng.binomial(np.tile(exit_weeks, (R, 1)), 1 - params['mortalidade_recria'])
+    creche_population = creche_exit.sum(axis=1)
+    recria_population = recria_exit.sum(axis=1)
+
+    names = ['partos', 'nascidos_vivos', 'desmamados', 'vendas', 'matrizes_gestantes', 'matrizes_lactantes',
+             'matrizes_vazias', 'leitoes_creche', 'animais_recria', 'baias_maternidade', 'baias_gestacao',
+             'baias_creche', 'baias_crescimento']
+    out = {name: np.zeros((R, weeks)) for name in names}
+    cull_probability = params['taxa_reposicao'] * np.median(params['dias_lactacao'] + HERD_FLOW_GESTATION_DAYS + params['intervalo_desmame_cio'].mean()) / 365
+    capacity = params['capacidade_baia']
+
+    for week in range(weeks):
+        day_end = (week + 1) * 7
+
+        # Partos
+        farrow = (stage == 0) & (event_day < day_end)
+        parity[farrow] += 1
+        bucket = np.minimum(parity, 3)
+        for b in (1, 2, 3):
+            mask = farrow & (bucket == b)
+            litter[mask] = rng.choice(params['tamanho_leitegada'][b], mask.sum())
+        stage[farrow] = 1
+        event_day[farrow] += rng.choice(params['dias_lactacao'], farrow.sum())
+        out['partos'][:, week] = farrow.sum(axis=1)
+        out['nascidos_vivos'][:, week] = np.where(farrow, litter, 0).sum(axis=1)
+
+        # Desmames, descarte com reposição por leitoa
+        wean = (stage == 1) & (event_day < day_end)
+        survivors = np.zeros((R, S), dtype=np.int64)
+        survivors[wean] = rng.binomial(litter[wean], 1 - rng.choice(params['mortalidade_maternidade'], wean.sum()))
+        weaned = survivors.sum(axis=1)
+        out['desmamados'][:, week] = weaned
+        stage[wean] = 2
+        event_day[wean] += rng.choice(params['intervalo_desmame_cio'], wean.sum())
+        culled = wean & (rng.random((R, S)) < cull_probability)
+        parity[culled] = 0
+        event_day[culled] += HERD_FLOW_GILT_ENTRY_DAYS
+
+        # Coberturas: prenhez ou retorno ao cio em 21 dias
+        service = (stage == 2) & (event_day < day_end)
+        conceived = service & (rng.random((R, S)) < params['taxa_parto'])
+        stage[conceived] = 0
+        event_day[conceived] += HERD_FLOW_GESTATION_DAYS
+        event_day[service & ~conceived] += 21
+
+        # Creche e recria como fluxos com atraso
+        nursery_survivors = rng.binomial(weaned, 1 - rng.choice(params['mortalidade_creche'], R))
+        exit_week = np.minimum(week + np.round(rng.choice(params['dias_creche'], R) / 7).astype(int), pad - 1)
+        creche_exit[rows, exit_week] += nursery_survivors
+        creche_population += nursery_survivors - creche_exit[:, week]
+
+        recria_survivors = rng.binomial(creche_exit[:, week].astype(np.int64), 1 - params['mortalidade_recria'])
+        exit_week = np.minimum(week + np.round(rng.choice(params['dias_recria'], R) / 7).astype(int), pad - 1)
+        recria_exit[rows, exit_week] += recria_survivors
+        recria_population += recria_survivors - recria_exit[:, week]
+        out['vendas'][:, week] = recria_exit[:, week]
+
+        gestating, lactating, empty = (stage == 0).sum(axis=1), (stage == 1).sum(axis=1), (stage == 2).sum(axis=1)
+        due_soon = ((stage == 0) & (event_day < day_end + 7)).sum(axis=1)
+        out['matrizes_gestantes'][:, week] = gestating
+        out['matrizes_lactantes'][:, week] = lactating
+        out['matrizes_vazias'][:, week] = empty
+        out['leitoes_creche'][:, week] = creche_population
+        out['animais_recria'][:, week] = recria_population
+        out['baias_maternidade'][:, week] = np.ceil((lactating + due_soon) / capacity['Maternidade'])
+        out['baias_gestacao'][:, week] = np.ceil((gestating + empty - due_soon) / capacity['Gestação'])
+        out['baias_creche'][:, week] = np.ceil(np.maximum(creche_population, 0) / capacity['Creche'])
+        out['baias_crescimento'][:, week] = np.ceil(np.maximum(recria_population, 0) / capacity['Crescimento'])
+
+    return out
+
+# Réplicas mínimas por processo para o pool compensar a partida dos processos (spawn, ~1 s)
+# e a cópia do estado (a ~2000 réplicas/s em série, um pool de 4 processos com 2000 réplicas foi mais lento)
+HERD_FLOW_MIN_REPLICATES_PER_JOB = 5000
+
+def simulate_herd_flow(state, params, weeks=26, replicates=1000, n_jobs=None, seed=None):
+    """
+    Projeta semanalmente partos, desmames, vendas e demanda de baias por Monte Carlo.
+
+    As réplicas são vetorizadas com numpy e, com n_jobs > 1, divididas entre
+    processos (cada um com sua própria semente derivada de `seed`). Com n_jobs=None
+    roda em série, a menos que cada processo receba HERD_FLOW_MIN_REPLICATES_PER_JOB réplicas.
+
+    Returns:
+        DataFrame: semana, data_inicio, indicador, media, p10, p50, p90
+    """
+    if n_jobs is None:
+        n_jobs = min(os.cpu_count() or 1, replicates // HERD_FLOW_MIN_REPLICATES_PER_JOB)
+    n_jobs = max(1, min(n_jobs, replicates))
+    shards = np.array_split(np.arange(replicates), n_jobs)
+    seeds = np.random.SeedSequence(seed).spawn(n_jobs)
+    results = None
+    if n_jobs > 1:
+        try:
+            with _process_pool(n_jobs) as executor:
+                futures = [executor.submit(_simulate_herd_flow_shard, state, params, weeks, len(shard), s)
+                           for shard, s in zip(shards, seeds)]
+                results = [future.result() for future in futures]
+        except (OSError, RuntimeError):
+            results = None
+    if results is None:
+        results = [_simulate_herd_flow_shard(state, params, weeks, len(shard), s) for shard, s in zip(shards, seeds)]
+
+    frames = []
+    week_start = state['data_referencia'] + pd.to_timedelta(np.arange(weeks) * 7, unit='D')
+    for name in results[0]:
+        values = np.vstack([r[name] for r in results])
+        p10, p50, p90 = np.percentile(values, [10, 50, 90], axis=0)
+        frames.append(pd.DataFrame({
+            'semana': np.arange(1, weeks + 1),
+            'data_inicio': week_start,
+            'indicador': name,
+            'media': values.mean(axis=0),
+            'p10': p10,
+            'p50': p50,
+            'p90': p90
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+def benchmark_herd_flow(state, params, weeks=26, replicates=2000, n_jobs=None):
+    """
+    Mede o desempenho do simulador em série e com o pool de processos.
+
+    Returns:
+        DataFrame: processos, replicas, segundos, replicas_por_segundo, replicas_por_segundo_por_nucleo
+    """
+    n_jobs = n_jobs or os.cpu_count() or 1
+    rows = []
+    for jobs in sorted({1, n_jobs}):
+        start = datetime.now()
+        simulate_herd_flow(state, params, weeks=weeks, replicates=replicates, n_jobs=jobs, seed=0)
+        seconds = max((datetime.now() - start).total_seconds(), 1e-9)
+        rows.append({
+            'processos': jobs,
+            'replicas': replicates,
+            'segundos': seconds,
+            'replicas_por_segundo': replicates / seconds,
+            'replicas_por_segundo_por_nucleo': replicates / seconds / jobs
+        })
+    return pd.DataFrame(rows)
+
+# Funções para planejamento de capacidade das baias
+
+# Dias antes do parto previsto em que a matriz entra na maternidade
+MATERNITY_ENTRY_DAYS_BEFORE_FARROWING = 5
+
+# Permanência da matriz na baia de maternidade: da entrada pré-parto ao desmame
+MATERNITY_STAY_DAYS = MATERNITY_ENTRY_DAYS_BEFORE_FARROWING + HERD_FLOW_DEFAULTS['dias_lactacao']
+
+PEN_PLANNER_SECTORS = ('Gestação', 'Maternidade', 'Creche')
+
+def _interval_occupancy(codes, starts, ends, counts, n_groups, horizon):
+    """
+    Occupancy per group and day for intervals [start, end) via cumulative sums of
+    entry/exit deltas (days relative to the reference date, clipped to the horizon).
+    """
+    deltas = np.zeros((n_groups, horizon + 1))
+    starts = np.clip(np.asarray(starts, dtype=float), 0, horizon).astype(int)
+    ends = np.clip(np.asarray(ends, dtype=float), 0, horizon).astype(int)
+    valid = ends > starts
+    np.add.at(deltas, (codes[valid], starts[valid]), counts[valid])
+    np.add.at(deltas, (codes[valid], ends[valid]), -counts[valid])
+    return np.cumsum(deltas, axis=1)[:, :horizon]
+
+def forecast_pen_demand(pens_df, animals_df, gestation_df, litters_df, weaning_df, nursery_batches_df,
+                        mortality_df=None, horizon_days=84, reference_date=None):
+    """
+    Projeta a demanda diária (em animais) dos setores Gestação, Maternidade e Creche.
+
+    Cada matriz e lote vira um ou mais intervalos de permanência por setor:
+    - gestantes ficam na Gestação até a entrada na maternidade (parto previsto - 5 dias)
+      e na Maternidade até o desmame previsto; depois voltam para a Gestação
+    - leitegadas ainda não desmamadas ocupam a Maternidade até o desmame previsto
+    - cada desmame previsto gera um lote na Creche pela duração histórica da creche
+    - lotes de creche ativos ficam até a saída prevista
+
+    Returns:
+        DataFrame: data, setor, demanda, capacidade, deficit
+    """
+    reference_date = pd.Timestamp(reference_date or datetime.now().date())
+    lactation_days = float(np.median(_empirical_or_default(
+        weaning_df['idade_desmame'] if not weaning_df.empty else [], HERD_FLOW_DEFAULTS['dias_lactacao'])))
+    finished = nursery_batches_df[nursery_batches_df['data_saida'].notna()] if not nursery_batches_df.empty else nursery_batches_df
+    nursery_days = float(np.median(_empirical_or_default(
+        (pd.to_datetime(finished['data_saida'], errors='coerce') - pd.to_datetime(finished['data_entrada'], errors='coerce')).dt.days
+        if not finished.empty else [], HERD_FLOW_DEFAULTS['dias_creche'])))
+    weaned_per_litter = HERD_FLOW_DEFAULTS['tamanho_leitegada'] * (1 - HERD_FLOW_DEFAULTS['mortalidade_maternidade'])
+    if not weaning_df.empty and pd.to_numeric(weaning_df['total_desmamados'], errors='coerce').notna().sum() >= HERD_FLOW_MIN_HISTORY:
+        weaned_per_litter = pd.to_numeric(weaning_df['total_desmamados'], errors='coerce').mean()
+
+    def days_from(dates):
+        return (pd.to_datetime(dates, errors='coerce') - reference_date).dt.days.to_numpy(dtype=float)
+
+    intervals = []  # (setor, início, fim, quantidade)
+    dead = set(mortality_df['id_animal']) if mortality_df is not None and not mortality_df.empty else set()
+    sows = animals_df.loc[(animals_df['categoria'] == 'Matriz') & ~animals_df['id_animal'].isin(dead), 'id_animal'] \
+        if not animals_df.empty else pd.Series(dtype=object)
+
+    # Gestações em andamento
+    farrowing = pd.Series(dtype=float)
+    if not gestation_df.empty:
+        active = gestation_df[gestation_df['data_parto'].isna() & gestation_df['id_animal'].isin(sows)].drop_duplicates('id_animal', keep='last')
+        farrowing = pd.Series(days_from(active['data_prevista_parto']), index=active['id_animal']).dropna()
+    maternity_in = farrowing.to_numpy() - MATERNITY_ENTRY_DAYS_BEFORE_FARROWING
+    weaning_day = farrowing.to_numpy() + lactation_days
+    intervals += [('Gestação', np.zeros(len(farrowing)), maternity_in, np.ones(len(farrowing))),
+                  ('Maternidade', maternity_in, weaning_day, np.ones(len(farrowing))),
+                  ('Gestação', weaning_day, np.full(len(farrowing), horizon_days), np.ones(len(farrowing))),
+                  ('Creche', weaning_day, weaning_day + nursery_days, np.full(len(farrowing), weaned_per_litter))]
+
+    # Leitegadas na maternidade ainda não desmamadas
+    lactating_ids = set()
+    if not litters_df.empty:
+        weaned = set(weaning_df['id_leitegada']) if not weaning_df.empty else set()
+        litters = litters_df[~litters_df['id_leitegada'].isin(weaned) & litters_df['id_animal'].isin(sows)]
+        wean_day = days_from(litters['data_parto']) + lactation_days
+        litters = litters[wean_day > 0]
+        wean_day = wean_day[wean_day > 0]
+        lactating_ids = set(litters['id_animal'])
+        litter_size = pd.to_numeric(litters['nascidos_vivos'], errors='coerce').fillna(weaned_per_litter).to_numpy() \
+            * (1 - HERD_FLOW_DEFAULTS['mortalidade_maternidade'])
+        intervals += [('Maternidade', np.zeros(len(litters)), wean_day, np.ones(len(litters))),
+                      ('Gestação', wean_day, np.full(len(litters), horizon_days), np.ones(len(litters))),
+                      ('Creche', wean_day, wean_day + nursery_days, litter_size)]
+
+    # Demais matrizes (vazias ou cobertas sem gestação registrada) ficam na Gestação
+    others = sows[~sows.isin(farrowing.index) & ~sows.isin(lactating_ids)]
+    intervals.append(('Gestação', np.zeros(len(others)), np.full(len(others), horizon_days), np.ones(len(others))))
+
+    # Lotes de creche ativos
+    if not nursery_batches_df.empty:
+        active = nursery_batches_df[nursery_batches_df['status'] == 'Ativo']
+        exit_day = days_from(active['data_entrada']) + nursery_days
+        intervals.append(('Creche', np.zeros(len(active)), exit_day,
+                          pd.to_numeric(active['quantidade_atual'], errors='coerce').fillna(0).to_numpy()))
+
+    sectors = list(PEN_PLANNER_SECTORS)
+    codes = np.concatenate([np.full(len(start), sectors.index(sector)) for sector, start, _, _ in intervals])
+    starts = np.concatenate([start for _, start, _, _ in intervals])
+    ends = np.concatenate([end for _, _, end, _ in intervals])
+    counts = np.concatenate([count for _, _, _, count in intervals]).astype(float)
+    valid = ~(np.isnan(starts) | np.isnan(ends))
+    occupancy = _interval_occupancy(codes[valid], starts[valid], ends[valid], counts[valid], len(sectors), horizon_days)
+
+    capacity = pd.to_numeric(pens_df['capacidade'], errors='coerce').groupby(pens_df['setor']).sum() \
+        if not pens_df.empty else pd.Series(dtype=float)
+    demand = pd.DataFrame({
+        'data': np.tile(reference_date + pd.to_timedelta(np.arange(horizon_days), unit='D'), len(sectors)),
+        'setor': np.repeat(sectors, horizon_days),
+        'demanda': np.ceil(occupancy.ravel()),
+        'capacidade': np.repeat([float(capacity.get(s, 0)) for s in sectors], horizon_days)
+    })
+    demand['deficit'] = (demand['demanda'] - demand['capacidade']).clip(lower=0)
+    return demand
+
+def summarize_pen_shortfalls(demand_df, freq='W'):
+    """
+    Agrega a demanda por período (pico) e aponta o primeiro déficit de cada setor.
+
+    Returns:
+        tuple: (DataFrame periodo/setor/demanda/capacidade/deficit, DataFrame de alertas
+                com setor, data_inicio_deficit, semanas_ate_deficit, deficit_maximo)
+    """
+    if demand_df.empty:
+        return demand_df, pd.DataFrame(columns=['setor', 'data_inicio_deficit', 'semanas_ate_deficit', 'deficit_maximo'])
+    periods = demand_df.assign(periodo=demand_df['data'].dt.to_period(freq).dt.start_time) \
+        .groupby(['periodo', 'setor'], as_index=False)[['demanda', 'capacidade', 'deficit']].max()
+
+    short = demand_df[demand_df['deficit'] > 0]
+    alerts = short.groupby('setor').agg(data_inicio_deficit=('data', 'min'), deficit_maximo=('deficit', 'max')).reset_index()
+    alerts['semanas_ate_deficit'] = ((alerts['data_inicio_deficit'] - demand_df['data'].min()).dt.days // 7).astype(int)
+    return periods, alerts[['setor', 'data_inicio_deficit', 'semanas_ate_deficit', 'deficit_maximo']]
+
+# Funções para alocação automática de baias
+
+def optimize_pen_assignment(pens_df, allocations_df, groups_df):
+    """
+    Propõe baias para um conjunto de grupos (animais, leitegadas ou lotes) de uma vez.
+
+    Heurística gulosa de empacotamento (best-fit decrescente) por setor: os grupos
+    maiores são alocados primeiro, cada um na baia com a menor sobra que ainda o
+    comporta, o que mantém o grupo junto e usa o menor número de baias. Grupos
+    que não cabem em nenhuma baia são divididos entre as baias com mais vagas.
+
+    Args:
+        groups_df: DataFrame com id_grupo, quantidade e categoria (ou setor)
+
+    Returns:
+        tuple: (DataFrame id_grupo/id_baia/quantidade com a proposta,
+                DataFrame id_grupo/quantidade_nao_alocada dos grupos sem vaga)
+    """
+    assignment_columns = ['id_grupo', 'id_baia', 'quantidade']
+    if groups_df.empty or pens_df.empty:
+        unassigned = groups_df[['id_grupo', 'quantidade']].rename(columns={'quantidade': 'quantidade_nao_alocada'}) \
+            if not groups_df.empty else pd.DataFrame(columns=['id_grupo', 'quantidade_nao_alocada'])
+        return pd.DataFrame(columns=assignment_columns), unassigned
+
+    pens = calculate_pens_occupancy(pens_df, allocations_df)
+    pens = pens[pens['vagas_disponiveis'] > 0]
+    if 'setor' in groups_df.columns:
+        sectors = groups_df['setor']
+    else:
+        sectors = groups_df['categoria'].map(CATEGORY_SECTOR_MAP)
+
+    assignments, unassigned = [], []
+    groups = groups_df.assign(_setor=sectors.to_numpy()).sort_values('quantidade', ascending=False, kind='stable')
+    for sector, sector_groups in groups.groupby('_setor', sort=False, dropna=False):
+        sector_pens = pens[pens['setor'] == sector] if pd.notna(sector) else pens.iloc[0:0]
+        # Lista ordenada de (vagas, ordem, id_baia) para busca binária da menor sobra
+        free = sorted(zip(sector_pens['vagas_disponiveis'].astype(int), range(len(sector_pens)), sector_pens['id_baia']))
+        for group_id, quantity in zip(sector_groups['id_grupo'], sector_groups['quantidade'].astype(int)):
+            position = bisect.bisect_left(free, (quantity, -1, ''))
+            if position < len(free):
+                places, order, pen_id = free.pop(position)
+                assignments.append((group_id, pen_id, quantity))
+                if places > quantity:
+                    bisect.insort(free, (places - quantity, order, pen_id))
+                continue
+            # Não cabe inteiro: divide entre as baias com mais vagas
+            remaining = quantity
+            while remaining > 0 and free:
+                places, order, pen_id = free.pop()
+                used = min(places, remaining)
+                assignments.append((group_id, pen_id, used))
+                remaining -= used
+                if places > used:
+                    bisect.insort(free, (places - used, order, pen_id))
+            if remaining > 0:
+                unassigned.append((group_id, remaining))
+
+    return (pd.DataFrame(assignments, columns=assignment_columns),
+            pd.DataFrame(unassigned, columns=['id_grupo', 'quantidade_nao_alocada']))
+
+# Funções para previsão de partos
+
+_farrowing_forecast_cache = {}
+
+def calculate_gestation_progress(coverage_dates, reference_date=None):
+    """
+    Dia de gestação, percentual concluído e data prevista de parto para várias coberturas.
+
+    Returns:
+        DataFrame: data_prevista_parto, dia_gestacao, percentual, dias_restantes
+    """
+    reference_date = pd.Timestamp(reference_date or datetime.now().date())
+    coverage = pd.to_datetime(pd.Series(coverage_dates).reset_index(drop=True), errors='coerce').dt.normalize()
+    current_day = (reference_date - coverage).dt.days
+    expected = coverage + pd.Timedelta(days=HERD_FLOW_GESTATION_DAYS)
+    return pd.DataFrame({
+        'data_prevista_parto': expected,
+        'dia_gestacao': current_day,
+        'percentual': (current_day.clip(lower=0, upper=HERD_FLOW_GESTATION_DAYS) / HERD_FLOW_GESTATION_DAYS * 100).round(1),
+        'dias_restantes': (expected - reference_date).dt.days.clip(lower=0)
+    })
+
+def forecast_farrowings(gestation_df, reference_date=None):
+    """
+    Previsão de partos de todas as gestações ativas em uma única passada vetorizada.
+
+    A data prevista registrada é usada quando existe; caso contrário, cobertura + 114 dias.
+    O resultado fica em cache por versão da tabela de gestação e data de referência.
+
+    Returns:
+        DataFrame: id_gestacao, id_animal, data_cobertura, data_prevista_parto, dia_gestacao,
+        percentual, dias_restantes, semana_suina, dia_suino (calendário de 1000 dias), lote_parto,
+        data_entrada_maternidade
+    """
+    reference_date = pd.Timestamp(reference_date or datetime.now().date())
+    key = (reference_date, _dataframe_version(gestation_df))
+    if key in _farrowing_forecast_cache:
+        return _farrowing_forecast_cache[key]
+
+    active = gestation_df[gestation_df['data_parto'].isna()] if not gestation_df.empty else gestation_df
+    progress = calculate_gestation_progress(active['data_cobertura'], reference_date)
+    recorded = pd.to_datetime(active['data_prevista_parto'], errors='coerce').dt.normalize().reset_index(drop=True)
+    expected = recorded.fillna(progress['data_prevista_parto'])
+
+    forecast = pd.DataFrame({
+        'id_gestacao': active['id_gestacao'].to_numpy(),
+        'id_animal': active['id_animal'].to_numpy(),
+        'data_cobertura': pd.to_datetime(active['data_cobertura'], errors='coerce').to_numpy(),
+        'data_prevista_parto': expected,
+        'dia_gestacao': progress['dia_gestacao'],
+        'percentual': progress['percentual'],
+        'dias_restantes': (expected - reference_date).dt.days.clip(lower=0),
+        'semana_suina': expected.dt.isocalendar()['week'].astype('Int64'),
+        'dia_suino': dates_to_pig_calendar(expected),
+        'lote_parto': _week_label(expected),
+        'data_entrada_maternidade': expected - pd.Timedelta(days=MATERNITY_ENTRY_DAYS_BEFORE_FARROWING)
+    })
+    forecast = forecast.sort_values(['data_prevista_parto', 'id_animal'], kind='stable').reset_index(drop=True)
+
+    if len(_farrowing_forecast_cache) > 8:
+        _farrowing_forecast_cache.clear()
+    _farrowing_forecast_cache[key] = forecast
+    return forecast
+
+def build_farrowing_board(forecast_df, pens_df, allocations_df, stay_days=MATERNITY_STAY_DAYS):
+    """
+    Quadro semanal de partos com sugestão de baias de maternidade.
+
+    Os lotes semanais são atendidos em ordem cronológica pelo otimizador de baias,
+    mantendo cada lote no menor número de baias livres da Maternidade. Antes de
+    cada semana são liberadas as vagas das matrizes que já desmamaram (entrada +
+    `stay_days`), tanto das ocupações atuais quanto das sugeridas nas semanas anteriores.
+
+    Returns:
+        tuple: (DataFrame por semana: lote_parto, inicio_semana, partos_previstos, matrizes_com_baia,
+                matrizes_sem_baia, baias_sugeridas;
+                forecast_df com a coluna id_baia_sugerida por matriz)
+    """
+    board_columns = ['lote_parto', 'inicio_semana', 'partos_previstos', 'matrizes_com_baia', 'matrizes_sem_baia', 'baias_sugeridas']
+    forecast = forecast_df.assign(id_baia_sugerida=None)
+    forecast = forecast[forecast['lote_parto'].notna()]
+    if forecast.empty:
+        return pd.DataFrame(columns=board_columns), forecast
+    forecast = forecast.sort_values('data_prevista_parto', kind='stable').reset_index(drop=True)
+
+    weekly = forecast.groupby('lote_parto', sort=True).agg(
+        inicio_semana=('data_prevista_parto', 'min'),
+        partos_previstos=('id_animal', 'size')
+    ).reset_index()
+    weekly['inicio_semana'] = weekly['inicio_semana'] - pd.to_timedelta(weekly['inicio_semana'].dt.weekday, unit='D')
+
+    pens = pens_df[pens_df['setor'] == 'Maternidade'] if not pens_df.empty else pens_df
+    assignments = pd.DataFrame(columns=['id_grupo', 'id_baia', 'quantidade'])
+    if not pens.empty:
+        if 'data_entrada_maternidade' in forecast.columns:
+            entry = pd.to_datetime(forecast['data_entrada_maternidade'])
+        else:
+            entry = forecast['data_prevista_parto'] - pd.Timedelta(days=MATERNITY_ENTRY_DAYS_BEFORE_FARROWING)
+        stay = pd.Timedelta(days=stay_days)
+
+        # Ocupações atuais saem no desmame previsto (sem data de entrada, a vaga segue ocupada)
+        current = allocations_df[allocations_df['data_saida'].isna() & allocations_df['id_baia'].isin(pens['id_baia'])] \
+            if not allocations_df.empty else pd.DataFrame(columns=['id_baia', 'data_entrada'])
+        occupied = pd.DataFrame({
+            'id_baia': current['id_baia'].to_numpy(),
+            'liberacao': (pd.to_datetime(current['data_entrada'], errors='coerce') + stay).to_numpy()
+        })
+
+        week_assignments = []
+        for week, rows in forecast.groupby('lote_parto', sort=False).groups.items():
+            occupied = occupied[~(occupied['liberacao'] <= entry[rows].min())]
+            group = pd.DataFrame({'id_grupo': [week], 'quantidade': [len(rows)], 'setor': 'Maternidade'})
+            proposal, _ = optimize_pen_assignment(pens, occupied.assign(data_saida=None), group)
+            # As matrizes do lote ocupam as vagas propostas na ordem de parto
+            slots = proposal['id_baia'].repeat(proposal['quantidade'].astype(int)).to_numpy()
+            placed = rows[:len(slots)]
+            forecast.loc[placed, 'id_baia_sugerida'] = slots
+            occupied = pd.concat([occupied, pd.DataFrame({'id_baia': slots, 'liberacao': (entry[placed] + stay).to_numpy()})],
+                                 ignore_index=True)
+            week_assignments.append(proposal)
+        assignments = pd.concat(week_assignments, ignore_index=True)
+
+    if not assignments.empty:
+        pen_names = pens_df.set_index('id_baia')['identificacao'] if 'identificacao' in pens_df.columns else None
+        named = assignments.assign(nome=assignments['id_baia'].map(pen_names) if pen_names is not None else assignments['id_baia'])
+        pens_per_week = named.groupby('id_grupo')['nome'].agg(lambda names: ', '.join(map(str, names)))
+    else:
+        pens_per_week = pd.Series(dtype=object)
+
+    with_pen = forecast['id_baia_sugerida'].notna().groupby(forecast['lote_parto']).sum()
+    weekly['matrizes_com_baia'] = weekly['lote_parto'].map(with_pen).fillna(0).astype(int)
+    weekly['matrizes_sem_baia'] = weekly['partos_previstos'] - weekly['matrizes_com_baia']
+    weekly['baias_sugeridas'] = weekly['lote_parto'].map(pens_per_week).fillna('')
+    return weekly[board_columns], forecast
+
+# Funções para formação de lotes de creche (todos dentro, todos fora)
+
+WEANING_BATCH_TARGET_SIZE = 30
+WEANING_BATCH_MAX_AGE_SPREAD = 7
+NURSERY_STAY_DAYS = 42
+
+def _write_csv_transaction(frames):
+    """
+    Grava vários CSVs como uma única operação: tudo ou nada.
+
+    Cada tabela é escrita em um arquivo temporário ao lado do destino; só depois
+    que todas foram escritas os temporários substituem os originais (os.replace).
+    O destino nunca deixa de existir: as cópias de segurança são feitas com
+    shutil.copy2 e só são usadas se uma substituição posterior falhar.
+    """
+    temp_paths, backups, replaced = {}, {}, []
+    try:
+        for path, df in frames.items():
+            temp_paths[path] = f"{path}.{uuid.uuid4().hex}.tmp"
+            df.to_csv(temp_paths[path], index=False)
+        for path in frames:
+            if os.path.exists(path):
+                backups[path] = f"{path}.{uuid.uuid4().hex}.bak"
+                shutil.copy2(path, backups[path])
+        for path in frames:
+            os.replace(temp_paths[path], path)
+            del temp_paths[path]
+            replaced.append(path)
+    except OSError:
+        # Desfaz apenas as tabelas já substituídas
+        for path in replaced:
+            if path in backups:
+                os.replace(backups.pop(path), path)
+            else:
+                os.remove(path)
+        raise
+    finally:
+        for temp_path in temp_paths.values():
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        for backup in backups.values():
+            if os.path.exists(backup):
+                os.remove(backup)
+    for path in frames:
+        _table_cache.pop(path, None)
+        invalidate_result_cache(path)
+
+def get_pending_weanings(weaning_df, nursery_batches_df, start_date=None, end_date=None):
+    """Desmames com destino Creche ainda sem lote, opcionalmente dentro de uma janela de datas"""
+    if weaning_df.empty:
+        return weaning_df
+    assigned = set()
+    if not nursery_batches_df.empty and 'id_desmame' in nursery_batches_df.columns:
+        # Lotes formados automaticamente guardam vários desmames separados por ';'
+        assigned = set(nursery_batches_df['id_desmame'].dropna().astype(str).str.split(';').explode())
+    pending = weaning_df[(weaning_df['destino_leitoes'] == 'Creche') & ~weaning_df['id_desmame'].astype(str).isin(assigned)]
+    weaning_dates = pd.to_datetime(pending['data_desmame'], errors='coerce')
+    if start_date is not None:
+        pending = pending[weaning_dates >= pd.Timestamp(start_date)]
+        weaning_dates = weaning_dates[pending.index]
+    if end_date is not None:
+        pending = pending[weaning_dates <= pd.Timestamp(end_date)]
+    return pending
+
+def form_weaning_batches(pending_weanings, target_size=WEANING_BATCH_TARGET_SIZE, max_age_spread=WEANING_BATCH_MAX_AGE_SPREAD):
+    """
+    Agrupa os leitões desmamados em lotes de creche de tamanho alvo.
+
+    Os desmames são separados em faixas de idade de até max_age_spread dias e,
+    dentro de cada faixa, ordenados por peso médio; a sequência de leitões é então
+    particionada em lotes de tamanho equilibrado, o que minimiza a amplitude de
+    peso de cada lote. Uma leitegada só é dividida na fronteira entre dois lotes.
+
+    Returns:
+        tuple: (DataFrame de lotes: lote, quantidade, peso_medio, peso_min, peso_max,
+                idade_media, idade_min, idade_max, data_entrada;
+                DataFrame de composição: lote, id_desmame, quantidade)
+    """
+    lot_columns = ['lote', 'quantidade', 'peso_medio', 'peso_min', 'peso_max', 'idade_media', 'idade_min', 'idade_max', 'data_entrada']
+    composition_columns = ['lote', 'id_desmame', 'quantidade']
+    counts = pd.to_numeric(pending_weanings['total_desmamados'], errors='coerce').fillna(0).astype(int).to_numpy() \
+        if not pending_weanings.empty else np.zeros(0, dtype=int)
+    if counts.sum() == 0:
+        return pd.DataFrame(columns=lot_columns), pd.DataFrame(columns=composition_columns)
+
+    valid = counts > 0
+    weanings = pending_weanings[valid]
+    counts = counts[valid]
+    weights = pd.to_numeric(weanings['peso_medio_desmame'], errors='coerce').to_numpy(dtype=float)
+    weights = np.where(np.isnan(weights), np.nanmean(weights) if np.isfinite(weights).any() else 0.0, weights)
+    ages = pd.to_numeric(weanings['idade_desmame'], errors='coerce').to_numpy(dtype=float)
+    ages = np.where(np.isnan(ages), np.nanmedian(ages) if np.isfinite(ages).any() else 0.0, ages)
+    dates = pd.to_datetime(weanings['data_desmame'], errors='coerce').to_numpy()
+
+    # Faixas de idade e ordenação por peso dentro de cada faixa
+    band = np.floor((ages - ages.min()) / max(max_age_spread, 1)).astype(int)
+    order = np.lexsort((weights, band))
+    counts, weights, ages, band, dates = counts[order], weights[order], ages[order], band[order], dates[order]
+    weaning_ids = weanings['id_desmame'].to_numpy()[order]
+
+    # Expande para um registro por leitão e particiona cada faixa em lotes equilibrados
+    piglet_litter = np.repeat(np.arange(len(counts)), counts)
+    piglet_band = band[piglet_litter]
+    band_start = np.searchsorted(piglet_band, piglet_band, side='left')
+    band_size = np.searchsorted(piglet_band, piglet_band, side='right') - band_start
+    position = np.arange(len(piglet_litter)) - band_start
+    lots_in_band = np.maximum(np.rint(band_size / max(target_size, 1)), 1).astype(int)
+    lot_in_band = position * lots_in_band // band_size
+    unique_bands, band_first = np.unique(piglet_band, return_index=True)
+    band_lot_offset = np.concatenate([[0], np.cumsum(lots_in_band[band_first])[:-1]])
+    piglet_lot = band_lot_offset[np.searchsorted(unique_bands, piglet_band)] + lot_in_band + 1
+
+    piglets = pd.DataFrame({
+        'lote': piglet_lot,
+        'id_desmame': weaning_ids[piglet_litter],
+        'peso': weights[piglet_litter],
+        'idade': ages[piglet_litter],
+        'data': dates[piglet_litter]
+    })
+    lots = piglets.groupby('lote').agg(
+        quantidade=('peso', 'size'),
+        peso_medio=('peso', 'mean'),
+        peso_min=('peso', 'min'),
+        peso_max=('peso', 'max'),
+        idade_media=('idade', 'mean'),
+        idade_min=('idade', 'min'),
+        idade_max=('idade', 'max'),
+        data_entrada=('data', 'max')
+    ).reset_index()
+    lots[['peso_medio', 'idade_media']] = lots[['peso_medio', 'idade_media']].round(2)
+    composition = piglets.groupby(['lote', 'id_desmame'], sort=False).size().reset_index(name='quantidade')
+    return lots[lot_columns], composition[composition_columns]
+
+def create_weaning_batches(lots_df, composition_df, pen_assignments_df, identification_prefix=None, responsavel='Sistema'):
+    """
+    Cria em uma única gravação os períodos de creche, lotes, movimentações de entrada,
+    alocações de baia e a baia de destino dos desmames de uma formação de lotes.
+
+    Args:
+        lots_df, composition_df: Resultado de form_weaning_batches
+        pen_assignments_df: Resultado de optimize_pen_assignment com id_grupo = lote
+
+    Returns:
+        tuple: (success, message)
+    """
+    if lots_df.empty:
+        return False, "Nenhum lote para criar"
+    unplaced = set(lots_df['lote']) - set(pen_assignments_df['id_grupo'])
+    if unplaced:
+        return False, f"{len(unplaced)} lote(s) sem baia de creche disponível"
+
+    prefix = identification_prefix or f"Lote-{datetime.now().strftime('%Y%m%d')}"
+    entry_dates = pd.to_datetime(lots_df['data_entrada'])
+    lot_ids = [str(uuid.uuid4()) for _ in range(len(lots_df))]
+    nursery_ids = [str(uuid.uuid4()) for _ in range(len(lots_df))]
+    lot_id_map = dict(zip(lots_df['lote'], lot_ids))
+    main_pen = pen_assignments_df.sort_values('quantidade', ascending=False).drop_duplicates('id_grupo').set_index('id_grupo')['id_baia']
+    weanings_per_lot = composition_df.groupby('lote')['id_desmame'].agg(lambda ids: ';'.join(map(str, pd.unique(ids))))
+    entry_text = entry_dates.dt.strftime('%Y-%m-%d').to_numpy()
+
+    new_nursery = pd.DataFrame({
+        'id_creche': nursery_ids,
+        'id_baia': lots_df['lote'].map(main_pen).to_numpy(),
+        'data_inicio': entry_text,
+        'data_fim_prevista': (entry_dates + pd.Timedelta(days=NURSERY_STAY_DAYS)).dt.strftime('%Y-%m-%d').to_numpy(),
+        'data_fim_real': None,
+        'status': 'Ativo',
+        'observacao': 'Formação automática de lotes'
+    })
+    new_batches = pd.DataFrame({
+        'id_lote': lot_ids,
+        'id_creche': nursery_ids,
+        'id_desmame': lots_df['lote'].map(weanings_per_lot).to_numpy(),
+        'identificacao': [f"{prefix}-{int(lote):02d}" for lote in lots_df['lote']],
+        'quantidade_inicial': lots_df['quantidade'].to_numpy(),
+        'quantidade_atual': lots_df['quantidade'].to_numpy(),
+        'peso_medio_entrada': lots_df['peso_medio'].to_numpy(),
+        'idade_media_entrada': lots_df['idade_media'].to_numpy(),
+        'peso_medio_atual': lots_df['peso_medio'].to_numpy(),
+        'mortalidade': 0.0,
+        'origem': 'Desmame',
+        'data_entrada': entry_text,
+        'data_saida': None,
+        'destino': None,
+        'status': 'Ativo',
+        'observacao': (
+            'Peso ' + lots_df['peso_min'].round(1).astype(str) + '–' + lots_df['peso_max'].round(1).astype(str)
+            + ' kg, idade ' + lots_df['idade_min'].round(0).astype(int).astype(str) + '–'
+            + lots_df['idade_max'].round(0).astype(int).astype(str) + ' dias'
+        ).to_numpy()
+    })
+    new_movements = pd.DataFrame({
+        'id_movimentacao': [str(uuid.uuid4()) for _ in range(len(lots_df))],
+        'id_lote': lot_ids,
+        'tipo': 'Entrada',
+        'data': entry_text,
+        'quantidade': lots_df['quantidade'].to_numpy(),
+        'peso_total': (lots_df['quantidade'] * lots_df['peso_medio']).round(2).to_numpy(),
+        'peso_medio': lots_df['peso_medio'].to_numpy(),
+        'ganho_diario': 0,
+        'causa': None,
+        'destino': None,
+        'medicamento': None,
+        'dosagem': None,
+        'via_aplicacao': None,
+        'responsavel': responsavel,
+        'observacao': ('Entrada na creche via desmames: ' + lots_df['lote'].map(weanings_per_lot)).to_numpy()
+    })
+    lot_entry = dict(zip(lots_df['lote'], entry_text))
+    new_allocations = pd.DataFrame({
+        'id_alocacao': [str(uuid.uuid4()) for _ in range(len(pen_assignments_df))],
+        'id_baia': pen_assignments_df['id_baia'].to_numpy(),
+        'id_animal': None,  # Não é um animal específico, é um lote
+        'data_entrada': pen_assignments_df['id_grupo'].map(lot_entry).to_numpy(),
+        'data_saida': None,
+        'motivo_saida': None,
+        'status': 'Ativo',
+        'observacao': (
+            'Lote de ' + pen_assignments_df['quantidade'].astype(int).astype(str) + ' leitões - Desmame - Lote ID: '
+            + pen_assignments_df['id_grupo'].map(lot_id_map)
+        ).to_numpy()
+    })
+
+    # Baia de destino de cada desmame: a baia principal do lote que recebeu mais leitões dele
+    weaning_lot = composition_df.sort_values('quantidade', ascending=False).drop_duplicates('id_desmame').set_index('id_desmame')['lote']
+    weaning_df = load_weaning()
+    target_pen = weaning_df['id_desmame'].map(weaning_lot.map(main_pen))
+    weaning_df['id_baia_destino'] = target_pen.where(target_pen.notna(), weaning_df['id_baia_destino'])
+
+    frames = {
+        NURSERY_FILE: pd.concat([load_nursery(), new_nursery], ignore_index=True),
+        NURSERY_BATCHES_FILE: pd.concat([load_nursery_batches(), new_batches], ignore_index=True),
+        NURSERY_MOVEMENTS_FILE: pd.concat([load_nursery_movements(), new_movements], ignore_index=True),
+        PENS_ALLOCATION_FILE: pd.concat([load_pen_allocations(), new_allocations], ignore_index=True),
+        WEANING_FILE: weaning_df
+    }
+    try:
+        _write_csv_transaction(frames)
+    except OSError as e:
+        return False, f"Erro ao gravar os lotes: {e}"
+    return True, f"{len(lots_df)} lote(s) criado(s) com {int(lots_df['quantidade'].sum())} leitões"
+
+# Funções para planejamento de campanhas de vacinação
+
+VACCINATION_CAMPAIGN_INTERVAL_DAYS = 7
+
+def plan_vaccination_campaign(animals_df, protocols_df, vaccines_df, records_df, allocations_df,
+                              start_date=None, horizon_days=28, campaign_interval=VACCINATION_CAMPAIGN_INTERVAL_DAYS):
+    """
+    Transforma as doses pendentes do rebanho em um plano de campanhas por baia.
+
+    As doses devidas (idade do protocolo ou reforço após a última aplicação) são
+    calculadas para todos os animais × protocolos da categoria de uma vez. Cada
+    dose respeita o intervalo_minimo da vacina desde a última aplicação dela no
+    animal; doses da mesma vacina que venceriam juntas ficam para a campanha seguinte.
+    Cada baia recebe uma única visita por campanha (campaign_interval dias), em um dia
+    fixo da janela distribuído entre as baias, e nela são aplicadas todas as doses
+    vencidas de seus animais.
+
+    Returns:
+        DataFrame: data_campanha, id_baia, id_animal, id_protocolo, id_vacina, dose,
+        data_prevista, atraso_dias, proxima_dose
+    """
+    plan_columns = ['data_campanha', 'id_baia', 'id_animal', 'id_protocolo', 'id_vacina', 'dose',
+                    'data_prevista', 'atraso_dias', 'proxima_dose']
+    if animals_df.empty or protocols_df.empty:
+        return pd.DataFrame(columns=plan_columns)
+
+    start = pd.Timestamp(start_date or datetime.now().date())
+    end = start + pd.Timedelta(days=horizon_days)
+    interval = max(int(campaign_interval), 1)
+
+    # Todos os pares animal × protocolo da sua categoria
+    animals = animals_df[['id_animal', 'categoria', 'data_nascimento']].assign(
+        data_nascimento=pd.to_datetime(animals_df['data_nascimento'], errors='coerce')
+    )
+    if 'status' in animals_df.columns:
+        animals = animals[animals_df['status'].fillna('Ativo') == 'Ativo']
+    protocols = protocols_df[['id_protocolo', 'categoria_animal', 'idade_aplicacao', 'id_vacina', 'dose', 'intervalo_reforco']]
+    doses = animals.merge(protocols, left_on='categoria', right_on='categoria_animal')
+    doses = doses[doses['data_nascimento'].notna()]
+    if doses.empty:
+        return pd.DataFrame(columns=plan_columns)
+
+    # Última aplicação por animal × protocolo e por animal × vacina
+    records = records_df.reindex(columns=['id_animal', 'id_protocolo', 'id_vacina', 'data_aplicacao'])
+    records = records.assign(data_aplicacao=pd.to_datetime(records['data_aplicacao'], errors='coerce')).dropna(subset=['data_aplicacao'])
+    last_protocol = records.dropna(subset=['id_protocolo']).groupby(['id_animal', 'id_protocolo'])['data_aplicacao'].max().rename('ultima_protocolo')
+    last_vaccine = records.dropna(subset=['id_vacina']).groupby(['id_animal', 'id_vacina'])['data_aplicacao'].max().rename('ultima_vacina')
+    doses = doses.join(last_protocol, on=['id_animal', 'id_protocolo']).join(last_vaccine, on=['id_animal', 'id_vacina'])
+
+    booster = pd.to_numeric(doses['intervalo_reforco'], errors='coerce').fillna(0)
+    age_due = doses['data_nascimento'] + pd.to_timedelta(pd.to_numeric(doses['idade_aplicacao'], errors='coerce').fillna(0), unit='D')
+    booster_due = doses['ultima_protocolo'] + pd.to_timedelta(booster, unit='D')
+    # Protocolos de dose única já aplicados não geram nova dose
+    doses = doses.assign(data_prevista=age_due.where(doses['ultima_protocolo'].isna(), booster_due.where(booster > 0)))
+    doses = doses[doses['data_prevista'].notna()]
+
+    minimum = vaccines_df.set_index('id_vacina')['intervalo_minimo'] if not vaccines_df.empty and 'intervalo_minimo' in vaccines_df.columns \
+        else pd.Series(dtype=float)
+    min_gap = pd.to_numeric(doses['id_vacina'].map(minimum), errors='coerce').fillna(0)
+    earliest = (doses['ultima_vacina'] + pd.to_timedelta(min_gap, unit='D')).fillna(pd.Timestamp.min)
+    doses = doses.assign(data_minima=earliest, data_prevista=doses['data_prevista'].where(doses['data_prevista'] >= earliest, earliest))
+    doses = doses[doses['data_prevista'] < end]
+
+    # Uma dose de cada vacina por animal no horizonte (as demais dependem desta)
+    doses = doses.sort_values(['data_prevista', 'id_protocolo'], kind='stable').drop_duplicates(['id_animal', 'id_vacina'])
+    if doses.empty:
+        return pd.DataFrame(columns=plan_columns)
+
+    # Baia atual de cada animal
+    if not allocations_df.empty:
+        active = allocations_df[allocations_df['data_saida'].isna() & allocations_df['id_animal'].notna()]
+        pen_of = active.drop_duplicates('id_animal', keep='last').set_index('id_animal')['id_baia']
+        doses['id_baia'] = doses['id_animal'].map(pen_of)
+    else:
+        doses['id_baia'] = None
+    doses['id_baia'] = doses['id_baia'].fillna('Sem baia')
+
+    # Cada baia tem um dia fixo dentro da janela (rodízio entre as baias, equilibrando o trabalho diário)
+    # e é visitada uma vez por janela; a dose entra na primeira visita em que já venceu e em
+    # que o intervalo mínimo da vacina foi respeitado
+    pen_offset = pd.Series(pd.factorize(doses['id_baia'], sort=True)[0] % interval, index=doses.index)
+    first_visit = start + pd.to_timedelta(pen_offset, unit='D')
+    due_days = (doses['data_prevista'] - first_visit).dt.days.clip(lower=0)
+    minimum_days = (doses['data_minima'].where(doses['data_minima'] > first_visit, first_visit) - first_visit).dt.days
+    window = np.maximum(due_days // interval, -(-minimum_days // interval))
+    doses['data_campanha'] = first_visit + pd.to_timedelta(window * interval, unit='D')
+    doses = doses[doses['data_campanha'] < end]
+
+    doses['atraso_dias'] = (doses['data_campanha'] - doses['data_prevista']).dt.days.clip(lower=0)
+    doses['proxima_dose'] = (doses['data_campanha'] + pd.to_timedelta(booster[doses.index], unit='D')).where(booster[doses.index] > 0)
+    return doses.sort_values(['data_campanha', 'id_baia', 'id_animal'], kind='stable')[plan_columns].reset_index(drop=True)
+
+def summarize_vaccination_worklist(plan_df, animals_df=None, vaccines_df=None, pens_df=None):
+    """Roteiro diário por baia: animais, doses e vacinas de cada visita"""
+    if plan_df.empty:
+        return pd.DataFrame(columns=['data_campanha', 'baia', 'animais', 'doses', 'vacinas'])
+    plan = plan_df
+    vaccine_names = vaccines_df.set_index('id_vacina')['nome'] if vaccines_df is not None and not vaccines_df.empty else pd.Series(dtype=object)
+    pen_names = pens_df.set_index('id_baia')['identificacao'] if pens_df is not None and not pens_df.empty else pd.Series(dtype=object)
+    plan = plan.assign(
+        vacina=plan['id_vacina'].map(vaccine_names).fillna(plan['id_vacina']).astype(str),
+        baia=plan['id_baia'].map(pen_names).fillna(plan['id_baia']).astype(str)
+    )
+    return plan.groupby(['data_campanha', 'baia'], as_index=False).agg(
+        animais=('id_animal', 'nunique'),
+        doses=('id_animal', 'size'),
+        vacinas=('vacina', lambda names: ', '.join(sorted(names.unique())))
+    )
+
+def apply_vaccination_campaign(plan_df, responsavel, vaccines_df=None, lote_vacina=None):
+    """
+    Registra as doses de uma campanha como aplicadas em uma única inserção.
+
+    Returns:
+        tuple: (success, message)
+    """
+    if plan_df.empty:
+        return False, "Nenhuma dose selecionada"
+    records_df = load_vaccination_records()
+    vaccine_names = vaccines_df.set_index('id_vacina')['nome'] if vaccines_df is not None and not vaccines_df.empty else pd.Series(dtype=object)
+    applied = pd.DataFrame({
+        'id_registro': [str(uuid.uuid4()) for _ in range(len(plan_df))],
+        'id_animal': plan_df['id_animal'].to_numpy(),
+        'id_vacina': plan_df['id_vacina'].to_numpy(),
+        'id_protocolo': plan_df['id_protocolo'].to_numpy(),
+        'data_aplicacao': pd.to_datetime(plan_df['data_campanha']).dt.strftime('%Y-%m-%d').to_numpy(),
+        'dose_aplicada': plan_df['dose'].to_numpy(),
+        'lote_vacina': lote_vacina,
+        'responsavel': responsavel,
+        'observacao': 'Campanha de vacinação',
+        # Colunas usadas pela página de vacinação
+        'nome_vacina': plan_df['id_vacina'].map(vaccine_names).fillna(plan_df['id_vacina']).to_numpy(),
+        'dose': plan_df['dose'].to_numpy(),
+        'lote': lote_vacina,
+        'proxima_dose': pd.to_datetime(plan_df['proxima_dose']).dt.strftime('%Y-%m-%d').to_numpy()
+    })
+    save_vaccination_records(pd.concat([records_df, applied], ignore_index=True))
+    return True, f"{len(applied)} doses registradas"
+
+# Registro preguiçoso de tabelas
+
+TABLE_LOADERS = {
+    'animals': load_animals,
+    'breeding': load_breeding_cycles,
+    'gestation': load_gestation,
+    'weight': load_weight_records,
+    'insemination': load_insemination,
+    'pens': load_pens,
+    'pen_allocations': load_pen_allocations,
+    'maternity': load_maternity,
+    'litters': load_litters,
+    'piglets': load_piglets,
+    'weaning': load_weaning,
+    'nursery': load_nursery,
+    'nursery_batches': load_nursery_batches,
+    'nursery_movements': load_nursery_movements,
+    'gilts': load_gilts,
+    'gilts_selection': load_gilts_selection,
+    'gilts_discard': load_gilts_discard,
+    'caliber_scores': load_caliber_scores,
+    'mortality': load_mortality_records,
+    'vaccines': load_vaccines,
+    'vaccination_protocols': load_vaccination_protocols,
+    'vaccination_records': load_vaccination_records,
+    'heat_detection': load_heat_detection,
+    'heat_records': load_heat_records,
+    'recria': load_recria,
+    'recria_lotes': load_recria_lotes,
+    'recria_pesagens': load_recria_pesagens
+}
+
+# Tabelas usadas pelo painel inicial e pelas páginas de cada módulo (pré-carregadas pelas páginas de módulo)
+DASHBOARD_TABLES = ['animals', 'breeding', 'gestation', 'weight', 'insemination', 'pens', 'pen_allocations']
+# Tabelas que o app.py carregava todas de uma vez antes do registro (referência do painel de desempenho)
+APP_EAGER_TABLES = ['animals', 'breeding', 'gestation', 'weight', 'insemination', 'pens', 'pen_allocations',
+                    'maternity', 'litters', 'piglets', 'weaning', 'nursery', 'nursery_batches',
+                    'nursery_movements', 'gilts', 'gilts_selection', 'gilts_discard']
+MODULE_TABLES = {
+    'ADMINISTRACAO': ['animals'],
+    'REPRODUCAO': ['animals', 'breeding', 'gestation', 'insemination', 'heat_detection', 'heat_records'],
+    'CRESCIMENTO': ['animals', 'weight', 'caliber_scores', 'pens', 'pen_allocations', 'maternity', 'litters',
+                    'piglets', 'weaning', 'nursery', 'nursery_batches', 'nursery_movements', 'gilts',
+                    'gilts_selection', 'gilts_discard'],
+    'SAUDE': ['animals', 'vaccines', 'vaccination_protocols', 'vaccination_records', 'mortality', 'piglets',
+              'nursery_batches', 'nursery_movements', 'recria'],
+    'GESTAO': ['animals', 'breeding', 'gestation', 'weight', 'pens', 'pen_allocations', 'litters', 'weaning',
+               'nursery_batches', 'mortality', 'recria', 'recria_pesagens']
+}
+
+_prefetch_threads = {}
+_page_render_timings = []
+
+class LazyTables:
+    """
+    Acesso preguiçoso às tabelas do sistema: cada tabela só é carregada no primeiro uso.
+
+    Uso: tables = LazyTables(); animals_df = tables['animals']
+    """
+
+    def __init__(self, loaders=None):
+        self._loaders = loaders or TABLE_LOADERS
+        self._frames = {}
+
+    def __getitem__(self, name):
+        if name not in self._frames:
+            self._frames[name] = self._loaders[name]()
+        return self._frames[name]
+
+    def __contains__(self, name):
+        return name in self._loaders
+
+    @property
+    def loaded(self):
+        """Nomes das tabelas já carregadas"""
+        return list(self._frames)
+
+    def memory_report(self):
+        """Memória das tabelas desta sessão: total, compartilhada com o armazenamento e privada (bytes)"""
+        rows = [(name, *_frame_memory_split(df)) for name, df in self._frames.items()]
+        return pd.DataFrame(rows, columns=['tabela', 'total_bytes', 'compartilhado_bytes', 'privado_bytes'])
+
+def prefetch_tables(names):
+    """
+    Carrega as tabelas em uma thread em segundo plano para aquecer o cache de leitura.
+
+    Chamadas repetidas enquanto um pré-carregamento do mesmo conjunto está em andamento
+    são ignoradas. Returns: a thread de pré-carregamento
+    """
+    key = tuple(sorted(names))
+    thread = _prefetch_threads.get(key)
+    if thread is not None and thread.is_alive():
+        return thread
+
+    def _prefetch():
+        for name in key:
+            try:
+                TABLE_LOADERS[name]()
+            except (OSError, ValueError, pd.errors.ParserError):
+                # Tabela ilegível: a página mostrará o erro quando a usar
+                pass
+
+    thread = threading.Thread(target=_prefetch, name=f"prefetch-{'-'.join(key)[:40]}", daemon=True)
+    _prefetch_threads[key] = thread
+    thread.start()
+    return thread
+
+def _column_memory(df):
+    """(endereço dos dados, bytes) de cada coluna, para identificar colunas compartilhadas"""
+    columns = []
+    for _, column in df.items():
+        values = column.array
+        if hasattr(values, '_pa_array'):
+            chunks = values._pa_array.chunks
+            address = chunks[0].buffers()[-1].address if chunks and chunks[0].buffers()[-1] is not None else None
+            columns.append((address, values._pa_array.nbytes))
+        else:
+            data = values._ndarray if hasattr(values, '_ndarray') else np.asarray(values)
+            columns.append((data.__array_interface__['data'][0] if data.nbytes else None, data.nbytes))
+    return columns
+
+def _frame_memory_split(df):
+    """(total, compartilhado, privado) em bytes das colunas do DataFrame frente ao armazenamento compartilhado"""
+    store_addresses = {address for _, base in _table_cache.values() for address, _ in _column_memory(base)}
+    total = shared = 0
+    for address, nbytes in _column_memory(df):
+        total += nbytes
+        if address is not None and address in store_addresses:
+            shared += nbytes
+    return total, shared, total - shared
+
+def _current_rss_bytes():
+    """Memória residente atual do processo (Linux: /proc/self/statm), ou None se indisponível"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def get_store_stats():
+    """Tabelas no armazenamento compartilhado e memória ocupada por elas"""
+    tables = {path: int(df.memory_usage(index=True).sum()) for path, (_, df) in _table_cache.items()}
+    return {'tabelas': len(tables), 'bytes': sum(tables.values()), 'por_arquivo': tables}
+
+def benchmark_session_memory(n_sessions=30, names=None):
+    """
+    Simula sessões simultâneas que carregam as tabelas e fazem uma edição típica
+    (acrescentar uma coluna derivada), medindo a memória residente a cada sessão.
+
+    Compara as visões do armazenamento compartilhado com cópias completas por sessão
+    (o comportamento anterior).
+
+    Returns:
+        DataFrame: modo, sessoes, rss_mb, privado_mb
+    """
+    import gc
+    names = names or DASHBOARD_TABLES
+    rows = []
+    for mode in ('Armazenamento compartilhado', 'Cópia por sessão (anterior)'):
+        sessions = tables = df = None
+        gc.collect()
+        sessions = []
+        baseline = _current_rss_bytes()
+        for n in range(1, n_sessions + 1):
+            tables = LazyTables()
+            for name in names:
+                df = tables[name]
+                if mode.startswith('Cópia'):
+                    df = df.copy()
+                    tables._frames[name] = df
+                # Edição típica de página: nova coluna derivada (ex.: breeding_df['ultima_data'] em app.py)
+                if len(df.columns):
+                    df['_derivada'] = df[df.columns[0]].isna()
+            sessions.append(tables)
+            rss = _current_rss_bytes()
+            private = int(tables.memory_report()['privado_bytes'].sum())
+            rows.append((mode, n, round((rss - baseline) / 2**20, 2) if rss is not None and baseline is not None else None,
+                         round(private / 2**20, 3)))
+    return pd.DataFrame(rows, columns=['modo', 'sessoes', 'rss_mb', 'privado_mb'])
+
+def record_page_render(page, seconds, cold=None):
+    """Registra o tempo de renderização de uma página (cold = houve leitura de disco)"""
+    _page_render_timings.append({
+        'data': datetime.now(),
+        'pagina': page,
+        'tempo_ms': round(seconds * 1000, 1),
+        'frio': cold
+    })
+    del _page_render_timings[:-200]
+
+def get_page_render_timings():
+    """Tempos de renderização registrados neste processo"""
+    return pd.DataFrame(_page_render_timings, columns=['data', 'pagina', 'tempo_ms', 'frio'])
+
+def get_table_cache_stats():
+    """Leituras atendidas pelo cache e leituras de disco desde o início do processo"""
+    return dict(_table_cache_stats, tabelas_em_cache=len(_table_cache))
+
+def benchmark_table_loading(names=None):
+    """
+    Mede o carregamento de cada tabela lida do disco (frio) e a partir do cache (quente).
+
+    O cache é esvaziado antes da medição e fica aquecido ao final.
+
+    Returns:
+        DataFrame: tabela, linhas, frio_ms, quente_ms
+    """
+    names = names or list(TABLE_LOADERS)
+    with _table_locks_guard:
+        _table_cache.clear()
+    rows = []
+    for name in names:
+        start = time.perf_counter()
+        df = TABLE_LOADERS[name]()
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        TABLE_LOADERS[name]()
+        warm = time.perf_counter() - start
+        rows.append((name, len(df), round(cold * 1000, 2), round(warm * 1000, 2)))
+    return pd.DataFrame(rows, columns=['tabela', 'linhas', 'frio_ms', 'quente_ms'])
+
+# Funções para paginação de tabelas no servidor
+
+GRID_PAGE_SIZE = 50
+
+_grid_index_cache = {}
+
+def _get_grid_index(df, search_columns):
+    """
+    Índices de uma tabela para a grade paginada (texto de busca e ordenações), em cache.
+
+    A busca no cache é feita primeiro pela identidade dos buffers das colunas (custo
+    constante para visões do armazenamento compartilhado, que se repetem a cada rerun)
+    e, se falhar, pela versão do conteúdo. A entrada guarda uma referência à tabela,
+    para que os buffers não sejam liberados e seus endereços reaproveitados.
+    """
+    columns_key = (tuple(df.columns), tuple(search_columns))
+    buffers_key = ('buffers', tuple(_column_memory(df)), len(df)) + columns_key
+    index = _grid_index_cache.get(buffers_key)
+    if index is not None:
+        return index
+    content_key = ('content', _dataframe_version(df)) + columns_key
+    index = _grid_index_cache.get(content_key)
+    if index is None:
+        search = None
+        if search_columns:
+            # No pandas 3 astype(str) mantém os nulos; viram texto vazio na busca
+            text = df[search_columns[0]].astype(str).fillna('')
+            for column in search_columns[1:]:
+                text = text + '\x1f' + df[column].astype(str).fillna('')
+            search = text.str.lower().to_numpy(dtype=object)
+        index = {'search': search, 'orders': {}, 'frame': df}
+    if len(_grid_index_cache) > 32:
+        _grid_index_cache.clear()
+    index['frame'] = df
+    _grid_index_cache[buffers_key] = _grid_index_cache[content_key] = index
+    return index
+
+def _grid_order(df, index, column, ascending):
+    """Posições das linhas ordenadas pela coluna (nulos no fim), calculadas uma vez por versão"""
+    order = index['orders'].get((column, ascending))
+    if order is None:
+        values = df[column].reset_index(drop=True)
+        order = values.sort_values(ascending=ascending, na_position='last', kind='stable').index.to_numpy()
+        index['orders'][(column, ascending)] = order
+    return order
+
+def query_grid_page(df, search=None, search_columns=None, filters=None, sort_by=None, ascending=True,
+                    page=1, page_size=GRID_PAGE_SIZE):
+    """
+    Filtra, ordena e pagina uma tabela no servidor, devolvendo apenas a página visível.
+
+    O texto de busca e as ordenações ficam indexados por versão da tabela; cada consulta
+    é só uma máscara booleana sobre a ordem já calculada e um recorte das posições.
+
+    Args:
+        search: Texto buscado (sem diferenciar maiúsculas) nas search_columns
+        filters: {coluna: [valores aceitos]}
+        page: Página desejada (1 = primeira); é limitada ao intervalo válido
+
+    Returns:
+        tuple: (DataFrame da página, total de linhas filtradas, número de páginas, página efetiva)
+    """
+    search_columns = list(search_columns or [])
+    index = _get_grid_index(df, search_columns)
+    mask = np.ones(len(df), dtype=bool)
+    for column, values in (filters or {}).items():
+        if values:
+            mask &= df[column].isin(values).to_numpy()
+    if search and index['search'] is not None:
+        # Busca apenas nas linhas que passaram pelos filtros
+        term = str(search).lower()
+        candidates = np.flatnonzero(mask)
+        texts = index['search'][candidates]
+        mask[candidates] = np.fromiter((term in text for text in texts), dtype=bool, count=len(candidates))
+
+    positions = _grid_order(df, index, sort_by, ascending) if sort_by else np.arange(len(df))
+    positions = positions[mask[positions]]
+    total = len(positions)
+    n_pages = max(1, -(-total // page_size))
+    page = min(max(int(page), 1), n_pages)
+    page_positions = positions[(page - 1) * page_size:page * page_size]
+    return df.iloc[page_positions], total, n_pages, page
+
+def benchmark_grid(n_rows=500000, page_size=GRID_PAGE_SIZE):
+    """
+    Compara o envio da tabela inteira com o envio de uma página da grade paginada.
+
+    O tamanho enviado ao navegador é estimado pela serialização Arrow usada pelo
+    st.dataframe.
+
+    Returns:
+        DataFrame: modo, linhas_enviadas, payload_kb, tempo_ms
+    """
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'identificacao': pd.Series(rng.integers(0, n_rows // 5 + 1, n_rows)).map('A{:06d}'.format),
+        'categoria': rng.choice(['Leitão', 'Matriz', 'Reprodutor', 'Leitoa'], n_rows),
+        'data_registro': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 2000, n_rows), unit='D'),
+        'peso': rng.normal(80, 30, n_rows).round(2),
+        'observacao': rng.choice(['', 'Pesagem de rotina', 'Reavaliação'], n_rows)
+    })
+
+    def payload_bytes(frame):
+        import pyarrow as pa
+        sink = pa.BufferOutputStream()
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().size
+
+    rows = []
+    start = time.perf_counter()
+    full = df.sort_values('data_registro', ascending=False)
+    full = full[full['categoria'] == 'Matriz']
+    full_bytes = payload_bytes(full)
+    rows.append(('Tabela inteira', len(full), round(full_bytes / 1024, 1), round((time.perf_counter() - start) * 1000, 1)))
+
+    for mode in ('Grade paginada (primeira consulta)', 'Grade paginada (consulta seguinte)'):
+        start = time.perf_counter()
+        page_df, _, _, _ = query_grid_page(
+            df, search_columns=['identificacao', 'observacao'], filters={'categoria': ['Matriz']},
+            sort_by='data_registro', ascending=False, page=3, page_size=page_size
+        )
+        page_bytes = payload_bytes(page_df)
+        rows.append((mode, len(page_df), round(page_bytes / 1024, 1), round((time.perf_counter() - start) * 1000, 1)))
+    return pd.DataFrame(rows, columns=['modo', 'linhas_enviadas', 'payload_kb', 'tempo_ms'])
+
+# Gráficos grandes: redução de pontos e renderização WebGL
+CHART_MAX_POINTS = 2000          # pontos por série após a redução
+CHART_WEBGL_THRESHOLD = 5000     # acima disso os traços usam WebGL (scattergl)
+CHART_DENSITY_THRESHOLD = 50000  # acima disso dispersões viram mapa de densidade
+_chart_render_stats = []
+
+def _numeric_axis(values):
+    """Converte um eixo (números ou datas) em float64 para os cálculos de redução"""
+    values = pd.Series(values)
+    if not pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_datetime64_any_dtype(values):
+        # Datas gravadas como texto (AAAA-MM-DD): str no pandas 3, object antes
+        converted = pd.to_datetime(values, errors='coerce')
+        if converted.notna().any():
+            values = converted
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype('int64').to_numpy(dtype='float64')
+    return pd.to_numeric(values, errors='coerce').to_numpy(dtype='float64')
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: escolhe n_out pontos que preservam a forma da série.
+
+    Args:
+        x, y: Arrays float64 ordenados por x, sem valores nulos
+        n_out: Número de pontos desejado
+
+    Returns:
+        ndarray: Posições dos pontos selecionados
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Média do próximo balde (ou o último ponto)
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[end:next_end].mean() if next_end > end else x[-1]
+        next_y = y[end:next_end].mean() if next_end > end else y[-1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous]) -
+            (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(areas.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+def minmax_indices(x, y, n_out):
+    """
+    Redução mínimo/máximo: mantém o menor e o maior valor de cada balde de x.
+
+    Preserva picos (ex.: mortes ou pesos extremos) que a média esconderia.
+
+    Returns:
+        ndarray: Posições dos pontos selecionados, em ordem de x
+    """
+    n = len(x)
+    n_buckets = max(n_out // 2, 1)
+    if n <= n_out:
+        return np.arange(n)
+    buckets = np.arange(n) * n_buckets // n
+    # Dentro de cada balde, ordenar por y: o primeiro é o mínimo, o último é o máximo
+    order = np.lexsort((y, buckets))
+    starts = np.flatnonzero(np.r_[True, buckets[order][1:] != buckets[order][:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    return np.unique(np.concatenate([order[starts], order[ends]]))
+
+def downsample_series(df, x, y, group=None, max_points=CHART_MAX_POINTS, method='lttb'):
+    """
+    Reduz uma série temporal (ou curva) para no máximo max_points pontos por grupo.
+
+    Args:
+        df: DataFrame com os dados do gráfico
+        x, y: Colunas dos eixos
+        group: Coluna de cor/série (cada grupo é reduzido separadamente)
+        max_points: Pontos por grupo
+        method: 'lttb' (forma da curva) ou 'minmax' (preserva extremos)
+
+    Returns:
+        DataFrame: Linhas selecionadas, ordenadas por grupo e x
+    """
+    data = df.dropna(subset=[x, y]).sort_values(([group] if group else []) + [x], kind='stable')
+    if len(data) <= max_points:
+        return data
+    select = lttb_indices if method == 'lttb' else minmax_indices
+    x_values = _numeric_axis(data[x])
+    y_values = data[y].to_numpy(dtype='float64')
+    if group:
+        codes = pd.factorize(data[group])[0]
+        bounds = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1], True])
+    else:
+        bounds = np.array([0, len(data)])
+    positions = [
+        start + select(x_values[start:end], y_values[start:end], max_points)
+        for start, end in zip(bounds[:-1], bounds[1:])
+    ]
+    return data.iloc[np.concatenate(positions)]
+
+def density_grid(df, x, y, bins_x=80, bins_y=60):
+    """
+    Contagem de pontos em uma grade x × y, para desenhar dispersões grandes como mapa de densidade.
+
+    Returns:
+        tuple: (centros de x, centros de y, matriz de contagens [y, x])
+    """
+    data = df[[x, y]].dropna()
+    counts, x_edges, y_edges = np.histogram2d(
+        data[x].to_numpy(dtype='float64'), data[y].to_numpy(dtype='float64'), bins=[bins_x, bins_y]
+    )
+    return (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2, counts.T
+
+def record_chart_render(chart, points, points_sent, payload_bytes, seconds):
+    """Registra o tamanho do JSON enviado e o tempo de montagem/envio de um gráfico"""
+    _chart_render_stats.append({
+        'data': datetime.now(),
+        'grafico': chart,
+        'pontos': points,
+        'pontos_enviados': points_sent,
+        'payload_kb': round(payload_bytes / 1024, 1),
+        'tempo_ms': round(seconds * 1000, 1)
+    })
+    del _chart_render_stats[:-200]
+
+def get_chart_render_stats():
+    """Gráficos renderizados neste processo (pontos, payload e tempo)"""
+    return pd.DataFrame(
+        _chart_render_stats,
+        columns=['data', 'grafico', 'pontos', 'pontos_enviados', 'payload_kb', 'tempo_ms']
+    )
+
+# Cache de resultados (agregações e figuras) pela versão das tabelas de entrada
+RESULT_CACHE_MAX_ENTRIES = 256
+RESULT_CACHE_MAX_BYTES = 128 * 2**20
+TABLE_FILES = {
+    'animals': ANIMALS_FILE,
+    'breeding': BREEDING_FILE,
+    'gestation': GESTATION_FILE,
+    'weight': WEIGHT_FILE,
+    'insemination': INSEMINATION_FILE,
+    'pens': PENS_FILE,
+    'pen_allocations': PENS_ALLOCATION_FILE,
+    'maternity': MATERNITY_FILE,
+    'litters': LITTERS_FILE,
+    'piglets': PIGLETS_FILE,
+    'weaning': WEANING_FILE,
+    'nursery': NURSERY_FILE,
+    'nursery_batches': NURSERY_BATCHES_FILE,
+    'nursery_movements': NURSERY_MOVEMENTS_FILE,
+    'gilts': GILTS_FILE,
+    'gilts_selection': GILTS_SELECTION_FILE,
+    'gilts_discard': GILTS_DISCARD_FILE,
+    'caliber_scores': "data/caliber_scores.csv",
+    'mortality': MORTALITY_FILE,
+    'vaccines': VACCINES_FILE,
+    'vaccination_protocols': VACCINATION_PROTOCOLS_FILE,
+    'vaccination_records': VACCINATION_RECORDS_FILE,
+    'heat_detection': HEAT_DETECTION_FILE,
+    'heat_records': HEAT_RECORDS_FILE,
+    'recria': RECRIA_FILE,
+    'recria_lotes': RECRIA_LOTES_FILE,
+    'recria_pesagens': RECRIA_PESAGENS_FILE
+}
+_result_cache = OrderedDict()
+_result_cache_lock = threading.Lock()
+_result_cache_bytes = [0]
+_result_write_counter = {}
+_result_cache_stats = {}
+_result_cache_totals = {'invalidations': 0, 'evictions': 0}
+
+def _freeze_params(value):
+    """Converte parâmetros de filtro (listas, dicts, datas) em uma chave imutável"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze_params(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_freeze_params(item) for item in value]
+        return tuple(sorted(items, key=repr) if isinstance(value, (set, frozenset)) else items)
+    return value
+
+def _result_size(value):
+    """Tamanho aproximado de um resultado em cache, em bytes"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(np.sum(value.memory_usage(deep=False)))
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(_result_size(item) for item in value)
+    if isinstance(value, dict):
+        return sum(_result_size(item) for item in value.values())
+    return 64
+
+def _result_key(name, tables, params):
+    """Caminhos das tabelas e chave (nome, versões das tabelas, parâmetros) de um resultado"""
+    paths = tuple(TABLE_FILES.get(table, table) for table in tables)
+    return paths, (
+        name,
+        tuple((_result_write_counter.get(path, 0), _file_stamp(path)) for path in paths),
+        _freeze_params(params)
+    )
+
+def cached_result(name, tables, params, compute, size=None):
+    """
+    Memoiza uma agregação ou figura pela versão das tabelas de entrada e pelos filtros.
+
+    A versão de cada tabela é o carimbo do arquivo (data de modificação, tamanho) mais
+    um contador incrementado a cada save_*; as entradas que dependem de uma tabela
+    gravada são descartadas na hora. O cache é LRU, limitado por número de entradas
+    e por bytes.
+
+    Args:
+        name: Nome do resultado (agrupa as estatísticas de acerto)
+        tables: Nomes das tabelas (chaves de TABLE_FILES) ou caminhos dos arquivos
+        params: Parâmetros de filtro que alteram o resultado
+        compute: Função sem argumentos que calcula o resultado
+        size: Função que estima o tamanho do resultado em bytes (opcional)
+
+    Returns:
+        O resultado (DataFrames são devolvidos como visões, sem alterar o cache)
+    """
+    paths, key = _result_key(name, tables, params)
+    stats = _result_cache_stats.setdefault(name, {'hits': 0, 'misses': 0})
+    with _result_cache_lock:
+        entry = _result_cache.get(key)
+        if entry is not None:
+            _result_cache.move_to_end(key)
+            stats['hits'] += 1
+    if entry is None:
+        stats['misses'] += 1
+        value = compute()
+        entry = {'paths': paths, 'value': value, 'bytes': size(value) if size else _result_size(value)}
+        with _result_cache_lock:
+            previous = _result_cache.pop(key, None)
+            if previous is not None:
+                _result_cache_bytes[0] -= previous['bytes']
+            _result_cache[key] = entry
+            _result_cache_bytes[0] += entry['bytes']
+            while len(_result_cache) > 1 and (
+                len(_result_cache) > RESULT_CACHE_MAX_ENTRIES or _result_cache_bytes[0] > RESULT_CACHE_MAX_BYTES
+            ):
+                _, evicted = _result_cache.popitem(last=False)
+                _result_cache_bytes[0] -= evicted['bytes']
+                _result_cache_totals['evictions'] += 1
+    value = entry['value']
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=False)
+    return value
+
+def invalidate_result_cache(path=None):
+    """Descarta os resultados que dependem de um arquivo (ou todos, se path for None)"""
+    with _result_cache_lock:
+        if path is not None:
+            _result_write_counter[path] = _result_write_counter.get(path, 0) + 1
+        stale = [key for key, entry in _result_cache.items() if path is None or path in entry['paths']]
+        for key in stale:
+            _result_cache_bytes[0] -= _result_cache.pop(key)['bytes']
+        _result_cache_totals['invalidations'] += len(stale)
+
+def get_result_cache_stats():
+    """
+    Acertos e faltas do cache de resultados por nome, com a taxa de acerto.
+
+    Returns:
+        tuple: (DataFrame nome/acertos/faltas/taxa_acerto, dict com entradas, bytes, invalidações e despejos)
+    """
+    rows = [
+        {'nome': name, 'acertos': stats['hits'], 'faltas': stats['misses'],
+         'taxa_acerto': stats['hits'] / (stats['hits'] + stats['misses']) if stats['hits'] + stats['misses'] else 0.0}
+        for name, stats in list(_result_cache_stats.items())
+    ]
+    summary = dict(_result_cache_totals, entradas=len(_result_cache), bytes=_result_cache_bytes[0])
+    return pd.DataFrame(rows, columns=['nome', 'acertos', 'faltas', 'taxa_acerto']), summary
+
+# Relatórios calculados em segundo plano
+REPORT_JOB_WORKERS = 4
+REPORT_JOB_HISTORY = 64
+_report_executor = ThreadPoolExecutor(max_workers=REPORT_JOB_WORKERS, thread_name_prefix='relatorio')
+_report_jobs = OrderedDict()
+_report_jobs_lock = threading.Lock()
+_report_job_stats = {'submitted': 0, 'deduplicated': 0, 'completed': 0, 'failed': 0}
+
+def _run_report_job(job, compute):
+    job['status'] = 'executando'
+    job['started'] = time.perf_counter()
+    try:
+        job['result'] = compute()
+        job['status'] = 'concluido'
+        _report_job_stats['completed'] += 1
+    except Exception as e:
+        job['error'] = str(e)
+        job['status'] = 'erro'
+        _report_job_stats['failed'] += 1
+    job['finished'] = time.perf_counter()
+
+def submit_report_job(name, tables, params, compute):
+    """
+    Envia o cálculo de uma seção de relatório para o pool de threads e retorna na hora.
+
+    Pedidos idênticos (mesmo nome, mesmas versões das tabelas e mesmos parâmetros),
+    de qualquer sessão, compartilham o mesmo job: se ele estiver em andamento ou já
+    concluído, nada é recalculado. Jobs com erro são reenviados no próximo pedido.
+
+    Args:
+        name: Nome da seção
+        tables: Tabelas de entrada (nomes de TABLE_FILES ou caminhos)
+        params: Parâmetros que alteram o resultado
+        compute: Função sem argumentos que calcula a seção
+
+    Returns:
+        tuple: Identificador do job (usado em get_report_job)
+    """
+    _, key = _result_key(name, tables, params)
+    with _report_jobs_lock:
+        job = _report_jobs.get(key)
+        if job is not None and job['status'] != 'erro':
+            _report_jobs.move_to_end(key)
+            _report_job_stats['deduplicated'] += 1
+            return key
+        job = {
+            'name': name, 'status': 'pendente', 'result': None, 'error': None,
+            'submitted': time.perf_counter(), 'started': None, 'finished': None
+        }
+        _report_jobs[key] = job
+        _report_job_stats['submitted'] += 1
+        # Descartar os jobs terminados mais antigos
+        finished = [k for k, j in _report_jobs.items() if j['status'] in ('concluido', 'erro')]
+        for old_key in finished[:max(len(_report_jobs) - REPORT_JOB_HISTORY, 0)]:
+            del _report_jobs[old_key]
+    _report_executor.submit(_run_report_job, job, compute)
+    return key
+
+def get_report_job(handle):
+    """
+    Situação de um job de relatório.
+
+    Returns:
+        dict: status ('pendente', 'executando', 'concluido', 'erro' ou 'desconhecido'),
+              result, error e tempo_ms (espera + cálculo, quando concluído)
+    """
+    job = _report_jobs.get(handle)
+    if job is None:
+        return {'status': 'desconhecido', 'result': None, 'error': None, 'tempo_ms': None}
+    elapsed = job['finished'] - job['submitted'] if job['finished'] is not None else None
+    return {
+        'status': job['status'],
+        'result': job['result'],
+        'error': job['error'],
+        'tempo_ms': round(elapsed * 1000, 1) if elapsed is not None else None
+    }
+
+def get_report_job_stats():
+    """
+    Jobs de relatório recentes e contadores (enviados, deduplicados, concluídos, com erro).
+
+    Returns:
+        tuple: (DataFrame secao/status/espera_ms/calculo_ms, dict de contadores)
+    """
+    rows = []
+    for job in list(_report_jobs.values()):
+        rows.append({
+            'secao': job['name'],
+            'status': job['status'],
+            'espera_ms': round((job['started'] - job['submitted']) * 1000, 1) if job['started'] else None,
+            'calculo_ms': round((job['finished'] - job['started']) * 1000, 1) if job['finished'] else None
+        })
+    return pd.DataFrame(rows, columns=['secao', 'status', 'espera_ms', 'calculo_ms']), dict(_report_job_stats)
+
+def build_cycle_report(breeding_df, animals_df):
+    """
+    Dados da aba de reprodução do relatório: ciclos por animal, regularidade dos
+    intervalos entre cios e último cio de cada animal com o próximo previsto (21 dias).
+
+    Returns:
+        dict: breeding_stats, intervals e latest_cycles (DataFrames)
+    """
+    breeding_counts = breeding_df['id_animal'].value_counts().reset_index()
+    breeding_counts.columns = ['id_animal', 'contagem_ciclos']
+    breeding_stats = pd.merge(breeding_counts, animals_df, on='id_animal', how='left')
+    
+    # Intervalos entre cios consecutivos de cada animal
+    cycles = breeding_df[['id_animal']].assign(
+        data=pd.to_datetime(breeding_df['ultima_data'], errors='coerce')
+    ).dropna(subset=['data']).sort_values(['id_animal', 'data'], kind='stable')
+    cycles['intervalo'] = cycles.groupby('id_animal')['data'].diff().dt.days
+    by_animal = cycles.groupby('id_animal')
+    intervals = by_animal.agg(
+        num_ciclos=('data', 'size'),
+        intervalo_medio=('intervalo', 'mean'),
+        intervalo_min=('intervalo', 'min'),
+        intervalo_max=('intervalo', 'max')
+    )
+    intervals['regularidade'] = by_animal['intervalo'].std(ddof=0).fillna(0)
+    intervals = intervals[intervals['num_ciclos'] >= 2].reset_index()
+    animal_columns = [c for c in ['id_animal', 'identificacao', 'nome'] if c in animals_df.columns]
+    intervals = intervals.merge(animals_df[animal_columns], on='id_animal', how='inner')
+    if 'nome' not in intervals.columns:
+        intervals['nome'] = ''
+    
+    latest_cycles = breeding_df.sort_values('ultima_data').groupby('id_animal').last().reset_index()
+    latest_cycles['ultima_data'] = pd.to_datetime(latest_cycles['ultima_data'])
+    latest_cycles['proxima_data'] = latest_cycles['ultima_data'] + pd.Timedelta(days=21)
+    latest_cycles = pd.merge(
+        latest_cycles, animals_df[['id_animal', 'identificacao', 'nome']], on='id_animal', how='left'
+    ).sort_values('proxima_data')
+    
+    return {'breeding_stats': breeding_stats, 'intervals': intervals, 'latest_cycles': latest_cycles}
+
+def build_gestation_report(gestation_df, animals_df, pens_df, allocations_df, reference_date=None):
+    """
+    Dados da aba de gestação do relatório: gestações ativas com a previsão de parto,
+    quadro semanal de partos, histórico de partos e produção mensal.
+
+    Returns:
+        dict: active_gestations, board_df, board_forecast, completed_gestations,
+              avg_by_animal e monthly_births (DataFrames)
+    """
+    animal_info = animals_df[['id_animal', 'identificacao', 'nome']]
+    forecast = forecast_farrowings(gestation_df, reference_date)
+    active_gestations = forecast.merge(
+        gestation_df[['id_gestacao', 'status']], on='id_gestacao', how='left'
+    ).merge(animal_info, on='id_animal', how='left')
+    # Dias de gestação e dias restantes já vêm calculados da previsão
+    active_gestations = active_gestations.rename(columns={'dia_gestacao': 'dias_gestacao'})
+    active_gestations['data_cobertura'] = active_gestations['data_cobertura'].dt.date
+    active_gestations['data_prevista_parto'] = active_gestations['data_prevista_parto'].dt.date
+    active_gestations = active_gestations.sort_values('dias_restantes')
+    board_df, board_forecast = build_farrowing_board(forecast, pens_df, allocations_df)
+    
+    gestation_with_animal = pd.merge(gestation_df, animal_info, on='id_animal', how='left')
+    completed = gestation_with_animal[~gestation_with_animal['data_parto'].isna()].copy()
+    completed['data_cobertura'] = pd.to_datetime(completed['data_cobertura'])
+    completed['data_parto'] = pd.to_datetime(completed['data_parto'])
+    completed['duracao_gestacao'] = (completed['data_parto'] - completed['data_cobertura']).dt.days
+    completed = completed.sort_values('data_parto', ascending=False)
+    
+    avg_by_animal = completed.groupby(['identificacao', 'nome'])['quantidade_leitoes'].mean().reset_index()
+    avg_by_animal.columns = ['Identificação', 'Nome', 'Média de Leitões']
+    
+    monthly_births = completed.groupby(completed['data_parto'].dt.to_period('M')).agg({
+        'id_gestacao': 'count',
+        'quantidade_leitoes': 'sum'
+    }).reset_index()
+    monthly_births['data_parto'] = monthly_births['data_parto'].astype(str)
+    monthly_births.columns = ['Mês', 'Partos', 'Leitões']
+    
+    return {
+        'active_gestations': active_gestations,
+        'board_df': board_df,
+        'board_forecast': board_forecast,
+        'completed_gestations': completed,
+        'avg_by_animal': avg_by_animal,
+        'monthly_births': monthly_births
+    }
+
+def build_growth_report(weight_df, animals_df, include_outliers=False):
+    """
+    Dados da aba de crescimento do relatório: pesagens com idade, referência de
+    crescimento e ganho diário entre pesagens consecutivas de cada animal.
+
+    Returns:
+        dict: growth_data, report_weight_df, growth_reference e growth_df (DataFrames/dict)
+    """
+    weight_flags = detect_weight_outliers(weight_df, animals_df)
+    report_weight_df = weight_df if include_outliers else weight_df[~weight_flags['outlier'].astype(bool)]
+    
+    growth_data = pd.merge(
+        report_weight_df,
+        animals_df[['id_animal', 'identificacao', 'nome', 'categoria', 'data_nascimento']],
+        on='id_animal',
+        how='left'
+    )
+    growth_data['data_registro'] = pd.to_datetime(growth_data['data_registro'])
+    growth_data['data_nascimento'] = pd.to_datetime(growth_data['data_nascimento'])
+    growth_data['idade_dias'] = (growth_data['data_registro'] - growth_data['data_nascimento']).dt.days
+    # Idades negativas são erros de cadastro
+    growth_data = growth_data[growth_data['idade_dias'] >= 0]
+    
+    growth_reference = build_growth_reference(prepare_weighings(report_weight_df, animals_df))
+    
+    # Ganho entre pesagens consecutivas do mesmo animal
+    ordered = growth_data.sort_values(['id_animal', 'data_registro'], kind='stable')
+    following = ordered.groupby('id_animal')[['data_registro', 'peso', 'idade_dias']].shift(-1)
+    growth_df = pd.DataFrame({
+        'id_animal': ordered['id_animal'],
+        'identificacao': ordered['identificacao'],
+        'categoria': ordered['categoria'],
+        'idade_inicial': ordered['idade_dias'],
+        'idade_final': following['idade_dias'],
+        'peso_inicial': ordered['peso'],
+        'peso_final': following['peso'],
+        'periodo_dias': (following['data_registro'] - ordered['data_registro']).dt.days
+    })
+    growth_df = growth_df[growth_df['periodo_dias'] > 0].reset_index(drop=True)
+    growth_df['ganho_diario'] = (growth_df['peso_final'] - growth_df['peso_inicial']) / growth_df['periodo_dias']
+    growth_df['faixa_idade'] = pd.cut(
+        growth_df['idade_inicial'],
+        bins=[0, 30, 60, 90, 180, 365, float('inf')],
+        labels=['0-1 mês', '1-2 meses', '2-3 meses', '3-6 meses', '6-12 meses', '12+ meses']
+    )
+    growth_df['eficiencia'] = growth_df['ganho_diario'] / growth_df['peso_inicial'] * 100
+    
+    return {
+        'growth_data': growth_data,
+        'report_weight_df': report_weight_df,
+        'growth_reference': growth_reference,
+        'growth_df': growth_df
+    }
+
+def build_heat_sister_report(breeding_df, animals_df, window_days=HEAT_GROUP_WINDOW_DAYS):
+    """
+    Dados da aba de irmãs de cio do relatório: grupos de cio sincronizado, ciclos de
+    cada grupo com os dados dos animais e a sincronização entre irmãs de ninhada.
+
+    Returns:
+        dict: grupos, ciclos_com_irmas e correlacoes_df (None sem irmãs de ninhada registradas)
+    """
+    ciclos_agrupados = assign_heat_groups(breeding_df, window_days)
+    grupos = summarize_heat_groups(ciclos_agrupados)
+    if grupos.empty:
+        return {'grupos': grupos, 'ciclos_com_irmas': None, 'correlacoes_df': None}
+    
+    animal_columns = [c for c in ['id_animal', 'identificacao', 'nome', 'irmas_ninhada'] if c in animals_df.columns]
+    ciclos_com_irmas = ciclos_agrupados[ciclos_agrupados['grupo_cio'].isin(grupos['grupo_cio'])].merge(
+        animals_df[animal_columns],
+        on='id_animal',
+        how='left'
+    )
+    if 'irmas_ninhada' not in ciclos_com_irmas.columns:
+        ciclos_com_irmas['irmas_ninhada'] = None
+    
+    # Irmãs de ninhada (uma linha por irmã) cruzadas com os membros do mesmo grupo de cio
+    com_ninhada = ciclos_com_irmas[ciclos_com_irmas['irmas_ninhada'].notna() & (ciclos_com_irmas['irmas_ninhada'] != "")]
+    correlacoes_df = None
+    if not com_ninhada.empty:
+        irmas = com_ninhada[['id_ciclo', 'grupo_cio', 'irmas_ninhada']].assign(
+            irma=com_ninhada['irmas_ninhada'].astype(str).str.split(',')
+        ).explode('irma')
+        irmas['irma'] = irmas['irma'].str.strip()
+        membros = ciclos_com_irmas[['grupo_cio', 'id_animal']].drop_duplicates().rename(columns={'id_animal': 'irma'})
+        irmas = irmas.merge(membros.assign(em_cio=True), on=['grupo_cio', 'irma'], how='left')
+        irmas['em_cio'] = irmas['em_cio'].notna()
+        
+        correlacoes_df = irmas.groupby('id_ciclo').agg(
+            total_irmas_ninhada=('irma', 'size'),
+            irmas_comuns=('em_cio', 'sum')
+        ).reset_index().merge(
+            com_ninhada[['id_ciclo', 'id_animal', 'identificacao', 'data_cio', 'tamanho_grupo_cio']],
+            on='id_ciclo'
+        )
+        correlacoes_df['irmas_comuns'] = correlacoes_df['irmas_comuns'].astype(int)
+        correlacoes_df['total_irmas_cio'] = correlacoes_df['tamanho_grupo_cio'].astype(int) - 1
+        correlacoes_df['porcentagem'] = correlacoes_df['irmas_comuns'] / correlacoes_df['total_irmas_ninhada'] * 100
+    
+    return {'grupos': grupos, 'ciclos_com_irmas': ciclos_com_irmas, 'correlacoes_df': correlacoes_df}
+
+# Pacotes de relatórios gerados à noite (um por setor), servidos prontos pelas páginas
+REPORTS_DIR = "data/reports"
+REPORT_PIPELINE_HOUR = 2            # hora da geração noturna
+REPORT_PACK_KEEP_VERSIONS = 3       # versões mantidas por setor
+REPORT_PACK_CHUNK_ROWS = 5000       # linhas por bloco nos escritores em streaming
+_report_scheduler = {'thread': None, 'last_run': None, 'last_result': None}
+_report_scheduler_lock = threading.Lock()
+_report_scheduler_wakeup = threading.Event()
+
+def _mortality_pack_sheets():
+    """Planilhas do pacote de mortalidade"""
+    mortality_df = load_mortality_records()
+    animals_df = load_animals()
+    data = mortality_df.assign(data_morte=pd.to_datetime(mortality_df['data_morte'], errors='coerce'))
+    by_cause = data.groupby('causa_morte').size().reset_index(name='mortes').sort_values('mortes', ascending=False)
+    by_month = data.groupby([data['data_morte'].dt.strftime('%Y-%m').rename('mes'), 'categoria']).size().reset_index(name='mortes')
+    return {
+        'Registros': generate_mortality_report(mortality_df, animals_df),
+        'Por Causa': by_cause,
+        'Por Mês': by_month
+    }
+
+def _vaccination_pack_sheets():
+    """Planilhas do pacote de vacinação (aplicações e roteiro das próximas campanhas)"""
+    animals_df = load_animals()
+    vaccines_df = load_vaccines()
+    records_df = load_vaccination_records()
+    pens_df = load_pens()
+    allocations_df = load_pen_allocations()
+    vaccine_names = vaccines_df.set_index('id_vacina')['nome'] if not vaccines_df.empty else pd.Series(dtype=object)
+    records = records_df.merge(animals_df[['id_animal', 'identificacao', 'categoria']], on='id_animal', how='left')
+    records['vacina'] = records['id_vacina'].map(vaccine_names)
+    if 'nome_vacina' in records.columns:
+        records['vacina'] = records['vacina'].fillna(records['nome_vacina'])
+    records['mes'] = pd.to_datetime(records['data_aplicacao'], errors='coerce').dt.strftime('%Y-%m')
+    by_month = records.groupby(['mes', 'vacina']).size().reset_index(name='aplicacoes')
+    plan_df = plan_vaccination_campaign(
+        animals_df, load_vaccination_protocols(), vaccines_df, records_df, allocations_df
+    )
+    return {
+        'Aplicações': records.drop(columns=['mes']),
+        'Por Mês': by_month,
+        'Próximas Campanhas': summarize_vaccination_worklist(plan_df, animals_df, vaccines_df, pens_df)
+    }
+
+def _recria_pack_sheets():
+    """Planilhas do pacote de desempenho da recria"""
+    lotes_df = load_recria_lotes()
+    pesagens_df = load_recria_pesagens()
+    by_lot = pesagens_df.groupby('id_lote').agg(
+        pesagens=('peso', 'size'),
+        peso_medio=('peso', 'mean'),
+        gpd_medio=('gpd_periodo', 'mean'),
+        ultima_pesagem=('data_pesagem', 'max')
+    ).reset_index()
+    lots = lotes_df.merge(by_lot, on='id_lote', how='left')
+    stats = calcular_estatisticas_recria()
+    summary = pd.DataFrame(
+        [(key, value) for key, value in stats.items() if not isinstance(value, dict)],
+        columns=['indicador', 'valor']
+    )
+    return {
+        'Resumo': summary,
+        'Lotes': lots,
+        'Pesagens': pesagens_df
+    }
+
+def _farrowing_pack_sheets():
+    """Planilhas do pacote de previsão de partos"""
+    gestation_df = load_gestation()
+    animals_df = load_animals()
+    forecast = forecast_farrowings(gestation_df).merge(
+        animals_df[['id_animal', 'identificacao']], on='id_animal', how='left'
+    )
+    board_df, board_forecast = build_farrowing_board(forecast, load_pens(), load_pen_allocations())
+    return {
+        'Previsão': forecast,
+        'Quadro Semanal': board_df,
+        'Matrizes por Semana': board_forecast.drop(columns=['identificacao'], errors='ignore').merge(
+            animals_df[['id_animal', 'identificacao']], on='id_animal', how='left'
+        )
+    }
+
+# setor -> título, tabelas de entrada, planilhas e gráficos do PDF (planilha, eixo x, eixo y)
+REPORT_PACKS = {
+    'mortalidade': {
+        'titulo': 'Mortalidade',
+        'tabelas': ['mortality', 'animals'],
+        'planilhas': _mortality_pack_sheets,
+        'graficos': [('Por Causa', 'causa_morte', 'mortes')]
+    },
+    'vacinacao': {
+        'titulo': 'Vacinação',
+        'tabelas': ['vaccination_records', 'vaccines', 'vaccination_protocols', 'animals', 'pens', 'pen_allocations'],
+        'planilhas': _vaccination_pack_sheets,
+        'graficos': [('Próximas Campanhas', 'data_campanha', 'doses')],
+        'diario': True
+    },
+    'recria': {
+        'titulo': 'Desempenho da Recria',
+        'tabelas': ['recria', 'recria_lotes', 'recria_pesagens', RECRIA_ALIMENTACAO_FILE, RECRIA_MEDICACAO_FILE],
+        'planilhas': _recria_pack_sheets,
+        'graficos': [('Lotes', 'codigo', 'gpd_medio')]
+    },
+    'previsao_partos': {
+        'titulo': 'Previsão de Partos',
+        'tabelas': ['gestation', 'animals', 'pens', 'pen_allocations'],
+        'planilhas': _farrowing_pack_sheets,
+        'graficos': [('Quadro Semanal', 'lote_parto', 'partos_previstos')],
+        'diario': True
+    }
+}
+
+def report_pack_version(sector):
+    """
+    Versão do pacote de um setor: hash dos carimbos (data de modificação, tamanho)
+    das tabelas de entrada, mais a data do dia para pacotes que dependem dela.
+    """
+    spec = REPORT_PACKS[sector]
+    stamps = [(path, _file_stamp(path)) for path in (TABLE_FILES.get(t, t) for t in spec['tabelas'])]
+    if spec.get('diario'):
+        stamps.append(('data', datetime.now().date().isoformat()))
+    return hashlib.sha1(repr(stamps).encode()).hexdigest()[:12]
+
+def _sheet_rows(df, chunk_rows):
+    """Linhas de uma planilha em blocos, com nulos como None"""
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows].astype(object)
+        yield from chunk.where(chunk.notna(), None).itertuples(index=False, name=None)
+
+def _write_pack_csv_zip(sheets, path, chunk_rows=REPORT_PACK_CHUNK_ROWS):
+    """Um CSV por planilha dentro de um ZIP, escrito em blocos direto no arquivo compactado"""
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, df in sheets.items():
+            with archive.open(f"{name}.csv", 'w') as raw, io.TextIOWrapper(raw, encoding='utf-8', newline='') as text:
+                df.head(0).to_csv(text, index=False)
+                for start in range(0, len(df), chunk_rows):
+                    df.iloc[start:start + chunk_rows].to_csv(text, index=False, header=False)
+
+def _write_pack_xlsx(sheets, path, chunk_rows=REPORT_PACK_CHUNK_ROWS):
+    """Planilha Excel no modo write-only do openpyxl (linhas vão direto para o disco)"""
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    for name, df in sheets.items():
+        sheet = workbook.create_sheet(title=name[:31])
+        sheet.append([str(column) for column in df.columns])
+        for row in _sheet_rows(df, chunk_rows):
+            sheet.append(row)
+    workbook.save(path)
+
+def _write_pack_pdf(sector, sheets, path, generated_at):
+    """Resumo em PDF: linhas por planilha e os gráficos configurados do setor"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_pdf import PdfPages
+    spec = REPORT_PACKS[sector]
+    with PdfPages(path) as pdf:
+        fig = Figure(figsize=(8.27, 11.69))
+        fig.text(0.08, 0.92, f"Relatório de {spec['titulo']}", fontsize=18, weight='bold')
+        fig.text(0.08, 0.88, f"Gerado em {generated_at.strftime('%d/%m/%Y %H:%M')}", fontsize=10)
+        for i, (name, df) in enumerate(sheets.items()):
+            fig.text(0.08, 0.82 - i * 0.03, f"{name}: {len(df)} linhas", fontsize=11)
+        pdf.savefig(fig)
+        for sheet_name, x, y in spec['graficos']:
+            df = sheets.get(sheet_name)
+            if df is None or df.empty or x not in df.columns or y not in df.columns:
+                continue
+            data = df[[x, y]].dropna().head(40)
+            fig = Figure(figsize=(11.69, 8.27))
+            ax = fig.add_subplot()
+            ax.bar(data[x].astype(str), data[y])
+            ax.set_title(sheet_name)
+            ax.set_xlabel(x)
+            ax.set_ylabel(y)
+            ax.tick_params(axis='x', labelrotation=60, labelsize=8)
+            fig.tight_layout()
+            pdf.savefig(fig)
+
+def _build_report_pack(sector, version, reports_dir=REPORTS_DIR):
+    """
+    Gera o pacote de um setor em um diretório temporário e o publica em
+    reports_dir/<setor>/<versão> (executado nos processos do pool).
+
+    Returns:
+        dict: Manifesto do pacote
+    """
+    start = time.perf_counter()
+    sheets = REPORT_PACKS[sector]['planilhas']()
+    generated_at = datetime.now()
+    sector_dir = os.path.join(reports_dir, sector)
+    os.makedirs(sector_dir, exist_ok=True)
+    temp_dir = os.path.join(sector_dir, f".{version}.{os.getpid()}.tmp")
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(temp_dir)
+    files = {'csv': f"{sector}.zip"}
+    try:
+        _write_pack_csv_zip(sheets, os.path.join(temp_dir, files['csv']))
+        _write_pack_xlsx(sheets, os.path.join(temp_dir, f"{sector}.xlsx"))
+        files['xlsx'] = f"{sector}.xlsx"
+        _write_pack_pdf(sector, sheets, os.path.join(temp_dir, f"{sector}.pdf"), generated_at)
+        files['pdf'] = f"{sector}.pdf"
+        manifest = {
+            'setor': sector,
+            'versao': version,
+            'gerado_em': generated_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'linhas': {name: len(df) for name, df in sheets.items()},
+            'arquivos': files,
+            'tempo_s': round(time.perf_counter() - start, 2)
+        }
+        with open(os.path.join(temp_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    final_dir = os.path.join(sector_dir, version)
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(temp_dir, final_dir)
+    return manifest
+
+def _load_report_index(reports_dir=REPORTS_DIR):
+    try:
+        with open(os.path.join(reports_dir, 'index.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_report_index(index, reports_dir=REPORTS_DIR):
+    os.makedirs(reports_dir, exist_ok=True)
+    temp_path = os.path.join(reports_dir, 'index.json.tmp')
+    with open(temp_path, 'w') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, os.path.join(reports_dir, 'index.json'))
+
+def _prune_report_versions(sector, keep, reports_dir=REPORTS_DIR):
+    """Remove as versões mais antigas de um setor, mantendo as keep mais recentes"""
+    sector_dir = os.path.join(reports_dir, sector)
+    versions = [
+        entry for entry in os.scandir(sector_dir)
+        if entry.is_dir() and not entry.name.startswith('.')
+    ]
+    versions.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in versions[keep:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+def run_report_pipeline(sectors=None, force=False, n_jobs=None, reports_dir=REPORTS_DIR):
+    """
+    Gera os pacotes de relatórios (ZIP de CSVs, Excel e PDF) dos setores em um pool de processos.
+
+    Setores cujas tabelas de entrada não mudaram desde o último pacote são pulados
+    (a versão é o hash dos carimbos dos arquivos); use force=True para regerar.
+
+    Args:
+        sectors: Setores a gerar (padrão: todos de REPORT_PACKS)
+        force: Regerar mesmo sem mudanças
+        n_jobs: Número de processos (padrão: um por setor, limitado pelos núcleos)
+        reports_dir: Diretório dos pacotes
+
+    Returns:
+        DataFrame: setor, versao, status, tempo_s
+    """
+    sectors = list(sectors or REPORT_PACKS)
+    index = _load_report_index(reports_dir)
+    rows, pending = [], []
+    for sector in sectors:
+        version = report_pack_version(sector)
+        published = os.path.join(reports_dir, sector, version, 'manifest.json')
+        if not force and index.get(sector) == version and os.path.exists(published):
+            rows.append({'setor': sector, 'versao': version, 'status': 'sem alterações', 'tempo_s': 0.0})
+        else:
+            pending.append((sector, version))
+
+    results = None
+    n_jobs = n_jobs or min(len(pending), os.cpu_count() or 1)
+    if n_jobs > 1 and len(pending) > 1:
+        try:
+            with _process_pool(n_jobs) as executor:
+                futures = {sector: executor.submit(_build_report_pack, sector, version, reports_dir) for sector, version in pending}
+                results = {}
+                for sector, future in futures.items():
+                    try:
+                        results[sector] = future.result()
+                    except Exception as e:
+                        results[sector] = e
+        except (OSError, RuntimeError):
+            results = None
+    if results is None:
+        results = {}
+        for sector, version in pending:
+            try:
+                results[sector] = _build_report_pack(sector, version, reports_dir)
+            except Exception as e:
+                results[sector] = e
+
+    for sector, version in pending:
+        result = results[sector]
+        if isinstance(result, Exception):
+            rows.append({'setor': sector, 'versao': version, 'status': f"erro: {result}", 'tempo_s': None})
+            continue
+        index[sector] = version
+        _prune_report_versions(sector, REPORT_PACK_KEEP_VERSIONS, reports_dir)
+        rows.append({'setor': sector, 'versao': version, 'status': 'gerado', 'tempo_s': result['tempo_s']})
+    _save_report_index(index, reports_dir)
+    return pd.DataFrame(rows, columns=['setor', 'versao', 'status', 'tempo_s'])
+
+def get_report_packs(reports_dir=REPORTS_DIR):
+    """
+    Pacotes publicados (última versão de cada setor), para as páginas servirem sem recalcular.
+
+    Returns:
+        dict: setor -> manifesto, com 'caminhos' (formato -> caminho do arquivo) e 'atualizado'
+              (False se as tabelas mudaram depois da geração)
+    """
+    packs = {}
+    for sector, version in _load_report_index(reports_dir).items():
+        if sector not in REPORT_PACKS:
+            continue
+        pack_dir = os.path.join(reports_dir, sector, version)
+        try:
+            with open(os.path.join(pack_dir, 'manifest.json')) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            continue
+        manifest['titulo'] = REPORT_PACKS[sector]['titulo']
+        manifest['caminhos'] = {fmt: os.path.join(pack_dir, name) for fmt, name in manifest['arquivos'].items()}
+        manifest['atualizado'] = report_pack_version(sector) == version
+        packs[sector] = manifest
+    return packs
+
+def _seconds_until_next_report_run(now=None):
+    now = now or datetime.now()
+    next_run = now.replace(hour=REPORT_PIPELINE_HOUR, minute=0, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+def _report_scheduler_loop():
+    """Thread do agendador: gera os pacotes ao iniciar (só o que mudou) e toda noite"""
+    while True:
+        try:
+            result = run_report_pipeline()
+            _report_scheduler['last_run'] = datetime.now()
+            _report_scheduler['last_result'] = result
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Erro ao gerar pacotes de relatórios: {str(e)}")
+        _report_scheduler_wakeup.wait(_seconds_until_next_report_run())
+        _report_scheduler_wakeup.clear()
+
+def start_report_scheduler():
+    """Inicia (uma vez por processo) a geração noturna dos pacotes de relatórios"""
+    with _report_scheduler_lock:
+        thread = _report_scheduler['thread']
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(target=_report_scheduler_loop, name='report-scheduler', daemon=True)
+            _report_scheduler['thread'] = thread
+            thread.start()
+
+def get_report_scheduler_status():
+    """Última execução do agendador de pacotes e o resultado por setor"""
+    return {
+        'ativo': _report_scheduler['thread'] is not None and _report_scheduler['thread'].is_alive(),
+        'ultima_execucao': _report_scheduler['last_run'],
+        'proxima_execucao': datetime.now() + timedelta(seconds=_seconds_until_next_report_run()),
+        'resultado': _report_scheduler['last_result']
+    }
+
+# Exportação em blocos para arquivo temporário (servida com st.download_button a partir do arquivo)
+EXPORT_CHUNK_ROWS = 50000
+EXCEL_MAX_ROWS = 1048575  # linhas de dados por planilha (o limite do Excel inclui o cabeçalho)
+
+EXPORT_FORMATS = {
+    'csv': ('csv', 'text/csv'),
+    'excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'json': ('json', 'application/json')
+}
+
+def get_export_formats():
+    """Formatos de exportação oferecidos nas páginas (rótulo -> formato de export_to_file)"""
+    return {'CSV': 'csv', 'Excel': 'excel', 'Parquet': 'parquet', 'JSON': 'json'}
+
+def _export_chunks(df, chunk_rows):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+def _export_csv(df, path, chunk_rows):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        df.head(0).to_csv(f, index=False)
+        for chunk in _export_chunks(df, chunk_rows):
+            chunk.to_csv(f, index=False, header=False)
+
+def _export_json(df, path, chunk_rows):
+    # Mesmo formato de export_data (lista de registros), montado bloco a bloco
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        first = True
+        for chunk in _export_chunks(df, chunk_rows):
+            records = chunk.to_json(orient='records')[1:-1]
+            if records:
+                f.write(records if first else ',' + records)
+                first = False
+        f.write(']')
+
+def _export_xlsx(df, path, chunk_rows):
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    header = [str(column) for column in df.columns]
+    # Uma planilha nova a cada EXCEL_MAX_ROWS linhas
+    for sheet_number, start in enumerate(range(0, max(len(df), 1), EXCEL_MAX_ROWS), start=1):
+        sheet = workbook.create_sheet(title="Dados" if sheet_number == 1 else f"Dados {sheet_number}")
+        sheet.append(header)
+        for row in _sheet_rows(df.iloc[start:start + EXCEL_MAX_ROWS], chunk_rows):
+            sheet.append(row)
+    workbook.save(path)
+
+def _export_parquet(df, path, chunk_rows):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    # Esquema da tabela inteira para que todos os blocos (grupos de linhas) tenham os mesmos tipos
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in _export_chunks(df, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+def export_to_file(source, format_type, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Exporta uma tabela para um arquivo temporário, escrevendo em blocos de chunk_rows linhas.
+
+    Ao contrário de export_data, o conteúdo não é montado inteiro em memória: cada bloco
+    vai direto para o disco e a página serve o arquivo aberto com st.download_button.
+    Quem chama deve remover o arquivo depois de servi-lo.
+
+    Args:
+        source: DataFrame ou nome de uma tabela de TABLE_FILES (lida da versão compartilhada)
+        format_type: 'csv', 'excel', 'parquet' ou 'json'
+        chunk_rows: Linhas por bloco
+
+    Returns:
+        tuple: (caminho do arquivo, extensão, tipo MIME)
+    """
+    df = _read_table(TABLE_FILES[source]) if isinstance(source, str) else source
+    writers = {'csv': _export_csv, 'excel': _export_xlsx, 'parquet': _export_parquet, 'json': _export_json}
+    if format_type not in writers:
+        format_type = 'csv'
+    extension, mime = EXPORT_FORMATS[format_type]
+    fd, path = tempfile.mkstemp(prefix='suinogest_export_', suffix=f'.{extension}')
+    os.close(fd)
+    try:
+        writers[format_type](df, path, chunk_rows)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, extension, mime
+
+def benchmark_export(n_rows=1000000, formats=('csv', 'parquet', 'json'), chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Compara o pico de memória da exportação antiga (conteúdo inteiro em memória e link
+    base64) com a exportação em blocos para arquivo.
+
+    O pico é medido com tracemalloc a partir de uma tabela já carregada; memória alocada
+    fora do Python (como o pool do pyarrow) não entra na medida.
+
+    Returns:
+        DataFrame: formato, modo, tempo_s, tamanho_mb, pico_mb
+    """
+    import base64
+    import tracemalloc
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'id_animal': pd.Series(rng.integers(0, n_rows // 5 + 1, n_rows)).map('A{:06d}'.format),
+        'data_pesagem': (pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 2000, n_rows), unit='D')).strftime('%Y-%m-%d'),
+        'peso': rng.normal(80, 30, n_rows).round(2),
+        'idade_dias': rng.integers(1, 900, n_rows),
+        'categoria': rng.choice(['Leitão', 'Matriz', 'Reprodutor', 'Leitoa'], n_rows),
+        'observacao': rng.choice(['', 'Pesagem de rotina', 'Reavaliação'], n_rows)
+    })
+
+    def in_memory(format_type):
+        if format_type == 'excel':
+            buffer = io.BytesIO()
+            df.to_excel(buffer, index=False)
+            content = buffer.getvalue()
+        elif format_type == 'parquet':
+            content = df.to_parquet(index=False)
+        else:
+            content = export_data(df, format_type).encode()
+        base64.b64encode(content)  # o link antigo embutia o arquivo inteiro em base64
+        return len(content)
+
+    def streaming(format_type):
+        path, _, _ = export_to_file(df, format_type, chunk_rows)
+        try:
+            return os.path.getsize(path)
+        finally:
+            os.remove(path)
+
+    rows = []
+    for format_type in formats:
+        for mode, run in (('Em memória + base64', in_memory), ('Streaming em arquivo', streaming)):
+            tracemalloc.start()
+            start = time.perf_counter()
+            size = run(format_type)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            rows.append((format_type, mode, round(elapsed, 2), round(size / 2**20, 1), round(peak / 2**20, 1)))
+    return pd.DataFrame(rows, columns=['formato', 'modo', 'tempo_s', 'tamanho_mb', 'pico_mb'])